@@ -0,0 +1,464 @@
+# benchmarks/executar.py
+"""Benchmarks dos caminhos quentes de montagem e exportação da planilha.
+
+Cada caso roda sobre dados sintéticos (common.dados_sinteticos, semente fixa) em vários
+tamanhos e mede vazão (itens/s, melhor de N repetições) e pico de memória alocada
+(tracemalloc, numa execução à parte). Antes dos casos roda uma calibração fixa (pandas +
+Python puro, sem código do app); a vazão de cada caso é guardada também como múltiplo da
+calibração (``vazao_relativa``), o que tira do baseline a velocidade da máquina.
+
+O resultado é comparado com ``baseline.json`` pela vazão relativa: abaixo de
+``(1 - tolerancia_vazao)`` ou pico acima de ``(1 + tolerancia_memoria)`` do baseline reprova
+(código de saída 1). Os valores absolutos do baseline são só informativos. A comparação roda
+também em tests/test_benchmarks.py, no tamanho pequeno e com tolerância mais folgada.
+
+    python -m benchmarks                       # compara com o baseline
+    python -m benchmarks --tamanhos 1000 100000 --casos aplicar_lotes
+    python -m benchmarks --atualizar           # regrava o baseline (em qualquer máquina: vale a razão)
+
+Qt fica de fora: diálogos, mensagens e o PDF de produção são trocados por dublês.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import gc
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from common.dados_sinteticos import GeradorSintetico, PerfilSintetico, carregar_catalogo
+
+BASELINE = Path(__file__).with_name("baseline.json")
+TAMANHO_TESTE = 200  # o que tests/test_benchmarks.py roda
+TAMANHOS_PADRAO = (TAMANHO_TESTE, 1_000, 10_000)
+CALIBRACAO_N = 20_000
+SEMENTE = 2024
+TOLERANCIA_VAZAO = 0.25
+TOLERANCIA_MEMORIA = 0.15
+
+# o caso devolve quantos itens processou
+Execucao = Callable[[], int]
+
+_rodadas = itertools.count()
+
+
+class Caso(NamedTuple):
+    nome: str
+    # (contexto, n) -> execução pronta (entradas montadas fora da medição)
+    preparar: Callable[[Contexto, int], Execucao]
+
+
+class Medida(NamedTuple):
+    itens: int
+    segundos: float
+    itens_por_s: float
+    pico_mb: float
+    vazao_relativa: float = 0.0  # itens_por_s / itens_por_s da calibração
+
+
+# ---------------------------------------------------------------------------
+# dublês de Qt
+# ---------------------------------------------------------------------------
+class _SinalMudo:
+    def emit(self, *_args: Any) -> None:
+        pass
+
+
+class _ComunicadorMudo:
+    mostrar_mensagem = _SinalMudo()
+
+
+class _DialogoNumero:
+    """QInputDialog.getInt que aceita o valor padrão oferecido (ano/mês correntes, número inicial)."""
+
+    @staticmethod
+    def getInt(*_args: Any, value: int = 0, **_kwargs: Any) -> tuple[int, bool]:
+        return value, True
+
+
+class _AplicacaoSemJanela:
+    @staticmethod
+    def activeWindow() -> object:
+        return object()
+
+
+@contextlib.contextmanager
+def _sem_qt(main: Any, ctx: Contexto) -> Iterator[None]:
+    trocas = {
+        "comunicador_global": _ComunicadorMudo(),
+        "QInputDialog": _DialogoNumero,
+        "QApplication": _AplicacaoSemJanela,
+        "gerar_pdf_producao_logistica": lambda *_a, **_k: None,
+        "abrir_envios_log": ctx.abrir_log_envios,
+    }
+    originais = {nome: getattr(main, nome) for nome in trocas}
+    for nome, valor in trocas.items():
+        setattr(main, nome, valor)
+    try:
+        yield
+    finally:
+        for nome, valor in originais.items():
+            setattr(main, nome, valor)
+
+
+# ---------------------------------------------------------------------------
+# contexto: dados sintéticos e estado compartilhado entre casos
+# ---------------------------------------------------------------------------
+class Contexto:
+    def __init__(self, main: Any, pasta: Path) -> None:
+        self.main = main
+        self.pasta = pasta
+        self.skus, _regras = carregar_catalogo()
+        # todo cupom vira candidato a regra: exercita aplicar_regras_assinaturas de verdade
+        self.gerador = GeradorSintetico(SEMENTE, PerfilSintetico(taxa_cupom=0.6))
+        self.fim = datetime(2025, 6, 30, 23, 59, tzinfo=UTC)
+        self.inicio = datetime(2025, 5, 1, tzinfo=UTC)
+        self._planilhas: dict[int, Any] = {}
+        self.log_envios: Any = None
+        main.estado["skus_info"] = self.skus
+
+    def abrir_log_envios(self, caminho: str | os.PathLike[str]) -> Any:
+        """Dublê de abrir_envios_log: o log fixo do app (Envios/) vira o log sintético da execução."""
+        from common.envios_store import abrir_envios_log
+
+        if Path(caminho).resolve().is_relative_to(self.pasta.resolve()):
+            return abrir_envios_log(caminho)
+        return self.log_envios
+
+    def transacoes(self, n: int) -> list[dict[str, Any]]:
+        return list(self.gerador.transacoes_guru(n, inicio=self.inicio, fim=self.fim))
+
+    def dados(self) -> dict[str, Any]:
+        dados = self.gerador.dados_guru()
+        dados.update(
+            {
+                "periodicidade": "bimestral",
+                "ordered_at_ini_periodo": self.inicio,
+                "ordered_at_end_periodo": self.fim,
+                "embutido_ini_ts": self.inicio.timestamp(),
+                "embutido_end_ts": self.fim.timestamp(),
+            }
+        )
+        return dados
+
+    def planilha(self, n: int) -> Any:
+        """Planilha do Guru montada a partir de `n` transações (cacheada; use uma cópia)."""
+        if n not in self._planilhas:
+            estado: dict[str, Any] = {}
+            self.main.montar_planilha_vendas_guru(
+                self.transacoes(n), self.dados(), None, self.skus, threading.Event(), estado
+            )
+            self._planilhas[n] = estado["df_planilha_parcial"]
+        return self._planilhas[n]
+
+
+# ---------------------------------------------------------------------------
+# casos
+# ---------------------------------------------------------------------------
+def _montar_planilha(ctx: Contexto, n: int) -> Execucao:
+    transacoes, dados = ctx.transacoes(n), ctx.dados()
+
+    def executar() -> int:
+        ctx.main.montar_planilha_vendas_guru(transacoes, dados, None, ctx.skus, threading.Event(), {})
+        return n
+
+    return executar
+
+
+def _calcular_valores(ctx: Contexto, n: int) -> Execucao:
+    transacoes, dados = ctx.transacoes(n), ctx.dados()
+
+    def executar() -> int:
+        for t in transacoes:
+            ctx.main.calcular_valores_pedidos(t, dados, ctx.skus)
+        return n
+
+    return executar
+
+
+def _aplicar_regras(ctx: Contexto, n: int) -> Execucao:
+    transacoes, dados = ctx.transacoes(n), ctx.dados()
+
+    def executar() -> int:
+        for t in transacoes:
+            ctx.main.aplicar_regras_assinaturas(t, dados, ctx.skus, t["product"]["name"])
+        return n
+
+    return executar
+
+
+def _desmembrar_combos(ctx: Contexto, n: int) -> Execucao:
+    combos = [nome for nome, info in ctx.skus.items() if info.get("tipo") == "combo" and info.get("composto_de")]
+    tabela = ctx.main.TabelaCombos(ctx.skus)
+    entradas = [
+        ({"produto_principal": combos[i % len(combos)], "valor_total": 199.9}, {"transaction_id": f"tx{i}"})
+        for i in range(n)
+    ]
+
+    def executar() -> int:
+        for valores, linha in entradas:
+            ctx.main.desmembrar_combo_planilha(valores, linha, ctx.skus, tabela=tabela)
+        return n
+
+    return executar
+
+
+def _aplicar_lotes(ctx: Contexto, n: int) -> Execucao:
+    df = ctx.planilha(n)
+
+    def executar() -> int:
+        return len(ctx.main.aplicar_lotes(df.copy(), {}))
+
+    return executar
+
+
+def _remover_enviados(ctx: Contexto, n: int) -> Execucao:
+    df = ctx.planilha(n)
+    main = ctx.main
+
+    def executar() -> int:
+        main.estado["df_planilha_parcial"] = df.copy()
+        main.remover_pedidos_enviados()
+        return len(df)
+
+    return executar
+
+
+def _verificar_duplicidade(ctx: Contexto, n: int) -> Execucao:
+    from common.envios_store import abrir_envios_log
+
+    ano = ctx.main.QDate.currentDate().year()
+    registros = [
+        {"subscription_id": f"sub{i}", "ano": ano, "periodicidade": "bimestral", "periodo": 1 + i % 6} for i in range(n)
+    ]
+    # log novo a cada preparo, já com metade dos registros (exercita o dedup)
+    caminho = ctx.pasta / f"dup_{n}_{next(_rodadas)}" / "envios_log.xlsx"
+    caminho.parent.mkdir()
+    abrir_envios_log(caminho).registrar("assinaturas", registros[::2])
+
+    def executar() -> int:
+        ctx.main.verificar_duplicidade_no_log(caminho, registros, sheet_name="assinaturas")
+        return n
+
+    return executar
+
+
+def _salvar_bling(ctx: Contexto, n: int) -> Execucao:
+    df = ctx.main.aplicar_lotes(ctx.planilha(n).copy(), {})
+    saida = str(ctx.pasta / f"bling_{n}.xlsx")
+
+    def executar() -> int:
+        ctx.main.salvar_planilha_bling(df, saida, numero_inicial=1, abrir_pdf=False)
+        return len(df)
+
+    return executar
+
+
+CASOS: tuple[Caso, ...] = (
+    Caso("montar_planilha_vendas_guru", _montar_planilha),
+    Caso("calcular_valores_pedidos", _calcular_valores),
+    Caso("aplicar_regras_assinaturas", _aplicar_regras),
+    Caso("desmembrar_combo_planilha", _desmembrar_combos),
+    Caso("aplicar_lotes", _aplicar_lotes),
+    Caso("remover_pedidos_enviados", _remover_enviados),
+    Caso("verificar_duplicidade_no_log", _verificar_duplicidade),
+    Caso("salvar_planilha_bling", _salvar_bling),
+)
+
+
+def _log_envios_com_enviados(ctx: Contexto, caminho: Path) -> Any:
+    """Log de envios com ~1/3 das assinaturas da maior planilha já registradas no mês corrente."""
+    from common.envios_store import abrir_envios_log
+
+    store = abrir_envios_log(caminho)
+    hoje = ctx.main.QDate.currentDate()  # o mesmo "hoje" que o diálogo dublê devolve
+    ano, mes = hoje.year(), hoje.month()
+    registros = []
+    for df in ctx._planilhas.values():
+        pares = list(df[["subscription_id", "periodicidade"]].drop_duplicates().itertuples(index=False))
+        for sid, per in pares[::3]:
+            periodo = mes if per == "mensal" else 1 + (mes - 1) // 2
+            registros.append({"subscription_id": sid, "ano": ano, "periodicidade": per, "periodo": periodo})
+    store.registrar("assinaturas", registros)
+    return store
+
+
+# ---------------------------------------------------------------------------
+# calibração: mesma carga em toda versão do app, mede só a máquina
+# ---------------------------------------------------------------------------
+def _calibracao(n: int) -> Execucao:
+    import random
+
+    import pandas as pd
+
+    rnd = random.Random(SEMENTE)
+    linhas: list[dict[str, Any]] = [
+        {"pedido": f"p{rnd.randrange(n // 3)}", "sku": f"S{rnd.randrange(50)}", "valor": rnd.random()} for _ in range(n)
+    ]
+
+    def executar() -> int:
+        df = pd.DataFrame(linhas)
+        df["sku"] = df["sku"].str.lower()
+        df.groupby(["pedido", "sku"])["valor"].sum()
+        por_pedido: dict[str, list[float]] = {}
+        for linha in linhas:
+            por_pedido.setdefault(linha["pedido"], []).append(round(linha["valor"] * 100))
+        sorted(json.dumps(linha, sort_keys=True) for linha in linhas)
+        return n
+
+    return executar
+
+
+def calibrar(repeticoes: int = 3) -> float:
+    """Vazão (itens/s) da carga de calibração nesta máquina."""
+    return medir(lambda: _calibracao(CALIBRACAO_N), repeticoes).itens_por_s
+
+
+# ---------------------------------------------------------------------------
+# medição
+# ---------------------------------------------------------------------------
+def medir(executar_pronto: Callable[[], Execucao], repeticoes: int) -> Medida:
+    """Melhor tempo de `repeticoes` execuções + pico de memória numa execução extra."""
+    melhor = float("inf")
+    itens = 0
+    for _ in range(max(1, repeticoes)):
+        executar = executar_pronto()
+        gc.collect()
+        t0 = time.perf_counter()
+        itens = executar()
+        melhor = min(melhor, time.perf_counter() - t0)
+
+    executar = executar_pronto()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        executar()
+        pico = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return Medida(itens, round(melhor, 4), round(itens / melhor, 1) if melhor > 0 else 0.0, round(pico / 2**20, 2))
+
+
+def executar_casos(
+    tamanhos: Sequence[int], nomes: Sequence[str] | None = None, repeticoes: int = 3
+) -> dict[str, dict[str, Medida]]:
+    """Roda os casos selecionados em cada tamanho. Retorna {caso: {tamanho: Medida}}."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    import main
+
+    casos = [c for c in CASOS if not nomes or c.nome in nomes]
+    resultados: dict[str, dict[str, Medida]] = {}
+    calibracao = calibrar(max(3, repeticoes))
+    print(f"{'calibracao':<30} n={CALIBRACAO_N:<8} {calibracao:>12,.0f} itens/s", file=sys.stderr)
+    with tempfile.TemporaryDirectory(prefix="lg_bench_") as tmp, open(os.devnull, "w") as nulo:
+        pasta = Path(tmp)
+        ctx = Contexto(main, pasta)
+        with contextlib.redirect_stdout(nulo):  # o pipeline imprime bastante; o custo de formatar fica
+            with _sem_qt(main, ctx):
+                for n in tamanhos:
+                    ctx.planilha(n)
+                ctx.log_envios = _log_envios_com_enviados(ctx, pasta / "envios" / "envios_log.xlsx")
+                for caso in casos:
+                    for n in tamanhos:
+                        medida = medir(lambda c=caso, n=n: c.preparar(ctx, n), repeticoes)  # type: ignore[misc]
+                        medida = medida._replace(vazao_relativa=round(medida.itens_por_s / calibracao, 4))
+                        resultados.setdefault(caso.nome, {})[str(n)] = medida
+                        print(
+                            f"{caso.nome:<30} n={n:<8} {medida.itens_por_s:>12,.0f} itens/s  "
+                            f"(x{medida.vazao_relativa:.4f})  {medida.segundos:>8.3f}s  pico {medida.pico_mb:>8.2f} MB",
+                            file=sys.stderr,
+                        )
+    return resultados
+
+
+def comparar(
+    resultados: Mapping[str, Mapping[str, Medida]],
+    baseline: Mapping[str, Any],
+    *,
+    tolerancia_vazao: float = TOLERANCIA_VAZAO,
+    tolerancia_memoria: float = TOLERANCIA_MEMORIA,
+) -> list[str]:
+    """Regressões em relação ao baseline (lista vazia = tudo dentro da tolerância).
+
+    A vazão é comparada relativa à calibração, nunca em itens/s absolutos: o baseline vale em
+    qualquer máquina. Entradas sem ``vazao_relativa`` (formato antigo) ficam de fora.
+    """
+    regressoes: list[str] = []
+    casos_base: Mapping[str, Any] = baseline.get("casos", {})
+    for caso, por_tamanho in resultados.items():
+        for n, medida in por_tamanho.items():
+            ref = casos_base.get(caso, {}).get(n)
+            if not ref or not ref.get("vazao_relativa"):
+                continue
+            minimo = ref["vazao_relativa"] * (1 - tolerancia_vazao)
+            if medida.vazao_relativa < minimo:
+                regressoes.append(
+                    f"{caso} n={n}: vazão x{medida.vazao_relativa:.4f} da calibração < x{minimo:.4f} "
+                    f"(baseline x{ref['vazao_relativa']:.4f})"
+                )
+            # picos minúsculos oscilam mais que a tolerância: 1 MB de folga absoluta
+            maximo = ref["pico_mb"] * (1 + tolerancia_memoria) + 1.0
+            if medida.pico_mb > maximo:
+                regressoes.append(
+                    f"{caso} n={n}: pico {medida.pico_mb:.2f} MB > {maximo:.2f} MB (baseline {ref['pico_mb']:.2f})"
+                )
+    return regressoes
+
+
+def gravar_baseline(resultados: Mapping[str, Mapping[str, Medida]], caminho: Path = BASELINE) -> None:
+    atual: dict[str, Any] = json.loads(caminho.read_text(encoding="utf-8")) if caminho.exists() else {}
+    casos: dict[str, Any] = atual.get("casos", {})
+    for caso, por_tamanho in resultados.items():
+        for n, medida in por_tamanho.items():
+            casos.setdefault(caso, {})[n] = medida._asdict()
+    conteudo = {
+        "gerado_em": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "maquina": f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPUs)",
+        "semente": SEMENTE,
+        "comparacao": "vazao_relativa (itens_por_s / calibração); itens_por_s e segundos são desta máquina",
+        "casos": dict(sorted(casos.items())),
+    }
+    caminho.write_text(json.dumps(conteudo, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=list(TAMANHOS_PADRAO))
+    parser.add_argument("--casos", nargs="+", choices=[c.nome for c in CASOS])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--atualizar", action="store_true", help="Regrava o baseline com os resultados")
+    parser.add_argument("--tolerancia-vazao", type=float, default=TOLERANCIA_VAZAO)
+    parser.add_argument("--tolerancia-memoria", type=float, default=TOLERANCIA_MEMORIA)
+    args = parser.parse_args(argv)
+
+    resultados = executar_casos(args.tamanhos, args.casos, args.repeticoes)
+    if args.atualizar:
+        gravar_baseline(resultados)
+        print(f"Baseline atualizado: {BASELINE}")
+        return 0
+
+    baseline = json.loads(BASELINE.read_text(encoding="utf-8")) if BASELINE.exists() else {}
+    regressoes = comparar(
+        resultados,
+        baseline,
+        tolerancia_vazao=args.tolerancia_vazao,
+        tolerancia_memoria=args.tolerancia_memoria,
+    )
+    for r in regressoes:
+        print(f"REGRESSÃO  {r}")
+    if not regressoes:
+        print("Sem regressões em relação ao baseline.")
+    return 1 if regressoes else 0
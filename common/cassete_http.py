@@ -0,0 +1,278 @@
+# common/cassete_http.py
+from __future__ import annotations
+
+import atexit
+import base64
+import gzip
+import hashlib
+import io
+import json
+import logging
+import re
+import threading
+import time
+from collections.abc import Callable, Mapping
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Literal, NamedTuple, TextIO, TypedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .errors import UserError
+from .http_client import interceptar_transporte
+
+if TYPE_CHECKING:
+    import httpx
+    import requests
+
+_log = logging.getLogger(__name__)
+
+ModoCassete = Literal["gravar", "reproduzir"]
+
+# parâmetros de query que nunca vão para o cassete
+_PARAM_SECRETO = re.compile(r"token|key|secret|senha|password|signature|auth", re.IGNORECASE)
+# cabeçalhos de resposta que não fazem sentido reproduzir (o corpo é gravado já descomprimido)
+_CABECALHOS_DESCARTADOS = frozenset({"set-cookie", "content-encoding", "content-length", "transfer-encoding"})
+
+
+class Gravacao(TypedDict):
+    metodo: str
+    url: str
+    corpo_sha256: str
+    status: int
+    headers: dict[str, str]
+    corpo: str  # texto (utf-8) ou base64, conforme `b64`
+    b64: bool
+    duracao_s: float
+
+
+class Resposta(NamedTuple):
+    status: int
+    headers: Mapping[str, str]
+    corpo: bytes  # já descomprimido
+    duracao_s: float
+
+
+class Cassete:
+    """Grava respostas HTTP reais num arquivo .jsonl.gz e as serve de volta, sem rede.
+
+    - ``gravar``: cada requisição vai para a rede; a resposta (corpo descomprimido, status,
+      cabeçalhos e latência) é acrescentada ao cassete.
+    - ``reproduzir``: nenhuma requisição sai do processo; a resposta gravada para o mesmo método,
+      URL e corpo é devolvida depois de esperar ``duracao_s * escala`` (``escala=0``: sem espera).
+      Requisições repetidas recebem as gravações na ordem; esgotadas, repete a última. Sem
+      gravação para o corpo exato, cai para a primeira com mesmo método e URL.
+
+    Segredos não são gravados: valores de `segredos` viram ``{NOME}`` em URL, cabeçalhos e
+    corpos; parâmetros de query com nome sensível (token, key...) viram ``***``. Na reprodução
+    a mesma troca é feita antes de procurar — basta que as variáveis existam (qualquer valor).
+    """
+
+    def __init__(
+        self,
+        caminho: str | Path,
+        modo: ModoCassete,
+        *,
+        escala: float = 1.0,
+        segredos: Mapping[str, str] | None = None,
+        dormir: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.caminho = Path(caminho)
+        self.modo: ModoCassete = modo
+        self.escala = max(0.0, float(escala))
+        # mais longos primeiro: um segredo contido em outro não quebra a troca
+        self._segredos = sorted(((v, k) for k, v in (segredos or {}).items() if v), key=lambda s: -len(s[0]))
+        self._dormir = dormir
+        self._lock = threading.Lock()
+        self._arquivo: TextIO | None = None
+        self._gravacoes: dict[tuple[str, str, str], list[Gravacao]] = {}
+        self._por_url: dict[tuple[str, str], list[Gravacao]] = {}
+        self._servidas: dict[tuple[str, str, str], int] = {}
+        self.gravadas = 0
+        self.servidas = 0
+        self.faltantes = 0
+
+        if modo == "gravar":
+            self.caminho.parent.mkdir(parents=True, exist_ok=True)
+            self._arquivo = gzip.open(self.caminho, "wt", encoding="utf-8")
+        else:
+            if not self.caminho.exists():
+                raise UserError(f"Cassete não encontrado: {self.caminho}", code="CASSETE_INEXISTENTE")
+            with gzip.open(self.caminho, "rt", encoding="utf-8") as f:
+                for linha in f:
+                    if linha.strip():
+                        self._indexar(json.loads(linha))
+
+    # ---- limpeza de segredos e chaves ----
+    def limpar(self, texto: str) -> str:
+        for valor, nome in self._segredos:
+            texto = texto.replace(valor, f"{{{nome}}}")
+        return texto
+
+    def _url(self, url: str) -> str:
+        partes = urlsplit(self.limpar(url))
+        query = sorted(
+            (k, "***" if _PARAM_SECRETO.search(k) else v) for k, v in parse_qsl(partes.query, keep_blank_values=True)
+        )
+        return urlunsplit(partes._replace(query=urlencode(query), fragment=""))
+
+    def _hash_corpo(self, corpo: Any) -> str:
+        if isinstance(corpo, str):
+            corpo = corpo.encode("utf-8")
+        elif not isinstance(corpo, bytes | bytearray):
+            corpo = b""  # sem corpo (ou upload em streaming, que não dá para comparar)
+        texto = self.limpar(bytes(corpo).decode("utf-8", errors="surrogateescape"))
+        return hashlib.sha256(texto.encode("utf-8", errors="surrogateescape")).hexdigest()
+
+    def _indexar(self, g: Gravacao) -> None:
+        self._gravacoes.setdefault((g["metodo"], g["url"], g["corpo_sha256"]), []).append(g)
+        self._por_url.setdefault((g["metodo"], g["url"]), []).append(g)
+
+    # ---- gravação ----
+    def gravar(self, metodo: str, url: str, corpo_requisicao: Any, resposta: Resposta) -> None:
+        try:
+            texto, b64 = self.limpar(resposta.corpo.decode("utf-8")), False
+        except UnicodeDecodeError:
+            texto, b64 = base64.b64encode(resposta.corpo).decode("ascii"), True
+        gravacao: Gravacao = {
+            "metodo": metodo.upper(),
+            "url": self._url(url),
+            "corpo_sha256": self._hash_corpo(corpo_requisicao),
+            "status": int(resposta.status),
+            "headers": {
+                k: self.limpar(str(v)) for k, v in resposta.headers.items() if k.lower() not in _CABECALHOS_DESCARTADOS
+            },
+            "corpo": texto,
+            "b64": b64,
+            "duracao_s": round(resposta.duracao_s, 6),
+        }
+        with self._lock:
+            if self._arquivo is None:
+                return
+            self._arquivo.write(json.dumps(gravacao, ensure_ascii=False) + "\n")
+            self.gravadas += 1
+
+    # ---- reprodução ----
+    def buscar(self, metodo: str, url: str, corpo_requisicao: Any) -> Gravacao | None:
+        chave = (metodo.upper(), self._url(url), self._hash_corpo(corpo_requisicao))
+        with self._lock:
+            lista = self._gravacoes.get(chave)
+            if not lista:
+                lista = self._por_url.get(chave[:2])
+                chave = (*chave[:2], "*")
+            if not lista:
+                self.faltantes += 1
+                return None
+            i = self._servidas.get(chave, 0)
+            self._servidas[chave] = i + 1
+            self.servidas += 1
+        return lista[min(i, len(lista) - 1)]
+
+    def corpo(self, g: Gravacao) -> bytes:
+        return base64.b64decode(g["corpo"]) if g["b64"] else g["corpo"].encode("utf-8")
+
+    def esperar(self, g: Gravacao) -> None:
+        if self.escala > 0 and g["duracao_s"] > 0:
+            self._dormir(g["duracao_s"] * self.escala)
+
+    def fechar(self) -> None:
+        with self._lock:
+            arquivo, self._arquivo = self._arquivo, None
+        if arquivo is not None:
+            arquivo.close()
+            _log.info("cassete_gravado", extra={"caminho": str(self.caminho), "gravacoes": self.gravadas})
+        elif self.modo == "reproduzir":
+            _log.info(
+                "cassete_reproduzido",
+                extra={"caminho": str(self.caminho), "servidas": self.servidas, "faltantes": self.faltantes},
+            )
+
+    # ---- requests (HTTPAdapter.send) ----
+    def enviar_requests(
+        self,
+        send_original: Callable[..., requests.Response],
+        adapter: Any,
+        request: requests.PreparedRequest,
+        *args: Any,
+        **kwargs: Any,
+    ) -> requests.Response:
+        metodo, url = request.method or "GET", request.url or ""
+        if self.modo == "gravar":
+            t0 = time.perf_counter()
+            res = send_original(adapter, request, *args, **kwargs)
+            corpo = res.content  # fica em cache no Response: quem chamou lê normalmente
+            resposta = Resposta(res.status_code, res.headers, corpo, time.perf_counter() - t0)
+            self.gravar(metodo, url, request.body, resposta)
+            return res
+
+        import requests
+        from urllib3 import HTTPResponse
+
+        g = self.buscar(metodo, url, request.body)
+        if g is None:
+            raise requests.ConnectionError(f"cassete sem gravação para {metodo} {self._url(url)}", request=request)
+        self.esperar(g)
+        raw = HTTPResponse(
+            body=io.BytesIO(self.corpo(g)),
+            headers=g["headers"],
+            status=g["status"],
+            preload_content=False,
+            decode_content=False,
+            request_method=metodo,
+        )
+        return adapter.build_response(request, raw)  # type: ignore[no-any-return]
+
+    # ---- httpx (cliente da OpenAI) ----
+    def transporte_httpx(self) -> httpx.BaseTransport:
+        """Transporte httpx que grava/reproduz pelo mesmo cassete (o SDK da OpenAI não usa requests)."""
+        import httpx
+
+        cassete = self
+
+        class _TransporteCassete(httpx.BaseTransport):
+            def __init__(self) -> None:
+                self._rede = httpx.HTTPTransport() if cassete.modo == "gravar" else None
+
+            def handle_request(self, request: httpx.Request) -> httpx.Response:
+                metodo, url, corpo_req = request.method, str(request.url), request.read()
+                if self._rede is not None:
+                    t0 = time.perf_counter()
+                    res = self._rede.handle_request(request)
+                    corpo = res.read()
+                    resposta = Resposta(res.status_code, res.headers, corpo, time.perf_counter() - t0)
+                    cassete.gravar(metodo, url, corpo_req, resposta)
+                    return httpx.Response(res.status_code, headers=res.headers, content=corpo, request=request)
+
+                g = cassete.buscar(metodo, url, corpo_req)
+                if g is None:
+                    raise httpx.ConnectError(f"cassete sem gravação para {metodo} {cassete._url(url)}", request=request)
+                cassete.esperar(g)
+                return httpx.Response(g["status"], headers=g["headers"], content=cassete.corpo(g), request=request)
+
+            def close(self) -> None:
+                if self._rede is not None:
+                    self._rede.close()
+
+        return _TransporteCassete()
+
+
+class _Ativo:
+    cassete: Cassete | None = None
+
+
+def ativar_cassete(cassete: Cassete | None) -> None:
+    """Passa todas as chamadas requests do processo pelo cassete (None desativa e fecha o atual)."""
+    anterior, _Ativo.cassete = _Ativo.cassete, cassete
+    interceptar_transporte(cassete.enviar_requests if cassete is not None else None)
+    if anterior is not None and anterior is not cassete:
+        anterior.fechar()
+
+
+def cassete_ativo() -> Cassete | None:
+    return _Ativo.cassete
+
+
+def _fechar_ao_sair() -> None:
+    if _Ativo.cassete is not None:
+        _Ativo.cassete.fechar()
+
+
+atexit.register(_fechar_ao_sair)
@@ -5,8 +5,6 @@ import json
 from pathlib import Path
 from typing import Any, TypedDict, cast
 
-from dotenv import load_dotenv
-
 from common.paths import (
     default_config_path,
     resolve_output_dir_only,
@@ -38,6 +36,8 @@ def load_env(dotenv_filename: str = ".env") -> None:
     """
     Carrega variáveis do .env (se existir), sem sobrepor variáveis já setadas no ambiente.
     """
+    from dotenv import load_dotenv
+
     load_dotenv(dotenv_path=Path(dotenv_filename), override=False)
 
 
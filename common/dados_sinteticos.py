@@ -0,0 +1,519 @@
+# common/dados_sinteticos.py
+"""Gerador de transações do Guru e pedidos do Shopify sintéticos, a partir do catálogo (skus.json).
+
+Os registros têm o formato que as APIs devolvem, então alimentam testes, benchmarks e execuções
+offline do pipeline sem rede. :class:`GeradorSintetico` é determinístico pela semente e preguiçoso
+(gera um registro por vez); :func:`pagina_guru`/:func:`pagina_shopify` montam as respostas
+paginadas. Pela linha de comando, grava JSONL na pasta de saída:
+
+    python -m common.dados_sinteticos --guru 10000 --shopify 5000 --semente 1 --saida dados/
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import unicodedata
+import uuid
+from collections.abc import Iterator, Mapping, Sequence
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from .paths import app_root
+
+# recorrência (skus.json) -> tipo_assinatura que a coleta do Guru grava na transação
+TIPO_POR_RECORRENCIA = {
+    "mensal": "mensais",
+    "bimestral": "bimestrais",
+    "semestral": "semestrais",
+    "anual": "anuais",
+    "18meses": "18meses",
+    "bianual": "bianuais",
+    "trianual": "trianuais",
+}
+
+# valor cheio por (tipo, periodicidade) — mesma tabela de calcular_valores_pedidos; demais usam a mensalidade
+_VALOR_PLANO = {
+    ("anuais", "mensal"): 960.0,
+    ("anuais", "bimestral"): 480.0,
+    ("bianuais", "mensal"): 1920.0,
+    ("bianuais", "bimestral"): 960.0,
+    ("trianuais", "mensal"): 2880.0,
+    ("trianuais", "bimestral"): 1440.0,
+}
+_MENSALIDADE = {"mensal": 89.9, "bimestral": 169.9}
+_PRECO_PADRAO = 89.9
+
+ESTILOS_ENDERECO = ("completo", "numero_na_rua", "sem_bairro", "cep_sem_mascara", "caixa_alta", "so_cobranca")
+
+_NOMES = ("Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Heitor", "Íris", "João", "Luíza", "Márcio")
+_SOBRENOMES = ("Silva", "Souza", "Oliveira", "Pereira", "Almeida", "Conceição", "Araújo", "Gonçalves", "Brandão")
+_RUAS = ("Rua das Flores", "Av. Brasil", "Rua São João", "Travessa da Paz", "Rua Dom Pedro II", "Alameda Santos")
+_BAIRROS = ("Centro", "Jardim América", "Vila Mariana", "Boa Vista", "São José", "Santa Cecília")
+# (cidade, UF, prefixo de CEP)
+_CIDADES = (
+    ("São Paulo", "SP", "01"),
+    ("Rio de Janeiro", "RJ", "20"),
+    ("Belo Horizonte", "MG", "30"),
+    ("Curitiba", "PR", "80"),
+    ("Porto Alegre", "RS", "90"),
+    ("Salvador", "BA", "40"),
+    ("Recife", "PE", "50"),
+    ("Goiânia", "GO", "74"),
+)
+_FORMAS_PAGAMENTO = ("credit_card", "pix", "billet")
+
+
+class PerfilSintetico(NamedTuple):
+    """Proporções usadas pelo gerador (todas as taxas em 0..1)."""
+
+    # peso de cada recorrência entre as assinaturas (chaves de TIPO_POR_RECORRENCIA)
+    mix_planos: Mapping[str, float] = {"mensal": 0.3, "bimestral": 0.25, "anual": 0.3, "bianual": 0.1, "trianual": 0.05}
+    taxa_cupom: float = 0.3  # assinaturas com cupom das regras de config_ofertas.json
+    taxa_oferta: float = 0.15  # assinaturas feitas por uma oferta com brinde embutido
+    taxa_bump: float = 0.15  # pedidos com order bump (Guru) / item extra (Shopify)
+    taxa_combo: float = 0.2  # itens avulsos que são combos
+    taxa_renovacao: float = 0.25  # assinaturas com mais de uma transação no período
+    taxa_upgrade: float = 0.03
+    taxa_parcial: float = 0.1  # pedidos Shopify parcialmente atendidos
+    # peso de cada estilo de endereço (chaves de ESTILOS_ENDERECO)
+    estilos_endereco: Mapping[str, float] = {
+        "completo": 0.6,
+        "numero_na_rua": 0.15,
+        "sem_bairro": 0.1,
+        "cep_sem_mascara": 0.07,
+        "caixa_alta": 0.05,
+        "so_cobranca": 0.03,
+    }
+
+
+class _Catalogo:
+    """O que o gerador sorteia, extraído de skus.json e config_ofertas.json."""
+
+    def __init__(self, skus: Mapping[str, Mapping[str, Any]], regras: Sequence[Mapping[str, Any]]) -> None:
+        self.skus = skus
+        self.planos: dict[str, list[str]] = {}  # recorrência -> nomes de assinatura com guru_ids
+        self.guru_produtos: list[str] = []
+        self.guru_combos: list[str] = []
+        self.shopify_produtos: list[str] = []
+        self.shopify_combos: list[str] = []
+        for nome, info in skus.items():
+            tipo = str(info.get("tipo", "")).strip().lower()
+            if tipo == "assinatura" and info.get("guru_ids"):
+                self.planos.setdefault(str(info.get("recorrencia", "")), []).append(nome)
+            elif tipo in ("produto", "combo"):
+                if info.get("guru_ids"):
+                    (self.guru_combos if tipo == "combo" else self.guru_produtos).append(nome)
+                if info.get("shopify_ids") and info.get("sku"):
+                    (self.shopify_combos if tipo == "combo" else self.shopify_produtos).append(nome)
+
+        # cupons por rótulo de assinatura ("Assinatura Anual (mensal)"); lista vazia vale para todas
+        self.cupons_por_rotulo: dict[str, list[str]] = {}
+        self.cupons_gerais: list[str] = []
+        # ofertas com brinde embutido: produto_id -> [(oferta_id, nome da oferta)]
+        self.ofertas: dict[str, list[tuple[str, str]]] = {}
+        self.ofertas_embutidas: dict[str, str] = {}
+        for r in regras:
+            alvo = str(r.get("applies_to") or "").strip().lower()
+            if alvo == "cupom":
+                self._indexar_cupom(r)
+            elif alvo == "oferta":
+                self._indexar_oferta(r)
+
+    def _indexar_cupom(self, r: Mapping[str, Any]) -> None:
+        cupom = str((r.get("cupom") or {}).get("nome") or "").strip()
+        if not cupom:
+            return
+        rotulos = r.get("assinaturas") or []
+        if not rotulos:
+            self.cupons_gerais.append(cupom)
+        for rotulo in rotulos:
+            lista = self.cupons_por_rotulo.setdefault(str(rotulo), [])
+            if cupom not in lista:
+                lista.append(cupom)
+
+    def _indexar_oferta(self, r: Mapping[str, Any]) -> None:
+        oferta = r.get("oferta") or {}
+        oid, pid = str(oferta.get("oferta_id") or ""), str(oferta.get("produto_id") or "")
+        brindes = (r.get("action") or {}).get("brindes") or []
+        if oid and pid:
+            self.ofertas.setdefault(pid, []).append((oid, str(oferta.get("nome") or "")))
+            if brindes:
+                self.ofertas_embutidas[oid] = str(brindes[0])
+
+    def ids_planos(self) -> list[str]:
+        return [gid for nomes in self.planos.values() for nome in nomes for gid in self.skus[nome]["guru_ids"]]
+
+
+def carregar_catalogo(raiz: str | Path | None = None) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+    """Lê skus.json e as regras de config_ofertas.json de `raiz` (padrão: raiz do app)."""
+    pasta = Path(raiz) if raiz is not None else app_root()
+    skus = json.loads((pasta / "skus.json").read_text(encoding="utf-8"))
+    ofertas = json.loads((pasta / "config_ofertas.json").read_text(encoding="utf-8"))
+    return skus, list(ofertas.get("rules") or [])
+
+
+def _escolher(rnd: random.Random, pesos: Mapping[str, float], validos: Sequence[str]) -> str:
+    chaves = [k for k in pesos if k in validos and pesos[k] > 0]
+    if not chaves:
+        return rnd.choice(list(validos))
+    return rnd.choices(chaves, weights=[pesos[k] for k in chaves])[0]
+
+
+def _cpf(rnd: random.Random) -> str:
+    digitos = [int(c) for c in f"{rnd.randrange(10**9):09d}"]
+    for n in (10, 11):
+        resto = sum(d * p for d, p in zip(digitos, range(n, 1, -1), strict=False)) * 10 % 11
+        digitos.append(resto % 10)
+    return "".join(map(str, digitos))
+
+
+def _ascii(texto: str) -> str:
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+
+
+class GeradorSintetico:
+    """Gera transações do Guru e pedidos do Shopify no formato que as APIs devolvem.
+
+    Determinístico: a mesma `semente`, o mesmo catálogo e o mesmo perfil produzem exatamente
+    os mesmos registros (ids, datas e valores inclusive). Os geradores são preguiçosos — 1M de
+    registros podem ser consumidos ou gravados sem montar a lista inteira em memória.
+    """
+
+    def __init__(
+        self,
+        semente: int = 0,
+        perfil: PerfilSintetico | None = None,
+        *,
+        skus: Mapping[str, Mapping[str, Any]] | None = None,
+        regras: Sequence[Mapping[str, Any]] | None = None,
+    ) -> None:
+        if skus is None or regras is None:
+            skus_arquivo, regras_arquivo = carregar_catalogo()
+            skus = skus if skus is not None else skus_arquivo
+            regras = regras if regras is not None else regras_arquivo
+        self.semente = semente
+        self.perfil = perfil or PerfilSintetico()
+        self.catalogo = _Catalogo(skus, regras)
+        if not self.catalogo.planos and not self.catalogo.guru_produtos:
+            raise ValueError("skus.json sem assinaturas nem produtos com guru_ids")
+
+    def _rnd(self, fluxo: str) -> random.Random:
+        # um fluxo por tipo de registro: gerar Shopify não muda as transações do Guru
+        return random.Random(f"{self.semente}:{fluxo}")
+
+    # ---- pedaços comuns ----
+    def _uuid(self, rnd: random.Random) -> str:
+        return str(uuid.UUID(int=rnd.getrandbits(128), version=4))
+
+    def _data(self, rnd: random.Random, inicio: datetime, fim: datetime) -> datetime:
+        return inicio + timedelta(seconds=rnd.randrange(max(1, int((fim - inicio).total_seconds()))))
+
+    def _pessoa(self, rnd: random.Random) -> dict[str, str]:
+        nome, sobrenome = rnd.choice(_NOMES), rnd.choice(_SOBRENOMES)
+        cidade, uf, prefixo = rnd.choice(_CIDADES)
+        cep = f"{prefixo}{rnd.randrange(1000):03d}{rnd.randrange(1000):03d}"
+        return {
+            "nome": nome,
+            "sobrenome": sobrenome,
+            "email": _ascii(f"{nome}.{sobrenome}{rnd.randrange(10_000)}@example.com").lower(),
+            "telefone": f"+55{rnd.randrange(11, 99)}9{rnd.randrange(10**8):08d}",
+            "cpf": _cpf(rnd),
+            "rua": rnd.choice(_RUAS),
+            "numero": str(rnd.randrange(1, 3000)),
+            "complemento": rnd.choice(("", "", "Apto 12", "Casa 2", "Bloco B")),
+            "bairro": rnd.choice(_BAIRROS),
+            "cidade": cidade,
+            "uf": uf,
+            "cep": f"{cep[:5]}-{cep[5:]}",
+            "estilo": _escolher(rnd, self.perfil.estilos_endereco, ESTILOS_ENDERECO),
+        }
+
+    @staticmethod
+    def _aplicar_estilo(p: dict[str, str]) -> dict[str, str]:
+        p = dict(p)
+        estilo = p["estilo"]
+        if estilo == "numero_na_rua":
+            p["rua"], p["numero"] = f"{p['rua']}, {p['numero']}", ""
+        elif estilo == "sem_bairro":
+            p["bairro"] = ""
+        elif estilo == "cep_sem_mascara":
+            p["cep"] = p["cep"].replace("-", "")
+        elif estilo == "caixa_alta":
+            p = {k: v.upper() if k not in ("email", "estilo") else v for k, v in p.items()}
+        return p
+
+    # ---- Guru ----
+    def dados_guru(self, modo: str = "assinaturas") -> dict[str, Any]:
+        """O `dados` que acompanha as transações em montar_planilha_vendas_guru."""
+        return {
+            "modo": modo,
+            "ids_planos_todos": self.catalogo.ids_planos(),
+            "ofertas_embutidas": dict(self.catalogo.ofertas_embutidas),
+        }
+
+    def _contato_guru(self, rnd: random.Random) -> dict[str, Any]:
+        p = self._aplicar_estilo(self._pessoa(rnd))
+        return {
+            "name": f"{p['nome']} {p['sobrenome']}",
+            "email": p["email"],
+            "doc": p["cpf"],
+            "phone_number": p["telefone"],
+            "address": p["rua"],
+            "address_number": p["numero"],
+            "address_comp": p["complemento"],
+            "address_district": p["bairro"],
+            "address_city": p["cidade"],
+            "address_state": p["uf"],
+            "address_zip_code": p["cep"],
+        }
+
+    def _transacao(
+        self, rnd: random.Random, nome: str, quando: datetime, contato: Mapping[str, Any], total: float
+    ) -> dict[str, Any]:
+        info = self.catalogo.skus[nome]
+        ts = int(quando.timestamp())
+        return {
+            "id": self._uuid(rnd),
+            "status": "approved",
+            "ordered_at": quando.isoformat(),
+            "created_at": quando.isoformat(),
+            "dates": {"ordered_at": ts, "created_at": ts},
+            "contact": contato,
+            "product": {"internal_id": rnd.choice(info["guru_ids"]), "name": nome, "offer": {}},
+            "invoice": {"type": "sale"},
+            "is_order_bump": 0,
+            "payment": {"total": round(total, 2), "method": rnd.choice(_FORMAS_PAGAMENTO), "coupon": {}},
+        }
+
+    def _preco(self, nome: str) -> float:
+        return float(self.catalogo.skus[nome].get("preco_fallback") or _PRECO_PADRAO)
+
+    def _bump(self, rnd: random.Random, quando: datetime, contato: Mapping[str, Any]) -> dict[str, Any] | None:
+        if not self.catalogo.guru_produtos or rnd.random() >= self.perfil.taxa_bump:
+            return None
+        nome = rnd.choice(self.catalogo.guru_produtos)
+        bump = self._transacao(rnd, nome, quando, contato, self._preco(nome) * 0.8)
+        bump["is_order_bump"] = 1
+        return bump
+
+    def _assinatura(self, rnd: random.Random, inicio: datetime, fim: datetime) -> list[dict[str, Any]]:
+        recorrencia = _escolher(rnd, self.perfil.mix_planos, list(self.catalogo.planos))
+        nome = rnd.choice(self.catalogo.planos[recorrencia])
+        info = self.catalogo.skus[nome]
+        tipo = TIPO_POR_RECORRENCIA.get(recorrencia, "bimestrais")
+        periodicidade = str(info.get("periodicidade") or "bimestral")
+        valor = _VALOR_PLANO.get((tipo, periodicidade), _MENSALIDADE.get(periodicidade, _PRECO_PADRAO))
+        contato = self._contato_guru(rnd)
+        sid = f"sub_{rnd.getrandbits(64):016x}"
+
+        cupom: dict[str, Any] = {}
+        if rnd.random() < self.perfil.taxa_cupom:
+            rotulo = nome.rsplit(" - ", 1)[0]
+            opcoes = self.catalogo.cupons_por_rotulo.get(rotulo, []) + self.catalogo.cupons_gerais
+            if opcoes:
+                desconto = rnd.choice((0, 5, 10, 15))
+                cupom = {"coupon_code": rnd.choice(opcoes), "incidence_type": "percent", "incidence_value": desconto}
+                valor *= 1 - desconto / 100
+
+        n = 1 + (rnd.randrange(1, 3) if rnd.random() < self.perfil.taxa_renovacao else 0)
+        grupo: list[dict[str, Any]] = []
+        for _ in range(n):
+            quando = self._data(rnd, inicio, fim)
+            t = self._transacao(rnd, nome, quando, contato, valor)
+            t["subscription"] = {"id": sid}
+            t["tipo_assinatura"] = tipo
+            t["invoice"] = {"type": "upgrade" if rnd.random() < self.perfil.taxa_upgrade else "subscription"}
+            t["payment"]["coupon"] = dict(cupom)
+            ofertas = self.catalogo.ofertas.get(t["product"]["internal_id"])
+            if ofertas and rnd.random() < self.perfil.taxa_oferta:
+                oid, oferta_nome = rnd.choice(ofertas)
+                t["product"]["offer"] = {"id": oid, "name": oferta_nome}
+                t["payment"]["total"] = round(valor + self._preco_embutido(oid), 2)
+            grupo.append(t)
+            bump = self._bump(rnd, quando, contato)
+            if bump is not None:
+                bump["subscription"] = {"id": sid}
+                bump["tipo_assinatura"] = tipo
+                grupo.append(bump)
+        return grupo
+
+    def _preco_embutido(self, oferta_id: str) -> float:
+        brinde = self.catalogo.ofertas_embutidas.get(oferta_id, "")
+        return self._preco(brinde) if brinde in self.catalogo.skus else 0.0
+
+    def _venda_avulsa(self, rnd: random.Random, inicio: datetime, fim: datetime) -> list[dict[str, Any]]:
+        combos = self.catalogo.guru_combos
+        if combos and rnd.random() < self.perfil.taxa_combo:
+            nome = rnd.choice(combos)
+        else:
+            nome = rnd.choice(self.catalogo.guru_produtos or combos)
+        quando = self._data(rnd, inicio, fim)
+        contato = self._contato_guru(rnd)
+        venda = [self._transacao(rnd, nome, quando, contato, self._preco(nome))]
+        bump = self._bump(rnd, quando, contato)
+        if bump is not None:
+            venda.append(bump)
+        return venda
+
+    def transacoes_guru(
+        self, n: int, *, modo: str = "assinaturas", inicio: datetime | None = None, fim: datetime | None = None
+    ) -> Iterator[dict[str, Any]]:
+        """`n` transações aprovadas (como em ``/transactions``), no período [inicio, fim].
+
+        Em ``assinaturas`` vêm agrupáveis por ``subscription.id`` (renovações, upgrades e order
+        bumps da mesma assinatura); em ``produtos``, vendas avulsas de produtos e combos.
+        """
+        fim = fim or datetime(2025, 6, 30, 23, 59, tzinfo=UTC)
+        inicio = inicio or fim - timedelta(days=60)
+        rnd = self._rnd(f"guru:{modo}")
+        gerar = self._assinatura if modo == "assinaturas" and self.catalogo.planos else self._venda_avulsa
+        emitidas = 0
+        while emitidas < n:
+            for t in gerar(rnd, inicio, fim):
+                if emitidas >= n:
+                    return
+                emitidas += 1
+                yield t
+
+    # ---- Shopify ----
+    def _endereco_shopify(self, p: Mapping[str, str]) -> dict[str, Any]:
+        # o Shopify não tem número nem bairro separados: vão juntos em address1/address2
+        numero = f", {p['numero']}" if p["numero"] else ""
+        return {
+            "name": f"{p['nome']} {p['sobrenome']}",
+            "firstName": p["nome"],
+            "lastName": p["sobrenome"],
+            "address1": f"{p['rua']}{numero}",
+            "address2": " - ".join(x for x in (p["complemento"], p["bairro"]) if x),
+            "city": p["cidade"],
+            "zip": p["cep"],
+            "provinceCode": p["uf"],
+            "phone": p["telefone"],
+        }
+
+    def _linha_shopify(self, rnd: random.Random, nome: str, contador: int) -> tuple[dict[str, Any], int]:
+        info = self.catalogo.skus[nome]
+        qtd = 1 if rnd.random() < 0.85 else rnd.randrange(2, 4)  # noqa: PLR2004
+        gid = f"gid://shopify/LineItem/{contador}"
+        no = {
+            "id": gid,
+            "title": nome,
+            "quantity": qtd,
+            "sku": str(info.get("sku") or ""),
+            "product": {"id": f"gid://shopify/Product/{rnd.choice(info['shopify_ids'])}"},
+            "discountedTotalSet": {"shopMoney": {"amount": f"{self._preco(nome) * qtd:.2f}"}},
+        }
+        return no, qtd
+
+    def pedidos_shopify(
+        self, n: int, *, inicio: datetime | None = None, fim: datetime | None = None
+    ) -> Iterator[dict[str, Any]]:
+        """`n` pedidos pagos como os nós de ``orders`` da query GraphQL de ColetarPedidosShopify."""
+        produtos, combos = self.catalogo.shopify_produtos, self.catalogo.shopify_combos
+        if not produtos and not combos:
+            raise ValueError("skus.json sem produtos com shopify_ids e SKU")
+        fim = fim or datetime(2025, 6, 30, 23, 59, tzinfo=UTC)
+        inicio = inicio or fim - timedelta(days=30)
+        rnd = self._rnd("shopify")
+        base = 5_000_000_000
+        for i in range(n):
+            p = self._aplicar_estilo(self._pessoa(rnd))
+            nomes = [rnd.choice(combos) if combos and rnd.random() < self.perfil.taxa_combo else rnd.choice(produtos)]
+            if rnd.random() < self.perfil.taxa_bump:
+                nomes.append(rnd.choice(produtos or combos))
+            linhas = [self._linha_shopify(rnd, nome, base + i * 10 + j) for j, nome in enumerate(nomes)]
+
+            parcial = rnd.random() < self.perfil.taxa_parcial
+            restantes = [(no["id"], rnd.randrange(0, qtd) if parcial else qtd) for no, qtd in linhas]
+            if parcial and all(r == q for (_, r), (_, q) in zip(restantes, linhas, strict=True)):
+                restantes[0] = (restantes[0][0], 0)  # ao menos um item já enviado
+            status = "PARTIALLY_FULFILLED" if parcial else "UNFULFILLED"
+
+            endereco = self._endereco_shopify(p)
+            so_cobranca = p["estilo"] == "so_cobranca"
+            desconto = round(rnd.choice((0.0, 0.0, 0.0, 10.0, 15.0)), 2)
+            yield {
+                "id": f"gid://shopify/Order/{base + i}",
+                "name": f"#{10_000 + i}",
+                "createdAt": self._data(rnd, inicio, fim).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "displayFulfillmentStatus": status,
+                "currentTotalDiscountsSet": {"shopMoney": {"amount": f"{desconto:.2f}"}},
+                "customer": {"email": p["email"], "firstName": p["nome"], "lastName": p["sobrenome"]},
+                "shippingAddress": None if so_cobranca else endereco,
+                "billingAddress": endereco,
+                "shippingLine": {"discountedPriceSet": {"shopMoney": {"amount": rnd.choice(("0.00", "19.90"))}}},
+                "lineItems": {"edges": [{"node": no} for no, _ in linhas]},
+                "fulfillmentOrders": {
+                    "edges": [
+                        {
+                            "node": {
+                                "id": f"gid://shopify/FulfillmentOrder/{base + i}",
+                                "status": "IN_PROGRESS" if parcial else "OPEN",
+                                "lineItems": {
+                                    "edges": [
+                                        {"node": {"id": f"{gid}F", "remainingQuantity": r, "lineItem": {"id": gid}}}
+                                        for gid, r in restantes
+                                    ]
+                                },
+                            }
+                        }
+                    ]
+                },
+                "localizationExtensions": {
+                    "edges": [{"node": {"purpose": "TAX", "title": "CPF/CNPJ", "value": p["cpf"]}}]
+                },
+            }
+
+
+def pagina_guru(transacoes: Sequence[Mapping[str, Any]], proximo_cursor: str | None = None) -> dict[str, Any]:
+    """Corpo de uma página de ``GET /transactions`` com as transações dadas."""
+    return {"data": list(transacoes), "next_cursor": proximo_cursor}
+
+
+def pagina_shopify(pedidos: Sequence[Mapping[str, Any]], proximo_cursor: str | None = None) -> dict[str, Any]:
+    """Corpo de uma resposta GraphQL de ``orders`` com os pedidos dados."""
+    return {
+        "data": {
+            "orders": {
+                "pageInfo": {"hasNextPage": proximo_cursor is not None, "endCursor": proximo_cursor},
+                "edges": [{"node": p} for p in pedidos],
+            }
+        }
+    }
+
+
+def gravar_jsonl(registros: Iterator[Mapping[str, Any]], caminho: str | Path) -> int:
+    """Grava um registro JSON por linha (sem montar a lista em memória). Retorna quantos gravou."""
+    n = 0
+    with Path(caminho).open("w", encoding="utf-8") as f:
+        for r in registros:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+            n += 1
+    return n
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Gera transações Guru e pedidos Shopify sintéticos (JSONL).")
+    parser.add_argument("--guru", type=int, default=0, help="Quantidade de transações do Guru")
+    parser.add_argument("--modo", choices=("assinaturas", "produtos"), default="assinaturas")
+    parser.add_argument("--shopify", type=int, default=0, help="Quantidade de pedidos do Shopify")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", default=".", help="Pasta de saída")
+    args = parser.parse_args(argv)
+
+    gerador = GeradorSintetico(args.semente)
+    pasta = Path(args.saida)
+    pasta.mkdir(parents=True, exist_ok=True)
+    if args.guru:
+        n = gravar_jsonl(gerador.transacoes_guru(args.guru, modo=args.modo), pasta / f"guru_{args.modo}.jsonl")
+        print(f"{n} transações Guru → {pasta / f'guru_{args.modo}.jsonl'}")
+    if args.shopify:
+        n = gravar_jsonl(gerador.pedidos_shopify(args.shopify), pasta / "shopify.jsonl")
+        print(f"{n} pedidos Shopify → {pasta / 'shopify.jsonl'}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,205 @@
+# common/disjuntor.py
+"""Disjuntor (circuit breaker) por host para as chamadas HTTP do processo.
+
+O ``HTTPAdapter.send`` de ``common.http_client`` consulta o :class:`Disjuntor` do host antes de
+cada requisição e registra o resultado depois (retries do urllib3 já incluídos). Fechado, tudo
+passa; quando as últimas chamadas falham (rede/5xx) ou demoram demais acima das taxas
+configuradas, ele abre e toda chamada ao host falha na hora com :class:`CircuitoAberto` — em vez de
+cada worker esperar connect + read + retries. Passado ``aberto_s``, fica meio-aberto: uma sonda
+passa e, se der certo, fecha; se falhar, abre de novo.
+
+    disjuntores.ao_mudar(lambda host, anterior, novo: ...)  # ex.: avisar a UI
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Any, NamedTuple
+
+from .errors import ExternalError
+
+_log = logging.getLogger(__name__)
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio_aberto"
+
+# ouvinte(host, estado_anterior, estado_novo) — roda na thread que causou a mudança
+OuvinteDisjuntor = Callable[[str, str, str], None]
+
+
+class ConfigDisjuntor(NamedTuple):
+    """Limiares avaliados sobre as últimas `janela` chamadas (com pelo menos `minimo_chamadas`)."""
+
+    janela: int = 20
+    minimo_chamadas: int = 10
+    taxa_falhas: float = 0.5
+    lenta_s: float = 10.0  # chamada acima disso conta como lenta
+    taxa_lentas: float = 0.8
+    aberto_s: float = 30.0  # tempo aberto antes de deixar a sonda passar
+    sondas: int = 1  # chamadas simultâneas permitidas no meio-aberto
+
+
+class CircuitoAberto(ExternalError):
+    """O host está fora (circuito aberto): a chamada nem saiu. Vale tentar de novo mais tarde."""
+
+    def __init__(self, host: str, reabre_em_s: float) -> None:
+        super().__init__(
+            f"Serviço {host} indisponível (nova tentativa em {reabre_em_s:.0f}s)",
+            code="CIRCUITO_ABERTO",
+            retryable=True,
+            data={"host": host, "reabre_em_s": round(reabre_em_s, 1)},
+        )
+
+
+class Disjuntor:
+    """Estado do circuito de um host (thread-safe)."""
+
+    def __init__(self, host: str, cfg: ConfigDisjuntor | None = None, ao_mudar: OuvinteDisjuntor | None = None) -> None:
+        self.host = host
+        self.cfg = cfg or ConfigDisjuntor()
+        self.estado = FECHADO
+        self.aberturas = 0
+        self.recusadas = 0
+        self._ao_mudar = ao_mudar
+        self._lock = threading.Lock()
+        self._janela: deque[tuple[bool, bool]] = deque(maxlen=self.cfg.janela)  # (falhou, lenta)
+        self._aberto_ate = 0.0
+        self._sondas = 0
+
+    def permitir(self) -> bool:
+        """Libera a chamada (True = é a sonda do meio-aberto) ou levanta :class:`CircuitoAberto`."""
+        mudou = None
+        with self._lock:
+            if self.estado == ABERTO:
+                restante = self._aberto_ate - time.monotonic()
+                if restante > 0:
+                    self.recusadas += 1
+                    raise CircuitoAberto(self.host, restante)
+                mudou = self._mudar(MEIO_ABERTO)
+                self._sondas = 0
+            sonda = self.estado == MEIO_ABERTO
+            if sonda:
+                if self._sondas >= self.cfg.sondas:
+                    self.recusadas += 1
+                    raise CircuitoAberto(self.host, 0)
+                self._sondas += 1
+        self._avisar(mudou)
+        return sonda
+
+    def registrar(self, sonda: bool, falhou: bool | None, duracao_s: float) -> None:
+        """Resultado de uma chamada liberada por :meth:`permitir` (`falhou` None = cancelada, sem veredito)."""
+        mudou = None
+        with self._lock:
+            if sonda:
+                self._sondas -= 1
+            if falhou is None:
+                return
+            ruim = falhou or duracao_s >= self.cfg.lenta_s
+            if sonda and self.estado == MEIO_ABERTO:
+                mudou = self._abrir() if ruim else self._mudar(FECHADO)
+            elif self.estado == FECHADO:
+                self._janela.append((falhou, duracao_s >= self.cfg.lenta_s))
+                n = len(self._janela)
+                if n >= self.cfg.minimo_chamadas:
+                    falhas = sum(f for f, _ in self._janela)
+                    lentas = sum(lenta for _, lenta in self._janela)
+                    if falhas / n >= self.cfg.taxa_falhas or lentas / n >= self.cfg.taxa_lentas:
+                        mudou = self._abrir()
+            # chamadas que começaram antes de abrir não mudam mais nada
+        self._avisar(mudou)
+
+    def _abrir(self) -> tuple[str, str]:
+        self._aberto_ate = time.monotonic() + self.cfg.aberto_s
+        self.aberturas += 1
+        return self._mudar(ABERTO)
+
+    def _mudar(self, novo: str) -> tuple[str, str]:
+        anterior, self.estado = self.estado, novo
+        self._janela.clear()
+        return anterior, novo
+
+    def _avisar(self, mudou: tuple[str, str] | None) -> None:
+        if mudou is None:
+            return
+        anterior, novo = mudou
+        nivel = logging.WARNING if novo == ABERTO else logging.INFO
+        _log.log(nivel, "disjuntor_" + novo, extra={"host": self.host, "anterior": anterior})
+        if self._ao_mudar is not None:
+            self._ao_mudar(self.host, anterior, novo)
+
+    def para_dict(self) -> dict[str, Any]:
+        with self._lock:
+            n = len(self._janela)
+            return {
+                "estado": self.estado,
+                "aberturas": self.aberturas,
+                "recusadas": self.recusadas,
+                "janela": n,
+                "taxa_falhas": round(sum(f for f, _ in self._janela) / n, 3) if n else 0.0,
+                "reabre_em_s": (
+                    round(max(0.0, self._aberto_ate - time.monotonic()), 1) if self.estado == ABERTO else 0.0
+                ),
+            }
+
+
+class RegistroDisjuntores:
+    """Um :class:`Disjuntor` por host, criado no primeiro uso, e os ouvintes de mudança de estado."""
+
+    def __init__(self, cfg: ConfigDisjuntor | None = None) -> None:
+        self.cfg = cfg or ConfigDisjuntor()
+        self._lock = threading.Lock()
+        self._por_host: dict[str, Disjuntor] = {}
+        self._cfg_por_host: dict[str, ConfigDisjuntor] = {}
+        self._ouvintes: list[OuvinteDisjuntor] = []
+
+    def configurar(self, host: str, cfg: ConfigDisjuntor) -> None:
+        """Limiares próprios para `host` (valem para o disjuntor criado a partir daqui)."""
+        with self._lock:
+            self._cfg_por_host[host] = cfg
+            self._por_host.pop(host, None)
+
+    def disjuntor(self, host: str) -> Disjuntor:
+        with self._lock:
+            d = self._por_host.get(host)
+            if d is None:
+                d = self._por_host[host] = Disjuntor(host, self._cfg_por_host.get(host, self.cfg), self._avisar)
+            return d
+
+    def _avisar(self, host: str, anterior: str, novo: str) -> None:
+        with self._lock:
+            ouvintes = list(self._ouvintes)
+        for ouvinte in ouvintes:
+            try:
+                ouvinte(host, anterior, novo)
+            except Exception:
+                _log.exception("disjuntor_ouvinte_erro")
+
+    def ao_mudar(self, ouvinte: OuvinteDisjuntor) -> None:
+        with self._lock:
+            self._ouvintes.append(ouvinte)
+
+    def deixar_de_ouvir(self, ouvinte: OuvinteDisjuntor) -> None:
+        with self._lock:
+            if ouvinte in self._ouvintes:
+                self._ouvintes.remove(ouvinte)
+
+    def indisponiveis(self) -> list[str]:
+        """Hosts com o circuito aberto agora."""
+        with self._lock:
+            return sorted(h for h, d in self._por_host.items() if d.estado == ABERTO)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._por_host.clear()
+
+    def para_dict(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            itens = sorted(self._por_host.items())
+        return {host: d.para_dict() for host, d in itens}
+
+
+disjuntores = RegistroDisjuntores()
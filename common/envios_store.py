@@ -0,0 +1,238 @@
+# common/envios_store.py
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from collections.abc import Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Literal, cast
+
+Aba = Literal["produtos", "assinaturas", "combos"]
+
+ABAS: tuple[Aba, ...] = ("assinaturas", "produtos", "combos")
+
+# Colunas de cada aba, na ordem do layout histórico do envios_log.xlsx
+COLUNAS: dict[str, tuple[str, ...]] = {
+    "assinaturas": ("subscription_id", "ano", "periodicidade", "periodo", "registro_em"),
+    "produtos": ("transaction_id", "registro_em", "id_lote"),
+    "combos": ("chave_dedup", "transaction_id", "sku", "registro_em", "id_lote"),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assinaturas (
+    id INTEGER PRIMARY KEY,
+    subscription_id TEXT NOT NULL,
+    ano INTEGER NOT NULL,
+    periodicidade TEXT NOT NULL,
+    periodo INTEGER NOT NULL,
+    registro_em TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_assinaturas_chave
+    ON assinaturas (subscription_id, ano, periodicidade, periodo);
+
+CREATE TABLE IF NOT EXISTS produtos (
+    id INTEGER PRIMARY KEY,
+    transaction_id TEXT NOT NULL,
+    registro_em TEXT,
+    id_lote TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_produtos_transaction_id ON produtos (transaction_id);
+
+CREATE TABLE IF NOT EXISTS combos (
+    id INTEGER PRIMARY KEY,
+    chave_dedup TEXT NOT NULL,
+    transaction_id TEXT,
+    sku TEXT,
+    registro_em TEXT,
+    id_lote TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_combos_chave_dedup ON combos (chave_dedup);
+
+CREATE TABLE IF NOT EXISTS meta (
+    chave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+
+def _texto(v: Any) -> str:
+    if v is None:
+        return ""
+    s = str(v).strip()
+    return "" if s.lower() in ("nan", "none", "nat") else s
+
+
+def _inteiro(v: Any, default: int = -1) -> int:
+    try:
+        return int(float(str(v).strip()))
+    except (TypeError, ValueError):
+        return default
+
+
+def _normalizar(aba: str, registro: Mapping[str, Any]) -> tuple[Any, ...] | None:
+    """Converte um registro dict-like na tupla de colunas da aba (ou None se sem chave)."""
+    if aba == "assinaturas":
+        sid = _texto(registro.get("subscription_id"))
+        if not sid:
+            return None
+        return (
+            sid,
+            _inteiro(registro.get("ano")),
+            _texto(registro.get("periodicidade")).lower(),
+            _inteiro(registro.get("periodo")),
+            _texto(registro.get("registro_em")),
+        )
+    if aba == "produtos":
+        tx = _texto(registro.get("transaction_id"))
+        if not tx:
+            return None
+        return (
+            tx,
+            _texto(registro.get("registro_em")),
+            _texto(registro.get("id_lote")) or None,
+        )
+    if aba == "combos":
+        tx = _texto(registro.get("transaction_id"))
+        sku = _texto(registro.get("sku"))
+        chave = _texto(registro.get("chave_dedup")) or f"{tx}+{sku}"
+        if chave == "+":
+            return None
+        return (
+            chave,
+            tx,
+            sku,
+            _texto(registro.get("registro_em")),
+            _texto(registro.get("id_lote")) or None,
+        )
+    raise ValueError(f"Aba desconhecida: {aba!r}")
+
+
+class EnviosLogStore:
+    """Log de envios append-only em SQLite, com índices únicos nas chaves de dedup.
+
+    Substitui a regravação completa do envios_log.xlsx: inserções usam
+    ``INSERT OR IGNORE`` (o primeiro registro de cada chave prevalece, como no
+    ``drop_duplicates(keep="first")`` anterior) e consultas usam os índices.
+    """
+
+    def __init__(self, caminho_db: str | os.PathLike[str]) -> None:
+        self.caminho_db = Path(caminho_db)
+        self.caminho_db.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._conectar() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _conectar(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.caminho_db, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+    def registrar(self, aba: Aba, registros: Iterable[Mapping[str, Any]]) -> int:
+        """Acrescenta registros ignorando chaves já existentes. Retorna quantos foram inseridos."""
+        linhas = [t for t in (_normalizar(aba, r) for r in registros) if t is not None]
+        if not linhas:
+            return 0
+        colunas = COLUNAS[aba]
+        sql = f"INSERT OR IGNORE INTO {aba} ({', '.join(colunas)}) " f"VALUES ({', '.join('?' for _ in colunas)})"
+        with self._lock, self._conectar() as conn:
+            antes = conn.total_changes
+            conn.executemany(sql, linhas)
+            return conn.total_changes - antes
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+    def registros(self, aba: Aba) -> list[dict[str, Any]]:
+        """Retorna todos os registros da aba, na ordem de inserção."""
+        colunas = COLUNAS[aba]
+        with self._conectar() as conn:
+            cur = conn.execute(f"SELECT {', '.join(colunas)} FROM {aba} ORDER BY id")
+            return [dict(zip(colunas, row, strict=True)) for row in cur.fetchall()]
+
+    def contagem(self, aba: Aba) -> int:
+        with self._conectar() as conn:
+            return int(conn.execute(f"SELECT COUNT(*) FROM {aba}").fetchone()[0])
+
+    # ------------------------------------------------------------------
+    # Migração / exportação no layout do Excel
+    # ------------------------------------------------------------------
+    def _meta(self, chave: str) -> str | None:
+        with self._conectar() as conn:
+            row = conn.execute("SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()
+            return None if row is None else str(row[0])
+
+    def _set_meta(self, chave: str, valor: str) -> None:
+        with self._conectar() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES (?, ?)", (chave, valor))
+
+    def migrar_de_xlsx(self, caminho_xlsx: str | os.PathLike[str]) -> dict[str, int]:
+        """Importa (uma única vez) as abas do envios_log.xlsx legado para o store.
+
+        Retorna a quantidade de registros inseridos por aba. Chamadas seguintes
+        não fazem nada, mesmo que o .xlsx continue existindo.
+        """
+        caminho = Path(caminho_xlsx)
+        if self._meta("migrado_de_xlsx") is not None:
+            return {}
+        if not caminho.exists():
+            # nada a migrar: marca para que um .xlsx exportado depois não seja reimportado
+            self._set_meta("migrado_de_xlsx", "")
+            return {}
+
+        import pandas as pd  # import tardio: o store não depende de pandas para operar
+
+        lidas = pd.read_excel(caminho, sheet_name=None, dtype=str)
+        inseridos: dict[str, int] = {}
+        for aba in ABAS:
+            df = lidas.get(aba)
+            if df is None or df.empty:
+                continue
+            df.columns = pd.Index([str(c).strip().lower() for c in df.columns])
+            inseridos[aba] = self.registrar(aba, cast(list[dict[str, Any]], df.to_dict("records")))
+
+        self._set_meta("migrado_de_xlsx", str(caminho))
+        return inseridos
+
+    def exportar_xlsx(self, caminho_xlsx: str | os.PathLike[str]) -> Path:
+        """Gera sob demanda o .xlsx no layout histórico (uma aba por tipo de registro)."""
+        import pandas as pd
+
+        destino = Path(caminho_xlsx)
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        with pd.ExcelWriter(destino, engine="openpyxl", mode="w") as writer:
+            for aba in ABAS:
+                df = pd.DataFrame(self.registros(aba), columns=list(COLUNAS[aba]))
+                if "id_lote" in df.columns and df["id_lote"].isna().all():
+                    df = df.drop(columns=["id_lote"])
+                df.to_excel(writer, sheet_name=aba, index=False)
+        return destino
+
+
+def caminho_store_para(caminho_xlsx: str | os.PathLike[str]) -> Path:
+    """Caminho do banco do log ao lado do .xlsx legado (envios_log.xlsx → envios_log.sqlite3)."""
+    return Path(caminho_xlsx).with_suffix(".sqlite3")
+
+
+@lru_cache(maxsize=8)
+def _store_cacheado(caminho_db: str, caminho_xlsx: str) -> EnviosLogStore:
+    store = EnviosLogStore(caminho_db)
+    store.migrar_de_xlsx(caminho_xlsx)
+    return store
+
+
+def abrir_envios_log(caminho_xlsx: str | os.PathLike[str]) -> EnviosLogStore:
+    """Abre (e na primeira vez migra) o log de envios associado ao .xlsx informado."""
+    xlsx = Path(caminho_xlsx).resolve()
+    return _store_cacheado(str(caminho_store_para(xlsx)), str(xlsx))
@@ -0,0 +1,290 @@
+# common/executor.py
+"""Executor único do app: uma faixa (fila + threads) por serviço externo.
+
+Cada faixa tem o seu limite de threads e uma fila com prioridade (interativo antes de lote) e
+tamanho máximo — quem enfileira numa fila cheia espera (backpressure) ou recebe
+``ExternalError(code="EXECUTOR_SATURADO")``. O trabalho em lote das faixas externas ainda divide
+um limite total, que segura a concorrência de saída do processo inteiro. Cada tarefa roda no
+contexto (span, correlation_id) de quem a enviou e devolve um ``concurrent.futures.Future``.
+
+    futuro = executor_global().submeter("guru", partial(coletar, pid, ini, fim))
+"""
+from __future__ import annotations
+
+import contextvars
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, NamedTuple, TypeVar
+
+from .errors import ExternalError
+from .metricas_http import QUANTIS, Histograma
+
+_log = logging.getLogger(__name__)
+
+R = TypeVar("R")
+
+PRIORIDADE_INTERATIVA = 0  # o usuário está esperando (coleta disparada pela UI, fulfillment)
+PRIORIDADE_LOTE = 10  # fan-out de páginas/pedidos/lotes
+
+
+class Faixa(NamedTuple):
+    """Configuração de uma faixa: `limite` threads, `fila_max` tarefas esperando e se conta no limite total."""
+
+    limite: int
+    fila_max: int = 10_000
+    externa: bool = True
+
+
+FAIXAS_PADRAO: dict[str, Faixa] = {
+    "guru": Faixa(12),
+    "shopify": Faixa(8),
+    "cep": Faixa(8),
+    "openai": Faixa(6),
+    "fretebarato": Faixa(8),
+    # orquestração local: coletas que só esperam as próprias chamadas (não contam no limite total)
+    "tarefas": Faixa(4, externa=False),
+}
+LIMITE_TOTAL_PADRAO = 24
+
+
+class _Tarefa(NamedTuple):
+    futuro: Future[Any]
+    fn: Callable[[], Any]
+    contexto: contextvars.Context
+    prioridade: int
+    enfileirada_em: float
+
+
+@dataclass(eq=False)
+class _EstadoFaixa:
+    nome: str
+    cfg: Faixa
+    tem_tarefa: threading.Condition
+    fila: list[tuple[int, int, _Tarefa]] = field(default_factory=list)
+    threads: list[threading.Thread] = field(default_factory=list)
+    ociosas: int = 0
+    ativas: int = 0
+    pico_fila: int = 0
+    enviadas: int = 0
+    concluidas: int = 0
+    falhas: int = 0
+    canceladas: int = 0
+    rejeitadas: int = 0
+    espera: Histograma = field(default_factory=Histograma)
+    execucao: Histograma = field(default_factory=Histograma)
+
+    def para_dict(self) -> dict[str, Any]:
+        return {
+            "limite": self.cfg.limite,
+            "threads": len(self.threads),
+            "ativas": self.ativas,
+            "fila": len(self.fila),
+            "pico_fila": self.pico_fila,
+            "enviadas": self.enviadas,
+            "concluidas": self.concluidas,
+            "falhas": self.falhas,
+            "canceladas": self.canceladas,
+            "rejeitadas": self.rejeitadas,
+            "espera_ms": _quantis_ms(self.espera),
+            "execucao_ms": _quantis_ms(self.execucao),
+        }
+
+
+def _quantis_ms(h: Histograma) -> dict[str, float]:
+    if not h.n:
+        return {}
+    return {f"p{round(q * 100)}": round(h.percentil(q) / 1000, 3) for q in QUANTIS}
+
+
+_local = threading.local()  # faixa da thread atual (só nas threads do executor)
+
+
+class ExecutorGerenciado:
+    """Faixas nomeadas com limite próprio, fila com prioridade e métricas de fila/latência.
+
+    As threads de cada faixa sobem sob demanda até o limite e ficam vivas até :meth:`encerrar`.
+    Threads do próprio executor nunca bloqueiam ao enfileirar (uma tarefa que agenda outra não
+    trava na fila cheia). O limite total vale só para o lote: o interativo respeita a faixa.
+    """
+
+    def __init__(self, faixas: dict[str, Faixa] | None = None, *, limite_total: int = LIMITE_TOTAL_PADRAO) -> None:
+        self._lock = threading.Lock()
+        self._mudou = threading.Condition(self._lock)
+        self._faixas = {
+            nome: _EstadoFaixa(nome, cfg, threading.Condition(self._lock))
+            for nome, cfg in (faixas or FAIXAS_PADRAO).items()
+        }
+        self._total = threading.BoundedSemaphore(limite_total)
+        self.limite_total = limite_total
+        self._seq = itertools.count()
+        self._encerrado = False
+
+    def _faixa(self, nome: str) -> _EstadoFaixa:
+        try:
+            return self._faixas[nome]
+        except KeyError:
+            raise ValueError(f"faixa desconhecida: {nome} (use {', '.join(self._faixas)})") from None
+
+    def submeter(
+        self,
+        faixa: str,
+        fn: Callable[[], R],
+        *,
+        prioridade: int = PRIORIDADE_LOTE,
+        espera_max: float | None = None,
+    ) -> Future[R]:
+        """Enfileira `fn` na faixa; com a fila cheia espera até `espera_max` s (None = sem limite)."""
+        est = self._faixa(faixa)
+        futuro: Future[R] = Future()
+        tarefa = _Tarefa(futuro, fn, contextvars.copy_context(), prioridade, time.perf_counter())
+        with self._lock:
+            if len(est.fila) >= est.cfg.fila_max and getattr(_local, "faixa", None) is None:
+                coube = self._mudou.wait_for(
+                    lambda: len(est.fila) < est.cfg.fila_max or self._encerrado, timeout=espera_max
+                )
+                if not coube:
+                    est.rejeitadas += 1
+                    raise ExternalError(
+                        f"Fila '{faixa}' cheia ({est.cfg.fila_max} tarefas)",
+                        code="EXECUTOR_SATURADO",
+                        data={"faixa": faixa},
+                    )
+            if self._encerrado:
+                raise RuntimeError("executor encerrado")
+            heapq.heappush(est.fila, (prioridade, next(self._seq), tarefa))
+            est.enviadas += 1
+            est.pico_fila = max(est.pico_fila, len(est.fila))
+            if len(est.fila) > est.ociosas and len(est.threads) < est.cfg.limite:
+                t = threading.Thread(
+                    target=self._trabalhar, args=(est,), name=f"{faixa}-{len(est.threads)}", daemon=True
+                )
+                est.threads.append(t)
+                t.start()
+            else:
+                est.tem_tarefa.notify()
+        return futuro
+
+    def _proxima(self, est: _EstadoFaixa) -> _Tarefa | None:
+        with self._lock:
+            while not est.fila and not self._encerrado:
+                est.ociosas += 1
+                est.tem_tarefa.wait()
+                est.ociosas -= 1
+            if not est.fila:
+                est.threads.remove(threading.current_thread())
+                self._mudou.notify_all()
+                return None
+            tarefa = heapq.heappop(est.fila)[2]
+            est.ativas += 1  # já conta como ativa: aguardar_ocioso não a perde entre a fila e a execução
+            self._mudou.notify_all()  # abriu espaço na fila
+            return tarefa
+
+    def _trabalhar(self, est: _EstadoFaixa) -> None:
+        _local.faixa = est.nome
+        while (tarefa := self._proxima(est)) is not None:
+            if not tarefa.futuro.set_running_or_notify_cancel():
+                with self._lock:
+                    est.ativas -= 1
+                    est.canceladas += 1
+                    self._mudou.notify_all()
+                continue
+            limitar = est.cfg.externa and tarefa.prioridade >= PRIORIDADE_LOTE
+            if limitar:
+                self._total.acquire()
+            inicio = time.perf_counter()
+            with self._lock:
+                est.espera.registrar(int((inicio - tarefa.enfileirada_em) * 1e6))
+            falhou = False
+            try:
+                tarefa.futuro.set_result(tarefa.contexto.run(tarefa.fn))
+            except BaseException as e:
+                falhou = True
+                tarefa.futuro.set_exception(e)
+            finally:
+                if limitar:
+                    self._total.release()
+                with self._lock:
+                    est.ativas -= 1
+                    est.execucao.registrar(int((time.perf_counter() - inicio) * 1e6))
+                    est.falhas += falhou
+                    est.concluidas += not falhou
+                    self._mudou.notify_all()
+
+    def cancelar_pendentes(self, faixas: Iterable[str] | None = None) -> int:
+        """Cancela o que ainda está na fila (as tarefas em execução seguem); retorna quantas."""
+        with self._lock:
+            canceladas = 0
+            for est in self._selecionar(faixas):
+                n = sum(tarefa.futuro.cancel() for _, _, tarefa in est.fila)
+                est.canceladas += n
+                canceladas += n
+                est.fila.clear()
+            self._mudou.notify_all()
+        return canceladas
+
+    def _selecionar(self, faixas: Iterable[str] | None) -> list[_EstadoFaixa]:
+        return list(self._faixas.values()) if faixas is None else [self._faixa(n) for n in faixas]
+
+    def aguardar_ocioso(self, faixas: Iterable[str] | None = None, timeout: float | None = None) -> bool:
+        """Bloqueia (sem polling) até as faixas esvaziarem; False se o timeout venceu antes.
+
+        Chamado de dentro de uma tarefa, não espera por ela mesma.
+        """
+        selecionadas = self._selecionar(faixas)
+        propria = getattr(_local, "faixa", None)
+
+        def ocioso() -> bool:
+            return all(not e.fila and e.ativas - (e.nome == propria) <= 0 for e in selecionadas)
+
+        with self._lock:
+            return self._mudou.wait_for(ocioso, timeout=timeout)
+
+    def encerrar(self, *, cancelar_pendentes: bool = True, timeout: float | None = None) -> None:
+        """Não aceita mais tarefas, cancela (ou drena) a fila e espera as threads saírem."""
+        if cancelar_pendentes:
+            self.cancelar_pendentes()
+        with self._lock:
+            self._encerrado = True
+            for est in self._faixas.values():
+                est.tem_tarefa.notify_all()
+            threads = [t for est in self._faixas.values() for t in est.threads]
+        limite = None if timeout is None else time.monotonic() + timeout
+        for t in threads:
+            if t is not threading.current_thread():
+                t.join(None if limite is None else max(0.0, limite - time.monotonic()))
+
+    def metricas(self) -> dict[str, dict[str, Any]]:
+        """Por faixa: limite, threads, ativas, fila/pico, contagens e p50/p90/p99 de espera e execução (ms)."""
+        with self._lock:
+            return {nome: est.para_dict() for nome, est in self._faixas.items()}
+
+
+class _Ativo:
+    executor: ExecutorGerenciado | None = None
+    lock = threading.Lock()
+
+
+def executor_global() -> ExecutorGerenciado:
+    """Executor do processo (criado com as faixas padrão no primeiro uso)."""
+    executor = _Ativo.executor
+    if executor is None:
+        with _Ativo.lock:
+            if _Ativo.executor is None:
+                _Ativo.executor = ExecutorGerenciado()
+            executor = _Ativo.executor
+    return executor
+
+
+def ativar_executor(executor: ExecutorGerenciado | None, *, timeout: float | None = 5.0) -> None:
+    """Troca o executor do processo; o anterior é encerrado (fila cancelada, até `timeout` s de espera)."""
+    with _Ativo.lock:
+        anterior, _Ativo.executor = _Ativo.executor, executor
+    if anterior is not None and anterior is not executor:
+        _log.info("executor_encerrado", extra={"faixas": anterior.metricas()})
+        anterior.encerrar(timeout=timeout)
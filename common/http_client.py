@@ -1,22 +1,34 @@
 from __future__ import annotations
 
-import logging  # [prof]
+import logging
 
 # === adições no topo ===
-import os  # [prof]
 import random
+import threading
 import time
-from functools import lru_cache
-from typing import Any
-
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from functools import lru_cache, partial
+from types import ModuleType, TracebackType
+from typing import TYPE_CHECKING, Any, NamedTuple, Self, cast
+from urllib.parse import urlsplit
+
+from .disjuntor import disjuntores
 from .errors import ExternalError
+from .lazy import ao_importar, modulo_tardio
+from .prazo import ExecucaoInterrompida, esperar, prazo_atual
+from .retentativas import BACKOFF_BASE_S, espera_backoff, orcamento_retentativas
+
+# requests/urllib3 só são importados na primeira chamada HTTP
+if TYPE_CHECKING:
+    import requests
+    from urllib3.connectionpool import ConnectionPool
+    from urllib3.response import BaseHTTPResponse
+    from urllib3.util.retry import Retry
+else:
+    requests = modulo_tardio("requests")
 
-# [prof] flag para ligar/desligar telemetria via env (sem mudar chamadas)
-_HTTP_PROF = os.getenv("HTTP_CLIENT_PROF", "0") in ("1", "true", "True")
 _log = logging.getLogger(__name__)
 
 # (connect, read) em segundos — pode ser sobrescrito em cada chamada
@@ -29,6 +41,47 @@ TRANSIENT_STATUSES = (429, 500, 502, 503, 504)
 IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "POST"})
 
 
+@lru_cache(maxsize=1)
+def _classe_retry() -> type[Retry]:
+    """Subclasse do Retry do urllib3 ligada à política única de ``common.retentativas``."""
+    from urllib3.exceptions import MaxRetryError, ResponseError
+    from urllib3.util.retry import Retry
+
+    class RetryComOrcamento(Retry):
+        """Cada retentativa paga uma ficha do orçamento do host; a espera tem jitter e acorda no cancelamento."""
+
+        def increment(
+            self,
+            method: str | None = None,
+            url: str | None = None,
+            response: BaseHTTPResponse | None = None,
+            error: Exception | None = None,
+            _pool: ConnectionPool | None = None,
+            _stacktrace: TracebackType | None = None,
+        ) -> Self:
+            novo = super().increment(method, url, response, error, _pool, _stacktrace)
+            if not orcamento_retentativas.gastar(getattr(_pool, "host", None) or "?"):
+                # mesmo caminho de "retries esgotados": com raise_on_status=False a última resposta volta
+                raise MaxRetryError(
+                    cast("ConnectionPool", _pool),
+                    url or "",
+                    error or ResponseError("retentativa negada pelo orçamento"),
+                )
+            return novo
+
+        def sleep(self, response: BaseHTTPResponse | None = None) -> None:
+            retry_after = None
+            if response is not None and self.respect_retry_after_header:
+                retry_after = self.get_retry_after(response)
+            espera = espera_backoff(
+                max(0, len(self.history) - 1), retry_after=retry_after, base=self.backoff_factor or BACKOFF_BASE_S
+            )
+            if not esperar(espera):
+                raise ExecucaoInterrompida("Retentativa HTTP interrompida")
+
+    return RetryComOrcamento
+
+
 def _build_retry(
     total: int = 5,
     backoff_factor: float = 0.5,
@@ -37,8 +90,11 @@ def _build_retry(
 ) -> Retry:
     """Cria política de retry exponencial com respeito a Retry-After (429/503).
 
+    Os retries gastam o orçamento por host de ``common.retentativas`` (negado = desiste na hora).
     Compatível com urllib3 novo (allowed_methods) e antigo (method_whitelist), sem esbarrar no mypy.
     """
+    Retry = _classe_retry()
+
     common_kwargs: dict[str, Any] = {
         "total": total,
         "connect": total,
@@ -61,6 +117,9 @@ def _build_retry(
 
 
 def _build_session() -> requests.Session:
+    from requests.adapters import HTTPAdapter
+
+    _instalar_observacao()  # o send registra cada requisição original no orçamento de retentativas
     s = requests.Session()
 
     # Headers padrão (pode ser sobrescrito por kwargs da chamada)
@@ -96,6 +155,175 @@ def get_session(session: requests.Session | None = None) -> requests.Session:
 # _get_cached_session.cache_clear()
 
 
+# ---- Observação de chamadas (qualquer sessão requests do processo, inclusive as criadas fora daqui) ----
+class ChamadaHttp(NamedTuple):
+    """Uma requisição concluída (ou que falhou) no HTTPAdapter, já com os retries do urllib3."""
+
+    metodo: str
+    url: str
+    host: str
+    status: int | None  # None: timeout/erro de rede
+    duracao_s: float  # inclui retries/backoff do urllib3 e a leitura do corpo (se não for streaming)
+    bytes_enviados: int
+    bytes_recebidos: int
+    retries: int
+
+
+# observador(chamada) — roda na thread que fez a chamada
+ObservadorHttp = Callable[[ChamadaHttp], None]
+
+_observadores: list[ObservadorHttp] = []
+_observadores_lock = threading.Lock()
+
+# interceptador(send_original, adapter, request, *args, **kwargs) -> Response — substitui o envio
+# (ex.: cassete de gravação/reprodução); None = envio normal pela rede
+InterceptadorHttp = Callable[..., "requests.Response"]
+
+
+class _Transporte:
+    interceptador: InterceptadorHttp | None = None
+
+
+def _tamanho_corpo(corpo: Any) -> int:
+    if isinstance(corpo, bytes | bytearray):
+        return len(corpo)
+    if isinstance(corpo, str):
+        return len(corpo.encode("utf-8"))
+    return 0
+
+
+def _tamanho_resposta(res: requests.Response, stream: bool) -> int:
+    """Bytes recebidos: Content-Length (tamanho no fio) ou, sem ele, o corpo lido.
+
+    Sem streaming o corpo é lido aqui (a Session leria logo em seguida de qualquer forma), para a
+    duração medida incluir o download.
+    """
+    corpo = None if stream else res.content
+    tamanho = res.headers.get("Content-Length")
+    if tamanho and tamanho.isdigit():
+        return int(tamanho)
+    return len(corpo or b"")
+
+
+def _retries(res: requests.Response) -> int:
+    retries = getattr(getattr(res, "raw", None), "retries", None)
+    return len(getattr(retries, "history", None) or ())
+
+
+@lru_cache(maxsize=1)
+def _instalar_observacao() -> None:
+    """Envolve HTTPAdapter.send uma única vez, quando requests for importado (sem antecipar o import).
+
+    Sem observador, interceptador nem prazo ativo o custo por chamada é o disjuntor do host, o
+    depósito no orçamento de retentativas, o lock e um ContextVar.
+    """
+    ao_importar("requests.adapters", _envolver_send)
+
+
+def _envolver_send(adapters: ModuleType) -> None:
+    HTTPAdapter = adapters.HTTPAdapter
+    send_original: Callable[..., requests.Response] = HTTPAdapter.send
+
+    def send(self: Any, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> requests.Response:
+        prazo = prazo_atual()
+        if prazo is not None:
+            # nada começa depois do fim da execução e o timeout cabe no que resta do prazo
+            prazo.verificar(request.url or "")
+            if len(args) > 1:
+                args = (args[0], prazo.limitar_timeout(args[1]), *args[2:])
+            else:
+                kwargs["timeout"] = prazo.limitar_timeout(kwargs.get("timeout"))
+        url = request.url or ""
+        host = urlsplit(url).hostname or "?"
+        disjuntor = disjuntores.disjuntor(host)
+        sonda = disjuntor.permitir()  # circuito aberto: CircuitoAberto na hora, sem sair para a rede
+        orcamento_retentativas.registrar(host)  # requisição original: rende fichas de retentativa ao host
+        interceptador = _Transporte.interceptador
+        enviar: Callable[..., requests.Response] = send_original
+        if interceptador is not None:
+            enviar = partial(interceptador, send_original)
+        with _observadores_lock:
+            observadores = list(_observadores)
+
+        status: int | None = None
+        falhou: bool | None = None  # None: sem veredito para o disjuntor (ex.: cancelamento)
+        recebidos = retries = 0
+        t0 = time.perf_counter()
+        try:
+            res = enviar(self, request, *args, **kwargs)
+            status = res.status_code
+            falhou = status >= 500  # noqa: PLR2004
+            if observadores:
+                retries = _retries(res)
+                recebidos = _tamanho_resposta(res, bool(kwargs.get("stream", args[0] if args else False)))
+            return res
+        except requests.RequestException:
+            # timeout encurtado pelo fim do prazo não é culpa do host
+            falhou = prazo is None or not prazo.interrompido()
+            raise
+        finally:
+            duracao_s = time.perf_counter() - t0
+            disjuntor.registrar(sonda, falhou, duracao_s)
+            if observadores:
+                chamada = ChamadaHttp(
+                    metodo=request.method or "GET",
+                    url=url,
+                    host=host,
+                    status=status,
+                    duracao_s=duracao_s,
+                    bytes_enviados=_tamanho_corpo(request.body),
+                    bytes_recebidos=recebidos,
+                    retries=retries,
+                )
+                _notificar(observadores, chamada)
+
+    setattr(HTTPAdapter, "send", send)  # noqa: B010
+
+
+def _notificar(observadores: list[ObservadorHttp], chamada: ChamadaHttp) -> None:
+    for observador in observadores:
+        try:
+            observador(chamada)
+        except Exception:
+            _log.exception("http_observador_erro")
+
+
+def interceptar_transporte(interceptador: InterceptadorHttp | None) -> None:
+    """Troca o envio de toda requisição requests do processo (None volta ao envio pela rede)."""
+    _instalar_observacao()
+    _Transporte.interceptador = interceptador
+
+
+def observar_chamadas_http(observador: ObservadorHttp) -> None:
+    """Registra `observador` para toda requisição HTTP feita no processo (retries do urllib3 não contam)."""
+    _instalar_observacao()
+    with _observadores_lock:
+        _observadores.append(observador)
+
+
+def deixar_de_observar_chamadas_http(observador: ObservadorHttp) -> None:
+    with _observadores_lock:
+        if observador in _observadores:
+            _observadores.remove(observador)
+
+
+@contextmanager
+def contar_chamadas_http() -> Iterator[Counter[str]]:
+    """Conta as requisições HTTP por host enquanto o bloco estiver ativo (retries do urllib3 não contam)."""
+    contador: Counter[str] = Counter()
+    lock = threading.Lock()
+
+    def contar(chamada: ChamadaHttp) -> None:
+        with lock:
+            contador[chamada.host] += 1
+
+    observar_chamadas_http(contar)
+    try:
+        yield contador
+    finally:
+        deixar_de_observar_chamadas_http(contar)
+
+
 def http_get(url: str, **kwargs: Any) -> requests.Response:
     """GET com timeout padrão, retries exponenciais (inclui 429/5xx), e tradução de erros para ExternalError."""
     timeout = kwargs.pop("timeout", DEFAULT_TIMEOUT)
@@ -103,40 +331,15 @@ def http_get(url: str, **kwargs: Any) -> requests.Response:
     jitter_max: float = kwargs.pop("jitter_max", 0.0)
 
     if jitter_max and jitter_max > 0:
-        time.sleep(random.uniform(0, jitter_max))
+        esperar(random.uniform(0, jitter_max))  # acorda no cancelamento; o send recusa se foi o caso
 
-    # telemetria opcional (não quebra se não existir)
-    _prof_enabled = bool(globals().get("_HTTP_PROF", False))
-    _logger = globals().get("_log", None)
-
-    t0 = time.perf_counter()
     try:
         res = session.get(url, timeout=timeout, **kwargs)
 
-        if _prof_enabled and _logger:
-            elapsed_ms = int((time.perf_counter() - t0) * 1000)
-            hdr = getattr(res, "headers", {}) or {}
-            _logger.error(
-                "http_prof",
-                extra={
-                    "method": "GET",
-                    "url": url,
-                    "status": getattr(res, "status_code", None),
-                    "elapsed_ms": elapsed_ms,
-                    "size_bytes": len(res.content) if getattr(res, "content", None) is not None else None,
-                    "shopify_limit": hdr.get("X-Shopify-Shop-Api-Call-Limit"),
-                    "retry_after": hdr.get("Retry-After"),
-                    "cf_ray": hdr.get("cf-ray") or hdr.get("CF-RAY"),
-                    "ce": hdr.get("Content-Encoding"),
-                },
-            )
-
         res.raise_for_status()
         return res
 
     except requests.Timeout as e:
-        if _prof_enabled and _logger:
-            _logger.error("http_prof_timeout", extra={"method": "GET", "url": url})
         raise ExternalError(
             f"Timeout ao chamar {url}",
             code="HTTP_TIMEOUT",
@@ -146,14 +349,6 @@ def http_get(url: str, **kwargs: Any) -> requests.Response:
         ) from e
 
     except requests.HTTPError as e:
-        if _prof_enabled and _logger:
-            elapsed_ms = int((time.perf_counter() - t0) * 1000)
-            status_code = getattr(e.response, "status_code", None)
-            _logger.error(
-                "http_prof_http_error",
-                extra={"method": "GET", "url": url, "status": status_code, "elapsed_ms": elapsed_ms},
-            )
-
         raw_status: Any = getattr(e.response, "status_code", None)
         status_: int | None = raw_status if isinstance(raw_status, int) else None
         retryable = bool(status_ in TRANSIENT_STATUSES)
@@ -166,9 +361,6 @@ def http_get(url: str, **kwargs: Any) -> requests.Response:
         ) from e
 
     except requests.RequestException as e:
-        if _prof_enabled and _logger:
-            elapsed_ms = int((time.perf_counter() - t0) * 1000)
-            _logger.error("http_prof_req_error", extra={"method": "GET", "url": url, "elapsed_ms": elapsed_ms})
         raise ExternalError(
             f"Erro de rede ao chamar {url}",
             code="HTTP_REQUEST_ERROR",
@@ -185,40 +377,15 @@ def http_post(url: str, **kwargs: Any) -> requests.Response:
     jitter_max: float = kwargs.pop("jitter_max", 0.0)
 
     if jitter_max and jitter_max > 0:
-        time.sleep(random.uniform(0, jitter_max))
+        esperar(random.uniform(0, jitter_max))  # acorda no cancelamento; o send recusa se foi o caso
 
-    # telemetria opcional (não quebra se não existir)
-    _prof_enabled = bool(globals().get("_HTTP_PROF", False))
-    _logger = globals().get("_log", None)
-
-    t0 = time.perf_counter()
     try:
         res = session.post(url, timeout=timeout, **kwargs)
 
-        if _prof_enabled and _logger:
-            elapsed_ms = int((time.perf_counter() - t0) * 1000)
-            hdr = getattr(res, "headers", {}) or {}
-            _logger.error(
-                "http_prof",
-                extra={
-                    "method": "POST",
-                    "url": url,
-                    "status": getattr(res, "status_code", None),
-                    "elapsed_ms": elapsed_ms,
-                    "size_bytes": len(res.content) if getattr(res, "content", None) is not None else None,
-                    "shopify_limit": hdr.get("X-Shopify-Shop-Api-Call-Limit"),
-                    "retry_after": hdr.get("Retry-After"),
-                    "cf_ray": hdr.get("cf-ray") or hdr.get("CF-RAY"),
-                    "ce": hdr.get("Content-Encoding"),
-                },
-            )
-
         res.raise_for_status()
         return res
 
     except requests.Timeout as e:
-        if _prof_enabled and _logger:
-            _logger.error("http_prof_timeout", extra={"method": "POST", "url": url})
         raise ExternalError(
             f"Timeout ao chamar {url}",
             code="HTTP_TIMEOUT",
@@ -228,19 +395,6 @@ def http_post(url: str, **kwargs: Any) -> requests.Response:
         ) from e
 
     except requests.HTTPError as e:
-        if _prof_enabled and _logger:
-            elapsed_ms = int((time.perf_counter() - t0) * 1000)
-            status_code = getattr(e.response, "status_code", None)
-            _logger.error(
-                "http_prof_http_error",
-                extra={
-                    "method": "POST",
-                    "url": url,
-                    "status": status_code,
-                    "elapsed_ms": elapsed_ms,
-                },
-            )
-
         raw_status: Any = getattr(e.response, "status_code", None)
         status_: int | None = raw_status if isinstance(raw_status, int) else None
         retryable = bool(status_ in TRANSIENT_STATUSES)
@@ -257,9 +411,6 @@ def http_post(url: str, **kwargs: Any) -> requests.Response:
         ) from e
 
     except requests.RequestException as e:
-        if _prof_enabled and _logger:
-            elapsed_ms = int((time.perf_counter() - t0) * 1000)
-            _logger.error("http_prof_req_error", extra={"method": "POST", "url": url, "elapsed_ms": elapsed_ms})
         raise ExternalError(
             f"Erro de rede ao chamar {url}",
             code="HTTP_REQUEST_ERROR",
@@ -0,0 +1,165 @@
+# common/lazy.py
+from __future__ import annotations
+
+import importlib
+import importlib.abc
+import sys
+import threading
+from collections.abc import Callable
+from importlib.machinery import ModuleSpec
+from types import ModuleType
+from typing import Any, cast
+
+
+class Tardio:
+    """Proxy que só resolve o alvo (módulo ou objeto) no primeiro acesso a um atributo.
+
+    Usado para adiar dependências pesadas (pandas, openai, requests...) até o primeiro
+    uso real, sem mudar as chamadas: ``pd.DataFrame(...)`` continua funcionando. Uma classe
+    tardia também pode ser chamada, usada no ``isinstance`` e (dentro de funções) como base.
+    """
+
+    __slots__ = ("_carregar", "_nome", "_alvo", "_lock")
+
+    def __init__(self, carregar: Callable[[], Any], nome: str) -> None:
+        object.__setattr__(self, "_carregar", carregar)
+        object.__setattr__(self, "_nome", nome)
+        object.__setattr__(self, "_alvo", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _resolver(self) -> Any:
+        alvo = self._alvo
+        if alvo is None:
+            with self._lock:
+                alvo = self._alvo
+                if alvo is None:
+                    alvo = self._carregar()
+                    object.__setattr__(self, "_alvo", alvo)
+        return alvo
+
+    def __getattr__(self, nome: str) -> Any:
+        return getattr(self._resolver(), nome)
+
+    def __setattr__(self, nome: str, valor: Any) -> None:
+        setattr(self._resolver(), nome, valor)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self._resolver()(*args, **kwargs)
+
+    def __instancecheck__(self, obj: Any) -> bool:
+        return isinstance(obj, self._resolver())
+
+    def __mro_entries__(self, bases: tuple[Any, ...]) -> tuple[type, ...]:
+        # resolve na hora do `class`: no nível do módulo isso antecipa o import (use base_tardia)
+        return (self._resolver(),)
+
+    def __repr__(self) -> str:
+        estado = "carregado" if self._alvo is not None else "pendente"
+        return f"<tardio {self._nome} ({estado})>"
+
+
+def modulo_tardio(nome: str) -> Any:
+    """Módulo importado só no primeiro acesso a um atributo (ex.: ``pd = modulo_tardio("pandas")``)."""
+    return Tardio(lambda: importlib.import_module(nome), nome)
+
+
+def atributo_tardio(modulo: str, atributo: str) -> Any:
+    """Objeto de módulo resolvido no primeiro acesso (ex.: a instância ``settings`` do pydantic)."""
+    return Tardio(lambda: getattr(importlib.import_module(modulo), atributo), f"{modulo}.{atributo}")
+
+
+def base_tardia(modulo: str, nome: str) -> type:
+    """Base de classe cuja base de verdade (ex.: ``QDialog``) só é importada na primeira instância.
+
+    ``class Janela(base_tardia("PyQt5.QtWidgets", "QDialog"))`` não importa nada; ``Janela(...)`` monta
+    (uma vez) ``Janela`` + a base real e devolve uma instância dela — ``isinstance`` vale para as duas.
+    """
+
+    montadas: dict[type, type] = {}
+
+    class Base:
+        __slots__ = ()
+
+        def __new__(cls, *args: Any, **kwargs: Any) -> Any:
+            if cls.__dict__.get("_montada"):
+                return super().__new__(cls)
+            real = montadas.get(cls)
+            if real is None:
+                base = getattr(importlib.import_module(modulo), nome)
+                atributos = {"__module__": cls.__module__, "__qualname__": cls.__qualname__, "_montada": True}
+                real = montadas.setdefault(cls, type(base)(cls.__name__, (cls, base), atributos))
+            return real.__new__(real, *args, **kwargs)
+
+    Base.__qualname__ = Base.__name__ = f"{nome}Tardio"
+    return Base
+
+
+class _GanchoImport(importlib.abc.MetaPathFinder):
+    """Finder que só observa: deixa os demais acharem o módulo e envolve o `exec_module` do loader."""
+
+    def __init__(self) -> None:
+        self.pendentes: dict[str, list[Callable[[ModuleType], None]]] = {}
+        self._lock = threading.Lock()
+
+    def find_spec(self, fullname: str, path: Any, target: Any = None) -> ModuleSpec | None:
+        with self._lock:
+            callbacks = self.pendentes.pop(fullname, None)
+        if not callbacks:
+            return None
+        spec = self._procurar(fullname, path, target)
+        if spec is None or spec.loader is None or not hasattr(spec.loader, "exec_module"):
+            with self._lock:
+                self.pendentes.setdefault(fullname, []).extend(callbacks)
+            return None
+
+        loader = spec.loader
+        exec_original = loader.exec_module
+        proprio = "exec_module" in vars(loader)
+
+        def exec_module(modulo: ModuleType) -> None:
+            # o loader pode ser compartilhado (ex.: executável congelado): desfaz o envoltório na 1ª vez
+            if modulo.__name__ != fullname:
+                exec_original(modulo)
+                return
+            if proprio:
+                setattr(loader, "exec_module", exec_original)  # noqa: B010
+            else:
+                del loader.exec_module
+            exec_original(modulo)
+            for callback in callbacks:
+                callback(modulo)
+
+        setattr(loader, "exec_module", exec_module)  # noqa: B010
+        return spec
+
+    def _procurar(self, fullname: str, path: Any, target: Any) -> ModuleSpec | None:
+        # os demais finders (inclusive o do executável congelado), na ordem de sempre
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                return cast(ModuleSpec, spec)
+        return None
+
+    def registrar(self, nome: str, callback: Callable[[ModuleType], None]) -> bool:
+        """Agenda `callback` para o import de `nome`; False se o módulo já estava carregado."""
+        with self._lock:
+            if nome in sys.modules:
+                return False
+            self.pendentes.setdefault(nome, []).append(callback)
+            if self not in sys.meta_path:
+                sys.meta_path.insert(0, self)
+        return True
+
+
+_gancho = _GanchoImport()
+
+
+def ao_importar(nome: str, callback: Callable[[ModuleType], None]) -> None:
+    """Chama `callback(modulo)` assim que `nome` for importado (ou já, se estiver carregado).
+
+    Permite instrumentar uma dependência tardia (ex.: ``requests.adapters``) sem antecipar o import.
+    """
+    if not _gancho.registrar(nome, callback):
+        callback(sys.modules[nome])
@@ -1,13 +1,19 @@
 # common/logging_setup.py
 from __future__ import annotations
 
+import atexit
+import copy
 import logging
 import os
+import queue
 import re
 import sys
+import threading
+import time
 import uuid
 from collections.abc import Iterable
 from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
 from typing import Any
 
 from pythonjsonlogger import jsonlogger
@@ -146,7 +152,8 @@ def setup_logging(
     root = logging.getLogger()
     root.setLevel(level)
 
-    # Evita duplicações
+    # Evita duplicações (inclusive uma fila de log de um setup anterior)
+    desativar_log_assincrono()
     for h in list(root.handlers):
         root.removeHandler(h)
 
@@ -172,6 +179,158 @@ def setup_logging(
         logging.getLogger(name).setLevel(logging.WARNING)
 
 
+# ---------------------------
+# Escrita assíncrona (QueueHandler → QueueListener)
+# ---------------------------
+class _Fila:
+    listener: QueueListener | None = None
+
+
+class _Marca(logging.LogRecord):
+    """Registro-sentinela de descarregar_logs: não é escrito, só avisa que a fila andou até ele."""
+
+    def __init__(self) -> None:
+        super().__init__("logging_setup", logging.NOTSET, __file__, 0, "", None, None)
+        self.evento = threading.Event()
+
+
+class _Escritor(QueueListener):
+    def handle(self, record: logging.LogRecord) -> None:
+        if isinstance(record, _Marca):
+            record.evento.set()
+            return
+        super().handle(record)
+
+
+class _FilaHandler(QueueHandler):
+    """QueueHandler em processo: resolve a mensagem na thread de origem e preserva extras/exc_info.
+
+    O `prepare` padrão achata tudo em texto (pensado para filas entre processos); aqui o registro
+    segue inteiro para os formatters de sempre (JSON no console, texto no arquivo).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
+def ativar_log_assincrono() -> QueueListener | None:
+    """Move os handlers atuais do root para trás de uma fila sem limite.
+
+    Quem loga (inclusive threads de trabalho) só enfileira o registro; uma thread dedicada escreve
+    no console/arquivo. O ContextFilter passa para o QueueHandler, para que correlation_id e
+    thread sejam lidos na thread de origem. Desative com LOG_ASYNC=0.
+    """
+    if _Fila.listener is not None or os.getenv("LOG_ASYNC", "1") in ("0", "false", "False"):
+        return _Fila.listener
+
+    root = logging.getLogger()
+    saidas = list(root.handlers)
+    if not saidas:
+        return None
+
+    fila_handler = _FilaHandler(queue.SimpleQueue())
+    for h in saidas:
+        root.removeHandler(h)
+        for f in list(h.filters):
+            if isinstance(f, ContextFilter):
+                h.removeFilter(f)
+                if f not in fila_handler.filters:
+                    fila_handler.addFilter(f)
+
+    listener = _Escritor(fila_handler.queue, *saidas, respect_handler_level=True)
+    listener.start()
+    root.addHandler(fila_handler)
+    _Fila.listener = listener
+    return listener
+
+
+def desativar_log_assincrono() -> None:
+    """Escreve o que ainda está na fila e devolve os handlers de saída ao root."""
+    listener, _Fila.listener = _Fila.listener, None
+    if listener is None:
+        return
+    listener.stop()
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        if isinstance(h, _FilaHandler):
+            root.removeHandler(h)
+            for f in h.filters:
+                for saida in listener.handlers:
+                    saida.addFilter(f)
+    for saida in listener.handlers:
+        root.addHandler(saida)
+
+
+def descarregar_logs(timeout: float | None = 5.0) -> bool:
+    """Bloqueia até a thread de escrita gravar tudo o que já estava na fila (sem efeito no modo síncrono).
+
+    Enfileira um registro-sentinela e espera a thread chegar nele; a thread de escrita segue a mesma.
+    Retorna False se `timeout` acabar antes.
+    """
+    listener = _Fila.listener
+    if listener is None:
+        return True
+    marca = _Marca()
+    listener.queue.put_nowait(marca)
+    return marca.evento.wait(timeout)
+
+
+def handlers_de_saida() -> list[logging.Handler]:
+    """Handlers que de fato escrevem (atrás da fila, se o log assíncrono estiver ativo)."""
+    if _Fila.listener is not None:
+        return list(_Fila.listener.handlers)
+    return list(logging.getLogger().handlers)
+
+
+# roda antes do logging.shutdown (atexit é LIFO): nada que ainda está na fila se perde
+atexit.register(desativar_log_assincrono)
+
+
+# ---------------------------
+# Pontos de log quentes: no máximo 1 registro por intervalo, por ponto de chamada
+# ---------------------------
+_limites: dict[tuple[str, int], list[float]] = {}  # chave -> [próximo instante liberado, suprimidos]
+_limites_lock = threading.Lock()
+
+
+def log_limitado(
+    logger: logging.Logger,
+    nivel: int,
+    msg: str,
+    *,
+    intervalo: float = 1.0,
+    extra: dict[str, Any] | None = None,
+) -> bool:
+    """Loga no máximo uma vez a cada `intervalo` segundos por ponto de chamada (arquivo:linha).
+
+    Sai cedo se o nível estiver desligado. As chamadas suprimidas no intervalo são contadas e
+    aparecem no campo `suprimidos` do próximo registro que passar. Retorna True se registrou.
+    """
+    if not logger.isEnabledFor(nivel):
+        return False
+    quadro = sys._getframe(1)
+    chave = (quadro.f_code.co_filename, quadro.f_lineno)
+
+    agora = time.monotonic()
+    with _limites_lock:
+        limite = _limites.setdefault(chave, [0.0, 0])
+        if agora < limite[0]:
+            limite[1] += 1
+            return False
+        suprimidos = int(limite[1])
+        limite[0], limite[1] = agora + intervalo, 0
+
+    dados = dict(extra or {})
+    if suprimidos:
+        dados["suprimidos"] = suprimidos
+    logger.log(nivel, msg, extra=dados, stacklevel=2)
+    return True
+
+
 # ---------------------------
 # Helpers
 # ---------------------------
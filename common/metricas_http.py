@@ -0,0 +1,242 @@
+# common/metricas_http.py
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+from collections import Counter
+from datetime import UTC, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+from .http_client import ChamadaHttp, observar_chamadas_http
+from .retentativas import orcamento_retentativas
+
+_log = logging.getLogger(__name__)
+
+QUANTIS = (0.5, 0.9, 0.99)
+
+# segmentos de caminho que são identificadores (pedido, CEP, produto, versão da API...)
+_SEGMENTO_ID = re.compile(
+    r"^(\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|\d{4}-\d{2}|(?=.*\d)[A-Za-z0-9_-]{12,})$",
+    re.IGNORECASE,
+)
+
+
+@lru_cache(maxsize=4096)
+def rota_modelo(url: str) -> str:
+    """Caminho da URL sem query e com identificadores trocados por ``{id}`` (ex.: ``/ws/{id}/json``)."""
+    caminho = urlsplit(url).path or "/"
+    return "/".join("{id}" if _SEGMENTO_ID.match(seg) else seg for seg in caminho.split("/"))
+
+
+class Histograma:
+    """Histograma log-linear no estilo HDR, em microssegundos.
+
+    Valores abaixo de ``SUB`` ficam em baldes exatos; acima, cada potência de 2 é dividida em
+    ``SUB`` baldes — erro relativo de no máximo 1/SUB (~3%) nos percentis, memória fixa e
+    ``registrar`` O(1). Não é thread-safe: o registro protege com o próprio lock.
+    """
+
+    SUB = 32
+    _BITS = SUB.bit_length()  # v >> deslocamento fica em [SUB, 2·SUB)
+
+    __slots__ = ("baldes", "maximo", "minimo", "n", "soma")
+
+    def __init__(self) -> None:
+        self.baldes: Counter[int] = Counter()
+        self.n = 0
+        self.soma = 0
+        self.minimo = 0
+        self.maximo = 0
+
+    @classmethod
+    def _indice(cls, v: int) -> int:
+        if v < cls.SUB:
+            return v
+        deslocamento = v.bit_length() - cls._BITS
+        return cls.SUB * (deslocamento + 1) + ((v >> deslocamento) - cls.SUB)
+
+    @classmethod
+    def _limites(cls, indice: int) -> tuple[int, int]:
+        if indice < cls.SUB:
+            return indice, indice
+        deslocamento, resto = divmod(indice, cls.SUB)
+        deslocamento -= 1
+        base = (cls.SUB + resto) << deslocamento
+        return base, base + (1 << deslocamento) - 1
+
+    def registrar(self, micros: int) -> None:
+        micros = max(0, int(micros))
+        self.baldes[self._indice(micros)] += 1
+        self.minimo = micros if self.n == 0 else min(self.minimo, micros)
+        self.maximo = max(self.maximo, micros)
+        self.n += 1
+        self.soma += micros
+
+    def percentil(self, q: float) -> int:
+        """Valor (µs) abaixo do qual estão `q` (0..1) das amostras — meio do balde, limitado a min/max."""
+        if self.n == 0:
+            return 0
+        alvo = max(1, round(q * self.n))
+        acumulado = 0
+        for indice in sorted(self.baldes):
+            acumulado += self.baldes[indice]
+            if acumulado >= alvo:
+                baixo, alto = self._limites(indice)
+                return min(max((baixo + alto) // 2, self.minimo), self.maximo)
+        return self.maximo
+
+
+class _Serie:
+    __slots__ = ("bytes_enviados", "bytes_recebidos", "latencia", "requisicoes", "retries", "status")
+
+    def __init__(self) -> None:
+        self.requisicoes = 0
+        self.retries = 0
+        self.bytes_enviados = 0
+        self.bytes_recebidos = 0
+        self.status: Counter[str] = Counter()
+        self.latencia = Histograma()
+
+
+def classe_status(status: int | None) -> str:
+    return f"{status // 100}xx" if status else "erro"
+
+
+class RegistroMetricasHttp:
+    """Métricas das chamadas HTTP de saída, por (host, método, rota modelo).
+
+    Alimentado pelo observador do HTTPAdapter (toda sessão requests do processo). Exporta em JSON
+    (``para_dict``) ou no formato de texto do Prometheus (``para_prometheus``).
+    """
+
+    def __init__(self) -> None:
+        self._series: dict[tuple[str, str, str], _Serie] = {}
+        self._lock = threading.Lock()
+        self.desde = datetime.now(UTC)
+
+    def registrar(self, chamada: ChamadaHttp) -> None:
+        chave = (chamada.host, chamada.metodo, rota_modelo(chamada.url))
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = _Serie()
+            serie.requisicoes += 1
+            serie.retries += chamada.retries
+            serie.bytes_enviados += chamada.bytes_enviados
+            serie.bytes_recebidos += chamada.bytes_recebidos
+            serie.status[classe_status(chamada.status)] += 1
+            serie.latencia.registrar(int(chamada.duracao_s * 1_000_000))
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self.desde = datetime.now(UTC)
+
+    def para_dict(self) -> dict[str, Any]:
+        with self._lock:
+            series = []
+            for (host, metodo, rota), s in sorted(self._series.items()):
+                h = s.latencia
+                series.append(
+                    {
+                        "host": host,
+                        "metodo": metodo,
+                        "rota": rota,
+                        "requisicoes": s.requisicoes,
+                        "status": dict(s.status),
+                        "retries": s.retries,
+                        "bytes_enviados": s.bytes_enviados,
+                        "bytes_recebidos": s.bytes_recebidos,
+                        "latencia_ms": {
+                            "min": h.minimo / 1000,
+                            "media": round(h.soma / h.n / 1000, 3) if h.n else 0.0,
+                            **{f"p{round(q * 100)}": h.percentil(q) / 1000 for q in QUANTIS},
+                            "max": h.maximo / 1000,
+                        },
+                    }
+                )
+        return {"desde": self.desde.isoformat(), "series": series, "retentativas": orcamento_retentativas.para_dict()}
+
+    def para_json(self) -> str:
+        return json.dumps(self.para_dict(), ensure_ascii=False, indent=2)
+
+    def para_prometheus(self) -> str:
+        """Texto no formato de exposição do Prometheus (latência como summary, em segundos)."""
+        with self._lock:
+            itens = sorted(self._series.items())
+            contadores: dict[str, list[str]] = {
+                "lg_http_requests_total": [],
+                "lg_http_retries_total": [],
+                "lg_http_sent_bytes_total": [],
+                "lg_http_received_bytes_total": [],
+            }
+            latencias: list[str] = []
+            for (host, metodo, rota), s in itens:
+                rotulos = f'host="{_escapar(host)}",method="{metodo}",route="{_escapar(rota)}"'
+                for classe, n in sorted(s.status.items()):
+                    contadores["lg_http_requests_total"].append(f'{{{rotulos},status_class="{classe}"}} {n}')
+                contadores["lg_http_retries_total"].append(f"{{{rotulos}}} {s.retries}")
+                contadores["lg_http_sent_bytes_total"].append(f"{{{rotulos}}} {s.bytes_enviados}")
+                contadores["lg_http_received_bytes_total"].append(f"{{{rotulos}}} {s.bytes_recebidos}")
+                h = s.latencia
+                latencias.extend(
+                    f'lg_http_request_duration_seconds{{{rotulos},quantile="{q}"}} {h.percentil(q) / 1e6}'
+                    for q in QUANTIS
+                )
+                latencias.append(f"lg_http_request_duration_seconds_sum{{{rotulos}}} {h.soma / 1e6}")
+                latencias.append(f"lg_http_request_duration_seconds_count{{{rotulos}}} {h.n}")
+
+        for host, conta in orcamento_retentativas.para_dict().items():
+            contadores.setdefault("lg_retry_budget_spent_total", []).append(
+                f'{{host="{_escapar(host)}"}} {conta["retentativas"]}'
+            )
+            contadores.setdefault("lg_retry_budget_denied_total", []).append(
+                f'{{host="{_escapar(host)}"}} {conta["negadas"]}'
+            )
+
+        linhas: list[str] = []
+        for nome, amostras in contadores.items():
+            linhas.append(f"# TYPE {nome} counter")
+            linhas.extend(nome + a for a in amostras)
+        linhas.append("# TYPE lg_http_request_duration_seconds summary")
+        linhas.extend(latencias)
+        return "\n".join(linhas) + "\n"
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registro_http = RegistroMetricasHttp()
+
+
+@lru_cache(maxsize=1)
+def ativar_metricas_http() -> RegistroMetricasHttp:
+    """Liga o registro global ao observador do HTTPAdapter (idempotente) e o devolve."""
+    observar_chamadas_http(registro_http.registrar)
+    return registro_http
+
+
+def gravar_metricas_http(diretorio: str | Path | None = None, *, prefixo: str = "metricas_http") -> list[Path]:
+    """Grava o registro em ``<prefixo>_<ts>.json`` e ``.prom`` (padrão: pasta de logs). Nunca levanta."""
+    try:
+        if diretorio is None:
+            from .paths import user_log_dir_path
+
+            diretorio = user_log_dir_path()
+        pasta = Path(diretorio)
+        pasta.mkdir(parents=True, exist_ok=True)
+        base = pasta / f"{prefixo}_{datetime.now(UTC).strftime('%Y%m%d_%H%M%S')}"
+        caminhos = [base.with_suffix(".json"), base.with_suffix(".prom")]
+        caminhos[0].write_text(registro_http.para_json(), encoding="utf-8")
+        caminhos[1].write_text(registro_http.para_prometheus(), encoding="utf-8")
+    except Exception:
+        _log.exception("metricas_http_gravar_erro")
+        return []
+    _log.info("metricas_http_gravadas", extra={"arquivos": [str(c) for c in caminhos]})
+    return caminhos
@@ -0,0 +1,137 @@
+# common/nfe_zip.py
+from __future__ import annotations
+
+import logging
+import os
+import xml.etree.ElementTree as ET
+import zipfile
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import IO, Any
+
+# (nNF, xNome destinatário, transportadora, produtos)
+DadosNFe = tuple[str | None, str | None, str | None, list[str]]
+
+_log = logging.getLogger(__name__)
+
+NS_NFE = "http://www.portalfiscal.inf.br/nfe"
+
+_INF_NFE = f"{{{NS_NFE}}}infNFe"
+
+
+_NS = {"nfe": NS_NFE}
+
+# subárvores volumosas que não são lidas (tributos por item): liberadas assim que terminam
+_DESCARTAVEIS = frozenset(f"{{{NS_NFE}}}{t}" for t in ("imposto", "impostoDevol", "obsItem"))
+
+# abaixo disso o custo de subir processos supera o ganho do paralelismo. Com spawn (Windows, build
+# PyInstaller) cada worker reimporta o script de entrada como __mp_main__ — o main.py inteiro, com PyQt
+# e config —, então subir o pool custa bem mais que um fork.
+_MIN_XMLS_PARALELO = 400
+
+
+def ler_dados_nfe(fonte: str | bytes | IO[bytes], origem: str = "") -> DadosNFe:
+    """Lê (nNF, xNome, transportadora, produtos) de uma NF-e em streaming (iterparse).
+
+    `fonte` pode ser um caminho, o conteúdo do XML em bytes ou um arquivo binário aberto
+    (ex.: membro de um ZipFile). A leitura para no fim do primeiro infNFe (assinatura e
+    protocolo não são parseados) e as subárvores de impostos são descartadas ao terminar.
+    """
+    if isinstance(fonte, bytes):
+        fonte = BytesIO(fonte)
+
+    infNFe: ET.Element | None = None
+    try:
+        for _evento, elem in ET.iterparse(fonte, events=("end",)):
+            if elem.tag == _INF_NFE:
+                infNFe = elem
+                break
+            if elem.tag in _DESCARTAVEIS:
+                elem.clear()
+    except Exception as e:
+        _log.warning("nfe_xml_invalido", extra={"arquivo": origem or str(fonte), "erro": str(e)})
+        return None, None, None, []
+
+    if infNFe is None:
+        return None, None, None, []
+
+    nNF = infNFe.findtext("nfe:ide/nfe:nNF", namespaces=_NS) if len(infNFe) else None
+    xNome = infNFe.findtext("nfe:dest/nfe:xNome", namespaces=_NS) if len(infNFe) else None
+    transportadora = (
+        infNFe.findtext("nfe:transp/nfe:transporta/nfe:xNome", namespaces=_NS) if len(infNFe) else None
+    ) or "Sem Transportadora"
+
+    produtos: list[str] = []
+    for det in infNFe.findall("nfe:det", _NS):
+        xProd = det.findtext("nfe:prod/nfe:xProd", namespaces=_NS)
+        if xProd:
+            produtos.append(xProd.strip())
+
+    infNFe.clear()
+    return nNF, xNome, transportadora, produtos
+
+
+def agrupar_por_transportadora(registros: Iterable[DadosNFe]) -> dict[str, dict[str, dict[str, Any]]]:
+    """{ transportadora: { nNF: {"xNome": str, "produtos": list[str]} } }, na ordem de leitura."""
+    agrupado: dict[str, dict[str, dict[str, Any]]] = {}
+    for nNF, xNome, transportadora, produtos in registros:
+        # garanta chaves válidas:
+        if not nNF or not transportadora:
+            continue
+        nota = agrupado.setdefault(transportadora, {}).setdefault(nNF, {"xNome": "", "produtos": []})
+        nota["xNome"] = xNome or ""
+        nota["produtos"].extend(produtos or [])
+    return agrupado
+
+
+def _ler_lote_zip(caminho_zip: str, nomes: Sequence[str]) -> list[DadosNFe]:
+    """Worker: lê um lote de membros direto do ZIP (cada processo abre o próprio handle).
+
+    Função de módulo para o pool conseguir serializá-la por nome.
+    """
+    with zipfile.ZipFile(caminho_zip, "r") as zf:
+        saida: list[DadosNFe] = []
+        for nome in nomes:
+            with zf.open(nome) as membro:
+                saida.append(ler_dados_nfe(membro, origem=nome))
+        return saida
+
+
+def _lotes(nomes: Sequence[str], tamanho: int) -> list[Sequence[str]]:
+    return [nomes[i : i + tamanho] for i in range(0, len(nomes), tamanho)]
+
+
+def ler_nfes_zip(
+    caminho_zip: str | os.PathLike[str],
+    *,
+    max_workers: int | None = None,
+    tamanho_lote: int = 200,
+) -> list[DadosNFe]:
+    """Lê todas as NF-e (.xml) de um ZIP sem extrair nada para disco, na ordem do ZIP.
+
+    Lotes de `tamanho_lote` membros são distribuídos num pool de processos; ZIPs pequenos
+    (ou `max_workers=1`) são lidos no próprio processo.
+    """
+    caminho = os.fspath(caminho_zip)
+    with zipfile.ZipFile(caminho, "r") as zf:
+        nomes = [n for n in zf.namelist() if n.endswith(".xml")]
+
+    workers = max_workers or min(8, os.cpu_count() or 1)
+    if workers <= 1 or len(nomes) < _MIN_XMLS_PARALELO:
+        return _ler_lote_zip(caminho, nomes)
+
+    lotes = _lotes(nomes, max(1, tamanho_lote))
+    with ProcessPoolExecutor(max_workers=min(workers, len(lotes))) as pool:
+        resultados = pool.map(_ler_lote_zip, [caminho] * len(lotes), lotes)
+        return [dados for lote in resultados for dados in lote]
+
+
+def organizar_nfes_zip(
+    caminho_zip: str | os.PathLike[str],
+    *,
+    max_workers: int | None = None,
+    tamanho_lote: int = 200,
+) -> dict[str, dict[str, dict[str, Any]]]:
+    """Agrupa as NF-e de um ZIP por transportadora → nNF, lendo os membros em streaming."""
+    return agrupar_por_transportadora(ler_nfes_zip(caminho_zip, max_workers=max_workers, tamanho_lote=tamanho_lote))
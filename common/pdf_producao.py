@@ -0,0 +1,137 @@
+# common/pdf_producao.py
+from __future__ import annotations
+
+import os
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any
+
+# Contagens já agregadas, na ordem em que devem ser impressas: [(rótulo, quantidade)]
+Contagens = Sequence[tuple[str, int]]
+
+
+def renderizar_pdf_notas(caminho_pdf: str, notas: Sequence[tuple[str, Mapping[str, Any]]]) -> str:
+    """Gera o PDF de conferência de uma transportadora: uma seção por NF (destinatário + itens)."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(caminho_pdf, pagesize=A4)
+    _largura, altura = A4
+    margem_sup = 10 * mm
+    margem_inf = 10 * mm
+    y = altura - margem_sup
+
+    for nNF, dados in notas:
+        if y < margem_inf + 25 * mm:
+            c.showPage()
+            y = altura - margem_sup
+
+        c.setFont("Helvetica-Bold", 10)
+        c.drawString(15 * mm, y, f"NF {nNF} - Destinatário: {dados['xNome']}")
+        y -= 5 * mm
+
+        c.setFont("Helvetica", 9)
+        for produto in dados["produtos"]:
+            if y < margem_inf + 10 * mm:
+                c.showPage()
+                y = altura - margem_sup
+            c.drawString(20 * mm, y, f"- 1x {produto}")
+            y -= 4 * mm
+
+        y -= 5 * mm  # espaço entre NF-es
+
+    c.save()
+    return caminho_pdf
+
+
+def renderizar_resumo_producao(
+    caminho_pdf: str,
+    subtitulo: str,
+    produtos_totais: Contagens,
+    conjuntos: Contagens,
+    extras: Contagens,
+) -> str:
+    """Gera o PDF "Resumo de Produção" (FPDF) a partir das contagens já agregadas."""
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, "Editora Logos - Logística", ln=True, align="C")
+    pdf.set_font("Arial", "", 12)
+    pdf.cell(0, 10, subtitulo, ln=True, align="C")
+    pdf.ln(10)
+
+    # 📦 Total por produto individual
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 10, "Total por Produto Individual:", ln=True)
+    pdf.set_font("Arial", "", 11)
+    for produto, qtd in produtos_totais:
+        pdf.cell(0, 8, f"{qtd} x {produto}", ln=True)
+
+    # 📦 Total por conjunto de produtos (pedido)
+    pdf.ln(6)
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 10, "Total por Conjunto de Produtos (Pedido):", ln=True)
+    pdf.set_font("Arial", "", 11)
+    for conjunto, qtd in conjuntos:
+        pdf.cell(0, 8, f"{qtd} x {conjunto}", ln=True)
+
+    # 🎁 Produtos extras por cupom
+    if extras:
+        pdf.ln(10)
+        pdf.set_font("Arial", "B", 12)
+        pdf.cell(0, 10, "Produtos Extras por Cupom (R$ 0,00):", ln=True)
+        pdf.set_font("Arial", "", 11)
+        for nome_produto, qtd in extras:
+            pdf.cell(0, 8, f"{qtd} x {nome_produto}", ln=True)
+
+    pdf.output(caminho_pdf)
+    return caminho_pdf
+
+
+def _max_workers_padrao() -> int:
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+@lru_cache(maxsize=1)
+def _pool() -> ProcessPoolExecutor:
+    """Pool compartilhado (criado sob demanda; encerrado pelo atexit do concurrent.futures)."""
+    return ProcessPoolExecutor(max_workers=_max_workers_padrao())
+
+
+def renderizar_em_paralelo(
+    renderizar: Callable[..., str],
+    tarefas: Sequence[tuple[Any, ...]],
+    *,
+    max_workers: int | None = None,
+) -> list[str]:
+    """Executa `renderizar(*args)` para cada tarefa (um documento por worker) e devolve os caminhos na ordem.
+
+    Com um único documento ou um único núcleo, renderiza no próprio processo.
+    """
+    workers = max_workers or _max_workers_padrao()
+    if len(tarefas) <= 1 or workers <= 1:
+        return [renderizar(*args) for args in tarefas]
+    if max_workers is None:
+        futuros = [_pool().submit(renderizar, *args) for args in tarefas]
+        return [f.result() for f in futuros]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tarefas))) as pool:
+        return list(pool.map(renderizar, *zip(*tarefas, strict=True)))
+
+
+def renderizar_em_segundo_plano(renderizar: Callable[..., str], *args: Any) -> Future[str]:
+    """Agenda um documento no pool de processos e retorna o Future (não bloqueia quem chamou).
+
+    Em máquinas de um núcleo, renderiza na hora e devolve um Future já resolvido.
+    """
+    if _max_workers_padrao() <= 1:
+        futuro: Future[str] = Future()
+        try:
+            futuro.set_result(renderizar(*args))
+        except Exception as e:
+            futuro.set_exception(e)
+        return futuro
+    return _pool().submit(renderizar, *args)
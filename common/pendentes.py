@@ -0,0 +1,84 @@
+# common/pendentes.py
+from __future__ import annotations
+
+import logging
+import threading
+from collections.abc import Callable, Iterable, Iterator, MutableSet
+
+_log = logging.getLogger(__name__)
+
+
+class PendentesEtapa(MutableSet[str]):
+    """Conjunto de pedidos pendentes de uma etapa que funciona como contagem regressiva (latch).
+
+    Quem conclui um pedido só precisa fazer ``pendentes.discard(pid)`` (como já fazia com o
+    ``set``); a remoção do último item dispara, uma única vez e na própria thread que removeu,
+    os callbacks de :meth:`ao_esvaziar`. Não há polling: ``aguardar()`` bloqueia num Event.
+    """
+
+    def __init__(self, itens: Iterable[str] = ()) -> None:
+        self._itens: set[str] = set(itens)
+        self._lock = threading.Lock()
+        self._vazio = threading.Event()
+        self._callbacks: list[Callable[[], None]] = []
+        self.total: int = len(self._itens)
+        if not self._itens:
+            self._vazio.set()
+
+    # ---- protocolo de conjunto ----
+    def __contains__(self, item: object) -> bool:
+        return item in self._itens
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._itens))
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def __repr__(self) -> str:
+        return f"PendentesEtapa({len(self._itens)}/{self.total})"
+
+    def add(self, item: str) -> None:
+        """Acrescenta uma pendência (depois que a etapa esvaziou, não rearma o latch)."""
+        with self._lock:
+            if item not in self._itens:
+                self._itens.add(item)
+                self.total += 1
+
+    def discard(self, item: str) -> None:
+        with self._lock:
+            if item not in self._itens:
+                return
+            self._itens.discard(item)
+            if self._itens or self._vazio.is_set():
+                return
+            self._vazio.set()
+            callbacks = list(self._callbacks)
+            self._callbacks.clear()
+        self._disparar(callbacks)
+
+    # ---- latch ----
+    @property
+    def concluido(self) -> bool:
+        return self._vazio.is_set()
+
+    def ao_esvaziar(self, callback: Callable[[], None]) -> None:
+        """Registra `callback` para quando a última pendência sair (ou chama já, se não houver nenhuma)."""
+        with self._lock:
+            if not self._vazio.is_set():
+                self._callbacks.append(callback)
+                return
+        self._disparar([callback])
+
+    def aguardar(self, timeout: float | None = None) -> bool:
+        """Bloqueia até não haver pendências; retorna False se o `timeout` (s) expirar antes."""
+        return self._vazio.wait(timeout)
+
+    @staticmethod
+    def _disparar(callbacks: Iterable[Callable[[], None]]) -> None:
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                _log.exception("pendentes_callback_erro")
@@ -0,0 +1,230 @@
+# common/perfilamento.py
+"""Perfilamento opcional das threads de trabalho (``--perfil`` / ``LG_PERFIL=1``).
+
+Com um :class:`Perfilador` ativo, cada função marcada com :func:`perfilado` tem o tempo de parede
+somado por (nome, thread) e roda sob ``cProfile``; as marcadas com ``memoria=True`` também comparam
+instantâneos do ``tracemalloc`` de antes e depois. A partir do Python 3.12 o ``cProfile`` usa o
+``sys.monitoring``, que aceita um único perfil ativo no processo e vê todas as threads: o
+perfilador liga um ``Profile`` só, ao ser criado, e grava um ``execucao.prof``. Antes disso o perfil
+é por thread: um ``Profile`` por (nome, thread), acumulado entre chamadas, gravado como
+``<nome>__<thread>.prof``. :func:`gravar_perfis` grava os ``.prof`` (``python -m pstats`` /
+snakeviz) e o ``alocacoes.txt`` — tempos por thread e linhas que mais alocaram — numa pasta
+``perfil_<ts>`` dentro dos logs. Desligado, o decorator só lê um atributo.
+"""
+from __future__ import annotations
+
+import cProfile
+import functools
+import logging
+import marshal
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import ParamSpec, TypeVar
+
+_log = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+TOP_PADRAO = 25
+QUADROS_PADRAO = 10  # profundidade da pilha guardada pelo tracemalloc em cada alocação
+
+# alocações do próprio tracemalloc e do mecanismo de import não interessam no relatório
+_FILTROS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+_NOME_ARQUIVO = re.compile(r"[^A-Za-z0-9_.-]+")
+
+# 3.12+: cProfile sobre sys.monitoring — um perfil por processo, que enxerga todas as threads; um
+# segundo enable() (outra thread, outro Perfilador, `python -m cProfile`) levanta ValueError
+PERFIL_DO_PROCESSO = sys.version_info >= (3, 12)
+
+
+class Perfilador:
+    """Guarda os perfis, os tempos por (nome, thread) e os diffs de memória de uma execução.
+
+    O ``tracemalloc`` é do processo inteiro: o diff de uma chamada inclui o que as outras threads
+    alocaram no mesmo intervalo. Por isso só os trabalhos longos (coletas) pedem ``memoria=True``.
+    """
+
+    def __init__(self, top: int = TOP_PADRAO, quadros: int = QUADROS_PADRAO) -> None:
+        self.top = top
+        self.iniciado_em = datetime.now(UTC)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._perfis: dict[tuple[str, str], cProfile.Profile] = {}
+        self._chamadas: Counter[tuple[str, str]] = Counter()
+        self._tempos: dict[tuple[str, str], float] = {}
+        self._rodando: Counter[tuple[str, str]] = Counter()
+        self._processo: cProfile.Profile | None = None
+        self._alocacoes: list[tuple[str, str, float, list[str]]] = []
+        self._iniciou_tracemalloc = not tracemalloc.is_tracing()
+        if self._iniciou_tracemalloc:
+            tracemalloc.start(quadros)
+        self._inicial = self._instantaneo()
+
+    @staticmethod
+    def _instantaneo() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_FILTROS)
+
+    def ligar(self) -> None:
+        """No 3.12+, liga o perfil único do processo (uma vez; :func:`ativar_perfilamento` chama)."""
+        if not PERFIL_DO_PROCESSO or self._processo is not None:
+            return
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # outra ferramenta já perfila o processo: seguem só os tempos e as alocações
+            _log.warning("perfil_cprofile_indisponivel", exc_info=True)
+            return
+        self._processo = perfil
+
+    def executar(self, nome: str, memoria: bool, fn: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R:
+        """Roda `fn` medindo (nome, thread atual); chamadas aninhadas entram na medida de fora."""
+        if getattr(self._local, "ativo", False):
+            return fn(*args, **kwargs)
+        chave = (nome, threading.current_thread().name)
+        with self._lock:
+            # com o perfil do processo ligado, as chamadas já caem nele: aqui só se mede o tempo
+            perfil = None if PERFIL_DO_PROCESSO else self._perfis.setdefault(chave, cProfile.Profile())
+            self._chamadas[chave] += 1
+            self._rodando[chave] += 1
+        antes = self._instantaneo() if memoria else None
+        t0 = time.perf_counter()
+        self._local.ativo = True
+        if perfil is not None:
+            perfil.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if perfil is not None:
+                perfil.disable()
+            self._local.ativo = False
+            duracao_s = time.perf_counter() - t0
+            with self._lock:
+                self._rodando[chave] -= 1
+                self._tempos[chave] = self._tempos.get(chave, 0.0) + duracao_s
+            if antes is not None:
+                self._registrar_alocacoes(chave, duracao_s, antes)
+
+    def _registrar_alocacoes(self, chave: tuple[str, str], duracao_s: float, antes: tracemalloc.Snapshot) -> None:
+        diff = self._instantaneo().compare_to(antes, "lineno")[: self.top]
+        with self._lock:
+            self._alocacoes.append((*chave, duracao_s, [str(d) for d in diff]))
+
+    def encerrar(self) -> None:
+        if self._processo is not None:
+            self._processo.disable()  # os stats ficam: gravar() depois de encerrar ainda funciona
+        if self._iniciou_tracemalloc:
+            tracemalloc.stop()
+
+    def gravar(self, diretorio: str | Path) -> list[Path]:
+        """Grava os ``.prof`` das chamadas concluídas e o ``alocacoes.txt``; retorna os arquivos."""
+        pasta = Path(diretorio) / f"perfil_{self.iniciado_em.strftime('%Y%m%d_%H%M%S')}"
+        pasta.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            prontos = [
+                (pasta / f"{nome}__{_NOME_ARQUIVO.sub('_', thread)}.prof", perfil)
+                for (nome, thread), perfil in self._perfis.items()
+                if not self._rodando[nome, thread]
+            ]
+            ocupados = sorted(c for c, n in self._rodando.items() if n)
+            chamadas = dict(self._chamadas)
+            tempos = dict(self._tempos)
+            alocacoes = list(self._alocacoes)
+        if self._processo is not None:
+            prontos.append((pasta / "execucao.prof", self._processo))
+
+        caminhos: list[Path] = []
+        for caminho, perfil in prontos:
+            # snapshot_stats + marshal = dump_stats sem o disable(), que desligaria o perfil ainda em uso
+            perfil.snapshot_stats()
+            with caminho.open("wb") as f:
+                marshal.dump(perfil.stats, f)
+            caminhos.append(caminho)
+
+        linhas = [
+            f"# alocações — iniciado em {self.iniciado_em.isoformat()}, gravado em {datetime.now(UTC).isoformat()}",
+        ]
+        if tracemalloc.is_tracing():
+            atual, pico = tracemalloc.get_traced_memory()
+            linhas.append(f"memória rastreada: atual {atual / 2**20:.1f} MB, pico {pico / 2**20:.1f} MB")
+            linhas += ["", f"## maiores variações desde o início (top {self.top})"]
+            linhas += [str(d) for d in self._instantaneo().compare_to(self._inicial, "lineno")[: self.top]]
+        for nome, thread, duracao_s, diff in alocacoes:
+            linhas += ["", f"## {nome} @ {thread} ({duracao_s:.2f} s)", *diff]
+        linhas += ["", "## chamadas perfiladas (tempo de parede somado das concluídas)"]
+        linhas += [
+            f"{nome} @ {thread}: {n} em {tempos.get((nome, thread), 0.0):.3f} s"
+            for (nome, thread), n in sorted(chamadas.items())
+        ]
+        if ocupados:
+            linhas += ["", "## ainda em execução (sem .prof nem tempo)"]
+            linhas += [f"{nome} @ {thread}" for nome, thread in ocupados]
+        relatorio = pasta / "alocacoes.txt"
+        relatorio.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+        caminhos.append(relatorio)
+        return caminhos
+
+
+class _Ativo:
+    perfilador: Perfilador | None = None
+
+
+def ativar_perfilamento(perfilador: Perfilador | None) -> None:
+    """Liga o perfilamento das funções :func:`perfilado` (None desliga e encerra o atual)."""
+    anterior, _Ativo.perfilador = _Ativo.perfilador, perfilador
+    if anterior is not None and anterior is not perfilador:
+        anterior.encerrar()  # antes de ligar o novo: no 3.12+ só cabe um perfil no processo
+    if perfilador is not None:
+        perfilador.ligar()
+
+
+def perfilamento_ativo() -> Perfilador | None:
+    return _Ativo.perfilador
+
+
+def perfilado(nome: str, *, memoria: bool = False) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Decorator: com o perfilamento ligado, roda a função sob ``cProfile`` (e ``tracemalloc`` se `memoria`)."""
+
+    def decorar(fn: Callable[P, R]) -> Callable[P, R]:
+        @functools.wraps(fn)
+        def envolvida(*args: P.args, **kwargs: P.kwargs) -> R:
+            perfilador = _Ativo.perfilador
+            if perfilador is None:
+                return fn(*args, **kwargs)
+            return perfilador.executar(nome, memoria, fn, *args, **kwargs)
+
+        return envolvida
+
+    return decorar
+
+
+def gravar_perfis(diretorio: str | Path | None = None) -> list[Path]:
+    """Grava os perfis do perfilador ativo (padrão: pasta de logs). Nunca levanta."""
+    perfilador = _Ativo.perfilador
+    if perfilador is None:
+        return []
+    try:
+        if diretorio is None:
+            from .paths import user_log_dir_path
+
+            diretorio = user_log_dir_path()
+        caminhos = perfilador.gravar(diretorio)
+    except Exception:
+        _log.exception("perfil_gravar_erro")
+        return []
+    _log.info("perfil_gravado", extra={"pasta": str(caminhos[-1].parent), "arquivos": len(caminhos)})
+    return caminhos
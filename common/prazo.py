@@ -0,0 +1,121 @@
+# common/prazo.py
+"""Esperas interrompíveis e prazo por execução.
+
+Toda espera de backoff/rate limit passa por :func:`esperar`, que dorme no ``Event`` de
+cancelamento (``wait(timeout)``): cancelar acorda a thread na hora, em vez de deixá-la terminar o
+``time.sleep``. Um :class:`Prazo` ativo (:func:`no_prazo`; é um ContextVar, então o executor o
+leva às tarefas) encurta cada espera e, pelo ``HTTPAdapter.send`` de ``common.http_client``, o
+timeout de toda requisição — nenhuma chamada começa depois do fim da execução.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Protocol
+
+from .errors import ExternalError
+
+
+class Cancelavel(Protocol):
+    def is_set(self) -> bool: ...
+
+
+class ExecucaoInterrompida(ExternalError):
+    """A execução foi cancelada ou o prazo acabou: não vale tentar de novo."""
+
+    def __init__(self, message: str, *, code: str = "EXECUCAO_INTERROMPIDA", **kw: Any) -> None:
+        super().__init__(message, code=code, retryable=False, **kw)
+
+
+class Prazo:
+    """Cancelamento (Event) + instante limite opcional de uma execução (relógio monotônico)."""
+
+    def __init__(self, segundos: float | None = None, cancelador: threading.Event | None = None) -> None:
+        self.cancelador = cancelador if cancelador is not None else threading.Event()
+        self.segundos = segundos
+        self.limite = None if segundos is None else time.monotonic() + segundos
+
+    def restante(self) -> float | None:
+        """Segundos até o limite (0 se já passou; None sem limite)."""
+        return None if self.limite is None else max(0.0, self.limite - time.monotonic())
+
+    def interrompido(self) -> bool:
+        return self.cancelador.is_set() or self.restante() == 0
+
+    def verificar(self, onde: str = "") -> None:
+        """Levanta :class:`ExecucaoInterrompida` se a execução foi cancelada ou o prazo acabou."""
+        if self.cancelador.is_set():
+            raise ExecucaoInterrompida(f"Execução cancelada ({onde})" if onde else "Execução cancelada")
+        if self.restante() == 0:
+            raise ExecucaoInterrompida(
+                f"Prazo de {self.segundos:g}s da execução esgotado" + (f" ({onde})" if onde else ""),
+                code="PRAZO_ESGOTADO",
+            )
+
+    def limitar_timeout(self, timeout: Any) -> Any:
+        """Encurta um timeout do requests (número ou (connect, read)) para caber no que resta."""
+        restante = self.restante()
+        if restante is None:
+            return timeout
+        restante = max(restante, 0.001)
+        if isinstance(timeout, tuple):
+            return tuple(restante if t is None else min(float(t), restante) for t in timeout)
+        if timeout is None or isinstance(timeout, int | float):
+            return restante if timeout is None else min(float(timeout), restante)
+        return timeout  # urllib3.Timeout e afins: mantidos
+
+
+_prazo_atual: ContextVar[Prazo | None] = ContextVar("prazo_atual", default=None)
+
+
+@contextmanager
+def no_prazo(prazo: Prazo) -> Iterator[Prazo]:
+    """Ativa `prazo` no contexto atual (e nas tarefas enviadas ao executor a partir dele)."""
+    from .http_client import _instalar_observacao
+
+    _instalar_observacao()  # o HTTPAdapter.send é quem aplica o prazo às requisições
+    token = _prazo_atual.set(prazo)
+    try:
+        yield prazo
+    finally:
+        _prazo_atual.reset(token)
+
+
+def prazo_atual() -> Prazo | None:
+    return _prazo_atual.get()
+
+
+def limitar_timeout(timeout: Any) -> Any:
+    """Timeout encurtado pelo prazo atual (sem prazo ativo, devolve o mesmo valor)."""
+    prazo = _prazo_atual.get()
+    return timeout if prazo is None else prazo.limitar_timeout(timeout)
+
+
+def esperar(segundos: float, cancelador: Cancelavel | None = None) -> bool:
+    """Dorme até `segundos`, acordando no cancelamento ou no fim do prazo atual.
+
+    Retorna True se dormiu o tempo todo (pode seguir) e False se foi interrompido. Sem
+    `cancelador`, usa o Event do prazo atual; um cancelador sem ``wait`` é checado antes e depois.
+    """
+    prazo = _prazo_atual.get()
+    alvo = max(0.0, segundos)
+    if prazo is not None:
+        restante = prazo.restante()
+        if restante is not None:
+            alvo = min(alvo, restante)
+        if cancelador is None:
+            cancelador = prazo.cancelador
+    if cancelador is not None and cancelador.is_set():
+        return False
+    aguardar = getattr(cancelador, "wait", None)
+    if callable(aguardar):
+        if aguardar(alvo):
+            return False
+    else:
+        time.sleep(alvo)
+    if cancelador is not None and cancelador.is_set():
+        return False
+    return prazo is None or not prazo.interrompido()
@@ -0,0 +1,57 @@
+# common/progresso.py
+from __future__ import annotations
+
+import itertools
+import time
+from collections.abc import Callable
+
+# (texto, atual, total) — mesmo formato do sinal de progresso da UI
+Progresso = tuple[str, int, int]
+
+HZ_PADRAO = 20.0
+
+
+class ProgressoCoalescido:
+    """Junta atualizações de progresso e entrega só a mais recente, no máximo `hz` vezes por segundo.
+
+    ``registrar`` pode ser chamado de qualquer thread e não usa lock: guarda a tupla mais recente
+    (troca atômica de referência) e avança um contador (``itertools.count``). Quem consome (a thread
+    da UI, por um QTimer ou no próprio ``atualizar``) chama ``descarregar`` — atualizações
+    intermediárias que chegaram entre duas entregas são descartadas.
+    """
+
+    def __init__(
+        self,
+        entregar: Callable[[str, int, int], None],
+        *,
+        hz: float = HZ_PADRAO,
+        relogio: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._entregar = entregar
+        self.intervalo: float = 1.0 / hz if hz > 0 else 0.0
+        self._relogio = relogio
+        self._seq = itertools.count(1)
+        self._ultimo: tuple[int, Progresso] | None = None
+        self._entregue_seq = 0
+        self._entregue_em = float("-inf")
+        self.entregues = 0
+
+    def registrar(self, texto: str, atual: int, total: int) -> None:
+        self._ultimo = (next(self._seq), (texto, atual, total))
+
+    def descarregar(self, *, forcar: bool = False) -> bool:
+        """Entrega a atualização mais recente se houver novidade e o intervalo já passou (ou `forcar`).
+
+        Deve ser chamado sempre pela mesma thread (a consumidora). Retorna True se entregou.
+        """
+        ultimo = self._ultimo
+        if ultimo is None or ultimo[0] == self._entregue_seq:
+            return False
+        agora = self._relogio()
+        if not forcar and agora - self._entregue_em < self.intervalo:
+            return False
+        self._entregue_seq, progresso = ultimo
+        self._entregue_em = agora
+        self.entregues += 1
+        self._entregar(*progresso)
+        return True
@@ -0,0 +1,271 @@
+# common/rastreamento.py
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, ParamSpec, TypeVar
+
+from .http_client import ChamadaHttp, observar_chamadas_http
+from .logging_setup import get_correlation_id
+
+_log = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+class Span:
+    """Nó da árvore de etapas de uma execução.
+
+    Spans com o mesmo nome sob o mesmo pai são agregados no mesmo nó (ex.: um por lote em
+    ``fretes``): ``execucoes`` conta as aberturas, ``duracao_total`` soma o tempo de cada uma e
+    ``inicio``/``fim`` guardam a janela de parede (primeira abertura → último fechamento).
+    """
+
+    __slots__ = (
+        "bytes_enviados",
+        "bytes_recebidos",
+        "chamadas_http",
+        "contagens",
+        "duracao_total",
+        "erros",
+        "execucoes",
+        "fim",
+        "filhos",
+        "inicio",
+        "nome",
+    )
+
+    def __init__(self, nome: str) -> None:
+        self.nome = nome
+        self.filhos: dict[str, Span] = {}
+        self.execucoes = 0
+        self.erros = 0
+        self.duracao_total = 0.0
+        self.inicio: float | None = None
+        self.fim: float | None = None
+        self.contagens: Counter[str] = Counter()
+        self.chamadas_http: Counter[str] = Counter()
+        self.bytes_enviados = 0
+        self.bytes_recebidos = 0
+
+    def _http_acumulado(self) -> tuple[Counter[str], int, int]:
+        chamadas = Counter(self.chamadas_http)
+        enviados, recebidos = self.bytes_enviados, self.bytes_recebidos
+        for filho in self.filhos.values():
+            c, e, r = filho._http_acumulado()
+            chamadas.update(c)
+            enviados += e
+            recebidos += r
+        return chamadas, enviados, recebidos
+
+    def para_dict(self, origem: float) -> dict[str, Any]:
+        """Serializa o nó; o bloco ``http`` inclui as chamadas dos filhos."""
+        chamadas, enviados, recebidos = self._http_acumulado()
+        inicio = self.inicio if self.inicio is not None else origem
+        fim = self.fim if self.fim is not None else time.perf_counter()
+        return {
+            "nome": self.nome,
+            "execucoes": self.execucoes,
+            "erros": self.erros,
+            "inicio_s": round(inicio - origem, 3),
+            "parede_s": round(fim - inicio, 3),
+            "duracao_total_s": round(self.duracao_total, 3),
+            "contagens": dict(self.contagens),
+            "http": {
+                "chamadas": sum(chamadas.values()),
+                "por_host": dict(chamadas),
+                "bytes_enviados": enviados,
+                "bytes_recebidos": recebidos,
+            },
+            "filhos": [f.para_dict(origem) for f in self.filhos.values()],
+        }
+
+
+class Execucao:
+    """Raiz do rastreamento de uma execução, identificada pelo correlation_id."""
+
+    def __init__(self, correlation_id: str) -> None:
+        self.correlation_id = correlation_id
+        self.iniciado_em = datetime.now(UTC)
+        self.raiz = Span("execucao")
+        self.raiz.inicio = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def relatorio(self) -> dict[str, Any]:
+        with self.lock:
+            arvore = self.raiz.para_dict(self.raiz.inicio or 0.0)
+        return {
+            "correlation_id": self.correlation_id,
+            "iniciado_em": self.iniciado_em.isoformat(),
+            "duracao_s": arvore["parede_s"],
+            "http": arvore["http"],
+            "etapas": arvore["filhos"],
+        }
+
+
+class _Atual:
+    execucao: Execucao | None = None
+
+
+_span_atual: ContextVar[Span | None] = ContextVar("span_atual", default=None)
+_lock_execucao = threading.Lock()
+
+
+def iniciar_execucao(correlation_id: str | None = None) -> Execucao:
+    """Abre uma nova execução (substitui a anterior); spans sem pai no contexto penduram-se nela."""
+    _instalar_observador_http()
+    execucao = Execucao(correlation_id or get_correlation_id())
+    with _lock_execucao:
+        _Atual.execucao = execucao
+    _span_atual.set(None)
+    return execucao
+
+
+def execucao_atual() -> Execucao:
+    """A execução corrente; cria uma (com o correlation_id do contexto) se ainda não houver."""
+    execucao = _Atual.execucao
+    if execucao is None:
+        with _lock_execucao:
+            if _Atual.execucao is None:
+                _instalar_observador_http()
+                _Atual.execucao = Execucao(get_correlation_id())
+            execucao = _Atual.execucao
+    return execucao
+
+
+def _no_atual(execucao: Execucao) -> Span:
+    return _span_atual.get() or execucao.raiz
+
+
+@contextmanager
+def span(nome: str) -> Iterator[Span]:
+    """Cronometra o bloco como etapa `nome`, filha do span corrente do contexto (ou da execução).
+
+    Chamadas HTTP feitas no bloco (na mesma thread ou em threads que receberam o contexto por
+    :func:`propagar`) contam para esta etapa; exceções contam como erro e continuam subindo.
+    Dentro de uma etapa de mesmo nome, não cria um nível novo: usa a que já está aberta.
+    """
+    execucao = execucao_atual()
+    with execucao.lock:
+        pai = _no_atual(execucao)
+        reentrante = pai.nome == nome
+    if reentrante:
+        # etapa de mesmo nome já aberta (ex.: função rastreada chamada pela etapa do pipeline)
+        yield pai
+        return
+    with execucao.lock:
+        no = pai.filhos.get(nome)
+        if no is None:
+            no = pai.filhos[nome] = Span(nome)
+        no.execucoes += 1
+    token = _span_atual.set(no)
+    t0 = time.perf_counter()
+    try:
+        yield no
+    except BaseException:
+        with execucao.lock:
+            no.erros += 1
+        raise
+    finally:
+        t1 = time.perf_counter()
+        _span_atual.reset(token)
+        with execucao.lock:
+            no.duracao_total += t1 - t0
+            no.inicio = t0 if no.inicio is None else min(no.inicio, t0)
+            no.fim = t1 if no.fim is None else max(no.fim, t1)
+
+
+def rastreado(
+    nome: str, *, itens: Callable[[Any], int | None] | None = None
+) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Decorator: roda a função dentro de ``span(nome)``; `itens(resultado)` alimenta a contagem "itens"."""
+
+    def decorar(fn: Callable[P, R]) -> Callable[P, R]:
+        @functools.wraps(fn)
+        def envolvida(*args: P.args, **kwargs: P.kwargs) -> R:
+            with span(nome):
+                resultado = fn(*args, **kwargs)
+                if itens is not None:
+                    try:
+                        n = itens(resultado)
+                    except Exception:
+                        n = None
+                    if n:
+                        contar("itens", n)
+                return resultado
+
+        return envolvida
+
+    return decorar
+
+
+def contar(chave: str, valor: int = 1) -> None:
+    """Soma `valor` na contagem `chave` do span corrente (ou da execução)."""
+    execucao = execucao_atual()
+    with execucao.lock:
+        _no_atual(execucao).contagens[chave] += int(valor)
+
+
+def propagar(fn: Callable[P, R]) -> Callable[P, R]:
+    """Leva o contexto atual (span e correlation_id) para a thread que vai executar `fn` (pools)."""
+    ctx = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def no_contexto(*args: P.args, **kwargs: P.kwargs) -> R:
+        # cada execução usa uma cópia: o mesmo callable pode rodar em paralelo
+        return ctx.copy().run(fn, *args, **kwargs)
+
+    return no_contexto
+
+
+def _registrar_http(chamada: ChamadaHttp) -> None:
+    execucao = _Atual.execucao
+    if execucao is None:
+        return
+    with execucao.lock:
+        no = _no_atual(execucao)
+        no.chamadas_http[chamada.host] += 1
+        no.bytes_enviados += chamada.bytes_enviados
+        no.bytes_recebidos += chamada.bytes_recebidos
+
+
+@functools.lru_cache(maxsize=1)
+def _instalar_observador_http() -> None:
+    observar_chamadas_http(_registrar_http)
+
+
+def gravar_relatorio(diretorio: str | Path | None = None, execucao: Execucao | None = None) -> Path | None:
+    """Grava o relatório JSON da execução em `diretorio` (padrão: pasta de logs do app).
+
+    Nunca levanta: falha de escrita só vai para o log. Retorna o caminho gravado.
+    """
+    execucao = execucao or _Atual.execucao
+    if execucao is None:
+        return None
+    try:
+        if diretorio is None:
+            from .paths import user_log_dir_path
+
+            diretorio = user_log_dir_path()
+        pasta = Path(diretorio)
+        pasta.mkdir(parents=True, exist_ok=True)
+        carimbo = execucao.iniciado_em.strftime("%Y%m%d_%H%M%S")
+        caminho = pasta / f"execucao_{carimbo}_{execucao.correlation_id[:8]}.json"
+        relatorio = execucao.relatorio()
+        caminho.write_text(json.dumps(relatorio, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+    except Exception:
+        _log.exception("rastreamento_relatorio_erro")
+        return None
+    _log.info("rastreamento_relatorio", extra={"caminho": str(caminho), "duracao_s": relatorio["duracao_s"]})
+    return caminho
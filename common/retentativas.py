@@ -0,0 +1,145 @@
+# common/retentativas.py
+"""Política única de retentativas: orçamento por host, backoff com jitter e Retry-After.
+
+Toda retentativa do app — a do urllib3 nas sessões de ``common.http_client`` e os laços da
+aplicação (página do Guru, coleta do produto, 429/THROTTLED da Shopify, OpenAI) — passa pelo mesmo
+:class:`OrcamentoRetentativas`: cada requisição original rende ``razao`` ficha ao host e cada
+retentativa gasta uma. Sem ficha, a retentativa é negada e quem chamou desiste. Num incidente o
+volume extra fica em ~10% das requisições, em vez de multiplicar camada sobre camada.
+
+    if not aguardar_retentativa("digitalmanager.guru", tentativa, cancelador=cancelador):
+        break
+"""
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+from .prazo import Cancelavel, esperar
+
+_log = logging.getLogger(__name__)
+
+RAZAO_PADRAO = 0.1  # cada requisição original rende 0,1 retentativa (≤ 10% de carga extra)
+RESERVA_PADRAO = 10.0  # saldo inicial e teto por host: cobre falhas isoladas logo no começo
+BACKOFF_BASE_S = 0.5
+BACKOFF_TETO_S = 30.0
+RETRY_AFTER_MAX_S = 120.0  # Retry-After maior que isso é tratado como este teto
+
+
+@dataclass
+class _Conta:
+    saldo: float
+    requisicoes: int = 0
+    gastas: int = 0
+    negadas: int = 0
+
+
+class OrcamentoRetentativas:
+    """Fichas de retentativa por host (thread-safe)."""
+
+    def __init__(self, razao: float = RAZAO_PADRAO, reserva: float = RESERVA_PADRAO) -> None:
+        self.razao = razao
+        self.reserva = reserva
+        self._lock = threading.Lock()
+        self._contas: dict[str, _Conta] = {}
+
+    def _conta(self, host: str) -> _Conta:
+        conta = self._contas.get(host)
+        if conta is None:
+            conta = self._contas[host] = _Conta(self.reserva)
+        return conta
+
+    def registrar(self, host: str) -> None:
+        """Conta uma requisição original (não retentativa) para `host`."""
+        with self._lock:
+            conta = self._conta(host)
+            conta.requisicoes += 1
+            conta.saldo = min(self.reserva, conta.saldo + self.razao)
+
+    def gastar(self, host: str) -> bool:
+        """Tenta pagar uma retentativa para `host`; False = negada (orçamento esgotado)."""
+        with self._lock:
+            conta = self._conta(host)
+            if conta.saldo < 1 - 1e-9:  # dez depósitos de 0,1 somam 0,999...
+                conta.negadas += 1
+                return False
+            conta.saldo -= 1
+            conta.gastas += 1
+            return True
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._contas.clear()
+
+    def para_dict(self) -> dict[str, dict[str, Any]]:
+        """Por host: requisições originais, retentativas gastas e negadas e o saldo atual."""
+        with self._lock:
+            return {
+                host: {
+                    "requisicoes": c.requisicoes,
+                    "retentativas": c.gastas,
+                    "negadas": c.negadas,
+                    "saldo": round(c.saldo, 2),
+                }
+                for host, c in sorted(self._contas.items())
+            }
+
+
+orcamento_retentativas = OrcamentoRetentativas()
+
+
+def ler_retry_after(valor: str | None) -> float | None:
+    """Segundos pedidos por um cabeçalho Retry-After (número ou data HTTP); None se ausente/inválido."""
+    if not valor:
+        return None
+    valor = valor.strip()
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def espera_backoff(
+    tentativa: int,
+    *,
+    retry_after: float | None = None,
+    base: float = BACKOFF_BASE_S,
+    teto: float = BACKOFF_TETO_S,
+) -> float:
+    """Espera antes da retentativa nº `tentativa` (0 = primeira).
+
+    Com Retry-After, espera o pedido pelo servidor (até ``RETRY_AFTER_MAX_S``) mais um jitter curto
+    que desencontra as threads; sem ele, "full jitter": uniforme entre 0 e ``base·2^tentativa``.
+    """
+    if retry_after is not None:
+        return min(retry_after, RETRY_AFTER_MAX_S) + random.uniform(0, base)
+    return random.uniform(0, min(teto, base * 2**tentativa))
+
+
+def aguardar_retentativa(
+    host: str,
+    tentativa: int,
+    *,
+    retry_after: float | None = None,
+    cancelador: Cancelavel | None = None,
+    base: float = BACKOFF_BASE_S,
+) -> bool:
+    """Paga a retentativa no orçamento de `host` e dorme o backoff.
+
+    Retorna False se a retentativa foi negada ou a espera foi interrompida (cancelamento/prazo):
+    quem chamou deve desistir.
+    """
+    if not orcamento_retentativas.gastar(host):
+        _log.warning("retentativa_negada", extra={"host": host, "tentativa": tentativa + 1})
+        return False
+    espera = espera_backoff(tentativa, retry_after=retry_after, base=base)
+    return esperar(espera, cancelador)
@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+from datetime import date, datetime
 from pathlib import Path
-from typing import Any, cast
+from typing import Any, Literal, cast
+from zoneinfo import ZoneInfo
 
-from pydantic import BaseModel, Field, ValidationError, field_validator
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
 
 from .errors import UserError
 
+_TZ = ZoneInfo("America/Sao_Paulo")
+
+
+def _hoje() -> date:
+    return datetime.now(_TZ).date()
+
 
 class JobConfig(BaseModel):
     """Exemplo de config de tarefa — adapte aos campos do seu domínio."""
@@ -52,7 +60,12 @@ def ensure_paths(cfg: JobConfig) -> None:
             data={"path": str(in_path)},
         )
 
-    out_dir = Path(cfg.output_dir)
+    ensure_output_dir(cfg.output_dir)
+
+
+def ensure_output_dir(output_dir: str) -> Path:
+    """Cria (se preciso) a pasta de saída e a devolve; erro de permissão vira UserError."""
+    out_dir = Path(output_dir)
     try:
         out_dir.mkdir(parents=True, exist_ok=True)
     except OSError as e:
@@ -61,3 +74,76 @@ def ensure_paths(cfg: JobConfig) -> None:
             code="OUTPUT_DIR_ERROR",
             data={"path": str(out_dir)},
         ) from e
+    return out_dir
+
+
+# ---- Execução headless (--mode cli): coleta → planilha → lotes → fretes → Bling ----
+
+
+class GuruEtapa(BaseModel):
+    """Coleta no Guru: assinaturas do período (ano/mês) ou vendas de produtos num intervalo."""
+
+    modo: Literal["assinaturas", "produtos"] = "assinaturas"
+    # assinaturas
+    ano: int = Field(default_factory=lambda: _hoje().year, ge=2020, le=2100)
+    mes: int = Field(default_factory=lambda: _hoje().month, ge=1, le=12)
+    periodicidade: Literal["mensal", "bimestral"] = "bimestral"
+    modo_periodo: Literal["PERÍODO", "TODAS"] = "TODAS"
+    box_nome: str = ""
+    # produtos
+    data_ini: date | None = None
+    data_fim: date | None = None
+    produtos: list[str] = Field(default_factory=list)  # nomes do skus.json; vazio = todos
+
+    @model_validator(mode="after")
+    def validate_intervalo(self) -> GuruEtapa:
+        if self.modo == "produtos":
+            if self.data_ini is None or self.data_fim is None:
+                raise ValueError("modo 'produtos' exige data_ini e data_fim")
+            if self.data_ini > self.data_fim:
+                raise ValueError("data_ini não pode ser posterior a data_fim")
+        return self
+
+
+class ShopifyEtapa(BaseModel):
+    """Coleta de pedidos pagos na Shopify a partir de `data_inicio` (+ CPF, bairro e endereço)."""
+
+    data_inicio: date
+    fulfillment_status: Literal["any", "unfulfilled"] = "unfulfilled"
+    produto: str | None = None
+
+
+class FretesEtapa(BaseModel):
+    """Cotação por lote, restrita às transportadoras aceitas."""
+
+    transportadoras: list[str] = Field(default_factory=lambda: ["CORREIOS", "GFL", "GOL", "JET", "LOG"], min_length=1)
+
+
+class PipelineConfig(BaseModel):
+    """Config da execução headless; seção ausente (guru/shopify/fretes) = etapa não executada."""
+
+    output_dir: str = Field(min_length=1)
+    guru: GuruEtapa | None = None
+    shopify: ShopifyEtapa | None = None
+    fretes: FretesEtapa | None = Field(default_factory=FretesEtapa)
+    numero_inicial: int = Field(default=8000, ge=1)  # primeiro "Número pedido" da planilha do Bling
+    max_workers: int = Field(default=8, ge=1, le=32)
+    prazo_s: float | None = Field(default=None, gt=0)  # prazo da execução inteira (esperas e timeouts HTTP)
+
+    @model_validator(mode="after")
+    def validate_fontes(self) -> PipelineConfig:
+        if self.guru is None and self.shopify is None:
+            raise ValueError("informe ao menos uma fonte: 'guru' e/ou 'shopify'")
+        return self
+
+
+def validate_pipeline_config(payload: dict[str, Any]) -> PipelineConfig:
+    """Converte o dicionário em PipelineConfig e converte ValidationError em UserError."""
+    try:
+        return cast(PipelineConfig, PipelineConfig.model_validate(payload))
+    except ValidationError as e:
+        raise UserError(
+            "Configuração inválida",
+            code="BAD_INPUT",
+            data={"errors": e.errors()},
+        ) from e
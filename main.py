@@ -5,11 +5,12 @@ import argparse
 import calendar
 import json
 import logging
+import math
+import multiprocessing
+import numbers
 import os
 import platform
-import random
 import re
-import shutil
 import subprocess
 import sys
 import threading
@@ -17,119 +18,209 @@ import time
 import traceback
 import unicodedata
 import uuid
-import xml.etree.ElementTree as ET
-import zipfile
 from calendar import monthrange
 from collections import Counter, OrderedDict, defaultdict
-from collections.abc import Callable, Hashable, Iterable, Mapping, MutableMapping, Sequence
-from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
-from contextlib import AbstractContextManager, suppress
+from collections.abc import Callable, Hashable, Iterable, Iterator, Mapping, MutableMapping, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from contextlib import AbstractContextManager, contextmanager, nullcontext, redirect_stdout, suppress
 from datetime import UTC, date, datetime, time as dtime, timedelta
 from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from functools import lru_cache, partial
 from json import JSONDecodeError
 from logging import Logger
 from os import PathLike
 from pathlib import Path
 from threading import Event
-from typing import TYPE_CHECKING, Any, Literal, Protocol, TypedDict, cast, overload
+from typing import TYPE_CHECKING, Any, Literal, Protocol, TextIO, TypedDict, cast, overload
+from urllib.parse import urlsplit
 from zoneinfo import ZoneInfo
 
 # Terceiros
-import certifi
-import openai
-import pandas as pd
-import requests
-import urllib3
-from brazilcep import exceptions, get_address_from_cep
-from colorama import init
-from dateutil.parser import parse as parse_date
-from dateutil.relativedelta import relativedelta
-from fpdf import FPDF
-from openai import RateLimitError
 from PyQt5 import QtCore
 from PyQt5.QtCore import (
+    QAbstractTableModel,
     QCoreApplication,
     QDate,
     QEvent,
     QModelIndex,
     QObject,
     QRunnable,
+    QSortFilterProxyModel,
     Qt,
     QThread,
-    QThreadPool,
     QTimer,
     pyqtBoundSignal,
     pyqtSignal,
     pyqtSlot,
 )
-from PyQt5.QtGui import QGuiApplication, QKeySequence
-from PyQt5.QtWidgets import (
-    QAbstractItemView,
-    QApplication,
-    QButtonGroup,
-    QCheckBox,
-    QComboBox,
-    QDateEdit,
-    QDesktopWidget,
-    QDialog,
-    QDialogButtonBox,
-    QFileDialog,
-    QGroupBox,
-    QHBoxLayout,
-    QHeaderView,
-    QInputDialog,
-    QLabel,
-    QLineEdit,
-    QListWidget,
-    QListWidgetItem,
-    QMessageBox,
-    QProgressBar,
-    QPushButton,
-    QRadioButton,
-    QShortcut,
-    QSpinBox,
-    QTableWidget,
-    QTableWidgetItem,
-    QTabWidget,
-    QVBoxLayout,
-    QWidget,
-)
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-from reportlab.pdfgen import canvas
 from unidecode import unidecode
 
 # Seus módulos
+from common.cassete_http import Cassete, ativar_cassete, cassete_ativo
 from common.cli_safe import safe_cli
 
 # Bootstrap de config (sem input_path)
 from common.config_bootstrap import AppConfig, load_config, load_env
+from common.disjuntor import ABERTO, FECHADO, CircuitoAberto, disjuntores
+from common.envios_store import abrir_envios_log
 from common.errors import ExternalError, UserError
-from common.http_client import http_get, http_post
-from common.logging_setup import get_correlation_id, set_correlation_id
+from common.executor import PRIORIDADE_INTERATIVA, ExecutorGerenciado, ativar_executor, executor_global
+from common.http_client import contar_chamadas_http, http_get, http_post
+from common.lazy import Tardio, atributo_tardio, base_tardia, modulo_tardio
+from common.logging_setup import (
+    descarregar_logs,
+    get_correlation_id,
+    handlers_de_saida,
+    log_limitado,
+    set_correlation_id,
+)
+from common.metricas_http import ativar_metricas_http, gravar_metricas_http
+from common.nfe_zip import agrupar_por_transportadora, ler_dados_nfe, organizar_nfes_zip
 from common.paths import app_root, default_log_file, user_data_dir_path
-from common.settings import settings
-from common.validation import ensure_paths, validate_config
+from common.pdf_producao import (
+    renderizar_em_paralelo,
+    renderizar_em_segundo_plano,
+    renderizar_pdf_notas,
+    renderizar_resumo_producao,
+)
+from common.pendentes import PendentesEtapa
+from common.perfilamento import Perfilador, ativar_perfilamento, gravar_perfis, perfilado
+from common.prazo import ExecucaoInterrompida, Prazo, esperar, limitar_timeout, no_prazo, prazo_atual
+from common.progresso import ProgressoCoalescido
+from common.rastreamento import contar, gravar_relatorio, iniciar_execucao, rastreado, span
+from common.retentativas import aguardar_retentativa, ler_retry_after, orcamento_retentativas
+
+# Dependências pesadas são carregadas no primeiro uso (GUI, Guru, Shopify, PDF e LLM
+# pagam o próprio import só quando usados; `--help` e `--mode cli` não).
+if TYPE_CHECKING:
+    import openai
+    import pandas as pd
+    import requests
+    from PyQt5.QtGui import QGuiApplication, QKeySequence
+    from PyQt5.QtWidgets import (
+        QAbstractItemView,
+        QApplication,
+        QButtonGroup,
+        QCheckBox,
+        QComboBox,
+        QDateEdit,
+        QDesktopWidget,
+        QDialog,
+        QDialogButtonBox,
+        QFileDialog,
+        QGroupBox,
+        QHBoxLayout,
+        QHeaderView,
+        QInputDialog,
+        QLabel,
+        QLineEdit,
+        QListWidget,
+        QListWidgetItem,
+        QMessageBox,
+        QProgressBar,
+        QPushButton,
+        QRadioButton,
+        QShortcut,
+        QSpinBox,
+        QTableView,
+        QTableWidget,
+        QTableWidgetItem,
+        QTabWidget,
+        QVBoxLayout,
+        QWidget,
+    )
 
-# 1) carrega variáveis de ambiente (.env se existir)
-load_env()
+    from common.settings import Settings
+    from common.validation import GuruEtapa, PipelineConfig, ShopifyEtapa
+
+    _QDialogTardio = QDialog
+else:
+    openai = modulo_tardio("openai")
+    pd = modulo_tardio("pandas")
+    requests = modulo_tardio("requests")
+
+    # QtGui/QtWidgets só com a interface aberta; a CLI usa apenas o QtCore (sinais e QRunnables)
+    _QT_INTERFACE = {
+        "PyQt5.QtGui": ("QGuiApplication", "QKeySequence"),
+        "PyQt5.QtWidgets": (
+            "QAbstractItemView",
+            "QApplication",
+            "QButtonGroup",
+            "QCheckBox",
+            "QComboBox",
+            "QDateEdit",
+            "QDesktopWidget",
+            "QDialog",
+            "QDialogButtonBox",
+            "QFileDialog",
+            "QGroupBox",
+            "QHBoxLayout",
+            "QHeaderView",
+            "QInputDialog",
+            "QLabel",
+            "QLineEdit",
+            "QListWidget",
+            "QListWidgetItem",
+            "QMessageBox",
+            "QProgressBar",
+            "QPushButton",
+            "QRadioButton",
+            "QShortcut",
+            "QSpinBox",
+            "QTableView",
+            "QTableWidget",
+            "QTableWidgetItem",
+            "QTabWidget",
+            "QVBoxLayout",
+            "QWidget",
+        ),
+    }
+    globals().update({nome: atributo_tardio(mod, nome) for mod, nomes in _QT_INTERFACE.items() for nome in nomes})
+    _QDialogTardio = base_tardia("PyQt5.QtWidgets", "QDialog")
 
-# 2) carrega config (sem input_path) e resolve output_dir
-CFG: AppConfig
-CFG, CFG_PATH = load_config()
 logger = logging.getLogger(__name__)
-logger.info("config carregada", extra={"config_path": str(CFG_PATH), "output_dir": CFG.get("output_dir")})
 
-init(autoreset=True)
 
-os.environ["SSL_CERT_FILE"] = certifi.where()
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+@lru_cache(maxsize=1)
+def inicializar_ambiente() -> tuple[AppConfig, Path]:
+    """Carrega .env e config.json e prepara TLS/terminal (uma vez, no primeiro uso)."""
+    import certifi
+    import urllib3
+    from colorama import init
+
+    # 1) carrega variáveis de ambiente (.env se existir)
+    load_env()
+
+    # 2) carrega config (sem input_path) e resolve output_dir
+    cfg, cfg_path = load_config()
+    logger.info("config carregada", extra={"config_path": str(cfg_path), "output_dir": cfg.get("output_dir")})
+
+    init(autoreset=True)
+
+    os.environ["SSL_CERT_FILE"] = certifi.where()
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    return cfg, cfg_path
+
+
+def _carregar_settings() -> Settings:
+    inicializar_ambiente()
+    from common.settings import settings as _settings
+
+    return _settings
+
+
+settings = cast("Settings", Tardio(_carregar_settings, "settings"))
 
 BASE_URL_GURU = "https://digitalmanager.guru/api/v2"
-HEADERS_GURU = {
-    "Authorization": f"Bearer {settings.API_KEY_GURU}",
-    "Content-Type": "application/json",
-}
+HOST_GURU = urlsplit(BASE_URL_GURU).hostname or "?"  # chave do orçamento de retentativas
+
+
+def headers_guru() -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {settings.API_KEY_GURU}",
+        "Content-Type": "application/json",
+    }
+
 
 # ===================== CONFIGURAÇÕES =====================
 
@@ -163,6 +254,21 @@ comunicador_global = Comunicador()
 
 comunicador_global.mostrar_mensagem.connect(slot_mostrar_mensagem)
 
+
+def avisar_servico_indisponivel(host: str, anterior: str, novo: str) -> None:
+    """Disjuntor abriu: avisa uma vez (na reabertura após a sonda, só o log).
+
+    Ligado por run_gui e pelo modo CLI (lá a mensagem vai para o relatório).
+    """
+    if novo == ABERTO and anterior == FECHADO:
+        comunicador_global.mostrar_mensagem.emit(
+            "aviso",
+            "Serviço indisponível",
+            f"{host} não está respondendo (falhas ou lentidão seguidas).\n"
+            "As chamadas a ele vão falhar na hora até o serviço voltar; tente de novo em alguns minutos.",
+        )
+
+
 # --------------------- BACKEND/PATH ----------------------
 
 
@@ -247,6 +353,20 @@ def aware_utc(
     return datetime(y, m, d, hh, mm, ss, us, tzinfo=UTC)
 
 
+def parse_date(timestr: str, **kwargs: Any) -> datetime:
+    """dateutil.parser.parse (o dateutil só é importado no primeiro uso)."""
+    from dateutil.parser import parse
+
+    return parse(timestr, **kwargs)
+
+
+def somar_meses(dt: datetime, meses: int) -> datetime:
+    """dt + relativedelta(months=meses), respeitando o fim de mês."""
+    from dateutil.relativedelta import relativedelta
+
+    return dt + relativedelta(months=meses)
+
+
 def ensure_aware_local(dt: datetime) -> datetime:
     return dt if dt.tzinfo else dt.replace(tzinfo=TZ_APP)
 
@@ -327,7 +447,7 @@ LIMITE_INFERIOR = datetime(2024, 10, 1, tzinfo=UTC)
 
 def coletar_ofertas_produto(product_id: str) -> list[dict[str, Any]]:
     url = f"{BASE_URL_GURU}/products/{product_id}/offers"
-    headers = HEADERS_GURU
+    headers = headers_guru()
     ofertas: list[dict[str, Any]] = []
     cursor: str | None = None
     pagina = 1
@@ -340,12 +460,20 @@ def coletar_ofertas_produto(product_id: str) -> list[dict[str, Any]]:
 
             r = http_get(url, headers=headers, params=params, timeout=10)
             if r.status_code != 200:
-                print(f"[❌ Guru] Erro {r.status_code} ao buscar ofertas do produto {product_id}: {r.text}")
+                logger.error(
+                    "guru_ofertas_http_erro",
+                    extra={"product_id": product_id, "status": r.status_code, "corpo": r.text[:500]},
+                )
                 break
 
             data: dict[str, Any] = r.json()
             pagina_dados = data.get("data", [])
-            print(f"[📄 Página {pagina}] {len(pagina_dados)} ofertas encontradas para produto {product_id}")
+            log_limitado(
+                logger,
+                logging.DEBUG,
+                "guru_ofertas_pagina",
+                extra={"product_id": product_id, "pagina": pagina, "ofertas": len(pagina_dados)},
+            )
 
             ofertas += pagina_dados
             cursor = data.get("next_cursor")
@@ -356,16 +484,16 @@ def coletar_ofertas_produto(product_id: str) -> list[dict[str, Any]]:
             pagina += 1
 
         except Exception as e:
-            print(f"[❌ Guru] Exceção ao buscar ofertas do produto {product_id}: {e}")
+            logger.exception("guru_ofertas_erro", extra={"product_id": product_id, "erro": str(e)})
             break
 
-    print(f"[✅ Guru] Total de ofertas carregadas para o produto {product_id}: {len(ofertas)}")
+    logger.info("guru_ofertas_fim", extra={"product_id": product_id, "ofertas": len(ofertas), "paginas": pagina})
     return ofertas
 
 
 def coletar_produtos_guru() -> list[dict[str, Any]]:
     url = f"{BASE_URL_GURU}/products"
-    headers = HEADERS_GURU
+    headers = headers_guru()
     produtos: list[dict[str, Any]] = []
     cursor: str | None = None
     pagina = 1
@@ -426,7 +554,7 @@ def esta_no_ultimo_mes(
     else:
         ordered_at = ordered_at.astimezone(UTC)
 
-    data_fim = ordered_at + relativedelta(months=duracao_meses)
+    data_fim = somar_meses(ordered_at, duracao_meses)
     janela_ini = data_fim - timedelta(days=30)
     return janela_ini <= referencia <= data_fim
 
@@ -901,7 +1029,7 @@ class RegrasConfig(TypedDict):
     rules: list[dict[str, Any]]
 
 
-class RuleEditorDialog(QDialog):
+class RuleEditorDialog(_QDialogTardio):
     """Editor de uma regra individual.
 
     Cria/edita um dict no formato:
@@ -1245,7 +1373,7 @@ class RuleEditorDialog(QDialog):
         return self.regra
 
 
-class RuleManagerDialog(QDialog):
+class RuleManagerDialog(_QDialogTardio):
     def __init__(
         self,
         parent: QWidget | None,
@@ -1782,6 +1910,13 @@ def with_suppress_close(gerenciador: GerenciadorProgresso) -> None:
 
 
 class GerenciadorProgresso(QObject):
+    """Janela de progresso com cancelamento.
+
+    `atualizar` pode ser chamado de qualquer thread: só registra a última atualização
+    (ProgressoCoalescido), e a janela é redesenhada no máximo ~20 vezes por segundo — por um
+    QTimer da thread da UI ou, quando a chamada já vem da UI, no próprio `atualizar`.
+    """
+
     atualizar_signal = pyqtSignal(str, int, int)
     finalizado_signal = pyqtSignal()
 
@@ -1805,6 +1940,7 @@ class GerenciadorProgresso(QObject):
             cast(MutableMapping[str, Any], estado_global) if estado_global is not None else {}
         )
         self.logger: Logger | None = logger_obj
+        self._progresso = ProgressoCoalescido(self._atualizar_seguro)
 
         try:
             self.janela: QDialog = QDialog()
@@ -1827,8 +1963,13 @@ class GerenciadorProgresso(QObject):
             self.botao_cancelar.clicked.connect(self.cancelar)
             layout.addWidget(self.botao_cancelar)
 
-            # Stubs do PyQt às vezes não aceitam o kwarg 'type' -> silenciar para mypy
-            self.atualizar_signal.connect(self._atualizar_seguro)
+            self.atualizar_signal.connect(self.atualizar)
+
+            # entrega o que as threads de trabalho registraram (só redesenha se houve novidade)
+            self._timer_progresso = QTimer(self)
+            self._timer_progresso.setInterval(max(1, int(self._progresso.intervalo * 1000)))
+            self._timer_progresso.timeout.connect(self._progresso.descarregar)
+            self._timer_progresso.start()
 
             self.janela.show()
             self.janela.raise_()
@@ -1862,13 +2003,19 @@ class GerenciadorProgresso(QObject):
         print("[🛑] Cancelamento solicitado.")
 
     def atualizar(self, texto: str, atual: int | None = None, total: int | None = None) -> None:
-        self.atualizar_signal.emit(texto, atual or 0, total or 0)
+        self._progresso.registrar(texto, atual or 0, total or 0)
+
+        # chamado da própria UI (laço síncrono): redesenha aqui, respeitando o limite de frequência
+        app = QCoreApplication.instance()
+        if app is not None and QThread.currentThread() == app.thread() and self._progresso.descarregar():
+            QApplication.processEvents()
 
     def _atualizar_seguro(self, texto: str, atual: int, total: int) -> None:
+        if self._ja_fechado:
+            return
         self.label_status.setText(texto)
 
         if not self.com_percentual:
-            QApplication.processEvents()
             return
 
         if total == 0:
@@ -1878,8 +2025,6 @@ class GerenciadorProgresso(QObject):
             progresso = min(100, max(1, int(100 * atual / total))) if total else 0
             self.barra.setValue(progresso)
 
-        QApplication.processEvents()
-
     def fechar(self) -> None:
         if self._ja_fechado:
             self._log_info("[🔁] Janela já havia sido fechada. Ignorando.")
@@ -1889,6 +2034,8 @@ class GerenciadorProgresso(QObject):
 
         def encerrar() -> None:
             try:
+                if getattr(self, "_timer_progresso", None) is not None:
+                    self._timer_progresso.stop()
                 if self.janela and self.janela.isVisible():
                     self._log_info("[🧼] Ocultando janela de progresso...")
                     self.janela.hide()
@@ -2135,15 +2282,8 @@ def exibir_resumo_coleta_guru(
     """
 
     def _is_zero(v: Any) -> bool:
-        s = str(v or "").strip()
-        if not s:
-            return False
-        try:
-            # lida com "0,00", "0.00", "0", etc.
-            s_norm = s.replace(".", "").replace(",", ".")
-            return abs(float(s_norm)) < 1e-9
-        except Exception:
-            return False
+        # centavos (int) ou texto "0,00"/"0.00"/"0"; vazio/nulo não é zero
+        return centavos_celula(v, unidade="centavos") == 0
 
     def _pega_bloco(cont: Mapping[str, Any] | None, chaves: Iterable[str]) -> Mapping[str, Any]:
         if not cont:
@@ -2337,6 +2477,17 @@ def configurar_cancelamento_em_janela(janela: QObject, cancelador: CanceladorLik
     janela.installEventFilter(filtro)
 
 
+def prazo_da_execucao(estado: Mapping[str, Any]) -> Prazo:
+    """Prazo das tarefas de uma ação da GUI: o cancelador_global + LG_PRAZO_EXECUCAO_S (opcional, em s).
+
+    Ativo (no_prazo) na hora de enviar as tarefas ao executor, vai junto com elas: cancelar acorda
+    as esperas e nenhuma requisição nova sai.
+    """
+    segundos = float(os.getenv("LG_PRAZO_EXECUCAO_S", "0") or 0)
+    cancelador = estado.get("cancelador_global")
+    return Prazo(segundos or None, cancelador if isinstance(cancelador, threading.Event) else None)
+
+
 class WorkerControllerGuru(QObject):
     iniciar_worker_signal = pyqtSignal()
 
@@ -2415,14 +2566,21 @@ class WorkerControllerGuru(QObject):
             # worker.finished.connect(gerenciador.fechar)  # opcional
 
             worker.start()
-            print("[🧵 iniciar_worker] Thread iniciada.")
+            print("[🧵 iniciar_worker] Coleta enviada ao executor.")
         except Exception as e:
             print("[❌ ERRO EM iniciar_worker]:", e)
             print(traceback.format_exc())
             comunicador_global.mostrar_mensagem.emit("erro", "Erro", f"Falha ao iniciar a exportação:\n{e!s}")
 
 
-class WorkerThreadGuru(QThread):
+class WorkerThreadGuru(QObject):
+    """Coleta + planilha da Guru como tarefa interativa do executor (faixa "tarefas").
+
+    O objeto vive na thread da UI; os sinais emitidos pela tarefa chegam à UI pela fila do Qt.
+    `start()`/`isRunning()` mantêm a interface do antigo QThread, mas é um QObject, não um QThread:
+    não há `wait()`, `quit()` nem os sinais `started`/`finished`. O fim chega por `finalizado`/`erro`.
+    """
+
     # sinais esperados pelo Controller
     finalizado = pyqtSignal(list, dict)
     erro = pyqtSignal(str)
@@ -2445,12 +2603,21 @@ class WorkerThreadGuru(QThread):
         self.skus_info: Any = skus_info
         self.gerenciador: GerenciadorProgresso = gerenciador
 
-        # Mantém Qt.QueuedConnection, mas silencia o stub do PyQt para mypy
-        self.progresso.connect(self.gerenciador.atualizar)
+        # direto: `atualizar` só registra (sem lock); a UI redesenha no ritmo do próprio timer
+        _conectar_direto(self.progresso, self.gerenciador.atualizar)
         self.fechar_ui.connect(self.gerenciador.fechar)
 
         self._parent_correlation_id = get_correlation_id()
+        self._futuro: Future[None] | None = None
 
+    def start(self) -> None:
+        with no_prazo(prazo_da_execucao(self.estado)):
+            self._futuro = executor_global().submeter("tarefas", self.run, prioridade=PRIORIDADE_INTERATIVA)
+
+    def isRunning(self) -> bool:
+        return self._futuro is not None and not self._futuro.done()
+
+    @perfilado("guru_worker", memoria=True)
     def run(self) -> None:
         set_correlation_id(self._parent_correlation_id)
 
@@ -2581,10 +2748,10 @@ def coletar_vendas(
     max_page_retries: int = 2,  # tentativas por página
 ) -> list[dict[str, Any]]:
     if cancelador and cancelador.is_set():
-        print("[🚫] Cancelado no início de coletar_vendas")
+        logger.info("guru_vendas_cancelado", extra={"product_id": product_id, "fase": "inicio"})
         return []
 
-    print(f"[🔎 coletar_vendas] Início - Produto: {product_id}, Período: {inicio} → {fim}")
+    logger.debug("guru_vendas_inicio", extra={"product_id": product_id, "inicio": inicio, "fim": fim})
 
     resultado: list[dict[str, Any]] = []
     cursor: str | None = None
@@ -2596,7 +2763,7 @@ def coletar_vendas(
 
     while True:
         if cancelador and cancelador.is_set():
-            print("[🚫] Cancelado no meio da busca individual")
+            logger.info("guru_vendas_cancelado", extra={"product_id": product_id, "fase": "paginacao"})
             break
 
         params: dict[str, Any] = {
@@ -2611,49 +2778,73 @@ def coletar_vendas(
         data: Mapping[str, Any] | None = None
         last_exc: Exception | None = None
 
-        # === tentativas por página ===
+        # === tentativas por página (pagas no orçamento de retentativas do Guru) ===
         for tentativa in range(max_page_retries + 1):
             if cancelador and cancelador.is_set():
-                print("[🚫] Cancelado durante tentativa de página")
+                logger.info("guru_vendas_cancelado", extra={"product_id": product_id, "fase": "tentativa"})
                 break
+            retry_after: float | None = None
             try:
                 r: requests.Response = session.get(
                     f"{BASE_URL_GURU}/transactions",
-                    headers=HEADERS_GURU,
+                    headers=headers_guru(),
                     params=params,
                     timeout=timeout,
                 )
                 if r.status_code != 200:
+                    retry_after = ler_retry_after(r.headers.get("Retry-After"))
                     raise requests.HTTPError(f"HTTP {r.status_code}")
                 data = cast(Mapping[str, Any], r.json())
                 break  # sucesso
             except Exception as e:
                 last_exc = e
+                if isinstance(e, CircuitoAberto):
+                    break  # Guru fora: nem gasta o orçamento de retentativas
                 if tentativa < max_page_retries:
-                    espera = (1.5**tentativa) + random.random()
-                    print(
-                        f"[⏳] Tentativa {tentativa+1}/{max_page_retries+1} falhou para {product_id} ({e}); novo retry em {espera:.1f}s"
+                    logger.warning(
+                        "guru_vendas_pagina_retry",
+                        extra={
+                            "product_id": product_id,
+                            "tentativa": tentativa + 1,
+                            "max_tentativas": max_page_retries + 1,
+                            "retry_after": retry_after,
+                            "erro": str(e),
+                        },
                     )
-                    time.sleep(espera)
+                    # orçamento negado ou cancelamento (que acorda a espera na hora): desiste da página
+                    if not aguardar_retentativa(
+                        HOST_GURU, tentativa, retry_after=retry_after, cancelador=cancelador, base=1.0
+                    ):
+                        break
                 else:
-                    print(f"❌ Falha ao obter página para {product_id} após {max_page_retries+1} tentativas: {e}")
+                    logger.error(
+                        "guru_vendas_pagina_falhou",
+                        extra={"product_id": product_id, "tentativas": max_page_retries + 1, "erro": str(e)},
+                    )
 
         # Se não conseguiu obter esta página:
         if data is None:
             if pagina_count == 0 and total_transacoes == 0:
                 # falhou logo de cara → deixa o wrapper decidir (retry externo)
-                raise TransientGuruError(f"Falha inicial ao buscar transações do produto {product_id}: {last_exc}")
+                raise TransientGuruError(
+                    f"Falha inicial ao buscar transações do produto {product_id}: {last_exc}"
+                ) from last_exc
             else:
                 # falhou depois de já ter coletado algo → devolve parciais
                 erro_final = True
                 break
 
         pagina = cast(list[dict[str, Any]], data.get("data", []) or [])
-        print(f"[📄 Página {pagina_count+1}] {len(pagina)} vendas encontradas")
+        log_limitado(
+            logger,
+            logging.DEBUG,
+            "guru_vendas_pagina",
+            extra={"product_id": product_id, "pagina": pagina_count + 1, "vendas": len(pagina)},
+        )
 
         for t in pagina:
             if cancelador and cancelador.is_set():
-                print("[🚫] Cancelado durante processamento da página")
+                logger.info("guru_vendas_cancelado", extra={"product_id": product_id, "fase": "pagina"})
                 break
             if tipo_assinatura:
                 t["tipo_assinatura"] = tipo_assinatura
@@ -2665,34 +2856,58 @@ def coletar_vendas(
         if not cursor:
             break
 
-    status = "Concluído" if not erro_final else "Concluído (parcial)"
-    print(
-        f"[✅ coletar_vendas] {status} - Produto {product_id} | Total: {total_transacoes} transações em {pagina_count} página(s)"
+    logger.info(
+        "guru_vendas_fim",
+        extra={
+            "product_id": product_id,
+            "transacoes": total_transacoes,
+            "paginas": pagina_count,
+            "parcial": erro_final,
+        },
     )
     return resultado
 
 
+@perfilado("guru_coleta_pool")
 def coletar_vendas_com_retry(
     *args: Any,
     cancelador: Any = None,
     tentativas: int = 3,
     **kwargs: Any,
 ) -> list[dict[str, Any]]:
+    product_id = args[0] if args else kwargs.get("product_id")
     for tentativa in range(tentativas):
         if cancelador and cancelador.is_set():
-            print("[🚫] Cancelado dentro de coletar_vendas_com_retry.")
+            logger.info("guru_vendas_cancelado", extra={"product_id": product_id, "fase": "retry"})
             return []
         try:
             resultado = coletar_vendas(*args, cancelador=cancelador, **kwargs)
             return cast(list[dict[str, Any]], resultado)  # ⬅️ evita "no-any-return"
         except TransientGuruError as e:
-            print(f"[⚠️ Retry {tentativa+1}/{tentativas}] {e}")
-            if tentativa < tentativas - 1:
-                espera = (2**tentativa) + random.random()
-                time.sleep(espera)
-            else:
-                print("[❌] Falhou após retries; retornando vazio.")
-                return []
+            causa = e.__cause__
+            if isinstance(causa, CircuitoAberto):
+                # Guru fora: o erro vai para transacoes_com_erro e a etapa aparece como falha
+                logger.error("guru_vendas_circuito_aberto", extra={"product_id": product_id, "erro": str(causa)})
+                raise causa from None
+            if tentativa == tentativas - 1:
+                logger.error(
+                    "guru_vendas_falhou", extra={"product_id": product_id, "tentativas": tentativas, "erro": str(e)}
+                )
+                raise
+            logger.warning(
+                "guru_vendas_retry",
+                extra={"product_id": product_id, "tentativa": tentativa + 1, "tentativas": tentativas, "erro": str(e)},
+            )
+            # mesmo orçamento das tentativas por página: num incidente não multiplica camada sobre camada
+            if not aguardar_retentativa(HOST_GURU, tentativa + 1, cancelador=cancelador, base=1.0):
+                # o erro sobe para quem coletou (vai para transacoes_com_erro): [] passaria por "sem vendas"
+                if cancelador and cancelador.is_set():
+                    raise ExecucaoInterrompida("Coleta da Guru cancelada durante a retentativa") from e
+                prazo = prazo_atual()
+                if prazo is not None:
+                    prazo.verificar("coleta da Guru")
+                logger.error("guru_vendas_retry_negado", extra={"product_id": product_id, "tentativa": tentativa + 1})
+                raise
     return []
 
 
@@ -2802,26 +3017,12 @@ def preparar_coleta_vendas_produtos(
     skus_info: Mapping[str, Mapping[str, Any]],
 ) -> None:
     print(f"[🔎] Iniciando busca de produtos de {data_ini} a {data_fim}")
-    produtos_alvo: dict[str, Mapping[str, Any]] = {}
-
     # 🎯 Seleciona produtos válidos
-    if nome_produto:
-        info = skus_info.get(nome_produto, {})
-        if info.get("tipo") == "assinatura":
-            QMessageBox.warning(None, "Erro", f"'{nome_produto}' é uma assinatura. Selecione apenas produtos.")
-            return
-        produtos_alvo[nome_produto] = info
-    else:
-        produtos_alvo = {nome: info for nome, info in skus_info.items() if info.get("tipo") != "assinatura"}
-
-    produtos_ids: list[str] = []
-    for info in produtos_alvo.values():
-        gids: Sequence[Any] = cast(Sequence[Any], info.get("guru_ids", []))
-        for gid in gids:
-            s = str(gid).strip()
-            if s:
-                produtos_ids.append(s)
+    if nome_produto and skus_info.get(nome_produto, {}).get("tipo") == "assinatura":
+        QMessageBox.warning(None, "Erro", f"'{nome_produto}' é uma assinatura. Selecione apenas produtos.")
+        return
 
+    produtos_ids = ids_guru_dos_produtos(skus_info, [nome_produto] if nome_produto else None)
     if not produtos_ids:
         QMessageBox.warning(None, "Aviso", "Nenhum produto com IDs válidos encontrados.")
         return
@@ -2865,6 +3066,29 @@ def preparar_coleta_vendas_produtos(
         comunicador_global.mostrar_mensagem.emit("erro", "Erro", f"Ocorreu um erro ao iniciar a exportação:\n{e!s}")
 
 
+def ids_guru_dos_produtos(
+    skus_info: Mapping[str, Mapping[str, Any]],
+    nomes: Sequence[str] | None = None,
+) -> list[str]:
+    """IDs da Guru dos produtos informados (ou de todos os não-assinatura, se `nomes` vier vazio)."""
+    if nomes:
+        produtos_alvo = {n: skus_info.get(n, {}) for n in nomes}
+    else:
+        produtos_alvo = dict(skus_info)
+
+    produtos_ids: list[str] = []
+    for info in produtos_alvo.values():
+        if info.get("tipo") == "assinatura":
+            continue
+        gids: Sequence[Any] = cast(Sequence[Any], info.get("guru_ids", []))
+        for gid in gids:
+            s = str(gid).strip()
+            if s:
+                produtos_ids.append(s)
+    return produtos_ids
+
+
+@rastreado("guru_coleta", itens=lambda r: len(r[0]))
 def coletar_vendas_produtos(
     dados: Mapping[str, Any],
     *,
@@ -2899,47 +3123,50 @@ def coletar_vendas_produtos(
             atualizar("⛔ Busca cancelada pelo usuário", 1, 1)
         return [], {}, dict(dados)  # ← CONVERTE
 
-    with ThreadPoolExecutor(max_workers=12) as executor:
-        futures = [executor.submit(coletar_vendas_com_retry, *args, cancelador=cancelador) for args in tarefas]
-        total_futures = len(futures)
-        concluidos = 0
+    # cada página vai para a faixa "guru" no contexto atual (HTTP conta para a etapa guru_coleta)
+    executor = executor_global()
+    futures = [
+        executor.submeter("guru", partial(coletar_vendas_com_retry, *args, cancelador=cancelador)) for args in tarefas
+    ]
+    total_futures = len(futures)
+    concluidos = 0
 
-        while futures:
-            if cancelador and cancelador.is_set():
-                print("[🚫] Cancelado durante busca de produtos.")
-                for f in futures:
-                    f.cancel()
-                return transacoes, {}, dict(dados)  # ← CONVERTE
+    while futures:
+        if cancelador and cancelador.is_set():
+            print("[🚫] Cancelado durante busca de produtos.")
+            for f in futures:
+                f.cancel()
+            return transacoes, {}, dict(dados)  # ← CONVERTE
 
-            done, not_done = wait(futures, timeout=0.5, return_when=FIRST_COMPLETED)
+        done, not_done = wait(futures, timeout=0.5, return_when=FIRST_COMPLETED)
 
-            for future in done:
-                try:
-                    resultado = future.result()
-                    if isinstance(resultado, list):
-                        for item in resultado:
-                            if isinstance(item, dict):
-                                transacoes.append(item)
-                            elif isinstance(item, list):
-                                for subitem in item:
-                                    if isinstance(subitem, dict):
-                                        transacoes.append(subitem)
-                                    else:
-                                        print(f"[⚠️] Ignorado item aninhado não-dict: {type(subitem)}")
-                            else:
-                                print(f"[⚠️] Ignorado item inesperado: {type(item)}")
-                    else:
-                        print(f"[⚠️] Resultado inesperado: {type(resultado)}")
-                except Exception as e:
-                    erro_msg = f"Erro ao buscar transações de produto: {e!s}"
-                    print(f"❌ {erro_msg}")
-                    estado["transacoes_com_erro"].append(erro_msg)
-                concluidos += 1
-                if atualizar:
-                    with suppress(Exception):
-                        atualizar("🔄 Coletando transações de produtos...", concluidos, total_futures)
+        for future in done:
+            try:
+                resultado = future.result()
+                if isinstance(resultado, list):
+                    for item in resultado:
+                        if isinstance(item, dict):
+                            transacoes.append(item)
+                        elif isinstance(item, list):
+                            for subitem in item:
+                                if isinstance(subitem, dict):
+                                    transacoes.append(subitem)
+                                else:
+                                    print(f"[⚠️] Ignorado item aninhado não-dict: {type(subitem)}")
+                        else:
+                            print(f"[⚠️] Ignorado item inesperado: {type(item)}")
+                else:
+                    print(f"[⚠️] Resultado inesperado: {type(resultado)}")
+            except Exception as e:
+                erro_msg = f"Erro ao buscar transações de produto: {e!s}"
+                print(f"❌ {erro_msg}")
+                estado["transacoes_com_erro"].append(erro_msg)
+            concluidos += 1
+            if atualizar:
+                with suppress(Exception):
+                    atualizar("🔄 Coletando transações de produtos...", concluidos, total_futures)
 
-            futures = list(not_done)
+        futures = list(not_done)
 
     print(f"[✅ coletar_vendas_produtos] Finalizado - {len(transacoes)} transações coletadas")
     return transacoes, {}, dict(dados)
@@ -2993,17 +3220,15 @@ def produto_indisponivel(produto_nome: str, *, sku: str | None = None) -> bool:
     return bool(info and info.get("indisponivel", False))
 
 
-def iniciar_busca_assinaturas(
+def montar_dados_busca_assinaturas(
     ano: int | str,
     mes: int | str,
-    modo_periodo: str,
-    box_nome_input: QComboBox,
-    _transportadoras_var: Any,
-    estado: MutableMapping[str, Any],
-    skus_info: Mapping[str, Mapping[str, Any]],
-    *,
     periodicidade_selecionada: str,
-) -> None:
+    modo_periodo: str,
+    box_nome: str,
+    regras: list[dict[str, Any]],
+) -> dict[str, Any]:
+    """Payload da coleta de assinaturas (janelas do período + regras), como o WorkerThreadGuru espera."""
     # normaliza periodicidade
     periodicidade: str = (periodicidade_selecionada or "").strip().lower()
     if periodicidade not in ("mensal", "bimestral"):
@@ -3011,22 +3236,8 @@ def iniciar_busca_assinaturas(
 
     # calcula janelas do período
     dt_ini, dt_end, periodo = calcular_periodo_assinatura(int(ano), int(mes), periodicidade)
-    box_nome: str = (box_nome_input.currentText() or "").strip()
-
-    # bloqueia box indisponivel
-    if box_nome and produto_indisponivel(box_nome):
-        comunicador_global.mostrar_mensagem.emit(
-            "erro",
-            "Box indisponivel",
-            f"O box selecionado (“{box_nome}”) está marcado como indisponivel no SKUs.",
-        )
-        return
-
-    # carrega regras ativas
-    regras: list[dict[str, Any]] = ler_regras_assinaturas(estado)
 
-    # monta o payload de execução (o WorkerThreadGuru usa isso direto)
-    dados: dict[str, Any] = {
+    return {
         "modo": "assinaturas",
         "ano": int(ano),
         "mes": int(mes),
@@ -3041,6 +3252,34 @@ def iniciar_busca_assinaturas(
         "modo_periodo": (modo_periodo or "").strip().upper(),  # "PERÍODO" | "TODAS"
     }
 
+
+def iniciar_busca_assinaturas(
+    ano: int | str,
+    mes: int | str,
+    modo_periodo: str,
+    box_nome_input: QComboBox,
+    _transportadoras_var: Any,
+    estado: MutableMapping[str, Any],
+    skus_info: Mapping[str, Mapping[str, Any]],
+    *,
+    periodicidade_selecionada: str,
+) -> None:
+    box_nome: str = (box_nome_input.currentText() or "").strip()
+
+    # bloqueia box indisponivel
+    if box_nome and produto_indisponivel(box_nome):
+        comunicador_global.mostrar_mensagem.emit(
+            "erro",
+            "Box indisponivel",
+            f"O box selecionado (“{box_nome}”) está marcado como indisponivel no SKUs.",
+        )
+        return
+
+    # monta o payload de execução (o WorkerThreadGuru usa isso direto)
+    dados = montar_dados_busca_assinaturas(
+        ano, mes, periodicidade_selecionada, modo_periodo, box_nome, ler_regras_assinaturas(estado)
+    )
+
     _subs_raw = fetch_all_subscriptions()
     subs_idx = build_subscriptions_index(_subs_raw, skus_info)
     estado["subscriptions_idx"] = subs_idx
@@ -3049,7 +3288,7 @@ def iniciar_busca_assinaturas(
     estado["contexto_busca_assinaturas"] = dados
     estado["skus_info"] = cast(Mapping[str, Mapping[str, Any]], skus_info)
 
-    # ---- dispara em QThread via WorkerControllerGuru ----
+    # ---- dispara no executor via WorkerControllerGuru ----
     # garante Event de cancelamento
     if not isinstance(estado.get("cancelador_global"), threading.Event):
         estado["cancelador_global"] = threading.Event()
@@ -3199,6 +3438,7 @@ def mapear_periodicidade_assinaturas(
     return ids_por_tipo
 
 
+@rastreado("guru_coleta", itens=lambda r: len(r[0]))
 def gerenciar_coleta_vendas_assinaturas(
     dados: dict[str, Any],
     *,
@@ -3273,7 +3513,7 @@ def gerenciar_coleta_vendas_assinaturas(
         return cast(list[tuple[str, str]], dividir_periodos_coleta_api_guru(ini, end_sel))
 
     def _janela_multi_meses(n_meses: int) -> list[tuple[str, str]]:
-        ini = (inicio_base - relativedelta(months=n_meses)).replace(day=1)
+        ini = somar_meses(inicio_base, -n_meses).replace(day=1)
         ini = max(ini, LIMITE_INFERIOR)
         return cast(list[tuple[str, str]], dividir_periodos_coleta_api_guru(ini, end_sel))
 
@@ -3307,41 +3547,37 @@ def gerenciar_coleta_vendas_assinaturas(
     ) -> bool:
         if not tarefas:
             return True
-        max_workers = min(12, len(tarefas))
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [
-                executor.submit(
-                    coletar_vendas_com_retry,
-                    pid,
-                    ini,
-                    fim,
-                    cancelador=cancelador,
-                    tipo_assinatura=tipo_ass,
-                )
-                for (pid, ini, fim, tipo_ass) in tarefas
-            ]
-            total_futures = len(futures)
-            concluidos = 0
-            while futures:
-                if cancelador and cancelador.is_set():
-                    for f in futures:
-                        f.cancel()
-                    return False
-                done, not_done = wait(futures, timeout=0.5, return_when=FIRST_COMPLETED)
-                for future in done:
-                    try:
-                        resultado = future.result()
-                        transacoes.extend(cast(list[dict[str, Any]], resultado))
-                    except Exception as e:
-                        erro_msg = f"Erro ao buscar transações ({label_progresso}): {e!s}"
-                        print(f"❌ {erro_msg}")
-                        estado["transacoes_com_erro"].append(erro_msg)
-                    finally:
-                        concluidos += 1
-                        if atualizar:
-                            with suppress(Exception):
-                                atualizar(f"🔄 {label_progresso}", concluidos, total_futures)
-                futures = list(not_done)
+        # cada página vai para a faixa "guru" no contexto atual (HTTP conta para a etapa guru_coleta)
+        executor = executor_global()
+        futures = [
+            executor.submeter(
+                "guru",
+                partial(coletar_vendas_com_retry, pid, ini, fim, cancelador=cancelador, tipo_assinatura=tipo_ass),
+            )
+            for (pid, ini, fim, tipo_ass) in tarefas
+        ]
+        total_futures = len(futures)
+        concluidos = 0
+        while futures:
+            if cancelador and cancelador.is_set():
+                for f in futures:
+                    f.cancel()
+                return False
+            done, not_done = wait(futures, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    resultado = future.result()
+                    transacoes.extend(cast(list[dict[str, Any]], resultado))
+                except Exception as e:
+                    erro_msg = f"Erro ao buscar transações ({label_progresso}): {e!s}"
+                    print(f"❌ {erro_msg}")
+                    estado["transacoes_com_erro"].append(erro_msg)
+                finally:
+                    concluidos += 1
+                    if atualizar:
+                        with suppress(Exception):
+                            atualizar(f"🔄 {label_progresso}", concluidos, total_futures)
+            futures = list(not_done)
         return True
 
     # ================= Tarefas (AGREGADAS) =================
@@ -3408,8 +3644,110 @@ class AplicarRegrasAssinaturas(TypedDict, total=False):
     brindes_extra: list[dict[str, Any]]
 
 
-def formatar_valor(valor: float) -> str:
-    return f"{valor:.2f}".replace(".", ",")
+# ===== Dinheiro: centavos inteiros internamente, texto "1234,56" só na exportação/exibição =====
+
+COLUNAS_MONETARIAS: tuple[str, ...] = (
+    "Valor Unitário",
+    "Valor Total",
+    "Total Pedido",
+    "Valor Frete Pedido",
+    "Valor Desconto Pedido",
+    "Valor Frete Lote",
+    "Valor Desconto Lote",
+    "Outras despesas",
+)
+
+_MILHAR_PT_RE = re.compile(r"\.(?=\d{3}(?:,|$))")
+
+# unidade dos números soltos numa célula monetária: "centavos" nos frames do pipeline, "reais" no que vem
+# de fora (APIs, planilhas importadas). Texto é sempre reais ("1.234,56"), o formato de exibição/edição.
+UnidadeMonetaria = Literal["centavos", "reais"]
+
+
+def para_centavos(valor: Any) -> int | None:
+    """Converte reais (número ou texto pt-BR/en) em centavos inteiros (ROUND_HALF_UP).
+
+    Texto: "1.234,56", "1234,56", "1234.56" e "R$ 12,00" são aceitos; o ponto só é
+    tratado como milhar quando seguido de exatamente 3 dígitos e vírgula/fim.
+    Vazio/nulo/inválido → None.
+    """
+    if valor is None or isinstance(valor, bool):
+        return None
+    if isinstance(valor, Decimal):
+        dec = valor
+    elif isinstance(valor, numbers.Real):
+        if not math.isfinite(float(valor)):
+            return None
+        dec = Decimal(str(valor))
+    else:
+        s = str(valor).strip().replace("R$", "").replace(" ", "")
+        if not s or s.lower() in ("nan", "none", "<na>"):
+            return None
+        s = _MILHAR_PT_RE.sub("", s).replace(",", ".")
+        try:
+            dec = Decimal(s)
+        except InvalidOperation:
+            return None
+    if not dec.is_finite():
+        return None
+    return int((dec * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def centavos_celula(valor: Any, *, unidade: UnidadeMonetaria) -> int | None:
+    """Lê uma célula de coluna monetária; `unidade` diz como ler números (texto é sempre reais).
+
+    unidade="reais" equivale a `para_centavos`.
+    """
+    if unidade == "reais":
+        return para_centavos(valor)
+    if unidade != "centavos":
+        raise ValueError(f"unidade monetária inválida: {unidade!r}")
+    if valor is None or valor is pd.NA or isinstance(valor, bool):
+        return None
+    if isinstance(valor, numbers.Integral):
+        return int(valor)
+    if isinstance(valor, numbers.Real):
+        return int(round(float(valor))) if math.isfinite(float(valor)) else None
+    return para_centavos(valor)
+
+
+def centavos_serie(valores: pd.Series[Any], *, unidade: UnidadeMonetaria) -> pd.Series[Any]:
+    """Versão vetorizada de `centavos_celula` → Series Int64 (nulos = <NA>)."""
+    if unidade == "centavos" and pd.api.types.is_integer_dtype(valores.dtype):
+        return valores.astype("Int64")
+    if unidade == "centavos" and pd.api.types.is_float_dtype(valores.dtype):
+        return valores.round().astype("Int64")
+    return pd.Series([centavos_celula(v, unidade=unidade) for v in valores], index=valores.index, dtype="Int64")
+
+
+def normalizar_colunas_monetarias(df: pd.DataFrame, *, unidade: UnidadeMonetaria) -> pd.DataFrame:
+    """Converte (in-place) as colunas monetárias presentes em `df` para centavos Int64.
+
+    Colunas já Int64 são tidas como centavos e não mudam.
+    """
+    for col in COLUNAS_MONETARIAS:
+        if col in df.columns and df[col].dtype != "Int64":
+            df[col] = centavos_serie(df[col], unidade=unidade)
+    return df
+
+
+def formatar_centavos(centavos: Any) -> str:
+    """Centavos → "1234,56" (formato aceito pelo Bling); nulo → ""."""
+    c = centavos_celula(centavos, unidade="centavos")
+    if c is None:
+        return ""
+    sinal = "-" if c < 0 else ""
+    return f"{sinal}{abs(c) // 100},{abs(c) % 100:02d}"
+
+
+def formatar_centavos_serie(centavos: pd.Series[Any]) -> pd.Series[str]:
+    """Versão vetorizada de `formatar_centavos`; nulos viram ""."""
+    numeros = centavos_serie(centavos, unidade="centavos")
+    validos = numeros.dropna().astype("int64")
+    sinal = pd.Series("", index=validos.index).mask(validos < 0, "-")
+    absoluto = validos.abs()
+    texto = sinal + (absoluto // 100).astype(str) + "," + (absoluto % 100).astype(str).str.zfill(2)
+    return texto.reindex(centavos.index, fill_value="")
 
 
 def _norm(s: str) -> str:
@@ -3479,6 +3817,9 @@ def padronizar_planilha_bling(df: pd.DataFrame, preservar_extras: bool = True) -
         if coluna not in df_out.columns:
             df_out[coluna] = ""
 
+    # valores monetários sempre em centavos (Int64); o texto "1234,56" só surge na exportação
+    normalizar_colunas_monetarias(df_out, unidade="centavos")
+
     # reordena pelas padrão
     base = df_out[colunas_padrao]
 
@@ -3559,78 +3900,190 @@ def gerar_linha_base_planilha(
     }
 
 
-def desmembrar_combo_planilha(
-    valores: Mapping[str, Any],
-    linha_base: dict[str, Any],
-    skus_info: Mapping[str, Mapping[str, Any]],
-) -> list[dict[str, Any]]:
-    """
-    - valores["produto_principal"] = nome do combo
-    - valores["valor_total"]       = total do combo (float/int ou string com vírgula)
-    - skus_info[nome_combo]["composto_de"] = componentes (str | dict) - "SKU", "SKU x 2", {"sku":"...", "qtd":2}
-    - skus_info[item]["tipo"]      = "produto" | "brinde" | "combo" | "assinatura"
-    - skus_info[nome_combo]["divisor"]     = opcional (int>=1)
-    """
+# ===== Tabela de expansão de combos (compilada uma vez por execução a partir do skus.json) =====
 
-    # ------- helpers -------
-    def _to_dec(v: Any) -> Decimal:
-        if v is None:
-            return Decimal("0.00")
-        if isinstance(v, int | float):  # ← antes: (int, float)
-            return Decimal(str(v)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-        s = str(v).strip().replace(".", "").replace(",", ".")
-        try:
-            return Decimal(s).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-        except InvalidOperation:
-            return Decimal("0.00")
+_COMPONENTE_COMBO_RE = re.compile(r"^\s*([A-Za-z0-9._\-]+)\s*(?:[xX\*]\s*(\d+))?\s*$")
 
-    def _fmt(d: Decimal) -> str:
-        return f"{d:.2f}".replace(".", ",")
 
-    def _info_by_sku_code(sku_code: str) -> tuple[str, Mapping[str, Any]]:
-        for nome, info in skus_info.items():
-            if str(info.get("sku", "")).strip() == sku_code:
-                return nome, info
-        return sku_code, {}
+class ComponenteCombo(TypedDict):
+    nome: str  # nome padrão no skus.json (ou o próprio SKU, se não cadastrado)
+    sku: str
+    qtd: int  # unidades por combo
+    brinde: bool
 
-    def _is_brinde_sku_code(sku_code: str) -> bool:
-        _, info = _info_by_sku_code(sku_code)
-        return str(info.get("tipo", "")).strip().lower() == "brinde"
 
-    def _parse_compostos(raw: Any) -> list[tuple[str, int]]:
-        out: list[tuple[str, int]] = []
-        if isinstance(raw, str):
-            parts = [s.strip() for s in re.split(r"[;,]", raw) if s.strip()]
-        elif isinstance(raw, list):
-            parts = raw
-        else:
-            parts = []
-        for c in parts:
-            if isinstance(c, dict):
-                sku = str(c.get("sku") or c.get("SKU") or "").strip()
-                try:
-                    q = int(c.get("qtd") or c.get("quantity") or 1)
-                except Exception:
-                    q = 1
-                if sku:
-                    out.append((sku, max(1, q)))
-            elif isinstance(c, str):
-                m = re.match(r"^\s*([A-Za-z0-9._\-]+)\s*(?:[xX\*]\s*(\d+))?\s*$", c)
-                if m:
-                    sku = m.group(1).strip()
-                    q = int(m.group(2)) if m.group(2) else 1
-                    out.append((sku, max(1, q)))
-        return out
+class ExpansaoCombo(TypedDict):
+    nome: str
+    sku: str
+    tipo_combo: bool  # tipo == "combo" (mesmo sem componentes)
+    componentes: list[ComponenteCombo]
+    divisor_explicito: int | None
+    divisor: int  # divisor efetivo: explícito ou total de unidades não-brinde
+    unidades_cobradas: int
+    mapeado: bool  # tem guru_ids e shopify_ids
+    indisponivel: bool
+
+
+def parse_composto_de(raw: Any, combo: str = "") -> list[tuple[str, int]]:
+    """Normaliza `composto_de` ("SKU1, SKU2 x 2; SKU3*3", lista de str ou dicts {"sku", "qtd"}) em [(sku, qtd)]."""
+    if isinstance(raw, str):
+        partes: list[Any] = [s.strip() for s in re.split(r"[;,]", raw) if s.strip()]
+    elif isinstance(raw, list):
+        partes = raw
+    else:
+        partes = []
 
-    def _get_divisor_explicito(info_combo: Mapping[str, Any]) -> int | None:
-        raw = info_combo.get("divisor")
-        if isinstance(raw, int):
-            return raw if raw >= 1 else None
-        if isinstance(raw, str) and raw.strip().isdigit():
-            v = int(raw.strip())
-            return v if v >= 1 else None
-        return None
+    out: list[tuple[str, int]] = []
+    for c in partes:
+        if isinstance(c, dict):
+            sku = str(c.get("sku") or c.get("SKU") or "").strip()
+            try:
+                q = int(c.get("qtd") or c.get("quantity") or 1)
+            except Exception:
+                q = 1
+        elif isinstance(c, str):
+            m = _COMPONENTE_COMBO_RE.match(c)
+            if not m:
+                continue
+            sku = m.group(1).strip()
+            q = int(m.group(2)) if m.group(2) else 1
+        else:
+            logger.warning("componente_tipo_inesperado", extra={"tipo": type(c).__name__, "combo": combo})
+            continue
+        if sku:
+            out.append((sku, max(1, q)))
+    return out
+
+
+def _divisor_explicito(raw: Any) -> int | None:
+    if isinstance(raw, int) and not isinstance(raw, bool):
+        return raw if raw >= 1 else None
+    if isinstance(raw, str) and raw.strip().isdigit():
+        v = int(raw.strip())
+        return v if v >= 1 else None
+    return None
+
+
+def _div_arredondada(a: int, b: int) -> int:
+    """a / b com ROUND_HALF_UP em inteiros (a >= 0, b >= 1)."""
+    return (2 * a + b) // (2 * b)
+
+
+class TabelaCombos:
+    """Definições de combo do skus.json compiladas em tabela: combo → componentes (nome, sku, qtd, brinde).
+
+    Construída uma vez por coleta/planilha; expandir um combo passa a ser uma consulta ao dicionário
+    mais o rateio em centavos (`ratear`), sem reparsear `composto_de` nem varrer o skus_info por componente.
+    Os SKUs de `composto_de` casam com o cadastro sem diferenciar maiúsculas ("liv-a" acha "LIV-A").
+    """
+
+    def __init__(self, skus_info: Mapping[str, Any]) -> None:
+        # SKU (UPPER) → (nome, info): primeira ocorrência prevalece, como nas buscas lineares anteriores
+        por_sku_info: dict[str, tuple[str, Mapping[str, Any]]] = {}
+        for nome, info in (skus_info or {}).items():
+            if not isinstance(info, Mapping):
+                continue
+            sku = str(info.get("sku", "") or "").strip().upper()
+            if sku and sku not in por_sku_info:
+                por_sku_info[sku] = (str(nome), info)
+
+        self.por_nome: dict[str, ExpansaoCombo] = {}
+        for nome, info in (skus_info or {}).items():
+            if not isinstance(info, Mapping):
+                continue
+            tipo_combo = str(info.get("tipo", "")).strip().lower() == "combo"
+            if not (tipo_combo or info.get("composto_de")):
+                continue
+            self.por_nome[str(nome)] = self._compilar(str(nome), info, tipo_combo, por_sku_info)
+
+        # SKU (UPPER) → expansão, apenas quando a primeira entrada com esse SKU é um combo
+        self.por_sku: dict[str, ExpansaoCombo] = {
+            sku: self.por_nome[nome] for sku, (nome, _info) in por_sku_info.items() if nome in self.por_nome
+        }
 
+    @staticmethod
+    def _compilar(
+        nome: str,
+        info: Mapping[str, Any],
+        tipo_combo: bool,
+        por_sku_info: Mapping[str, tuple[str, Mapping[str, Any]]],
+    ) -> ExpansaoCombo:
+        componentes: list[ComponenteCombo] = []
+        for sku, qtd in parse_composto_de(info.get("composto_de") or [], combo=nome):
+            nome_item, info_item = por_sku_info.get(sku.upper(), (sku, {}))
+            componentes.append(
+                {
+                    "nome": nome_item,
+                    "sku": sku,
+                    "qtd": qtd,
+                    "brinde": str(info_item.get("tipo", "")).strip().lower() == "brinde",
+                }
+            )
+        unidades_cobradas = sum(c["qtd"] for c in componentes if not c["brinde"])
+        divisor_expl = _divisor_explicito(info.get("divisor"))
+        return {
+            "nome": nome,
+            "sku": str(info.get("sku", "") or "").strip(),
+            "tipo_combo": tipo_combo,
+            "componentes": componentes,
+            "divisor_explicito": divisor_expl,
+            "divisor": divisor_expl if divisor_expl is not None else max(1, unidades_cobradas),
+            "unidades_cobradas": unidades_cobradas,
+            "mapeado": bool(info.get("guru_ids")) and bool(info.get("shopify_ids")),
+            "indisponivel": str(info.get("indisponivel", "")).strip().lower() in {"true", "1", "s", "sim", "y", "yes"},
+        }
+
+    @staticmethod
+    def ratear(expansao: ExpansaoCombo, total_centavos: int) -> list[tuple[ComponenteCombo, int, int]]:
+        """Distribui o total do combo entre os componentes → [(componente, valor_unitário, valor_total)] em centavos.
+
+        - Sem total ou sem itens cobrados: tudo zero, na ordem de `composto_de`.
+        - Com divisor explícito: unitário = total / divisor (o total não é fechado).
+        - Sem divisor: rateio por unidades não-brinde; o último item cobrado fecha o total.
+        Itens cobrados vêm primeiro; brindes sempre zerados, ao final.
+        """
+        componentes = expansao["componentes"]
+        if total_centavos <= 0 or expansao["unidades_cobradas"] == 0:
+            return [(c, 0, 0) for c in componentes]
+
+        cobrados = [c for c in componentes if not c["brinde"]]
+        divisor = expansao["divisor"]
+        unitario = _div_arredondada(total_centavos, divisor)
+        saida: list[tuple[ComponenteCombo, int, int]] = []
+
+        if expansao["divisor_explicito"] is not None:
+            saida.extend((c, unitario, unitario * c["qtd"]) for c in cobrados)
+        else:
+            soma_parcial = 0
+            for idx, c in enumerate(cobrados):
+                if idx < len(cobrados) - 1:
+                    total_item = _div_arredondada(total_centavos * c["qtd"], divisor)
+                    soma_parcial += total_item
+                else:
+                    total_item = total_centavos - soma_parcial
+                saida.append((c, unitario, total_item))
+
+        saida.extend((c, 0, 0) for c in componentes if c["brinde"])
+        return saida
+
+
+def desmembrar_combo_planilha(
+    valores: Mapping[str, Any],
+    linha_base: dict[str, Any],
+    skus_info: Mapping[str, Mapping[str, Any]],
+    *,
+    tabela: TabelaCombos | None = None,
+) -> list[dict[str, Any]]:
+    """
+    - valores["produto_principal"] = nome do combo
+    - valores["valor_total"]       = total do combo em reais (float/int ou string com vírgula)
+    - skus_info[nome_combo]["composto_de"] = componentes (str | dict) - "SKU", "SKU x 2", {"sku":"...", "qtd":2}
+    - skus_info[item]["tipo"]      = "produto" | "brinde" | "combo" | "assinatura"
+    - skus_info[nome_combo]["divisor"]     = opcional (int>=1)
+    - tabela: `TabelaCombos` já compilada (em lote, evita recompilar o skus_info a cada linha)
+    """
+
+    # ------- helpers -------
     def _get_transaction_id(linha: Mapping[str, Any]) -> str:
         # cobre variações comuns de nome em planilhas
         candidatos = [
@@ -3659,104 +4112,25 @@ def desmembrar_combo_planilha(
         return nova
 
     # ------- dados de entrada -------
+    if tabela is None:
+        tabela = TabelaCombos(skus_info)
     nome_combo: str = str(valores.get("produto_principal", ""))
-    info_combo: Mapping[str, Any] = skus_info.get(nome_combo, {}) or {}
-    componentes: list[tuple[str, int]] = _parse_compostos(info_combo.get("composto_de") or [])
-
-    # 🔹 marca combos explicitamente, mesmo sem componentes
-    eh_combo = str(info_combo.get("tipo", "")).strip().lower() == "combo"
+    expansao = tabela.por_nome.get(nome_combo)
 
-    if not componentes:
+    if expansao is None or not expansao["componentes"]:
         lb = linha_base.copy()
-        lb["is_combo"] = eh_combo  # True se tipo == "combo"
+        lb["is_combo"] = bool(expansao and expansao["tipo_combo"])  # True se tipo == "combo"
         return [lb]
 
-    total_combo = _to_dec(valores.get("valor_total"))
-
-    # separa cobrados (não-brinde) e brindes
-    cobrados: list[tuple[str, int]] = []
-    brindes: list[tuple[str, int]] = []
-    for sku_code, qtd in componentes:
-        (brindes if _is_brinde_sku_code(sku_code) else cobrados).append((sku_code, qtd))
-
-    unidades_cobradas = sum(q for _, q in cobrados)
     linhas: list[dict[str, Any]] = []
-
-    # Caso sem total ou sem itens cobrados → tudo zero
-    if total_combo <= Decimal("0.00") or unidades_cobradas == 0:
-        for sku_code, _qtd in componentes:
-            nome_item, _ = _info_by_sku_code(sku_code)
-            nova = linha_base.copy()
-            nova["Produto"] = nome_item
-            nova["SKU"] = sku_code
-            nova["Valor Unitário"] = "0,00"
-            nova["Valor Total"] = "0,00"
-            try:
-                nova["indisponivel"] = "S" if produto_indisponivel(nome_item, sku=sku_code) else ""
-            except Exception:
-                pass
-            linhas.append(_finalizar_linha(nova, nome_combo))
-        return linhas
-
-    # ---- comportamento com/sem divisor explícito ----
-    divisor_expl = _get_divisor_explicito(info_combo)
-    if divisor_expl is not None:
-        # ✅ MODO 1: DIVISOR EXPLÍCITO — NÃO fechar total agora.
-        valor_unit_bruto = total_combo / Decimal(divisor_expl)
-        valor_unit = valor_unit_bruto.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-
-        for sku_code, qtd in cobrados:
-            nome_item, _ = _info_by_sku_code(sku_code)
-            total_item = (valor_unit * Decimal(qtd)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-
-            nova = linha_base.copy()
-            nova["Produto"] = nome_item
-            nova["SKU"] = sku_code
-            nova["Valor Unitário"] = _fmt(valor_unit)
-            nova["Valor Total"] = _fmt(total_item)
-            try:
-                nova["indisponivel"] = "S" if produto_indisponivel(nome_item, sku=sku_code) else ""
-            except Exception:
-                pass
-            linhas.append(_finalizar_linha(nova, nome_combo))
-
-    else:
-        # ✅ MODO 2: FALLBACK — rateio por unidades não-brinde e FECHA o total no último item.
-        divisor_fallback = max(1, unidades_cobradas)
-        valor_unit_bruto = total_combo / Decimal(divisor_fallback)
-
-        soma_parcial = Decimal("0.00")
-        for idx, (sku_code, qtd) in enumerate(cobrados):
-            nome_item, _ = _info_by_sku_code(sku_code)
-            if idx < len(cobrados) - 1:
-                total_item = (valor_unit_bruto * Decimal(qtd)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-                soma_parcial += total_item
-                valor_unit = valor_unit_bruto.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-            else:
-                total_item = (total_combo - soma_parcial).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-                valor_unit = valor_unit_bruto.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-
-            nova = linha_base.copy()
-            nova["Produto"] = nome_item
-            nova["SKU"] = sku_code
-            nova["Valor Unitário"] = _fmt(valor_unit)
-            nova["Valor Total"] = _fmt(total_item)
-            try:
-                nova["indisponivel"] = "S" if produto_indisponivel(nome_item, sku=sku_code) else ""
-            except Exception:
-                pass
-            linhas.append(_finalizar_linha(nova, nome_combo))
-
-    # Brindes sempre 0,00
-    for sku_code, _qtd in brindes:
-        nome_item, _ = _info_by_sku_code(sku_code)
+    for comp, valor_unit, total_item in tabela.ratear(expansao, para_centavos(valores.get("valor_total")) or 0):
         nova = linha_base.copy()
-        nova["Produto"] = nome_item
-        nova["SKU"] = sku_code
-        nova["Valor Unitário"] = "0,00"
-        nova["Valor Total"] = "0,00"
+        nova["Produto"] = comp["nome"]
+        nova["SKU"] = comp["sku"]
+        nova["Valor Unitário"] = valor_unit
+        nova["Valor Total"] = total_item
         try:
-            nova["indisponivel"] = "S" if produto_indisponivel(nome_item, sku=sku_code) else ""
+            nova["indisponivel"] = "S" if produto_indisponivel(comp["nome"], sku=comp["sku"]) else ""
         except Exception:
             pass
         linhas.append(_finalizar_linha(nova, nome_combo))
@@ -3764,6 +4138,7 @@ def desmembrar_combo_planilha(
     return linhas
 
 
+@rastreado("guru_planilha", itens=lambda r: len(r[0]))
 def montar_planilha_vendas_guru(
     transacoes: Sequence[Mapping[str, Any] | Sequence[Mapping[str, Any]]],
     dados: Mapping[str, Any],
@@ -3911,6 +4286,7 @@ def montar_planilha_vendas_guru(
     # =========================
     if modo == "produtos":
         print(f"[DEBUG produtos] total_transacoes={total_transacoes}")
+        tabela_combos = TabelaCombos(skus_info)
         for i, transacao in enumerate(transacoes):
             if cancelador.is_set():
                 return [], contagem
@@ -3941,8 +4317,8 @@ def montar_planilha_vendas_guru(
                         "Produto": nome_produto,
                         "subscription_id": "",
                         "SKU": sku_produto,
-                        "Valor Unitário": formatar_valor(valores["valor_unitario"]),
-                        "Valor Total": formatar_valor(valores["valor_total"]),
+                        "Valor Unitário": para_centavos(valores["valor_unitario"]),
+                        "Valor Total": para_centavos(valores["valor_total"]),
                         "indisponivel": ("S" if produto_indisponivel(nome_produto, sku=sku_produto) else "N"),
                     }
                 )
@@ -3960,7 +4336,9 @@ def montar_planilha_vendas_guru(
                             linha_base["is_combo"] = True  # ← marca combo mesmo sem desmembrar
                         _append_linha(linha_base, valores["transaction_id"])
                     else:
-                        for linha_item in desmembrar_combo_planilha(valores, linha_base, skus_info):
+                        for linha_item in desmembrar_combo_planilha(
+                            valores, linha_base, skus_info, tabela=tabela_combos
+                        ):
                             linha_item["indisponivel"] = (
                                 "S"
                                 if produto_indisponivel(
@@ -4130,8 +4508,8 @@ def montar_planilha_vendas_guru(
 
                 linha["Produto"] = nome_produto_principal
                 linha["SKU"] = skus_info.get(nome_produto_principal, {}).get("sku", "")
-                linha["Valor Unitário"] = formatar_valor(valores["valor_unitario"])
-                linha["Valor Total"] = formatar_valor(valores["valor_total"])
+                linha["Valor Unitário"] = para_centavos(valores["valor_unitario"])
+                linha["Valor Total"] = para_centavos(valores["valor_total"])
                 linha["periodicidade"] = periodicidade_atual
                 linha["indisponivel"] = _flag_indisp(
                     nome_produto_principal, skus_info.get(nome_produto_principal, {}).get("sku", "")
@@ -4181,8 +4559,8 @@ def montar_planilha_vendas_guru(
                         {
                             "Produto": brinde_nome,
                             "SKU": sku_b,
-                            "Valor Unitário": "0,00",
-                            "Valor Total": "0,00",
+                            "Valor Unitário": 0,
+                            "Valor Total": 0,
                             "indisponivel": _flag_indisp(brinde_nome, sku_b),
                             "subscription_id": subscription_id,  # garante nas derivadas
                         }
@@ -4215,8 +4593,8 @@ def montar_planilha_vendas_guru(
                         {
                             "Produto": nome_embutido_oferta,
                             "SKU": sku_embutido,
-                            "Valor Unitário": "0,00",
-                            "Valor Total": "0,00",
+                            "Valor Unitário": 0,
+                            "Valor Total": 0,
                             "indisponivel": _flag_indisp(nome_embutido_oferta, sku_embutido),
                             "subscription_id": subscription_id,
                         }
@@ -4509,7 +4887,12 @@ def calcular_valores_pedidos(
     offer: Mapping[str, Any] = cast(Mapping[str, Any], product.get("offer") or {})
     id_oferta: str = str(offer.get("id", ""))
 
-    print(f"[DEBUG calcular_valores_pedidos] id={transaction_id} internal_id={internal_id} modo={modo}")
+    log_limitado(
+        logger,
+        logging.DEBUG,
+        "valores_pedido_inicio",
+        extra={"transaction_id": transaction_id, "internal_id": internal_id, "modo": modo},
+    )
 
     invoice: Mapping[str, Any] = cast(Mapping[str, Any], transacao.get("invoice") or {})
     is_upgrade: bool = invoice.get("type") == "upgrade"
@@ -4566,11 +4949,14 @@ def calcular_valores_pedidos(
     if not produto_principal:
         try:
             produto_principal = next(iter(skus_info.keys()))
-            print(
-                f"[⚠️ calcular_valores_pedidos] internal_id '{internal_id}' sem match; usando fallback '{produto_principal}'."
+            log_limitado(
+                logger,
+                logging.WARNING,
+                "valores_pedido_produto_fallback",
+                extra={"internal_id": internal_id, "produto": produto_principal},
             )
         except StopIteration:
-            print(f"[⚠️ calcular_valores_pedidos] skus_info vazio; retornando estrutura mínima para '{transaction_id}'.")
+            log_limitado(logger, logging.WARNING, "valores_pedido_skus_vazio", extra={"transaction_id": transaction_id})
             return CalcularPedido(
                 transaction_id=transaction_id,
                 id_oferta=id_oferta,
@@ -4624,7 +5010,12 @@ def calcular_valores_pedidos(
     # =========================
     # ✅ janela/regras protegidas
     try:
-        print(f"[DEBUG janela-check] id={transaction_id} data_pedido={data_pedido}")
+        log_limitado(
+            logger,
+            logging.DEBUG,
+            "valores_pedido_janela",
+            extra={"transaction_id": transaction_id, "data_pedido": str(data_pedido)},
+        )
         aplica_regras_neste_periodo: bool = bool(
             validar_regras_pedido_assinatura(
                 cast(dict[Any, Any], dados),  # <-- converte Mapping -> dict p/ mypy
@@ -4632,7 +5023,12 @@ def calcular_valores_pedidos(
             )
         )
     except Exception as e:
-        print(f"[DEBUG janela-skip] Erro em validar_regras_pedido_assinatura: {e}")
+        log_limitado(
+            logger,
+            logging.WARNING,
+            "valores_pedido_janela_erro",
+            extra={"transaction_id": transaction_id, "erro": str(e)},
+        )
         aplica_regras_neste_periodo = False
 
     # Regras/cupom/override só se dentro do período
@@ -4649,7 +5045,12 @@ def calcular_valores_pedidos(
                 or {},
             )
         except Exception as e:
-            print(f"[⚠️ regras] Erro em aplicar_regras_assinaturas: {e}")
+            log_limitado(
+                logger,
+                logging.WARNING,
+                "valores_pedido_regras_erro",
+                extra={"transaction_id": transaction_id, "erro": str(e)},
+            )
             regras_aplicadas = AplicarRegrasAssinaturas()
     else:
         regras_aplicadas = AplicarRegrasAssinaturas()
@@ -4998,40 +5399,6 @@ def importar_planilha_pedidos_guru() -> None:
 
     # ===== Helpers =====
 
-    def remove_milhar_pt(s: str) -> str:
-        """
-        Remove apenas pontos que são separadores de milhar no padrão PT-BR.
-        Ex.: '2.349,92' -> '2349,92' ; '1.997,52' -> '1997,52'
-        (não mexe em outros pontos que não estejam nessa posição)
-        """
-        if not isinstance(s, str):
-            s = str(s) if s is not None else ""
-        s = s.strip()
-        # ponto antes de exatamente 3 dígitos e seguido de vírgula ou fim
-        return re.sub(r"\.(?=\d{3}(?:,|$))", "", s)
-
-    def parse_money(val: Any) -> float:
-        """
-        Converte '2.349,92' / '2349,92' -> 2349.92 (float), sem jamais perder escala.
-        """
-        if pd.isna(val) or str(val).strip() == "":
-            return 0.0
-        s = remove_milhar_pt(str(val))
-        s = s.replace(",", ".")
-        try:
-            return round(float(s), 2)
-        except Exception:
-            return 0.0
-
-    def fmt_brl(num: float | int | None) -> str:
-        """2349.92 -> '2349,92' (sem separador de milhar)."""
-        if num is None or (isinstance(num, float) and pd.isna(num)):
-            return ""
-        try:
-            return f"{float(num):.2f}".replace(".", ",")
-        except Exception:
-            return ""
-
     def limpar(valor: Any) -> str:
         return "" if pd.isna(valor) else str(valor).strip()
 
@@ -5112,10 +5479,8 @@ def importar_planilha_pedidos_guru() -> None:
 
         try:
             # campos base da planilha Guru
-            valor_venda_str: str = remove_milhar_pt(
-                str(linha.get("valor venda", "")).strip()
-            )  # '2.349,92' -> '2349,92'
-            valor_venda: float = parse_money(valor_venda_str)  # -> 2349.92
+            # '2.349,92' / 2349.92 -> 234992 (centavos)
+            valor_venda: int = para_centavos(linha.get("valor venda")) or 0
 
             nome_prod: str = str(linha.get("nome produto", ""))
             id_prod: str = str(linha.get("id produto", ""))
@@ -5130,20 +5495,23 @@ def importar_planilha_pedidos_guru() -> None:
             # Fallback de preços: assinatura sem "assinatura código"
             usar_fallback: bool = bool(is_assin and assinatura_codigo == "")
 
-            # Base para aplicar divisor
+            # Base para aplicar divisor (centavos)
             if is_assin:
+                base: int = valor_venda
                 if usar_fallback and tipo_ass in {"anuais", "bianuais", "trianuais"}:
-                    base: float = float(TABELA_VALORES.get((tipo_ass, periodicidade), valor_venda))
-                else:
-                    base = float(valor_venda)
+                    base_tabela = TABELA_VALORES.get((tipo_ass, periodicidade))
+                    if base_tabela is not None:
+                        base = para_centavos(base_tabela) or 0
                 div: int = divisor_para(tipo_ass, periodicidade)
-                valor_unitario_f: float = round(base / max(div, 1), 2)
-                valor_total_item_f: float = valor_unitario_f  # qtd = 1
+                valor_unitario_c: int = int(
+                    (Decimal(base) / max(div, 1)).quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+                )
+                valor_total_item_c: int = valor_unitario_c  # qtd = 1
             else:
-                valor_unitario_f = valor_venda
-                valor_total_item_f = valor_venda
+                valor_unitario_c = valor_venda
+                valor_total_item_c = valor_venda
 
-            total_pedido_f: float = valor_venda  # sempre o valor efetivamente pago
+            total_pedido_c: int = valor_venda  # sempre o valor efetivamente pago
 
             cpf: str = limpar(linha.get("doc contato")).zfill(11)
             cep: str = limpar(linha.get("cep contato")).zfill(8)[:8]
@@ -5175,10 +5543,10 @@ def importar_planilha_pedidos_guru() -> None:
                     "SKU": sku,
                     "Un": "UN",
                     "Quantidade": "1",
-                    # >>> valores BR prontos (sem milhar, vírgula decimal) <<<
-                    "Valor Unitário": fmt_brl(valor_unitario_f),
-                    "Valor Total": fmt_brl(valor_total_item_f),
-                    "Total Pedido": fmt_brl(total_pedido_f),
+                    # valores em centavos; o texto "2349,92" é gerado só na exportação
+                    "Valor Unitário": valor_unitario_c,
+                    "Valor Total": valor_total_item_c,
+                    "Total Pedido": total_pedido_c,
                     "Valor Frete Pedido": "",
                     "Valor Desconto Pedido": "",
                     "Outras despesas": "",
@@ -5217,20 +5585,9 @@ def importar_planilha_pedidos_guru() -> None:
 
     df_importado: pd.DataFrame = pd.DataFrame(registros)
 
-    # Padroniza colunas (NÃO mexe mais em monetários aqui)
+    # Padroniza colunas (monetários já em centavos Int64)
     df_importado = padronizar_planilha_bling(df_importado)
 
-    # Garante novamente o formato BR sem milhar (caso algo mexa depois)
-    for col in ["Valor Unitário", "Valor Total", "Total Pedido"]:
-        if col in df_importado.columns:
-            df_importado[col] = (
-                df_importado[col].astype(str).str.replace(".", "", regex=False)
-            )  # remove milhar residual
-            # se houver perdido vírgula, repõe 2 casas (somente quando a string for só dígitos)
-            df_importado[col] = df_importado[col].apply(
-                lambda s: (f"{float(s.replace(',', '.')):.2f}".replace(".", ",")) if re.search(r"\d", s) else s
-            )
-
     # estado é global e possivelmente sem tipo -> cast local
     estado_map: dict[str, Any] = cast(dict[str, Any], estado)
     if "df_planilha_parcial" not in estado_map:
@@ -5405,9 +5762,9 @@ def incluir_brindes_comercial(
                 base["SKU"] = sku_brinde_norm
 
                 if "Valor Unitário" in base.index:
-                    base["Valor Unitário"] = 0.0
+                    base["Valor Unitário"] = 0
                 if "Valor Total" in base.index:
-                    base["Valor Total"] = 0.0
+                    base["Valor Total"] = 0
 
                 base["subscription_id"] = subscription_id
                 if "transaction_id" in base.index:
@@ -5423,7 +5780,7 @@ def incluir_brindes_comercial(
     # concatena novas linhas (se houver) e salva
     if novas_linhas:
         df_novas = pd.DataFrame(novas_linhas)
-        df_final = pd.concat([df_saida, df_novas], ignore_index=True)
+        df_final = normalizar_colunas_monetarias(pd.concat([df_saida, df_novas], ignore_index=True), unidade="centavos")
         estado["df_planilha_parcial"] = df_final
         comunicador_global.mostrar_mensagem.emit("info", "Sucesso", f"{len(novas_linhas)} brinde(s) adicionados.")
     else:
@@ -5434,6 +5791,100 @@ def incluir_brindes_comercial(
 # Geração e controle de logs de envios DMG
 
 
+_VALORES_VERDADEIROS = frozenset({"true", "1", "s", "sim", "t", "y", "yes"})
+
+
+def _chaves_log_envios(
+    assinaturas_df: pd.DataFrame,
+    produtos_df: pd.DataFrame,
+    combos_df: pd.DataFrame,
+) -> tuple[pd.MultiIndex, pd.Index, pd.Index]:
+    """Monta (vetorizado) as chaves do log de envios usadas no anti-join de `mascara_pedidos_enviados`.
+
+    Retorna (assinaturas (sid, ano, periodicidade, periodo), transaction_ids de produtos, chaves de combos
+    nas variantes com e sem '+').
+    """
+    # ----- assinaturas -----
+    ass = assinaturas_df.reindex(columns=["subscription_id", "ano", "periodicidade", "periodo"])
+    sid = ass["subscription_id"].fillna("").astype(str).str.strip()
+    chaves_ass = pd.MultiIndex.from_arrays(
+        [
+            sid,
+            pd.to_numeric(ass["ano"], errors="coerce").fillna(-1).astype(int),
+            ass["periodicidade"].fillna("").astype(str).str.lower().str.strip(),
+            pd.to_numeric(ass["periodo"], errors="coerce").fillna(-1).astype(int),
+        ]
+    )[sid.ne("").to_numpy()]
+
+    # ----- produtos (legacy por transaction_id inteiro) -----
+    if "transaction_id" in produtos_df.columns:
+        chaves_prod = pd.Index(produtos_df["transaction_id"].astype(str).str.strip().unique())
+    else:
+        chaves_prod = pd.Index([], dtype=object)
+
+    # ----- combos (dedup por transaction_id + sku; aceita chave com e sem '+') -----
+    partes: list[pd.Series[str]] = []
+    if "chave_dedup" in combos_df.columns:
+        chave = combos_df["chave_dedup"].astype(str).str.strip()
+        chave = chave[chave.ne("")]
+        partes += [chave, chave.str.replace("+", "", regex=False)]
+    if {"transaction_id", "sku"}.issubset(combos_df.columns):
+        tx = combos_df["transaction_id"].astype(str).str.strip()
+        sk = combos_df["sku"].astype(str).str.strip().str.upper()
+        validos = tx.ne("") & sk.ne("")
+        tx, sk = tx[validos], sk[validos]
+        partes += [tx + sk, tx + "+" + sk]
+    chaves_combo = pd.Index(pd.concat(partes).unique()) if partes else pd.Index([], dtype=object)
+
+    return chaves_ass, chaves_prod, chaves_combo
+
+
+def mascara_pedidos_enviados(
+    df: pd.DataFrame,
+    assinaturas_df: pd.DataFrame,
+    produtos_df: pd.DataFrame,
+    combos_df: pd.DataFrame,
+    *,
+    ano: int,
+    mes: int,
+) -> pd.Series[bool]:
+    """Máscara (True = remover) das linhas já registradas no log de envios.
+
+    `df` deve vir com colunas normalizadas: transaction_id/subscription_id (strip), sku (strip+upper),
+    periodicidade (lower) e is_combo (bool). A decisão roteia pela flag is_combo:
+      - combos: só a aba "combos", por transaction_id+sku (com ou sem '+');
+      - assinaturas: (subscription_id, ano, periodicidade, período do mês/bimestre); periodicidade
+        diferente de mensal/bimestral nunca remove;
+      - demais: aba "produtos" por transaction_id.
+    """
+    chaves_ass, chaves_prod, chaves_combo = _chaves_log_envios(assinaturas_df, produtos_df, combos_df)
+    bimestre = 1 + (mes - 1) // 2
+
+    tx = df["transaction_id"]
+    sku = df["sku"]
+    sid = df["subscription_id"]
+    per = df["periodicidade"].str.strip()
+    is_combo = df["is_combo"].astype(bool)
+
+    # 0) Combos
+    tem_tx_sku = tx.ne("") & sku.ne("")
+    hit_combo = tem_tx_sku & ((tx + sku).isin(chaves_combo) | (tx + "+" + sku).isin(chaves_combo))
+
+    # 1) Assinaturas
+    tem_sid = sid.ne("")
+    per_valida = per.isin(["mensal", "bimestral"])
+    per_num = per.map({"mensal": mes, "bimestral": bimestre}).fillna(-1).astype(int)
+    chaves_df = pd.MultiIndex.from_arrays([sid, pd.Series(int(ano), index=df.index), per, per_num])
+    hit_ass = pd.Series(chaves_df.isin(chaves_ass), index=df.index) & tem_sid & per_valida
+
+    # 2) Produtos (legacy)
+    hit_prod = tx.ne("") & tx.isin(chaves_prod)
+
+    nao_combo = hit_ass | (hit_prod & ~(tem_sid & ~per_valida))
+    return hit_combo.where(is_combo, nao_combo).astype(bool)
+
+
+@rastreado("dedup_envios")
 def remover_pedidos_enviados() -> None:
     # estado é global
     df_any: Any = estado.get("df_planilha_parcial")
@@ -5473,35 +5924,19 @@ def remover_pedidos_enviados() -> None:
         df["transaction_id"] = df["id transação"]
 
     # ---------------------------
-    # Normalização de campos base
+    # Normalização de campos base (vetorizada)
     # ---------------------------
-    def _norm_tx(x: Any) -> str:
-        return str(x).strip()  # mantém hífens
-
-    def _norm_sku(x: Any) -> str:
-        return str(x).strip().upper()  # SKU maiúsculo
-
-    def _key_no_plus(tx: str, sku: str) -> str:
-        return f"{_norm_tx(tx)}{_norm_sku(sku)}"  # sem separador
-
-    def _key_with_plus(tx: str, sku: str) -> str:
-        return f"{_norm_tx(tx)}+{_norm_sku(sku)}"  # com '+'
-
     # ✅ SKU / IDs
-    df["sku"] = col_series(df, "sku", "").astype(str).fillna("").map(_norm_sku)
+    df["sku"] = col_series(df, "sku", "").astype(str).fillna("").str.strip().str.upper()  # SKU maiúsculo
     df["subscription_id"] = col_series(df, "subscription_id", "").astype(str).fillna("").str.strip()
-    df["transaction_id"] = col_series(df, "transaction_id", "").astype(str).fillna("").map(_norm_tx)
+    df["transaction_id"] = col_series(df, "transaction_id", "").astype(str).fillna("").str.strip()  # mantém hífens
 
     # ✅ periodicidade / periodo
     df["periodicidade"] = col_series(df, "periodicidade", "").astype(str).str.lower().str.strip().replace({"nan": ""})
     df["periodo"] = pd.to_numeric(col_series(df, "periodo", -1), errors="coerce").fillna(-1).astype(int)
 
     # ✅ is_combo (normaliza para bool-like)
-    def _to_bool(v: Any) -> bool:
-        s = str(v).strip().lower()
-        return s in {"true", "1", "s", "sim", "t", "y", "yes"}
-
-    df["is_combo"] = col_series(df, "is_combo", False).map(_to_bool).fillna(False)
+    df["is_combo"] = col_series(df, "is_combo", False).astype(str).str.strip().str.lower().isin(_VALORES_VERDADEIROS)
 
     # seleção do período (passa QWidget, não None)
     ano_atual: int = QDate.currentDate().year()
@@ -5516,108 +5951,31 @@ def remover_pedidos_enviados() -> None:
     mes, ok2 = QInputDialog.getInt(parent_widget, "Selecionar Mês", "Mês (1 a 12):", value=mes_padrao, min=1, max=12)
     if not ok2:
         return
-    bimestre: int = 1 + (mes - 1) // 2
 
     # carrega log
     caminho_excel = os.path.join(os.path.dirname(__file__), "Envios", "envios_log.xlsx")
-    assinaturas_existentes: set[tuple[str, int, str, int]] = set()
-    produtos_existentes: set[str] = set()
-    combos_existentes: set[str] = set()  # aceita chave com e sem '+'
-
-    if os.path.exists(caminho_excel):
-        try:
-            xls_all = pd.read_excel(caminho_excel, sheet_name=None)
-            assinaturas_df = xls_all.get("assinaturas", pd.DataFrame())
-            produtos_df = xls_all.get("produtos", pd.DataFrame())
-            combos_df = xls_all.get("combos", pd.DataFrame())
-
-            # ----- assinaturas -----
-            for col in ("subscription_id", "periodicidade", "periodo", "ano"):
-                if col not in assinaturas_df.columns:
-                    assinaturas_df[col] = "" if col in ("subscription_id", "periodicidade") else -1
-            assinaturas_df["subscription_id"] = assinaturas_df["subscription_id"].astype(str).str.strip()
-            assinaturas_df["periodicidade"] = assinaturas_df["periodicidade"].astype(str).str.lower().str.strip()
-            assinaturas_df["periodo"] = pd.to_numeric(assinaturas_df["periodo"], errors="coerce").fillna(-1).astype(int)
-            assinaturas_df["ano"] = pd.to_numeric(assinaturas_df["ano"], errors="coerce").fillna(-1).astype(int)
-            assinaturas_existentes = {
-                (str(row["subscription_id"]), int(row["ano"]), str(row["periodicidade"]), int(row["periodo"]))
-                for _, row in assinaturas_df.iterrows()
-                if str(row.get("subscription_id", "")).strip() != ""
-            }
-
-            # ----- produtos (legacy por transaction_id inteiro) -----
-            if "transaction_id" in produtos_df.columns:
-                produtos_existentes = {_norm_tx(v) for v in produtos_df["transaction_id"].astype(str).tolist()}
-            else:
-                produtos_existentes = set()
-
-            # ----- combos (dedup por transaction_id + sku) -----
-            combos_existentes = set()
-            if not combos_df.empty:
-                # 1) Se houver chave_dedup, aceita como veio e também sem '+'
-                if "chave_dedup" in combos_df.columns:
-                    for raw in combos_df["chave_dedup"].astype(str):
-                        val = str(raw).strip()
-                        if not val:
-                            continue
-                        combos_existentes.add(val)
-                        combos_existentes.add(val.replace("+", ""))  # tolera variação
-                # 2) Se houver colunas separadas, monta as duas variantes
-                if {"transaction_id", "sku"}.issubset(combos_df.columns):
-                    for _, r in combos_df.iterrows():
-                        tx = _norm_tx(r.get("transaction_id", ""))
-                        sk = _norm_sku(r.get("sku", ""))
-                        if tx and sk:
-                            combos_existentes.add(_key_no_plus(tx, sk))
-                            combos_existentes.add(_key_with_plus(tx, sk))
-
-        except Exception as e:
-            print(f"[⚠️] Erro ao ler Excel: {e}")
+    assinaturas_df = pd.DataFrame()
+    produtos_df = pd.DataFrame()
+    combos_df = pd.DataFrame()
+    try:
+        log_envios = abrir_envios_log(caminho_excel)
+        assinaturas_df = pd.DataFrame(log_envios.registros("assinaturas"))
+        produtos_df = pd.DataFrame(log_envios.registros("produtos"))
+        combos_df = pd.DataFrame(log_envios.registros("combos"))
+    except Exception as e:
+        print(f"[⚠️] Erro ao ler log de envios: {e}")
 
     linhas_antes: int = len(df)
 
-    # ------------------------------------------------------------
-    # Decisão de remoção: roteia pela flag is_combo
-    # ------------------------------------------------------------
-    def deve_remover(row: pd.Series) -> bool:
-        id_sub = str(row.get("subscription_id", "")).strip()
-        id_trans = _norm_tx(row.get("transaction_id", ""))
-        sku_row = _norm_sku(row.get("sku", ""))
-        is_combo = bool(row.get("is_combo", False))
-
-        # 0) Combos: consultar SOMENTE a aba "combos"
-        if is_combo:
-            if id_trans and sku_row:
-                k1 = _key_no_plus(id_trans, sku_row)  # ex.: a037...L008A
-                k2 = _key_with_plus(id_trans, sku_row)  # ex.: a037...+L008A
-                return (k1 in combos_existentes) or (k2 in combos_existentes)
-            return False  # sem tx/sku não dá para deduplicar combo
-
-        # 1) Assinaturas (por periodicidade/periodo/ano) — só se não for combo
-        if id_sub:
-            per = str(row.get("periodicidade", "")).strip().lower()
-            if per == "mensal":
-                per_num = mes
-            elif per == "bimestral":
-                per_num = bimestre
-            else:
-                return False
-            if (id_sub, int(ano), per, int(per_num)) in assinaturas_existentes:
-                return True
-
-        # 2) Produtos (legacy): consultar SOMENTE a aba "produtos" por transaction_id
-        if id_trans:
-            return id_trans in produtos_existentes
-
-        return False
-
-    mask_remover: pd.Series = df.apply(deve_remover, axis=1).astype(bool)
+    mask_remover = mascara_pedidos_enviados(df, assinaturas_df, produtos_df, combos_df, ano=int(ano), mes=int(mes))
 
     # -- aplica a máscara no DataFrame ORIGINAL, preservando schema/casos/acentos --
     df_filtrado: pd.DataFrame = df_orig.loc[~mask_remover].copy()
 
     removidas: int = linhas_antes - len(df_filtrado)
     estado["df_planilha_parcial"] = df_filtrado
+    contar("itens", linhas_antes)
+    contar("removidas", removidas)
 
     comunicador_global.mostrar_mensagem.emit(
         "info",
@@ -5824,85 +6182,46 @@ def verificar_duplicidade_no_log(
     novos: Sequence[Mapping[str, Any]] | pd.DataFrame,
     sheet_name: Literal["produtos", "assinaturas", "combos"],
 ) -> int:
-    """Salva/atualiza uma planilha Excel garantindo que não haja duplicados na aba indicada. Retorna
+    """Acrescenta registros ao log de envios garantindo que não haja duplicados na aba indicada. Retorna
     a quantidade de registros efetivamente adicionados.
 
-    - caminho: caminho do arquivo .xlsx
+    O log fica num store append-only (SQLite, ao lado do .xlsx) com índices únicos nas chaves de
+    dedup; o .xlsx legado é migrado na primeira abertura e só é regerado via `exportar_log_envios`.
+
+    - caminho: caminho do arquivo .xlsx do log (define onde fica o store)
     - novos: sequência de registros (dict-like) ou um DataFrame já pronto
     - sheet_name: "produtos" | "assinaturas" | "combos"
     """
-    caminho_str = os.fspath(caminho)
-
-    # normaliza entrada para DataFrame
-    if isinstance(novos, pd.DataFrame):
-        novos_df: pd.DataFrame = novos.copy()
-    else:
-        novos_df = pd.DataFrame(list(novos))
-
-    # garante colunas mínimas por aba e chave de dedup
-    if sheet_name == "produtos":
-        if "transaction_id" not in novos_df.columns:
-            novos_df["transaction_id"] = ""
-        chave_unica: list[str] = ["transaction_id"]
-
-    elif sheet_name == "assinaturas":
-        for col in ("subscription_id", "ano", "periodicidade", "periodo"):
-            if col not in novos_df.columns:
-                novos_df[col] = "" if col in ("subscription_id", "periodicidade") else -1
-        chave_unica = ["subscription_id", "ano", "periodicidade", "periodo"]
-
-    elif sheet_name == "combos":
-        # precisa de transaction_id + sku; chave_dedup = "transaction_id+sku"
-        for col in ("transaction_id", "sku"):
-            if col not in novos_df.columns:
-                novos_df[col] = ""
-        if "chave_dedup" not in novos_df.columns:
-            novos_df["chave_dedup"] = (
-                novos_df["transaction_id"].astype(str).str.strip() + "+" + novos_df["sku"].astype(str).str.strip()
-            )
-        chave_unica = ["chave_dedup"]
-
-    else:
+    if sheet_name not in ("produtos", "assinaturas", "combos"):
         raise ValueError(f"Aba desconhecida: {sheet_name!r}")
 
-    escritor_existente = os.path.exists(caminho_str)
-    todas_abas: dict[str, pd.DataFrame] = {}
-
-    if escritor_existente:
-        try:
-            lidas = pd.read_excel(caminho_str, sheet_name=None)
-            todas_abas = dict(lidas) if isinstance(lidas, dict) else {}
-            existentes: pd.DataFrame = todas_abas.get(sheet_name, pd.DataFrame())
-            tamanho_antes = len(existentes)
-
-            combinado = pd.concat([existentes, novos_df], ignore_index=True)
-            combinado = combinado.drop_duplicates(subset=chave_unica, keep="first")
-            tamanho_depois = len(combinado)
-        except Exception as e:
-            print(f"[⚠️] Erro ao ler aba {sheet_name}: {e}")
-            combinado = novos_df
-            tamanho_antes = 0
-            tamanho_depois = len(novos_df)
+    # normaliza entrada para registros dict-like
+    if isinstance(novos, pd.DataFrame):
+        registros: list[dict[str, Any]] = cast(list[dict[str, Any]], novos.to_dict("records"))
     else:
-        combinado = novos_df
-        tamanho_antes = 0
-        tamanho_depois = len(novos_df)
-
-    todas_abas[sheet_name] = combinado
-
-    adicionados = tamanho_depois - tamanho_antes
+        registros = [dict(r) for r in novos]
 
     try:
-        with pd.ExcelWriter(caminho_str, engine="openpyxl", mode="w") as writer:
-            for aba, dfw in todas_abas.items():
-                dfw.to_excel(writer, sheet_name=aba, index=False)
+        adicionados = abrir_envios_log(caminho).registrar(sheet_name, registros)
         print(f"[💾] {adicionados} novo(s) registro(s) adicionado(s) em '{sheet_name}'")
     except Exception as e:
-        print(f"[❌] Erro ao salvar Excel: {e}")
+        print(f"[❌] Erro ao salvar log de envios: {e}")
+        adicionados = 0
 
     return adicionados
 
 
+def exportar_log_envios() -> None:
+    """Gera o envios_log.xlsx (layout histórico por abas) a partir do store, para consulta no Excel."""
+    caminho_excel = os.path.join(os.path.dirname(__file__), "Envios", "envios_log.xlsx")
+    try:
+        destino = abrir_envios_log(caminho_excel).exportar_xlsx(caminho_excel)
+    except Exception as e:
+        comunicador_global.mostrar_mensagem.emit("erro", "Erro", f"Erro ao exportar o log de envios:\n{e}")
+        return
+    comunicador_global.mostrar_mensagem.emit("info", "Log exportado", f"Log de envios exportado para:\n{destino}")
+
+
 # Integração com a API da Shopify
 
 # API SHOPIFY
@@ -5919,7 +6238,11 @@ def obter_api_shopify_version(now: datetime | None = None) -> str:
 
 
 API_VERSION = obter_api_shopify_version()
-GRAPHQL_URL = f"https://{settings.SHOP_URL}/admin/api/{API_VERSION}/graphql.json"
+
+
+def graphql_url() -> str:
+    return f"https://{settings.SHOP_URL}/admin/api/{API_VERSION}/graphql.json"
+
 
 # ESTADOS
 
@@ -6009,6 +6332,7 @@ class FulfillPedidoRunnable(QRunnable):
         self.signals: _SinaisFulfill = SinaisFulfill()
 
     @pyqtSlot()
+    @perfilado("shopify_fulfillment")
     def run(self) -> None:
         try:
             print(
@@ -6035,7 +6359,7 @@ class FulfillPedidoRunnable(QRunnable):
             with lock:
                 delta = float(time.time() - cast(float, ctrl.get("ultimo_acesso", 0.0)))
                 if delta < min_intervalo_graphql:
-                    time.sleep(min_intervalo_graphql - delta)
+                    esperar(min_intervalo_graphql - delta)
                 ctrl["ultimo_acesso"] = time.time()
 
             # === (1) Order.id direto da planilha ===
@@ -6086,7 +6410,7 @@ class FulfillPedidoRunnable(QRunnable):
                 after: str | None = None
                 while True:
                     r = sess.post(
-                        GRAPHQL_URL,
+                        graphql_url(),
                         json={"query": query_fo, "variables": {"orderId": order_gid, "first": 50, "after": after}},
                         timeout=10,
                         verify=False,
@@ -6125,7 +6449,7 @@ class FulfillPedidoRunnable(QRunnable):
                             }
                             """
                             r_li = sess.post(
-                                GRAPHQL_URL,
+                                graphql_url(),
                                 json={
                                     "query": q_li_more,
                                     "variables": {"foId": node_fo.get("id"), "first": 100, "after": li_after},
@@ -6282,7 +6606,7 @@ class FulfillPedidoRunnable(QRunnable):
                     print(
                         f"[→] Enviando fulfillmentCreate: location={loc_gid.split('/')[-1]} FO_count={len(fo_payloads)}"
                     )
-                    r2 = sess.post(GRAPHQL_URL, json=payload, timeout=10, verify=False)
+                    r2 = sess.post(graphql_url(), json=payload, timeout=10, verify=False)
                     r2.raise_for_status()
                     resp = cast(dict[str, Any], r2.json())
                     user_errors = ((resp.get("data") or {}).get("fulfillmentCreate") or {}).get("userErrors") or []
@@ -6379,6 +6703,7 @@ class NormalizarEndereco(QRunnable):
         self.estado: MutableMapping[str, Any] = estado
 
     @pyqtSlot()
+    @perfilado("shopify_endereco")
     def run(self) -> None:
         pedido_id = self.order_id  # já normalizado
         try:
@@ -6560,6 +6885,8 @@ def buscar_cep_com_timeout(cep: str, timeout: int = 5) -> dict[str, Any]:
 
     Retorna um dicionário de endereço ou {} em caso de erro.
     """
+    from brazilcep import exceptions, get_address_from_cep
+
     try:
         # sem lock global, sem sleep serializador
         return get_address_from_cep(cep, timeout=timeout)
@@ -6574,135 +6901,67 @@ def buscar_cep_com_timeout(cep: str, timeout: int = 5) -> dict[str, Any]:
 
 
 class VerificadorDeEtapa(QObject):
+    """Encerra a etapa no instante em que o último pedido sai de `pendentes` (sem polling).
+
+    O latch dispara na thread do runnable que concluiu o último pedido; o sinal `concluida`
+    leva o fechamento (flags + `callback_final`) para a thread dona do verificador (a da UI).
+    """
+
+    concluida = pyqtSignal()
+
     def __init__(
         self,
         estado: MutableMapping[str, Any],
         chave: str,
-        total_esperado: int,
-        get_pendentes: Callable[[], set[Any] | None],
+        pendentes: PendentesEtapa,
         callback_final: Callable[[], None] | None = None,
-        intervalo_ms: int = 300,
-        timeout: int = 60,
-        max_intervalo_ms: int = 5000,
-        log_cada_n_checks: int = 10,
     ) -> None:
         super().__init__()
         self.estado: MutableMapping[str, Any] = estado
         self.chave: str = chave
-        self.total_esperado: int = int(total_esperado)
-        self.get_pendentes: Callable[[], set[Any] | None] = get_pendentes
+        self.pendentes: PendentesEtapa = pendentes
         self.callback_final: Callable[[], None] | None = callback_final
-
-        # controle de temporização
-        self.intervalo_inicial_ms: int = max(50, int(intervalo_ms))
-        self.intervalo_atual_ms: int = self.intervalo_inicial_ms
-        self.max_intervalo_ms: int = int(max_intervalo_ms)
-        self.timeout: int = int(timeout)
-
-        # book-keeping
-        self.contador: int = 0
         self._encerrado: bool = False
-        self._ultimo_len: int | None = None
-        self._ultimo_tick_com_progresso: float = time.monotonic()
-        self._timer: QTimer = QTimer(self)
-        self._timer.setSingleShot(True)
-        self._timer.timeout.connect(self._verificar)
-
-        # logging
-        self._log_cada_n: int = max(1, int(log_cada_n_checks))
+        self._inicio: float = time.monotonic()
         self._parent_correlation_id: str = get_correlation_id()
+        self.concluida.connect(self._concluir)
 
     def iniciar(self) -> None:
         set_correlation_id(self._parent_correlation_id)
-        logger.info(
-            "monitor_start",
-            extra={
-                "chave": self.chave,
-                "intervalo_ms": self.intervalo_inicial_ms,
-                "timeout_s": self.timeout,
-                "total_esperado": self.total_esperado,
-            },
-        )
+        logger.info("monitor_start", extra={"chave": self.chave, "total_esperado": self.pendentes.total})
         self.estado.setdefault("etapas_finalizadas", {})
         self.estado[f"finalizou_{self.chave}"] = False
         self.estado["etapas_finalizadas"][self.chave] = False
-        QTimer.singleShot(0, self._verificar)
+        self._inicio = time.monotonic()
+        self.pendentes.ao_esvaziar(self.concluida.emit)
 
-    def _reagendar(self) -> None:
+    def _concluir(self) -> None:
         if self._encerrado:
             return
-        self._timer.start(self.intervalo_atual_ms)
-
-    def _verificar(self) -> None:
-        if self._encerrado:
-            return
-
-        self.contador += 1
-        pendentes_raw = self.get_pendentes() or set()
-        pendentes: set[Any] = cast(set[Any], pendentes_raw)
-        lp: int = len(pendentes)
+        self._encerrado = True
 
         # pode não existir em testes ou cenários específicos; mantém default compatível
         cancel_event = self.estado.get("cancelador_global", threading.Event())
         cancelado: bool = bool(cancel_event.is_set())
 
-        # timeout real em segundos (não em número de checks)
-        if (time.monotonic() - self._ultimo_tick_com_progresso) > self.timeout and cancelado:
-            logger.warning("monitor_timeout_cancelled", extra={"chave": self.chave})
-            self._encerrar()
-            return
-
-        # log só quando muda ou a cada N checks
-        if self._ultimo_len is None or lp != self._ultimo_len or (self.contador % self._log_cada_n == 0):
-            logger.info(
-                "monitor_tick",
-                extra={
-                    "chave": self.chave,
-                    "count": self.contador,
-                    "pendentes": lp,
-                    "cancelado": cancelado,
-                },
-            )
-
-        # finalizou?
-        if lp == 0:
-            logger.info("monitor_done", extra={"chave": self.chave})
-            self.estado[f"finalizou_{self.chave}"] = True
-            self.estado["etapas_finalizadas"][self.chave] = True
-            self._encerrar()
-
-            if callable(self.callback_final) and not cancelado:
-                try:
-                    logger.info("monitor_callback_final", extra={"chave": self.chave})
-                    self.callback_final()
-                except Exception as e:
-                    logger.exception("monitor_callback_final_error", extra={"chave": self.chave, "err": str(e)})
-            return
-
-        # se já foi marcada como finalizada por outro caminho, encerra
-        if bool(self.estado.get(f"finalizou_{self.chave}", False)):
-            self._encerrar()
-            return
-
-        # backoff: só aumenta se não houve progresso
-        if self._ultimo_len is None or lp < self._ultimo_len:
-            # houve progresso → reset backoff
-            self.intervalo_atual_ms = self.intervalo_inicial_ms
-            self._ultimo_tick_com_progresso = time.monotonic()
-        else:
-            # sem progresso → dobra, limitado ao máximo
-            self.intervalo_atual_ms = min(self.max_intervalo_ms, int(self.intervalo_atual_ms * 2))
-
-        self._ultimo_len = lp
-        self._reagendar()
+        logger.info(
+            "monitor_done",
+            extra={
+                "chave": self.chave,
+                "total": self.pendentes.total,
+                "duracao_s": round(time.monotonic() - self._inicio, 3),
+                "cancelado": cancelado,
+            },
+        )
+        self.estado[f"finalizou_{self.chave}"] = True
+        self.estado.setdefault("etapas_finalizadas", {})[self.chave] = True
 
-    def _encerrar(self) -> None:
-        if self._encerrado:
-            return
-        self._encerrado = True
-        with suppress(Exception):
-            self._timer.stop()
-        logger.info("monitor_closed", extra={"chave": self.chave})
+        if callable(self.callback_final) and not cancelado:
+            try:
+                logger.info("monitor_callback_final", extra={"chave": self.chave})
+                self.callback_final()
+            except Exception as e:
+                logger.exception("monitor_callback_final_error", extra={"chave": self.chave, "err": str(e)})
 
 
 class SinaisObterCpf(QObject):
@@ -6725,6 +6984,7 @@ class ObterCpfShopifyRunnable(QRunnable):
         self._parent_correlation_id: str = get_correlation_id()
 
     @pyqtSlot()
+    @perfilado("shopify_cpf")
     def run(self) -> None:
         set_correlation_id(self._parent_correlation_id)
         logger.info("cpf_lookup_start", extra={"order_id": self.order_id})
@@ -6766,7 +7026,7 @@ class ObterCpfShopifyRunnable(QRunnable):
                 agora: float = time.time()
                 delta: float = agora - ultimo
                 if delta < min_intervalo_graphql:
-                    time.sleep(min_intervalo_graphql - delta)
+                    esperar(min_intervalo_graphql - delta, self.estado["cancelador_global"])
                 ctrl["ultimo_acesso"] = agora
 
             if self.estado["cancelador_global"].is_set():
@@ -6775,7 +7035,7 @@ class ObterCpfShopifyRunnable(QRunnable):
 
             with requests.Session() as sess:
                 sess.headers.update(headers)
-                resp = sess.post(GRAPHQL_URL, json=query, timeout=6, verify=False)
+                resp = sess.post(graphql_url(), json=query, timeout=6, verify=False)
 
             if self.estado["cancelador_global"].is_set():
                 logger.warning("cpf_lookup_cancelled_mid", extra={"order_id": self.order_id})
@@ -6821,109 +7081,74 @@ class ObterCpfShopifyRunnable(QRunnable):
                     logger.exception("cpf_lookup_final_signal_error", extra={"order_id": self.order_id, "err": str(e)})
 
 
-def iniciar_busca_cpfs(
-    estado: MutableMapping[str, Any],
-    gerenciador: GerenciadorProgresso | None,
-    depois: Callable[[], None] | None = None,
-) -> None:
-    df_any = estado.get("df_temp")
-
-    # mypy: só usa quando não for None
-    if gerenciador is not None:
-        gerenciador.atualizar("🔍 Coletando CPF dos pedidos...", 0, 0)
+def pedidos_sem_cpf(df: pd.DataFrame) -> set[str]:
+    """Pedidos (ids normalizados, sem duplicados) cujo CPF ainda não foi coletado."""
+    serie_cpf = df["CPF/CNPJ Comprador"].fillna("").astype(str)
+    faltando_cpf = serie_cpf.str.strip() == ""
+    pedidos_faltantes = df.loc[faltando_cpf, "transaction_id"].dropna().astype(str).str.strip()
+    return {normalizar_order_id(pid) for pid in pedidos_faltantes}
 
-    if not isinstance(df_any, pd.DataFrame) or df_any.empty:
-        logger.warning("[⚠️] Não há dados de pedidos coletados.")
-        return
-    df_temp: pd.DataFrame = df_any
 
-    estado.setdefault("etapas_finalizadas", {})
-    cancelador = estado.get("cancelador_global")
-    if cancelador is not None and cancelador.is_set():
-        logger.info("[🛑] Cancelamento detectado antes de iniciar busca de CPFs.")
-        if gerenciador is not None:
-            gerenciador.fechar()
-        return
+def pedidos_sem_bairro(df: pd.DataFrame) -> list[tuple[str, str]]:
+    """[(pedido_id, cep)] dos pedidos sem bairro, um por pedido (garante a coluna no df)."""
+    # Garante coluna e evita .str em NaN
+    if "Bairro Comprador" not in df.columns:
+        df["Bairro Comprador"] = ""
 
-    # 🔍 Quais pedidos ainda sem CPF
-    serie_cpf = df_temp["CPF/CNPJ Comprador"].fillna("").astype(str)
-    faltando_cpf = serie_cpf.str.strip() == ""
-    pedidos_faltantes = df_temp.loc[faltando_cpf, "transaction_id"].dropna().astype(str).str.strip().tolist()
+    faltando = df["Bairro Comprador"].fillna("").astype(str).str.strip() == ""
 
-    if not pedidos_faltantes:
-        logger.info("[✅] Todos os CPFs já foram coletados.")
-        if callable(depois) and not (cancelador is not None and cancelador.is_set()):
-            depois()
-        return
+    # Só precisamos de transaction_id e CEP; remove NaN e duplicados de id
+    pendentes: dict[str, str] = {}
+    for tid, cep in (
+        df.loc[faltando, ["transaction_id", "CEP Comprador"]]
+        .dropna(subset=["transaction_id"])
+        .itertuples(index=False, name=None)
+    ):
+        pendentes.setdefault(normalizar_order_id(str(tid)), "" if pd.isna(cep) else str(cep).strip())
+    return list(pendentes.items())
 
-    # ✅ Normaliza e remove duplicados UMA vez só
-    pendentes_set: set[str] = {normalizar_order_id(pid) for pid in pedidos_faltantes}
-    estado["cpf_pendentes"] = pendentes_set
-    estado["cpf_total_esperado"] = len(pendentes_set)
 
-    # 🔁 Inicia threads de coleta (evita duplicados)
-    pool = QThreadPool.globalInstance()
+def enderecos_a_normalizar(df: pd.DataFrame) -> list[tuple[str, str, str]]:
+    """[(pedido_id, endereço, complemento)] de entrega, um por pedido (garante as colunas no df)."""
+    # blindagem de colunas
+    for col in ("Endereço Entrega", "Complemento Entrega"):
+        if col not in df.columns:
+            df[col] = ""
 
-    def continuar_para_bairros() -> None:
-        if cancelador is not None and cancelador.is_set():
-            if gerenciador is not None:
-                gerenciador.fechar()
-            return
-        # iniciar_busca_bairros aceita gerenciador opcional
-        iniciar_busca_bairros(estado, gerenciador, depois=depois)
-
-    # Adapter para o sinal resultado -> marcar_cpf_coletado sem keywords
-    def _on_cpf_ok(pedido_id: str, cpf: str) -> None:
-        estado_dict: dict[Any, Any] = cast(dict[Any, Any], estado)
-        if gerenciador is None:
-            # assinatura sem gerenciador
-            marcar_cpf_coletado(pedido_id, cpf, estado_dict)
-        else:
-            # assinatura com gerenciador
-            marcar_cpf_coletado(pedido_id, cpf, estado_dict, gerenciador)
+    pendentes: dict[str, tuple[str, str]] = {}
+    colunas = ["transaction_id", "Endereço Entrega", "Complemento Entrega"]
+    for tid, endereco, complemento in df[colunas].dropna(subset=["transaction_id"]).itertuples(index=False, name=None):
+        pendentes.setdefault(
+            normalizar_order_id(str(tid)),
+            ("" if pd.isna(endereco) else str(endereco), "" if pd.isna(complemento) else str(complemento)),
+        )
+    return [(pid, end, compl) for pid, (end, compl) in pendentes.items()]
 
-    for pedido_id in pendentes_set:
-        if cancelador is not None and cancelador.is_set():
-            break
-        runnable = ObterCpfShopifyRunnable(pedido_id, estado)
-        # conecta sem passar keywords não suportadas
-        runnable.signals.resultado.connect(_on_cpf_ok)
-        pool.start(runnable)
 
-    # ✅ Verificador com intervalo inicial maior (use com backoff na classe)
-    estado["verificador_cpf"] = VerificadorDeEtapa(
-        estado=estado,
-        chave="cpf",
-        total_esperado=estado["cpf_total_esperado"],
-        get_pendentes=lambda: estado.get("cpf_pendentes", set()),
-        callback_final=continuar_para_bairros,  # encadeia próximo passo aqui
-        intervalo_ms=1000,
-        # max_intervalo_ms=8000,
-        # log_cada_n_checks=20,
-    )
-    estado["verificador_cpf"].iniciar()
+class BuscarBairroRunnable(QRunnable):
+    """Consulta o CEP de um pedido e devolve `callback(order_id, bairro, cidade, uf)`.
 
+    Não toca no DataFrame: os resultados são aplicados de uma vez em consolidar_planilha_shopify.
+    """
 
-class BuscarBairroRunnable(QRunnable):
     def __init__(
         self,
         order_id: str,
         cep: str,
-        df: pd.DataFrame,
-        callback: Callable[[str, str], None],
+        callback: Callable[[str, str, str, str], None],
         estado: MutableMapping[str, Any],
         sinal_finalizacao: _SinalFinalizacao | None = None,
     ) -> None:
         super().__init__()
         self.order_id: str = normalizar_order_id(order_id)
         self.cep: str = cep
-        self.df: pd.DataFrame = df
-        self.callback: Callable[[str, str], None] = callback
+        self.callback: Callable[[str, str, str, str], None] = callback
         self.estado: MutableMapping[str, Any] = estado
         self.sinal_finalizacao: _SinalFinalizacao | None = sinal_finalizacao
         self._parent_correlation_id: str = get_correlation_id()
 
     @pyqtSlot()
+    @perfilado("shopify_bairro")
     def run(self) -> None:
         set_correlation_id(self._parent_correlation_id)
         logger.info("bairro_lookup_start", extra={"order_id": self.order_id})
@@ -6938,6 +7163,9 @@ class BuscarBairroRunnable(QRunnable):
                 raise ValueError("CEP inválido")
 
             endereco: dict[str, Any] = buscar_cep_com_timeout(cep_limpo)
+            if endereco:
+                # reaproveitado pela normalização do endereço (mesmo CEP de entrega)
+                self.estado.setdefault("cep_info_por_pedido", {})[self.order_id] = endereco
 
             if cancelador is not None and cancelador.is_set():
                 logger.warning("bairro_lookup_cancelled_after_fetch", extra={"order_id": self.order_id})
@@ -6947,25 +7175,11 @@ class BuscarBairroRunnable(QRunnable):
             cidade = cast(str, (endereco.get("city") or "")).strip()
             uf = cast(str, (endereco.get("uf") or "")).strip()
 
-            # Seleciona as linhas do pedido
-            idx = self.df["transaction_id"].astype(str).str.strip() == self.order_id
-
-            if bairro:
-                self.df.loc[idx, "Bairro Comprador"] = bairro
-                self.df.loc[idx, "Bairro Entrega"] = bairro
-            if cidade:
-                self.df.loc[idx, "Cidade Comprador"] = cidade
-                self.df.loc[idx, "Cidade Entrega"] = cidade
-            if uf:
-                self.df.loc[idx, "UF Comprador"] = uf
-                self.df.loc[idx, "UF Entrega"] = uf
-
             if cancelador is not None and cancelador.is_set():
                 logger.warning("bairro_lookup_cancelled_before_callback", extra={"order_id": self.order_id})
                 return
 
-            # callback(pid, bairro)
-            self.callback(self.order_id, bairro or "")
+            self.callback(self.order_id, bairro, cidade, uf)
 
         except Exception:
             cancelador = cast(threading.Event | None, self.estado.get("cancelador_global"))
@@ -6974,7 +7188,7 @@ class BuscarBairroRunnable(QRunnable):
                 return
 
             logger.exception("bairro_lookup_error", extra={"order_id": self.order_id})
-            self.callback(self.order_id, "")
+            self.callback(self.order_id, "", "", "")
 
         finally:
             try:
@@ -6998,274 +7212,212 @@ class BuscarBairroRunnable(QRunnable):
                     )
 
 
-def iniciar_busca_bairros(
-    estado: MutableMapping[str, Any],
-    gerenciador: GerenciadorProgresso | None,
-    depois: Callable[[], None] | None = None,
-) -> None:
-    df_any = estado.get("df_temp")
-    if not isinstance(df_any, pd.DataFrame) or df_any.empty:
-        logger.warning("[⚠️] Nenhuma planilha temporária encontrada.")
-        return
-    df: pd.DataFrame = df_any
-
-    # mypy: só chama se não for None
-    if gerenciador is not None:
-        gerenciador.atualizar("📍 Buscando bairros dos pedidos...", 0, 0)
-
-    estado.setdefault("etapas_finalizadas", {})
-    if estado["cancelador_global"].is_set():
-        logger.info("[🛑] Cancelamento detectado antes da busca de bairros.")
-        if gerenciador is not None:
-            gerenciador.fechar()
-        return
-
-    # Garante coluna e evita .str em NaN
-    if "Bairro Comprador" not in df.columns:
-        df["Bairro Comprador"] = ""
-
-    serie_bairro = df["Bairro Comprador"].fillna("").astype(str)
-    faltando = serie_bairro.str.strip() == ""
-
-    # Só precisamos de transaction_id e CEP; remove NaN e duplicados de id
-    pendentes_df = (
-        df.loc[faltando, ["transaction_id", "CEP Comprador"]]
-        .dropna(subset=["transaction_id"])  # mantém linhas com CEP NaN se quiser outra estratégia
-        .drop_duplicates(subset="transaction_id")
-    )
-
-    total = len(pendentes_df)
-    if total == 0:
-        logger.info("[✅] Nenhum bairro para buscar.")
-        if callable(depois):
-            depois()
-        return
-
-    logger.info(f"[📍] Buscando bairro para {total} pedidos.")
-
-    # Conjunto de pendentes normalizado
-    pendentes_set: set[str] = {normalizar_order_id(pid) for pid in pendentes_df["transaction_id"].astype(str)}
-    estado["bairro_total_esperado"] = len(pendentes_set)
-    estado["bairro_pendentes"] = set(pendentes_set)  # cópia defensiva
+class EnriquecimentoPedidos:
+    """Agenda CPF, CEP/bairro e endereço de cada pedido como um pequeno DAG, sem barreira entre etapas.
 
-    pool = QThreadPool.globalInstance()
-
-    # Adapter sem keywords e com casts para mypy
-    def _on_bairro_ok(pid: str, bairro: str) -> None:
-        # marcar_bairro_coletado espera estado: dict[Any, Any]
-        estado_dict: dict[Any, Any] = cast(dict[Any, Any], estado)
-        # Se o slot exige GerenciadorProgresso (não-opcional), só chamamos quando houver
-        if gerenciador is None:
-            # Sem gerenciador, apenas atualiza estruturas e segue (ou loga)
-            marcar_bairro_coletado(pid, bairro, estado_dict)  # tipo: ignore[call-arg]
-        else:
-            marcar_bairro_coletado(pid, bairro, estado_dict, gerenciador)  # tipo: ignore[call-arg]
+    Para cada pedido, CPF e CEP/bairro rodam em paralelo; a normalização do endereço depende só do
+    CEP do próprio pedido (reaproveita `cep_info_por_pedido`). Cada etapa segue com o seu
+    PendentesEtapa no estado (flags `finalizou_*` quando esvazia) e `pedidos` esvazia quando o
+    último pedido fecha todas as suas tarefas.
+    """
 
-        # Se quiser ainda executar 'depois' quando cada item finalizar, pode guardar no estado
-        if callable(depois):
-            # opcional: deixe para o verificador final chamar apenas uma vez
-            pass
+    def __init__(self, estado: MutableMapping[str, Any], df: pd.DataFrame) -> None:
+        self.estado = estado
+        self.df = df
+        self._cpf: set[str] = pedidos_sem_cpf(df)
+        self._cep: dict[str, str] = dict(pedidos_sem_bairro(df))
+        self._endereco: dict[str, tuple[str, str]] = {pid: (e, c) for pid, e, c in enderecos_a_normalizar(df)}
+
+        self.pendentes: dict[str, PendentesEtapa] = {
+            "cpf": PendentesEtapa(self._cpf),
+            "bairro": PendentesEtapa(self._cep),
+            "endereco": PendentesEtapa(self._endereco),
+        }
+        # tarefas que faltam por pedido (1 a 3); o pedido sai de `pedidos` quando zera
+        self._restantes: dict[str, int] = {
+            pid: (pid in self._cpf) + (pid in self._cep) + (pid in self._endereco)
+            for pid in self._cpf | self._cep.keys() | self._endereco.keys()
+        }
+        self.pedidos = PendentesEtapa(self._restantes)
+        self.duracoes: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._inicio = time.monotonic()
+        self._executor: ExecutorGerenciado | None = None
+
+    def iniciar(self, executor: ExecutorGerenciado | None = None) -> None:
+        """Publica os pendentes no estado e dispara as tarefas sem dependência nas faixas do executor.
+
+        CPF vai para a faixa "shopify", CEP/bairro para "cep" e o endereço (GPT) para "openai".
+        O envio pedido a pedido roda numa tarefa da faixa "tarefas": quem chama (a thread da UI)
+        só enfileira essa tarefa e volta, mesmo com as faixas cheias.
+        """
+        est = self.estado
+        est.setdefault("etapas_finalizadas", {})
+        est.setdefault("enderecos_normalizados", {})
+        est.setdefault("dados_temp", {})
+        for chave, pendentes in self.pendentes.items():
+            est[f"{chave}_pendentes"] = pendentes
+            est[f"{chave}_total_esperado"] = pendentes.total
+            est[f"finalizou_{chave}"] = False
+            est["etapas_finalizadas"][chave] = False
+
+        self._inicio = time.monotonic()
+
+        # o executor leva o contexto de quem enviou: toda tarefa (inclusive o endereço, enviado de
+        # dentro da tarefa de CEP) chega às threads com o span da etapa e o correlation_id
+        self._executor = executor or executor_global()
+        logger.info(
+            "enriquecimento_inicio",
+            extra={"pedidos": self.pedidos.total, **{k: p.total for k, p in self.pendentes.items()}},
+        )
+        for chave, pendentes in self.pendentes.items():
+            pendentes.ao_esvaziar(partial(self._etapa_concluida, chave))
 
-    # Dispara runnables
-    for _, linha in pendentes_df.iterrows():
-        if estado["cancelador_global"].is_set():
-            logger.info("[🛑] Cancelamento detectado durante o disparo de tarefas de bairro.")
-            break
+        # de dentro de uma thread do executor o submeter nunca espera pela fila cheia
+        self._executor.submeter("tarefas", self._disparar, prioridade=PRIORIDADE_INTERATIVA)
 
-        pedido_id = normalizar_order_id(str(linha["transaction_id"]))
-        cep = "" if pd.isna(linha["CEP Comprador"]) else str(linha["CEP Comprador"]).strip()
+    def _disparar(self) -> None:
+        # mesmo com cancelamento as tarefas são enviadas: saem cedo e liberam os latches
+        pids = list(self._restantes)
+        for i, pid in enumerate(pids):
+            try:
+                if pid in self._cpf:
+                    self._submeter("shopify", partial(self._tarefa_cpf, pid))
+                if pid in self._cep:
+                    self._submeter("cep", partial(self._tarefa_cep, pid))
+                elif pid in self._endereco:
+                    self._submeter("openai", partial(self._tarefa_endereco, pid))
+            except Exception:
+                # sem isso os latches nunca esvaziam e a tela fica esperando para sempre
+                logger.exception("enriquecimento_disparo_erro", extra={"order_id": pid, "restantes": len(pids) - i})
+                for restante in pids[i:]:
+                    self._abandonar(restante)
+                return
 
-        runnable = BuscarBairroRunnable(
-            pedido_id,
-            cep,
-            df,
-            _on_bairro_ok,  # ✅ sem keywords e sem 'depois'
-            estado,
+    def _submeter(self, faixa: str, tarefa: Callable[[], None]) -> None:
+        if self._executor is None:
+            tarefa()
+            return
+        self._executor.submeter(faixa, tarefa)
+
+    def aguardar(self, timeout: float | None = None) -> bool:
+        return self.pedidos.aguardar(timeout)
+
+    def consolidar(self, gerenciador: GerenciadorProgresso | None = None) -> None:
+        """Aplica CPF/bairro/endereço coletados no df (estado["df_planilha_parcial"])."""
+        consolidar_planilha_shopify(self.estado, gerenciador)
+
+    # ---- tarefas ----
+    def _abandonar(self, pid: str) -> None:
+        """Tira o pedido de todos os pendentes sem coletar nada (o envio das tarefas falhou)."""
+        for pendentes in self.pendentes.values():
+            pendentes.discard(pid)
+        self.pedidos.discard(pid)
+
+    def _concluir_tarefa(self, pid: str) -> None:
+        with self._lock:
+            self._restantes[pid] -= 1
+            fim = self._restantes[pid] == 0
+        if fim:
+            self.pedidos.discard(pid)
+
+    def _etapa_concluida(self, chave: str) -> None:
+        self.duracoes[chave] = round(time.monotonic() - self._inicio, 3)
+        self.estado[f"finalizou_{chave}"] = True
+        self.estado["etapas_finalizadas"][chave] = True
+        logger.info(
+            "enriquecimento_etapa_concluida",
+            extra={"etapa": chave, "total": self.pendentes[chave].total, "duracao_s": self.duracoes[chave]},
         )
-        pool.start(runnable)
 
-    # Se o próximo passo exige GerenciadorProgresso não-opcional, garanta aqui
-    if gerenciador is None:
-        logger.warning("[i] 'gerenciador' ausente; não é possível iniciar normalização de endereços.")
-        return
-
-    # Verificador persistente
-    estado["verificador_bairro"] = VerificadorDeEtapa(
-        estado=estado,
-        chave="bairro",
-        total_esperado=estado["bairro_total_esperado"],
-        get_pendentes=lambda: estado.get("bairro_pendentes", set()),
-        callback_final=lambda: iniciar_normalizacao_enderecos(  # ✅ tipo esperado
-            estado, gerenciador  # mypy: GerenciadorProgresso garantido
-        ),
-        intervalo_ms=800,
-    )
-    estado["verificador_bairro"].iniciar()
+    @rastreado("shopify_cpf", itens=lambda _r: 1)
+    def _tarefa_cpf(self, pid: str) -> None:
+        try:
+            runnable = ObterCpfShopifyRunnable(pid, self.estado)
+            _conectar_direto(
+                runnable.signals.resultado, lambda p, c: marcar_cpf_coletado(p, c, cast(dict, self.estado))
+            )
+            runnable.run()
+        finally:
+            self._concluir_tarefa(pid)
 
+    @rastreado("shopify_bairro", itens=lambda _r: 1)
+    def _tarefa_cep(self, pid: str) -> None:
+        try:
+            BuscarBairroRunnable(
+                pid,
+                self._cep[pid],
+                lambda p, b, c, u: marcar_bairro_coletado(p, b, cast(dict, self.estado), cidade=c, uf=u),
+                self.estado,
+            ).run()
+        finally:
+            # endereço depende do CEP: só agora entra no pool (o cache do CEP já está no estado)
+            if pid in self._endereco:
+                try:
+                    self._submeter("openai", partial(self._tarefa_endereco, pid))
+                except Exception:
+                    logger.exception("enriquecimento_disparo_erro", extra={"order_id": pid, "restantes": 1})
+                    self.pendentes["endereco"].discard(pid)
+                    self._concluir_tarefa(pid)  # a parte do endereço, que não vai rodar
+            self._concluir_tarefa(pid)
+
+    @rastreado("shopify_endereco", itens=lambda _r: 1)
+    def _tarefa_endereco(self, pid: str) -> None:
+        endereco, complemento = self._endereco[pid]
+        try:
+            NormalizarEndereco(pid, endereco, complemento, self._endereco_normalizado, None, self.estado).run()
+        finally:
+            self._concluir_tarefa(pid)
 
-class FinalizarNormalizacaoSignal(QObject):
-    if TYPE_CHECKING:
-        finalizado: pyqtBoundSignal  # o mypy enxerga bound
-    else:
-        finalizado = pyqtSignal(str, dict)  # runtime
+    def _endereco_normalizado(self, pid: str, dados: Mapping[str, Any]) -> None:
+        # o runnable tira o pedido dos pendentes no finally, depois deste registro
+        self.estado["enderecos_normalizados"][pid] = dict(dados)  # cópia defensiva
 
 
-def iniciar_normalizacao_enderecos(
+def iniciar_enriquecimento_pedidos(
     estado: MutableMapping[str, Any],
-    gerenciador: GerenciadorProgresso,
+    gerenciador: GerenciadorProgresso | None,
     depois: Callable[[], None] | None = None,
 ) -> None:
-    # gate idempotente
-    if estado.get("_once_iniciar_normalizacao_enderecos"):
-        logger.info("[🧪] Normalização de endereços já iniciada - ignorando repetição.")
-        return
-    estado["_once_iniciar_normalizacao_enderecos"] = True
-
-    jp = estado.get("janela_principal")
-    visivel = getattr(jp, "isVisible", lambda: None)()
-    logger.info(f"[🧪] Visibilidade da janela principal: {visivel}")
-    logger.info(f"[🧪] iniciar_normalizacao_enderecos recebeu gerenciador: {id(gerenciador)}")
-
-    if not estado.get("gerenciador_progresso"):
-        estado["gerenciador_progresso"] = gerenciador
-    else:
-        gerenciador = estado["gerenciador_progresso"]
-
-    estado.setdefault("etapas_finalizadas", {})
-    estado.setdefault("enderecos_normalizados", {})
-
+    """Coleta CPF, bairro e endereço de todos os pedidos do df_temp (DAG por pedido nas faixas do executor)."""
     df_any = estado.get("df_temp")
-    gerenciador.atualizar("📦 Normalizando endereços...", 0, 0)
+    if gerenciador is not None:
+        gerenciador.atualizar("🔍 Coletando CPF, bairro e endereço dos pedidos...", 0, 0)
+
     if not isinstance(df_any, pd.DataFrame) or df_any.empty:
-        logger.warning("[⚠️] Nenhuma planilha temporária encontrada.")
+        logger.warning("[⚠️] Não há dados de pedidos coletados.")
         return
-    df: pd.DataFrame = df_any
 
-    if estado["cancelador_global"].is_set():
-        if gerenciador:
+    cancelador = estado.get("cancelador_global")
+    if cancelador is not None and cancelador.is_set():
+        logger.info("[🛑] Cancelamento detectado antes de iniciar o enriquecimento dos pedidos.")
+        if gerenciador is not None:
             gerenciador.fechar()
         return
 
-    # blindagem de colunas
-    for col in ("Endereço Entrega", "Complemento Entrega"):
-        if col not in df.columns:
-            df[col] = ""
-
-    pendentes_df = (
-        df.drop_duplicates(subset="transaction_id")
-        .loc[:, ["transaction_id", "Endereço Entrega", "Complemento Entrega"]]
-        .dropna(subset=["transaction_id"])
-    )
+    enriquecimento = EnriquecimentoPedidos(estado, df_any)
+    estado["enriquecimento"] = enriquecimento
 
-    total = len(pendentes_df)
-    if total == 0:
-        logger.info("[✅] Nenhum endereço para normalizar.")
-        estado["etapas_finalizadas"]["endereco"] = True
-        estado["finalizou_endereco"] = True
-        try:
-            finalizar_coleta_shopify(estado, gerenciador)
-        except Exception:
-            logger.exception("[❌] Erro ao finalizar no caminho zero-pendentes")
+    def concluir() -> None:
+        enriquecimento.consolidar(gerenciador)
+        finalizar_coleta_shopify(estado, gerenciador)
         if callable(depois):
             try:
                 depois()
             except Exception:
-                logger.exception("[❌] Erro no 'depois()' após zero-pendentes")
-        return
-
-    logger.info(f"[📦] Normalizando {total} endereços.")
-
-    pendentes_set = {normalizar_order_id(str(pid)) for pid in pendentes_df["transaction_id"].astype(str)}
-    estado["endereco_total_esperado"] = len(pendentes_set)
-    estado["endereco_pendentes"] = set(pendentes_set)
-
-    logger.info(f"[🧪] Iniciando {len(pendentes_set)} NormalizarEndereco(s)...")
-
-    pool = QThreadPool.globalInstance()
-    for _, linha in pendentes_df.iterrows():
-        if estado["cancelador_global"].is_set():
-            logger.info("[🛑] Cancelamento detectado durante o disparo de normalizações de endereço.")
-            break
-
-        pedido_id = normalizar_order_id(str(linha["transaction_id"]))
-        endereco_raw = "" if pd.isna(linha["Endereço Entrega"]) else str(linha["Endereço Entrega"])
-        complemento_raw = "" if pd.isna(linha.get("Complemento Entrega")) else str(linha.get("Complemento Entrega"))
-
-        runnable = NormalizarEndereco(
-            pedido_id,
-            endereco_raw,
-            complemento_raw,
-            lambda pid, dados: ao_finalizar_endereco(str(pid), dict(dados), estado, gerenciador, depois),
-            sinal_finalizacao=cast(_SinalFinalizacao, FinalizarNormalizacaoSignal()),
-            estado=estado,
-        )
+                logger.exception("[❌] Erro no 'depois()' após o enriquecimento dos pedidos")
 
-        _pool = pool or QThreadPool.globalInstance()
-        _pool.start(runnable)
+    with no_prazo(prazo_da_execucao(estado)):
+        enriquecimento.iniciar()
 
-    estado["verificador_endereco"] = VerificadorDeEtapa(
+    # fecha na thread da UI assim que o último pedido concluir (sem polling)
+    estado["verificador_pedidos"] = VerificadorDeEtapa(
         estado=estado,
-        chave="endereco",
-        total_esperado=estado["endereco_total_esperado"],
-        get_pendentes=lambda: estado.get("endereco_pendentes", set()),
-        callback_final=lambda: finalizar_coleta_shopify(estado, gerenciador),
-        intervalo_ms=800,
+        chave="pedidos",
+        pendentes=enriquecimento.pedidos,
+        callback_final=concluir,
     )
-    estado["verificador_endereco"].iniciar()
-
-
-def ao_finalizar_endereco(
-    pedido_id: str,
-    endereco_dict: Mapping[str, Any],
-    estado: MutableMapping[str, Any],
-    gerenciador: GerenciadorProgresso | None,
-    depois_callback: Callable[[], None] | None,
-) -> None:
-    # Proteção contra chamadas após finalização
-    if estado.get("finalizou_endereco"):
-        logger.debug(f"[🛑] Ignorando ao_finalizar_endereco para {pedido_id} - etapa já foi finalizada.")
-        return
-
-    pedido_id = normalizar_order_id(pedido_id)
-    logger.info(f"[🧪] ao_finalizar_endereco chamado para {pedido_id} - gerenciador={id(gerenciador)}")
-
-    estado.setdefault("enderecos_normalizados", {})
-    estado.setdefault("endereco_pendentes", set())
-
-    if estado.get("cancelador_global", threading.Event()).is_set():
-        logger.warning(f"[🛑] Cancelado antes de processar endereço do pedido {pedido_id}.")
-        return
-
-    # Evita reprocessar pedidos já removidos
-    if pedido_id not in estado["endereco_pendentes"]:
-        logger.debug(f"[🟡] Pedido {pedido_id} já finalizado ou não está nos pendentes. Ignorando.")
-        return
-
-    # Registra o endereço normalizado e remove da lista de pendentes
-    estado["enderecos_normalizados"][pedido_id] = dict(endereco_dict)  # cópia defensiva
-    estado["endereco_pendentes"].remove(pedido_id)
-
-    total: int = int(estado.get("endereco_total_esperado", 0))
-    atual: int = total - len(estado["endereco_pendentes"])
-    logger.info(f"[📦] Endereços normalizados: {atual}/{total}")
-
-    # Se todos foram normalizados, finaliza a etapa
-    if not estado["endereco_pendentes"]:
-        if not estado.get("finalizou_endereco", False):
-            logger.info("[✅] Todos os endereços finalizados.")
-            estado["etapas_finalizadas"]["endereco"] = True
-            estado["finalizou_endereco"] = True
-
-            consolidar_planilha_shopify(estado, gerenciador)
-
-            if callable(depois_callback):
-                logger.info("[📞] Chamando `depois()` após normalização.")
-                try:
-                    depois_callback()
-                except Exception as e:
-                    logger.exception(f"[❌] Erro ao executar `depois()` após normalização: {e}")
-        else:
-            logger.debug("[🟡] ao_finalizar_endereco ignorado - etapa já finalizada.")
+    estado["verificador_pedidos"].iniciar()
 
 
 def validar_endereco(address1: str) -> bool:
@@ -7302,7 +7454,6 @@ def acionar_coleta_pedidos_shopify(estado: MutableMapping[str, Any]) -> None:
         produto_alvo=produto_alvo,
         skus_info=skus_info,
         fulfillment_status=fulfillment_status,
-        depois=lambda: iniciar_normalizacao_enderecos(estado, gerenciador),
     )
 
 
@@ -7424,12 +7575,14 @@ class ColetarPedidosShopify(QRunnable):
         deficit = needed - available
         return max(0.0, deficit / restore)
 
-    def _esperar_creditos_se_preciso(self) -> None:
+    def _esperar_creditos_se_preciso(self, cancelador: threading.Event | None) -> bool:
+        """Espera os créditos do GraphQL se recomporem; False se cancelado durante a espera."""
         needed = max(50.0, float(self._ultimo_requested_cost or 100.0))
         wait_s = self._calc_wait_seconds(self._ultimo_throttle_status, needed)
-        if wait_s > 0:
-            print(f"⏳ Aguardando {wait_s:.2f}s para recuperar créditos (precisa ~{needed:.0f}).")
-            time.sleep(wait_s)
+        if wait_s <= 0:
+            return True
+        print(f"⏳ Aguardando {wait_s:.2f}s para recuperar créditos (precisa ~{needed:.0f}).")
+        return esperar(wait_s, cancelador)
 
     def _atualizar_custos(self, payload: Mapping[str, Any]) -> None:
         extensions = cast(dict[str, Any], (payload or {}).get("extensions", {}))
@@ -7452,23 +7605,10 @@ class ColetarPedidosShopify(QRunnable):
             self._ultimo_throttle_status = None
 
     # ---- helpers de combo/sku ----
-    def _buscar_info_por_sku(self, skus_info: dict[str, Any], sku: str) -> dict[str, Any] | None:
-        sku_norm = (sku or "").strip().upper()
-        if not sku_norm:
-            return None
-        for info in skus_info.values():
-            try:
-                v = str(info.get("sku", "")).strip().upper()
-            except Exception:
-                v = ""
-            if v and v == sku_norm:
-                return cast(dict[str, Any], info)
-        return None
-
     def _expandir_line_items_por_regras(
         self,
         pedido: Pedido,
-        skus_info: dict[str, Any],
+        tabela_combos: TabelaCombos,
     ) -> list[dict[str, Any]]:
         """Retorna uma lista de dicts "itens_expandidos" a partir de pedido.lineItems:
 
@@ -7476,12 +7616,9 @@ class ColetarPedidosShopify(QRunnable):
         - Se combo indisponível e mapeado: [{'sku', 'quantity', 'line_item_id', 'combo_indisponivel': True}]
         - Se combo normal: componentes multiplicados, todos com o MESMO 'line_item_id' do line item original.
         (anota unit_price_hint: 0.0 p/ brinde; {"_combo_divisor": N} p/ não-brinde)
-        """
-
-        def _to_bool(v: Any) -> bool:
-            s = str(v).strip().lower()
-            return s in {"true", "1", "s", "sim", "y", "yes"}
 
+        Os combos vêm pré-compilados em `tabela_combos` (consulta por SKU + multiplicação pela quantidade).
+        """
         itens_expandidos: list[dict[str, Any]] = []
         li_edges = cast(list[dict[str, Any]], (pedido.get("lineItems") or {}).get("edges", []) or [])
         for li_edge in li_edges:
@@ -7496,15 +7633,9 @@ class ColetarPedidosShopify(QRunnable):
             if qty_li <= 0:
                 continue
 
-            info = self._buscar_info_por_sku(skus_info, sku_li)
-            # normaliza para sempre ter um dict; isso tira o Optional da jogada para o mypy
-            info_dict: dict[str, Any] = info or {}
-
-            tipo_info = str(info_dict.get("tipo", "")).strip().lower()
-
             # não é combo
-            eh_combo = bool(info_dict) and (tipo_info == "combo" or info_dict.get("composto_de"))
-            if not eh_combo:
+            expansao = tabela_combos.por_sku.get(sku_li.upper()) if sku_li else None
+            if expansao is None:
                 itens_expandidos.append(
                     {
                         "sku": sku_li,
@@ -7516,9 +7647,7 @@ class ColetarPedidosShopify(QRunnable):
                 continue
 
             # combo → aplicar regra de pré-venda (não desmembrar)
-            mapeado = bool(info_dict.get("guru_ids")) and bool(info_dict.get("shopify_ids"))
-            indisponivel = _to_bool(info_dict.get("indisponivel", ""))  # ← parse seguro
-            if indisponivel and mapeado:
+            if expansao["indisponivel"] and expansao["mapeado"]:
                 itens_expandidos.append(
                     {
                         "sku": sku_li,
@@ -7530,49 +7659,7 @@ class ColetarPedidosShopify(QRunnable):
                 )
                 continue
 
-            # desmembrar componentes → TODOS herdam o mesmo line_item_id
-            raw_comp = info_dict.get("composto_de") or []
-
-            # Normaliza para lista de componentes "por combo" (sem multiplicar por qty_li ainda)
-            if isinstance(raw_comp, str):
-                # permite "SKU1, SKU2 x 2; SKU3*3"
-                comp_list_any: list[Any] = [s.strip() for s in re.split(r"[;,]", raw_comp) if s.strip()]
-            elif isinstance(raw_comp, list):
-                comp_list_any = raw_comp
-            else:
-                comp_list_any = []
-
-            comp_norm: list[tuple[str, int]] = []
-            for comp in comp_list_any:
-                comp_sku = ""
-                comp_qty = 1
-
-                if isinstance(comp, dict):
-                    comp_sku = str(comp.get("sku") or comp.get("SKU") or "").strip()
-                    try:
-                        comp_qty = int(comp.get("qtd") or comp.get("quantity") or 1)
-                    except Exception:
-                        comp_qty = 1
-
-                elif isinstance(comp, str):
-                    # aceita "SKU", "SKU x 2", "SKU*2"
-                    m = re.match(r"^\s*([A-Za-z0-9._\-]+)\s*(?:[xX\*]\s*(\d+))?\s*$", comp)
-                    if m:
-                        comp_sku = m.group(1).strip()
-                        if m.group(2):
-                            comp_qty = int(m.group(2))
-
-                else:
-                    logger.warning(
-                        "componente_tipo_inesperado",
-                        extra={"tipo": type(comp).__name__, "combo": sku_li},
-                    )
-                    continue
-
-                if comp_sku:
-                    comp_norm.append((comp_sku, max(1, comp_qty)))
-
-            if not comp_norm:
+            if not expansao["componentes"]:
                 # fallback: sem componentes válidos, mantém o combo “inteiro”
                 itens_expandidos.append(
                     {
@@ -7585,72 +7672,25 @@ class ColetarPedidosShopify(QRunnable):
                 )
                 continue
 
-            # === calcular divisor efetivo do combo e anotar unit_price_hint por componente ===
-            try:
-                # aceita divisor como int ou string numérica; válido se >= 1
-                cfg_div_raw = info_dict.get("divisor", None)
-                cfg_div: int | None
-                if isinstance(cfg_div_raw, int):
-                    cfg_div = cfg_div_raw if cfg_div_raw >= 1 else None
-                elif isinstance(cfg_div_raw, str) and cfg_div_raw.strip().isdigit():
-                    cfg_div = int(cfg_div_raw.strip())
-                    if cfg_div < 1:
-                        cfg_div = None
-                else:
-                    cfg_div = None
-
-                def _is_brinde(sku_: str) -> bool:
-                    _inf = self._buscar_info_por_sku(skus_info, sku_) or {}
-                    _inf_dict: Mapping[str, Any] = _inf or {}
-                    return str(_inf_dict.get("tipo", "")).strip().lower() == "brinde"
-
-                total_nao_brinde = sum(q for (s, q) in comp_norm if not _is_brinde(s))
-                if cfg_div is not None:
-                    divisor_efetivo = cfg_div
-                else:
-                    divisor_efetivo = max(1, total_nao_brinde)
-
-                # adiciona os componentes multiplicando pela quantidade do line item (qty_li),
-                # marcando a dica de preço por item:
-                for comp_sku, comp_qty in comp_norm:
-                    quantidade_total = comp_qty * qty_li
-                    if quantidade_total <= 0:
-                        continue
-
-                    if _is_brinde(comp_sku):
-                        unit_price_hint: Any = 0.0
-                    else:
-                        unit_price_hint = {"_combo_divisor": divisor_efetivo}
-
-                    itens_expandidos.append(
-                        {
-                            "sku": comp_sku,
-                            "quantity": quantidade_total,
-                            "from_combo": sku_li,
-                            "is_combo": True,
-                            "line_item_id": line_item_id,  # ✅ mesmo id p/ todas as linhas do combo
-                            "unit_price_hint": unit_price_hint,
-                        }
-                    )
-            except Exception:
-                # fallback sem hints
-                for comp_sku, comp_qty in comp_norm:
-                    quantidade_total = comp_qty * qty_li
-                    if quantidade_total <= 0:
-                        continue
-                    itens_expandidos.append(
-                        {
-                            "sku": comp_sku,
-                            "quantity": quantidade_total,
-                            "from_combo": sku_li,
-                            "is_combo": True,
-                            "line_item_id": line_item_id,
-                        }
-                    )
+            # desmembrar componentes (multiplicados por qty_li) → TODOS herdam o mesmo line_item_id
+            for comp in expansao["componentes"]:
+                unit_price_hint: Any = 0.0 if comp["brinde"] else {"_combo_divisor": expansao["divisor"]}
+                itens_expandidos.append(
+                    {
+                        "sku": comp["sku"],
+                        "quantity": comp["qtd"] * qty_li,
+                        "from_combo": sku_li,
+                        "is_combo": True,
+                        "line_item_id": line_item_id,  # ✅ mesmo id p/ todas as linhas do combo
+                        "unit_price_hint": unit_price_hint,
+                    }
+                )
 
         return itens_expandidos
 
     @pyqtSlot()
+    @perfilado("shopify_coleta", memoria=True)
+    @rastreado("shopify_coleta")
     def run(self) -> None:
         set_correlation_id(self._parent_correlation_id)
 
@@ -7676,6 +7716,8 @@ class ColetarPedidosShopify(QRunnable):
 
         cursor: str | None = None
         pedidos: list[Pedido] = []
+        # combos do skus.json compilados uma vez para toda a coleta
+        tabela_combos = TabelaCombos(cast(dict[str, Any], self.estado.get("skus_info", {})))
 
         # ------- Fulfillment status: só "any" ou "unfulfilled" -------
         fs = (self.fulfillment_status or "").strip().lower()
@@ -7791,19 +7833,24 @@ class ColetarPedidosShopify(QRunnable):
                 return ship
             return bill
 
+        host_shopify = urlsplit(graphql_url()).hostname or "?"
+        tentativa = 0  # 429/THROTTLED seguidos na página atual
+
         while True:
             if cancelador is not None and cancelador.is_set():
                 logger.warning("shopify_fetch_cancelled_midloop")
                 break
 
-            self._esperar_creditos_se_preciso()
+            if not self._esperar_creditos_se_preciso(cancelador):
+                logger.warning("shopify_fetch_cancelled_waiting_credits")
+                break
 
             # --- chamada HTTP ---
             try:
                 with requests.Session() as sess:
                     sess.headers.update(headers)
                     resp = sess.post(
-                        GRAPHQL_URL,
+                        graphql_url(),
                         json={
                             "query": query_template,
                             "variables": {"cursor": cursor, "search": query_str},
@@ -7814,7 +7861,7 @@ class ColetarPedidosShopify(QRunnable):
             except requests.exceptions.Timeout as e:
                 self._log_erro("Timeout na requisição", exc=e, extra_ctx={"cursor": cursor, "query": query_str})
                 return
-            except requests.exceptions.RequestException as e:
+            except (requests.exceptions.RequestException, CircuitoAberto) as e:
                 self._log_erro(
                     "Exceção de rede/requests",
                     exc=e,
@@ -7828,9 +7875,14 @@ class ColetarPedidosShopify(QRunnable):
 
             # --- HTTP status ---
             if resp.status_code == 429:
-                retry = int(resp.headers.get("Retry-After", "2"))
+                retry = ler_retry_after(resp.headers.get("Retry-After"))
                 logger.warning("shopify_http_429", extra={"retry_after": retry})
-                time.sleep(retry)
+                if not aguardar_retentativa(host_shopify, tentativa, retry_after=retry or 2.0, cancelador=cancelador):
+                    if cancelador is None or not cancelador.is_set():
+                        self._log_erro("HTTP 429: orçamento de retentativas esgotado", resp=resp)
+                        return
+                    break
+                tentativa += 1
                 continue
             if resp.status_code != 200:
                 self._log_erro(
@@ -7869,7 +7921,13 @@ class ColetarPedidosShopify(QRunnable):
                     if wait_s <= 0:
                         wait_s = 1.5
                     print(f"⏳ THROTTLED - aguardando {wait_s:.2f}s e tentando novamente...")
-                    time.sleep(wait_s)
+                    # a espera calculada pelos créditos faz o papel do Retry-After
+                    if not aguardar_retentativa(host_shopify, tentativa, retry_after=wait_s, cancelador=cancelador):
+                        if cancelador is None or not cancelador.is_set():
+                            self._log_erro("THROTTLED: orçamento de retentativas esgotado", resp=resp)
+                            return
+                        break
+                    tentativa += 1
                     continue
 
                 if code == "MAX_COST_EXCEEDED":
@@ -7908,8 +7966,7 @@ class ColetarPedidosShopify(QRunnable):
                     pass
 
                 # --- EXPANSÃO DE ITENS: prioridade por SKU e regra de combo ---
-                skus_info = cast(dict[str, Any], self.estado.get("skus_info", {}))
-                itens_expandidos = self._expandir_line_items_por_regras(pedido, skus_info)
+                itens_expandidos = self._expandir_line_items_por_regras(pedido, tabela_combos)
                 pedido["itens_expandidos"] = itens_expandidos  # para uso posterior
 
                 # CPF via localizationExtensions
@@ -7933,6 +7990,7 @@ class ColetarPedidosShopify(QRunnable):
                 novos.append(pedido)
 
             pedidos.extend(novos)
+            tentativa = 0
 
             page_info = cast(dict[str, Any], data.get("pageInfo") or {})
             if not page_info.get("hasNextPage"):
@@ -7990,6 +8048,8 @@ class ColetarPedidosShopify(QRunnable):
             itens_expandidos = cast(list[dict[str, Any]], pedido.get("itens_expandidos") or [])
             cast(dict[str, Any], dados_temp["itens_por_pedido"])[pedido_id] = itens_expandidos
 
+        contar("itens", len(pedidos))
+
         # sinais PyQt
         self.sinais.resultado.emit(pedidos)
 
@@ -8004,7 +8064,7 @@ def iniciar_coleta_pedidos_shopify(
     depois: Callable[[], None] | None = None,
 ) -> None:
     print("[🧪] iniciar_coleta_pedidos_shopify recebeu depois =", depois)
-    logger.info(f"[🧪] Threads ativas no pool: {QThreadPool.globalInstance().activeThreadCount()}")
+    logger.info("shopify_coleta_executor", extra={"faixa": executor_global().metricas()["shopify"]})
 
     # Salva o gerenciador original apenas se ainda não existir
     if "gerenciador_progresso" not in estado or not estado["gerenciador_progresso"]:
@@ -8018,12 +8078,6 @@ def iniciar_coleta_pedidos_shopify(
 
     estado["processando_pedidos"] = True
 
-    pool = QThreadPool.globalInstance()
-    pool.waitForDone(100)  # espera 100ms por qualquer thread pendente
-    pool.setMaxThreadCount(30)
-
-    logger.info(f"[⚙️] Reset QThreadPool: ativas = {pool.activeThreadCount()}")
-
     estado.setdefault("dados_temp", {})
     estado["dados_temp"].setdefault("cpfs", {})
     estado["dados_temp"].setdefault("bairros", {})
@@ -8041,10 +8095,27 @@ def iniciar_coleta_pedidos_shopify(
     )
     runnable.sinais.erro.connect(lambda _msg: tratar_erro_coleta_shopify(gerenciador))
 
-    QThreadPool.globalInstance().start(runnable)
+    # o usuário está esperando: passa na frente do lote (CPF/fulfillment) da faixa "shopify"
+    with no_prazo(prazo_da_execucao(estado)):
+        executor_global().submeter("shopify", runnable.run, prioridade=PRIORIDADE_INTERATIVA)
+
+
+@lru_cache(maxsize=1)
+def cliente_openai() -> openai.OpenAI:
+    # max_retries=0: quem retenta é o GPTRateLimiter, pelo orçamento de retentativas (sem camada escondida)
+    cassete = cassete_ativo()
+    if cassete is None:
+        return openai.OpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0)
+    import httpx
+
+    return openai.OpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        max_retries=0,
+        http_client=httpx.Client(transport=cassete.transporte_httpx()),
+    )
 
 
-openai_client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+HOST_OPENAI = "api.openai.com"
 
 
 class GPTRateLimiter:
@@ -8053,6 +8124,7 @@ class GPTRateLimiter:
         self._lock: threading.Lock = threading.Lock()
         self._ultima_chamada: float = 0.0
         self._intervalo_minimo: float = intervalo_minimo  # em segundos
+        self.chamadas: int = 0  # requisições enviadas (inclui retentativas); lido pelo relatório do modo CLI
 
     def chamar(self, prompt: str, openai_client: Any, model: str = "gpt-4o") -> dict[str, Any]:
         with self._semaforo:
@@ -8060,16 +8132,21 @@ class GPTRateLimiter:
                 agora = time.time()
                 tempo_decorrido = agora - self._ultima_chamada
                 if tempo_decorrido < self._intervalo_minimo:
-                    time.sleep(self._intervalo_minimo - tempo_decorrido)
+                    esperar(self._intervalo_minimo - tempo_decorrido)
                 self._ultima_chamada = time.time()
 
+            orcamento_retentativas.registrar(HOST_OPENAI)  # o cliente usa httpx: não passa pelo HTTPAdapter
             for tentativa in range(3):
+                with self._lock:
+                    self.chamadas += 1
                 try:
+                    if (prazo := prazo_atual()) is not None:
+                        prazo.verificar("openai")
                     response = openai_client.chat.completions.create(
                         model=model,
                         messages=[{"role": "user", "content": prompt}],
                         temperature=0,
-                        timeout=10,
+                        timeout=limitar_timeout(10),
                     )
                     conteudo: str = response.choices[0].message.content.strip()
                     json_inicio: int = conteudo.find("{")
@@ -8078,10 +8155,14 @@ class GPTRateLimiter:
                         return cast(dict[str, Any], json.loads(conteudo[json_inicio:json_fim]))
                     else:
                         raise ValueError("❌ JSON não encontrado na resposta da API.")
-                except RateLimitError:
-                    espera = 2**tentativa
-                    print(f"[⏳ GPT] Limite temporário. Tentando novamente em {espera}s...")
-                    time.sleep(espera)
+                except openai.RateLimitError as e:
+                    cabecalhos = getattr(getattr(e, "response", None), "headers", None) or {}
+                    retry_after = ler_retry_after(cabecalhos.get("retry-after"))
+                    print(f"[⏳ GPT] Limite temporário. Tentando novamente (Retry-After: {retry_after})...")
+                    if tentativa == 2 or not aguardar_retentativa(
+                        HOST_OPENAI, tentativa, retry_after=retry_after, base=1.0
+                    ):
+                        break
                 except Exception as e:
                     print(f"[❌ GPT] Erro: {e}")
                     break
@@ -8183,7 +8264,7 @@ Formato de resposta:
 
     # >>> ajuste essencial: capturar erro de requisição e cair no fallback
     try:
-        resp = gpt_limiter.chamar(prompt, openai_client)
+        resp = gpt_limiter.chamar(prompt, cliente_openai())
     except Exception:
         return _fallback_regex(address1, address2)
 
@@ -8257,18 +8338,18 @@ def finalizar_coleta_shopify(
     finalizar_estados_coleta_shopify(estado)
 
 
-def finalizar_threads_ativas() -> None:
-    pool = QThreadPool.globalInstance()
-    pool.waitForDone(5000)  # Espera até 5s
-
-    while pool.activeThreadCount() > 0:
-        logger.warning(f"[⚠️] Ainda há {pool.activeThreadCount()} threads ativas no pool - aguardando...")
-        time.sleep(0.5)
-        pool.waitForDone(500)
-
-    pool.clear()
-    pool.setMaxThreadCount(30)
-    logger.info("[✅] QThreadPool limpo com sucesso.")
+def finalizar_threads_ativas(timeout: float = 5.0) -> None:
+    """Espera (sem polling) as faixas da coleta Shopify esvaziarem; o que sobrar segue sozinho."""
+    faixas = ("shopify", "cep", "openai")
+    executor = executor_global()
+    if not executor.aguardar_ocioso(faixas, timeout=timeout):
+        metricas = executor.metricas()
+        logger.warning(
+            "executor_ainda_ocupado",
+            extra={f: {"ativas": metricas[f]["ativas"], "fila": metricas[f]["fila"]} for f in faixas},
+        )
+        return
+    logger.info("[✅] Faixas da coleta Shopify ociosas.")
 
 
 def finalizar_estados_coleta_shopify(estado: MutableMapping[str, Any]) -> None:
@@ -8297,6 +8378,20 @@ def ajustar_telefone_planilha(tel: str | None) -> str:
     return re.sub(r"\D", "", tel or "").removeprefix("55")
 
 
+def preencher_por_pedido(df: pd.DataFrame, tid: pd.Series, coluna: str, valores: Mapping[str, Any]) -> None:
+    """Grava `valores[pedido]` em `coluna` para todas as linhas do pedido (demais linhas ficam como estão).
+
+    `tid` é a coluna transaction_id já normalizada (str + strip), calculada uma vez pelo chamador.
+    """
+    if not valores:
+        return
+    novos = tid.map(valores)
+    mascara = tid.isin(valores.keys())
+    if coluna not in df.columns:
+        df[coluna] = ""
+    df.loc[mascara, coluna] = novos[mascara]
+
+
 def consolidar_planilha_shopify(
     estado: MutableMapping[str, Any],
     gerenciador: GerenciadorProgresso | None,
@@ -8328,34 +8423,42 @@ def consolidar_planilha_shopify(
 
     logger.info("[✅] Todos os dados foram coletados. Atualizando a planilha...")
 
-    # -- preenchimentos por pedido (CPF, bairro, endereço) --
-    for pedido_id, cpf in estado.get("dados_temp", {}).get("cpfs", {}).items():
-        if encerrar_se_cancelado("Cancelamento durante preenchimento de CPF."):
-            return
-        pid = normalizar_order_id(pedido_id)
-        idx = df["transaction_id"].astype(str).str.strip() == pid
-        df.loc[idx, "CPF/CNPJ Comprador"] = cpf
+    # -- preenchimentos por pedido (CPF, bairro, endereço): um map por coluna sobre o id normalizado --
+    dados_temp: Mapping[str, Any] = estado.get("dados_temp", {})
+    tid = df["transaction_id"].astype(str).str.strip()
 
-    for pedido_id, bairro in estado.get("dados_temp", {}).get("bairros", {}).items():
-        if encerrar_se_cancelado("Cancelamento durante preenchimento de bairro."):
-            return
-        pid = normalizar_order_id(pedido_id)
-        idx = df["transaction_id"].astype(str).str.strip() == pid
-        df.loc[idx, "Bairro Comprador"] = bairro
+    def por_pedido(valores: Mapping[str, Any]) -> dict[str, Any]:
+        return {normalizar_order_id(pid): v for pid, v in valores.items()}
 
-    for pedido_id, endereco in estado.get("enderecos_normalizados", {}).items():
-        if encerrar_se_cancelado("Cancelamento durante preenchimento de endereço."):
-            return
-        pid = normalizar_order_id(pedido_id)
-        idx = df["transaction_id"].astype(str).str.strip() == pid
-        df.loc[idx, "Endereço Comprador"] = endereco.get("endereco_base", "")
-        df.loc[idx, "Número Comprador"] = endereco.get("numero", "")
-        df.loc[idx, "Complemento Comprador"] = endereco.get("complemento", "")
-        df.loc[idx, "Precisa Contato"] = endereco.get("precisa_contato", "")
-        df.loc[idx, "Endereço Entrega"] = endereco.get("endereco_base", "")
-        df.loc[idx, "Número Entrega"] = endereco.get("numero", "")
-        df.loc[idx, "Complemento Entrega"] = endereco.get("complemento", "")
-        df.loc[idx, "Bairro Entrega"] = estado.get("dados_temp", {}).get("bairros", {}).get(pid, "")
+    cpfs = por_pedido(dados_temp.get("cpfs", {}))
+    bairros = por_pedido(dados_temp.get("bairros", {}))
+    localidades = por_pedido(dados_temp.get("localidades", {}))
+    enderecos = por_pedido(estado.get("enderecos_normalizados", {}))
+
+    if encerrar_se_cancelado("Cancelamento durante preenchimento de CPF/bairro."):
+        return
+    preencher_por_pedido(df, tid, "CPF/CNPJ Comprador", cpfs)
+    # Bairro Comprador recebe todo pedido consultado: quando o CEP falhou, grava "" de propósito
+    # (sobrescreve o que havia, como o preenchimento por pedido sempre fez)
+    preencher_por_pedido(df, tid, "Bairro Comprador", bairros)
+    # os demais campos do CEP só são gravados quando a consulta trouxe o dado
+    preencher_por_pedido(df, tid, "Bairro Entrega", {p: b for p, b in bairros.items() if b})
+    for sufixo in ("Comprador", "Entrega"):
+        preencher_por_pedido(df, tid, f"Cidade {sufixo}", {p: c for p, (c, _uf) in localidades.items() if c})
+        preencher_por_pedido(df, tid, f"UF {sufixo}", {p: u for p, (_c, u) in localidades.items() if u})
+
+    if encerrar_se_cancelado("Cancelamento durante preenchimento de endereço."):
+        return
+    for campo, colunas in (
+        ("endereco_base", ("Endereço Comprador", "Endereço Entrega")),
+        ("numero", ("Número Comprador", "Número Entrega")),
+        ("complemento", ("Complemento Comprador", "Complemento Entrega")),
+        ("precisa_contato", ("Precisa Contato",)),
+    ):
+        valores = {pid: end.get(campo, "") for pid, end in enderecos.items()}
+        for coluna in colunas:
+            preencher_por_pedido(df, tid, coluna, valores)
+    preencher_por_pedido(df, tid, "Bairro Entrega", {pid: bairros.get(pid, "") for pid in enderecos})
 
     # telefones normalizados
     for col in ["Telefone Comprador", "Celular Comprador"]:
@@ -8431,15 +8534,13 @@ def consolidar_planilha_shopify(
     logger.info(f"[✅] Planilha atualizada com {len(df)} linhas.")
 
 
-def montar_planilha_shopify(
+def construir_df_temp_shopify(
     pedidos: Iterable[Mapping[str, Any]],
     produto_alvo: str | None,
     skus_info: Mapping[str, Mapping[str, Any]],
     estado: MutableMapping[str, Any],
-    gerenciador: GerenciadorProgresso,
-    depois: Callable[[], None] | None,
-) -> None:
-    print("[🧪] montar_planilha_shopify recebeu depois =", depois)
+) -> pd.DataFrame:
+    """Gera as linhas da planilha (uma por unidade) a partir dos pedidos coletados e guarda em estado["df_temp"]."""
     estado["df_temp"] = pd.DataFrame()
     df_temp: pd.DataFrame = estado.get("df_temp", pd.DataFrame())
 
@@ -8627,11 +8728,11 @@ def montar_planilha_shopify(
                             "SKU": comp_sku,
                             "Un": "UN",
                             "Quantidade": "1",
-                            "Valor Unitário": f"{valor_unit_comp:.2f}".replace(".", ","),
-                            "Valor Total": f"{valor_unit_comp:.2f}".replace(".", ","),
+                            "Valor Unitário": para_centavos(valor_unit_comp),
+                            "Valor Total": para_centavos(valor_unit_comp),
                             "Total Pedido": "",
-                            "Valor Frete Pedido": f"{valor_frete:.2f}".replace(".", ","),
-                            "Valor Desconto Pedido": f"{valor_desconto:.2f}".replace(".", ","),
+                            "Valor Frete Pedido": para_centavos(valor_frete),
+                            "Valor Desconto Pedido": para_centavos(valor_desconto),
                             "Outras despesas": "",
                             "Nome Entrega": nome_cliente,
                             "Endereço Entrega": endereco.get("address1", ""),
@@ -8684,11 +8785,11 @@ def montar_planilha_shopify(
                         "SKU": sku_item,
                         "Un": "UN",
                         "Quantidade": "1",
-                        "Valor Unitário": f"{valor_unit_line:.2f}".replace(".", ","),
-                        "Valor Total": f"{valor_unit_line:.2f}".replace(".", ","),
+                        "Valor Unitário": para_centavos(valor_unit_line),
+                        "Valor Total": para_centavos(valor_unit_line),
                         "Total Pedido": "",
-                        "Valor Frete Pedido": f"{valor_frete:.2f}".replace(".", ","),
-                        "Valor Desconto Pedido": f"{valor_desconto:.2f}".replace(".", ","),
+                        "Valor Frete Pedido": para_centavos(valor_frete),
+                        "Valor Desconto Pedido": para_centavos(valor_desconto),
                         "Outras despesas": "",
                         "Nome Entrega": nome_cliente,
                         "Endereço Entrega": endereco.get("address1", ""),
@@ -8719,7 +8820,7 @@ def montar_planilha_shopify(
 
     if linhas_geradas:
         df_novo = pd.DataFrame(linhas_geradas)
-        df_temp = pd.concat([df_temp, df_novo], ignore_index=True)
+        df_temp = normalizar_colunas_monetarias(pd.concat([df_temp, df_novo], ignore_index=True), unidade="centavos")
         estado["df_temp"] = df_temp
         print(f"[✅] {len(linhas_geradas)} itens adicionados ao df_temp.")
         print(f"[📊] Total atual no df_temp: {len(df_temp)} linhas.")
@@ -8738,10 +8839,23 @@ def montar_planilha_shopify(
     estado["fretes_shopify"] = estado.get("dados_temp", {}).get("fretes", {}).copy()
     estado["status_fulfillment_shopify"] = estado.get("dados_temp", {}).get("status_fulfillment", {}).copy()
     estado["descontos_shopify"] = estado.get("dados_temp", {}).get("descontos", {}).copy()
+    return cast(pd.DataFrame, estado["df_temp"])
+
 
-    logger.info("[🚀] Iniciando fluxo de coleta de CPFs após montar_planilha_shopify.")
+def montar_planilha_shopify(
+    pedidos: Iterable[Mapping[str, Any]],
+    produto_alvo: str | None,
+    skus_info: Mapping[str, Mapping[str, Any]],
+    estado: MutableMapping[str, Any],
+    gerenciador: GerenciadorProgresso,
+    depois: Callable[[], None] | None,
+) -> None:
+    print("[🧪] montar_planilha_shopify recebeu depois =", depois)
+    construir_df_temp_shopify(pedidos, produto_alvo, skus_info, estado)
+
+    logger.info("[🚀] Iniciando enriquecimento dos pedidos após montar_planilha_shopify.")
     gerenciador.atualizar("📦 Processando transações recebidas...", 0, 0)
-    iniciar_busca_cpfs(estado, estado.get("gerenciador_progresso"), depois)
+    iniciar_enriquecimento_pedidos(estado, estado.get("gerenciador_progresso"), depois)
 
 
 def marcar_cpf_coletado(
@@ -8760,12 +8874,14 @@ def marcar_cpf_coletado(
             gerenciador.fechar()
         return
 
-    if pedido_id not in estado["cpf_pendentes"]:
-        logger.debug(f"[DBG] Pedido {pedido_id} já removido de cpf_pendentes ou não pertence ao conjunto. Ignorando.")
+    # o runnable já pode ter tirado o pedido dos pendentes (o slot roda depois, na UI): vale o 1º resultado
+    if pedido_id in estado["dados_temp"]["cpfs"]:
+        logger.debug(f"[DBG] CPF do pedido {pedido_id} já registrado. Ignorando.")
         return
 
-    estado["cpf_pendentes"].discard(pedido_id)
+    # registra antes de tirar dos pendentes: o último discard encerra a etapa
     estado["dados_temp"]["cpfs"][pedido_id] = cpf
+    estado["cpf_pendentes"].discard(pedido_id)
 
     total = estado.get("cpf_total_esperado", 0)
     atual = total - len(estado["cpf_pendentes"])
@@ -8777,10 +8893,14 @@ def marcar_bairro_coletado(
     bairro: str,
     estado: dict,
     gerenciador: Any | None = None,
+    *,
+    cidade: str = "",
+    uf: str = "",
 ) -> None:
     pedido_id = normalizar_order_id(pedido_id)
     estado.setdefault("bairro_pendentes", set())
     estado.setdefault("dados_temp", {}).setdefault("bairros", {})
+    estado["dados_temp"].setdefault("localidades", {})
 
     # Cancela cedo se necessário (coerente com marcar_cpf_coletado)
     if estado.get("cancelador_global", threading.Event()).is_set():
@@ -8789,9 +8909,11 @@ def marcar_bairro_coletado(
             gerenciador.fechar()
         return
 
-    if pedido_id in estado["bairro_pendentes"]:
-        estado["bairro_pendentes"].discard(pedido_id)
+    if pedido_id not in estado["dados_temp"]["bairros"]:
+        # registra antes de tirar dos pendentes: o último discard encerra a etapa
         estado["dados_temp"]["bairros"][pedido_id] = bairro
+        estado["dados_temp"]["localidades"][pedido_id] = (cidade, uf)
+        estado["bairro_pendentes"].discard(pedido_id)
 
         total = estado.get("bairro_total_esperado", 0)
         atual = total - len(estado["bairro_pendentes"])
@@ -9094,7 +9216,7 @@ def processar_lineitems_shopify(df: pd.DataFrame | None) -> None:
     total_fulfilled: dict[str, int] = {"count": 0}
     erros: list[tuple[str, str]] = []
 
-    pool: QThreadPool = QThreadPool.globalInstance()
+    executor = executor_global()
 
     # groupby retorna (chave, DataFrame)
     for order_id_any, grupo in df.groupby("transaction_id"):
@@ -9119,7 +9241,7 @@ def processar_lineitems_shopify(df: pd.DataFrame | None) -> None:
         runnable.signals.concluido.connect(sucesso)
         runnable.signals.erro.connect(falha)
 
-        pool.start(runnable)
+        executor.submeter("shopify", runnable.run, prioridade=PRIORIDADE_INTERATIVA)
 
     print("🚚 Fulfillments iniciados. Acompanhe no console.")
 
@@ -9127,6 +9249,7 @@ def processar_lineitems_shopify(df: pd.DataFrame | None) -> None:
 # Cotação de fretes
 
 
+@rastreado("lotes", itens=len)
 def aplicar_lotes(df: pd.DataFrame, estado: dict | None = None, lote_inicial: int = 1) -> pd.DataFrame:
     df_resultado = df.copy()
 
@@ -9153,11 +9276,9 @@ def aplicar_lotes(df: pd.DataFrame, estado: dict | None = None, lote_inicial: in
     mask_validos = ~df_resultado["indisponivel"].astype(str).str.upper().eq("S")
     excluidos = int((~mask_validos).sum())
     if excluidos:
-        print(f"[INFO] Removendo {excluidos} item(ns) marcados como indisponíveis.")
+        logger.info("lotes_indisponiveis_removidos", extra={"itens": excluidos})
     df_resultado = df_resultado[mask_validos].copy()
 
-    print("\n[🚧] Atribuindo ID Lote por email + cpf + cep...")
-
     # 🔑 chave do lote: email + cpf + cep
     emails = df_resultado["E-mail Comprador"].fillna("").astype(str).str.lower().str.strip()
     cpfs = df_resultado["CPF/CNPJ Comprador"].fillna("").astype(str).str.replace(r"\D", "", regex=True)
@@ -9176,7 +9297,7 @@ def aplicar_lotes(df: pd.DataFrame, estado: dict | None = None, lote_inicial: in
     df_resultado.loc[mask_ainda_vazia, "chave_lote"] = df_resultado.loc[mask_ainda_vazia].index.astype(str).to_list()
 
     if df_resultado.empty:
-        print("\n[✅] Nenhum item válido para lote/cotação após remoção dos indisponíveis.\n")
+        logger.info("lotes_sem_itens_validos")
         return df_resultado.drop(columns=["chave_lote"], errors="ignore")
 
     agrupado = df_resultado.groupby("chave_lote", dropna=False)
@@ -9195,6 +9316,7 @@ def aplicar_lotes(df: pd.DataFrame, estado: dict | None = None, lote_inicial: in
         df_resultado["Valor Frete Lote"] = ""
     if "Valor Desconto Lote" not in df_resultado.columns:
         df_resultado["Valor Desconto Lote"] = ""
+    normalizar_colunas_monetarias(df_resultado, unidade="centavos")
 
     # Evita cast repetido em loop
     df_resultado["transaction_id_str"] = df_resultado["transaction_id"].astype(str)
@@ -9207,36 +9329,42 @@ def aplicar_lotes(df: pd.DataFrame, estado: dict | None = None, lote_inicial: in
         id_lote_str = f"L{lote_atual:04d}"
         df_resultado.loc[indices, "ID Lote"] = id_lote_str
 
-        # Calcula os totais do lote somando por pedido (partials viram 0)
+        # Calcula os totais do lote (centavos) somando por pedido (partials viram 0)
         pedidos_do_lote = subdf["transaction_id_str"].unique()
-        frete_total = 0.0
-        desconto_total = 0.0
+        frete_total = 0
+        desconto_total = 0
 
         for pid in pedidos_do_lote:
             pid_norm = normalizar_order_id(pid)
             status_atual = (status.get(pid_norm, "") or "").upper()
             is_partial = status_atual == "PARTIALLY_FULFILLED"
 
-            frete_val = 0.0 if is_partial else float(fretes.get(pid_norm, 0.0) or 0.0)
-            desc_val = 0.0 if is_partial else float(descontos.get(pid_norm, 0.0) or 0.0)
+            frete_val = 0 if is_partial else para_centavos(fretes.get(pid_norm)) or 0
+            desc_val = 0 if is_partial else para_centavos(descontos.get(pid_norm)) or 0
 
             frete_total += frete_val
             desconto_total += desc_val
 
-            print(
-                f"[🧾] Pedido {pid_norm} | Status: {status_atual} | Frete usado: {frete_val} | Desconto usado: {desc_val}"
+            log_limitado(
+                logger,
+                logging.DEBUG,
+                "lote_pedido_valores",
+                extra={"pedido": pid_norm, "status": status_atual, "frete": frete_val, "desconto": desc_val},
             )
 
         # 🔁 APLICA o TOTAL DO LOTE nas colunas *Pedido* (substitui valores anteriores)
-        df_resultado.loc[indices, "Valor Frete Pedido"] = f"{frete_total:.2f}".replace(".", ",")
-        df_resultado.loc[indices, "Valor Desconto Pedido"] = f"{desconto_total:.2f}".replace(".", ",")
+        df_resultado.loc[indices, "Valor Frete Pedido"] = frete_total
+        df_resultado.loc[indices, "Valor Desconto Pedido"] = desconto_total
 
         # (opcional) mantém colunas de lote em sincronia
-        df_resultado.loc[indices, "Valor Frete Lote"] = f"{frete_total:.2f}".replace(".", ",")
-        df_resultado.loc[indices, "Valor Desconto Lote"] = f"{desconto_total:.2f}".replace(".", ",")
-
-        print(
-            f"🔸 {id_lote_str} → {len(indices)} item(ns) | Frete total LOTE: R$ {frete_total:.2f} | Desconto total LOTE: R$ {desconto_total:.2f}"
+        df_resultado.loc[indices, "Valor Frete Lote"] = frete_total
+        df_resultado.loc[indices, "Valor Desconto Lote"] = desconto_total
+
+        log_limitado(
+            logger,
+            logging.DEBUG,
+            "lote_atribuido",
+            extra={"lote": id_lote_str, "itens": len(indices), "frete": frete_total, "desconto": desconto_total},
         )
         lote_atual += 1
 
@@ -9246,56 +9374,82 @@ def aplicar_lotes(df: pd.DataFrame, estado: dict | None = None, lote_inicial: in
     # Se quiser remover as colunas de lote (já que Pedido = Lote), descomente:
     # df_resultado.drop(columns=["Valor Frete Lote", "Valor Desconto Lote"], inplace=True, errors="ignore")
 
-    print("\n[✅] Todos os lotes atribuídos e totais aplicados nas colunas de Pedido.\n")
+    logger.info("lotes_atribuidos", extra={"lotes": lote_atual - lote_inicial, "itens": len(df_resultado)})
     return df_resultado
 
 
+_MAPA_TRANSPORTADORAS_BLING: dict[str, tuple[str, str]] = {
+    "JET": ("JET EXPRESS BRAZIL LTDA", "jet"),
+    "GOL": ("GOL LINHAS AEREAS SA", "E-GOLLOG"),
+    "LOG": ("LOGGI", "loggi"),
+    "COR": ("CORREIOS", "correios"),
+    "GFL": ("GFL TRANSPORTES", "gfl"),
+    "AZUL": ("AZUL CARGO EXPRESS", "azul"),
+    "LATAM": ("LATAM CARGO", "latam"),
+}
+
+
+def _resolver_transportadora_bling(nome_normalizado: str) -> tuple[str, str] | None:
+    for chave, par_bling in _MAPA_TRANSPORTADORAS_BLING.items():
+        if chave in nome_normalizado:
+            return par_bling
+    return None
+
+
 def padronizar_transportadora_servico(
     row: Mapping[str, Any],
 ) -> tuple[str, str]:
     nome_original = str(row.get("Transportadora", "")).strip().upper()
 
-    mapeamento: dict[str, tuple[str, str]] = {
-        "JET": ("JET EXPRESS BRAZIL LTDA", "jet"),
-        "GOL": ("GOL LINHAS AEREAS SA", "E-GOLLOG"),
-        "LOG": ("LOGGI", "loggi"),
-        "COR": ("CORREIOS", "correios"),
-        "GFL": ("GFL TRANSPORTES", "gfl"),
-        "AZUL": ("AZUL CARGO EXPRESS", "azul"),
-        "LATAM": ("LATAM CARGO", "latam"),
-    }
-
-    for chave, (nome_bling, servico_bling) in mapeamento.items():
-        if chave in nome_original:
-            return nome_bling, servico_bling
+    par_bling = _resolver_transportadora_bling(nome_original)
+    if par_bling is not None:
+        return par_bling
 
     return str(row.get("Transportadora", "")), str(row.get("Serviço", ""))
 
 
+def padronizar_transportadora_servico_df(df: pd.DataFrame) -> tuple[pd.Series[str], pd.Series[str]]:
+    """Versão vetorizada de `padronizar_transportadora_servico`: resolve cada nome normalizado distinto
+    uma única vez e aplica o resultado com `map`. Retorna (Transportadora, Serviço)."""
+    transportadora = df["Transportadora"].astype(str) if "Transportadora" in df.columns else pd.Series("", df.index)
+    servico = df["Serviço"].astype(str) if "Serviço" in df.columns else pd.Series("", df.index)
+
+    chave = transportadora.str.strip().str.upper()
+    resolvidos = {k: _resolver_transportadora_bling(k) for k in chave.unique()}
+    nomes = chave.map({k: v[0] for k, v in resolvidos.items() if v is not None})
+    servicos = chave.map({k: v[1] for k, v in resolvidos.items() if v is not None})
+
+    achou = nomes.notna()
+    return nomes.where(achou, transportadora), servicos.where(achou, servico)
+
+
 def gerar_payload_cotacao(
     cep: str | int,
-    total_pedido: float | str,
-    peso_total: float | str,
+    total_centavos: int,
+    peso_total: float,
 ) -> dict[str, Any]:
     cep_limpo = re.sub(r"\D", "", str(cep)).zfill(8)
+    valor_reais = total_centavos / 100  # a API de cotação recebe reais (float)
 
     return {
         "zipcode": cep_limpo,
-        "amount": round(float(str(total_pedido).replace(",", ".")), 2),
+        "amount": valor_reais,
         "skus": [
             {
                 "sku": "B050A",  # SKU simbólico fixo
-                "price": round(float(str(total_pedido).replace(",", ".")), 2),
+                "price": valor_reais,
                 "quantity": 1,
                 "length": 24,
                 "width": 16,
                 "height": 3,
-                "weight": round(float(str(peso_total).replace(",", ".")), 3),
+                "weight": round(float(peso_total), 3),
             }
         ],
     }
 
 
+@perfilado("fretes_pool")
+@rastreado("fretes", itens=lambda _r: 1)
 def cotar_fretes(
     trans_id: str | int,
     linhas: Sequence[Mapping[str, Any]],
@@ -9313,7 +9467,7 @@ def cotar_fretes(
         nomes_aceitos: set[str] = {str(s).strip().upper() for s in (selecionadas or []) if str(s).strip()}
         if not nomes_aceitos:
             msg = f"Nenhuma transportadora selecionada para o lote {lote_id}."
-            print(f"[⚠️] {msg}")
+            log_limitado(logger, logging.WARNING, "frete_sem_transportadora", extra={"lote": lote_id})
             with suppress(Exception):
                 comunicador_global.mostrar_mensagem.emit("aviso", "Cotação de Frete", msg)
             return None
@@ -9324,7 +9478,7 @@ def cotar_fretes(
         if len(lotes_presentes) != 1:
             vistos = sorted(lotes_presentes) or ["nenhum"]
             msg = f"Lote inconsistente: esperava 1 ID Lote, mas encontrei {vistos}."
-            print(f"[⚠️] {msg} (grupo solicitado: {lote_id})")
+            logger.warning("frete_lote_inconsistente", extra={"lote": lote_id, "lotes_vistos": vistos})
             with suppress(Exception):
                 comunicador_global.mostrar_mensagem.emit(
                     "aviso", "Cotação de Frete", f"{msg}\nGrupo solicitado: {lote_id}"
@@ -9337,33 +9491,38 @@ def cotar_fretes(
             row for row in linhas if str(row.get("ID Lote") or "").strip() == lote_id
         ]
         if not linhas_validas:
-            print(f"[⚠️] Lote {lote_id} ignorado: nenhuma linha válida.")
+            log_limitado(logger, logging.WARNING, "frete_lote_sem_linhas", extra={"lote": lote_id})
             return None
 
         # 2) CEP (usa a primeira linha do lote)
         cep: str = str(linhas_validas[0].get("CEP Entrega") or "").strip()
         if not cep:
             msg = f"Lote {lote_id} ignorado: CEP não encontrado."
-            print(f"[⚠️] {msg}")
+            log_limitado(logger, logging.WARNING, "frete_lote_sem_cep", extra={"lote": lote_id})
         with suppress(Exception):
             comunicador_global.mostrar_mensagem.emit("aviso", "Cotação de Frete", msg)
             return None
 
-        # 3) total do lote (somando itens com valor > 0; fallback por preco_fallback do SKU)
-        total: float = 0.0
+        # 3) total do lote em centavos (somando itens com valor > 0; fallback por preco_fallback do SKU)
+        total: int = 0
         for row in linhas_validas:
             try:
-                valor = float(str(row.get("Valor Total", "0")).replace(",", "."))
+                valor = centavos_celula(row.get("Valor Total"), unidade="centavos") or 0
                 if valor > 0:
                     total += valor
                 else:
                     sku = str(row.get("SKU", "")).strip()
                     for info in skus_info.values():  # usa skus_info global
                         if str(info.get("sku", "")).strip().upper() == sku.upper():
-                            total += float(info.get("preco_fallback", 0) or 0)
+                            total += para_centavos(info.get("preco_fallback")) or 0
                             break
             except Exception as e:
-                print(f"[⚠️] Erro ao calcular valor de {row.get('Produto')}: {e}")
+                log_limitado(
+                    logger,
+                    logging.WARNING,
+                    "frete_valor_item_erro",
+                    extra={"lote": lote_id, "produto": str(row.get("Produto")), "erro": str(e)},
+                )
 
         # 4) peso total (somando pesos por SKU)
         peso: float = 0.0
@@ -9376,14 +9535,19 @@ def cotar_fretes(
                     achou = True
                     break
             if not achou and sku:
-                print(f"[⚠️] SKU '{sku}' não encontrado no skus_info para o lote {lote_id}")
+                log_limitado(logger, logging.WARNING, "frete_sku_desconhecido", extra={"lote": lote_id, "sku": sku})
 
         itens: int = len(linhas_validas)
-        print(f"[🔎] Lote {lote_id} - CEP: {cep} | Itens: {itens} | Peso: {peso:.3f} kg | Total: R$ {total:.2f}")
+        log_limitado(
+            logger,
+            logging.DEBUG,
+            "frete_lote_cotando",
+            extra={"lote": lote_id, "cep": cep, "itens": itens, "peso_kg": round(peso, 3), "total": total},
+        )
 
         if total <= 0 or peso <= 0:
             msg = f"Lote {lote_id} ignorado: total ou peso inválido."
-            print(f"[❌] {msg}")
+            logger.warning("frete_lote_invalido", extra={"lote": lote_id, "total": total, "peso_kg": peso})
             with suppress(Exception):
                 comunicador_global.mostrar_mensagem.emit("aviso", "Cotação de Frete", msg)
             return None
@@ -9400,25 +9564,38 @@ def cotar_fretes(
                 timeout=(5, 30),  # mesmo padrão do DEFAULT_TIMEOUT
             )
         except ExternalError as e:
-            print(f"[❌] Lote {lote_id}: falha ao chamar FreteBarato ({e.code}) - retryable={e.retryable}")
+            logger.error("frete_cotacao_falhou", extra={"lote": lote_id, "code": e.code, "retryable": e.retryable})
             return None
 
         data: dict[str, Any] = r.json()
         quotes_raw = data.get("quotes", []) or []
         quotes: list[Mapping[str, Any]] = quotes_raw if isinstance(quotes_raw, list) else []  # robustez de tipo
-        print(f"[📦] Lote {lote_id} - {len(quotes)} cotações recebidas")
 
         # filtra por transportadoras selecionadas
         opcoes: list[Mapping[str, Any]] = [q for q in quotes if str(q.get("name", "")).strip().upper() in nomes_aceitos]
-        print(f"[🔎] Lote {lote_id} - {len(opcoes)} compatíveis com selecionadas: {sorted(nomes_aceitos)}")
 
         if not opcoes:
-            print(f"[⚠️] Lote {lote_id} - Nenhum frete aceito pelas transportadoras selecionadas.")
+            log_limitado(
+                logger,
+                logging.WARNING,
+                "frete_sem_opcao_aceita",
+                extra={"lote": lote_id, "cotacoes": len(quotes), "aceitas": sorted(nomes_aceitos)},
+            )
             return None
 
         melhor = sorted(opcoes, key=lambda x: float(x.get("price", 0) or 0))[0]
-        print(
-            f"[✅] Lote {lote_id} - Frete: {melhor['name']} ({melhor.get('service','')}) - R$ {float(melhor['price']):.2f}"
+        log_limitado(
+            logger,
+            logging.DEBUG,
+            "frete_lote_cotado",
+            extra={
+                "lote": lote_id,
+                "cotacoes": len(quotes),
+                "compativeis": len(opcoes),
+                "transportadora": str(melhor["name"]),
+                "servico": str(melhor.get("service", "")),
+                "preco": float(melhor["price"]),
+            },
         )
         return (
             lote_id,
@@ -9428,7 +9605,7 @@ def cotar_fretes(
         )
 
     except Exception as e:
-        print(f"[❌] Erro ao cotar frete para lote {trans_id}: {e}")
+        logger.exception("frete_cotacao_erro", extra={"lote": str(trans_id), "erro": str(e)})
         return None
 
 
@@ -9436,6 +9613,16 @@ class HasIsChecked(Protocol):
     def isChecked(self) -> bool: ...
 
 
+def agrupar_linhas_por_lote(df: pd.DataFrame) -> list[tuple[str, list[dict[str, Any]]]]:
+    """[(ID Lote, linhas do lote)] na ordem da planilha, apenas lotes válidos (não vazios)."""
+    pedidos_por_lote: dict[str, list[dict[str, Any]]] = {}
+    for _, linha in df.iterrows():
+        lote = str(linha.get("ID Lote") or "").strip()
+        if lote:
+            pedidos_por_lote.setdefault(lote, []).append(linha.to_dict())
+    return list(pedidos_por_lote.items())
+
+
 def iniciar_cotacao_fretes(
     estado: MutableMapping[str, Any],
     transportadoras_var: Mapping[str, HasIsChecked],
@@ -9464,14 +9651,7 @@ def iniciar_cotacao_fretes(
     estado["df_planilha_parcial"] = df
     print("[⚙️] ID Lote atribuído antes da cotação.")
 
-    # Agrupa por lote (apenas lotes válidos, não vazios)
-    pedidos_por_lote: dict[str, list[dict[str, Any]]] = {}
-    for _, linha in df.iterrows():
-        lote = str(linha.get("ID Lote") or "").strip()
-        if lote:
-            pedidos_por_lote.setdefault(lote, []).append(linha.to_dict())
-
-    ids_lotes: list[tuple[str, list[dict[str, Any]]]] = list(pedidos_por_lote.items())
+    ids_lotes = agrupar_linhas_por_lote(df)
     total: int = len(ids_lotes)
     fretes_aplicados: list[tuple[str, str, float]] = []
 
@@ -9532,7 +9712,134 @@ def iniciar_cotacao_fretes(
 # Visualização de planilhas e logs na interface
 
 
-class VisualizadorPlanilha(QDialog):
+_COLUNAS_DATA_PLANILHA = ("Data", "Data Pedido")
+_SEP_BUSCA = "\x1f"  # separador entre células na coluna de busca (não aparece em texto digitado)
+
+
+class DataFrameTableModel(QAbstractTableModel):
+    """Modelo Qt lido direto do DataFrame: células são renderizadas sob demanda (sem um item por célula).
+
+    As células são mantidas como texto (como eram exibidas/salvas pela QTableWidget) e uma coluna de busca
+    pré-computada (todas as células da linha em minúsculas) atende o filtro. A ordenação reordena o próprio
+    DataFrame de forma vetorizada, então a ordem salva é a ordem exibida. Colunas monetárias (centavos) são
+    exibidas como "1234,56" e ordenadas pelo valor numérico.
+    """
+
+    def __init__(self, df: pd.DataFrame, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        texto = df.astype(str)
+        for col in COLUNAS_MONETARIAS:
+            if col in df.columns:
+                texto[col] = formatar_centavos_serie(df[col])
+        self.df: pd.DataFrame = texto
+        self._atualizar_caches()
+
+    def _atualizar_caches(self) -> None:
+        self._n_linhas, self._n_colunas = self.df.shape
+        self._colunas: list[Any] = [self.df.iloc[:, j].to_numpy() for j in range(self._n_colunas)]
+        busca: pd.Series[str] = pd.Series("", index=self.df.index, dtype=object)
+        for j in range(self.df.shape[1]):
+            col = self.df.iloc[:, j].str.lower()
+            busca = col if j == 0 else busca + _SEP_BUSCA + col
+        self._busca: list[str] = busca.tolist()
+        self._busca_serie: pd.Series[str] = busca.reset_index(drop=True)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:  # noqa: B008
+        return 0 if parent.isValid() else self._n_linhas
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:  # noqa: B008
+        return 0 if parent.isValid() else self._n_colunas
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self._colunas[index.column()][index.row()]
+        if role == Qt.UserRole and str(self.df.columns[index.column()]) in _COLUNAS_DATA_PLANILHA:
+            try:
+                valor = self._colunas[index.column()][index.row()]
+                return datetime.strptime(valor, "%d/%m/%Y").replace(tzinfo=TZ_APP)
+            except Exception:
+                return None
+        return None
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole) -> Any:
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return str(self.df.columns[section])
+        return str(section + 1)
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlags:
+        if not index.isValid():
+            return Qt.ItemFlags(Qt.NoItemFlags)
+        return Qt.ItemFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable)
+
+    def setData(self, index: QModelIndex, value: Any, role: int = Qt.EditRole) -> bool:
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        linha, coluna = index.row(), index.column()
+        self.df.iat[linha, coluna] = str(value)
+        self._colunas[coluna] = self.df.iloc[:, coluna].to_numpy()
+        self._busca[linha] = _SEP_BUSCA.join(v.lower() for v in self.df.iloc[linha].tolist())
+        self._busca_serie.iat[linha] = self._busca[linha]
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder) -> None:
+        if not 0 <= column < self.df.shape[1]:
+            return
+        chave: pd.Series[Any] = self.df.iloc[:, column].reset_index(drop=True)
+        if str(self.df.columns[column]) in COLUNAS_MONETARIAS:
+            chave = centavos_serie(chave, unidade="centavos")
+        posicoes = chave.sort_values(ascending=order == Qt.AscendingOrder, kind="stable").index.tolist()
+        self.beginResetModel()
+        self.df = self.df.iloc[posicoes]
+        self._atualizar_caches()
+        self.endResetModel()
+
+    def mascara_busca(self, termo: str) -> list[bool]:
+        """Linhas (posição no DataFrame) que contêm `termo` em alguma célula."""
+        if not termo:
+            return [True] * len(self.df)
+        return cast(list[bool], self._busca_serie.str.contains(termo, regex=False).tolist())
+
+    def remover_linhas(self, posicoes: Iterable[int]) -> None:
+        remover = set(posicoes)
+        manter = [i for i in range(len(self.df)) if i not in remover]
+        self.beginResetModel()
+        self.df = self.df.iloc[manter]
+        self._atualizar_caches()
+        self.endResetModel()
+
+
+class _FiltroBuscaProxy(QSortFilterProxyModel):
+    """Filtro de busca sobre a coluna pré-computada do `DataFrameTableModel` (uma varredura vetorizada por termo).
+
+    A ordenação é delegada ao modelo de origem (vetorizada), em vez de comparar célula a célula no proxy.
+    """
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._termo: str = ""
+        self._visiveis: list[bool] | None = None
+
+    def definir_termo(self, termo: str) -> None:
+        modelo = cast(DataFrameTableModel, self.sourceModel())
+        self._termo = termo
+        self._visiveis = None if not termo else modelo.mascara_busca(termo)
+        self.invalidateFilter()
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder) -> None:
+        cast(DataFrameTableModel, self.sourceModel()).sort(column, order)
+        self.definir_termo(self._termo)
+
+    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
+        _ = source_parent
+        return self._visiveis is None or self._visiveis[source_row]
+
+
+class VisualizadorPlanilha(_QDialogTardio):
     def __init__(
         self,
         df: pd.DataFrame,
@@ -9561,31 +9868,22 @@ class VisualizadorPlanilha(QDialog):
         layout.addLayout(linha_busca)
         self.campo_busca.textChanged.connect(self.filtrar_tabela)
 
-        # 📋 Tabela
-        self.tabela: QTableWidget = QTableWidget()
-        self.tabela.setColumnCount(len(self.df.columns))
-        self.tabela.setRowCount(len(self.df))
-        self.tabela.setHorizontalHeaderLabels(self.df.columns.astype(str).tolist())
+        # 📋 Tabela (modelo virtual sobre o DataFrame + proxy de ordenação/busca)
+        self.modelo: DataFrameTableModel = DataFrameTableModel(self.df, self)
+        self.proxy: _FiltroBuscaProxy = _FiltroBuscaProxy(self)
+        self.proxy.setSourceModel(self.modelo)
+
+        self.tabela: QTableView = QTableView()
+        self.tabela.setModel(self.proxy)
         self.tabela.setEditTriggers(QAbstractItemView.DoubleClicked)
         self.tabela.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.tabela.setAlternatingRowColors(True)
+        # sem indicador inicial: mantém a ordem original até o usuário clicar num cabeçalho
+        self.tabela.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
         self.tabela.setSortingEnabled(True)
 
-        # preencher células
-        nlin: int = len(self.df)
-        _ncol: int = len(self.df.columns)
-        for i in range(nlin):
-            for j, col in enumerate(list(self.df.columns)):
-                valor: str = str(self.df.iloc[i, j])
-                item: QTableWidgetItem = QTableWidgetItem(valor)
-                if col in ["Data", "Data Pedido"]:
-                    try:
-                        dt = datetime.strptime(valor, "%d/%m/%Y").replace(tzinfo=TZ_APP)
-                        item.setData(int(Qt.UserRole), dt)
-                    except Exception:
-                        pass
-                self.tabela.setItem(i, j, item)
-
+        # ajusta largura pelas primeiras linhas (não varre a planilha inteira)
+        self.tabela.horizontalHeader().setResizeContentsPrecision(100)
         self.tabela.resizeColumnsToContents()
         layout.addWidget(self.tabela)
 
@@ -9610,19 +9908,12 @@ class VisualizadorPlanilha(QDialog):
 
     def filtrar_tabela(self) -> None:
         termo: str = self.campo_busca.text().lower().strip()
-        for row in range(self.tabela.rowCount()):
-            mostrar = False
-            for col in range(self.tabela.columnCount()):
-                item = self.tabela.item(row, col)
-                if item and termo in item.text().lower():
-                    mostrar = True
-                    break
-            self.tabela.setRowHidden(row, not mostrar)
+        self.proxy.definir_termo(termo)
 
     def remover_linhas_selecionadas(self) -> None:
-        # selectedIndexes() -> Sequence[QModelIndex]; convertemos para set de ints
-        idxs: Sequence[QModelIndex] = self.tabela.selectedIndexes()
-        linhas: list[int] = sorted({idx.row() for idx in idxs}, reverse=True)
+        # seleção está em índices do proxy → converte para linhas do DataFrame
+        idxs: Sequence[QModelIndex] = self.tabela.selectionModel().selectedIndexes()
+        linhas: set[int] = {self.proxy.mapToSource(idx).row() for idx in idxs}
         if not linhas:
             return
 
@@ -9634,24 +9925,19 @@ class VisualizadorPlanilha(QDialog):
         )
 
         if resposta == QMessageBox.Yes:
-            for linha in linhas:
-                self.tabela.removeRow(linha)
+            self.modelo.remover_linhas(linhas)
+            self.filtrar_tabela()
 
     def salvar_edicoes(self) -> None:
-        nova_df_rows: list[list[str]] = []
-        for i in range(self.tabela.rowCount()):
-            linha_vals: list[str] = []
-            for j in range(self.tabela.columnCount()):
-                item = self.tabela.item(i, j)
-                linha_vals.append(item.text() if item else "")
-            nova_df_rows.append(linha_vals)
-
-        self.df = pd.DataFrame(nova_df_rows, columns=self.df.columns)
+        # ordenação já reordena o DataFrame do modelo; o filtro de busca não remove linhas
+        texto = self.modelo.df.reset_index(drop=True)
+        # volta o texto "1234,56" editado para centavos
+        self.df = normalizar_colunas_monetarias(texto.copy(), unidade="centavos")
 
         if self.caminho_log:
             try:
                 with open(self.caminho_log, "w", encoding="utf-8") as f:
-                    json.dump(self.df.to_dict(orient="records"), f, ensure_ascii=False, indent=2)
+                    json.dump(texto.to_dict(orient="records"), f, ensure_ascii=False, indent=2)
                 comunicador_global.mostrar_mensagem.emit("info", "Sucesso", "Alterações salvas no log.")
             except Exception as e:
                 comunicador_global.mostrar_mensagem.emit("erro", "Erro", f"Falha ao salvar alterações:\n{e!s}")
@@ -9738,32 +10024,46 @@ def resetar_planilha() -> None:
         comunicador_global.mostrar_mensagem.emit("info", "Limpo", "Planilha foi limpa.")
 
 
+def contar_conjuntos_produtos(df: pd.DataFrame) -> tuple[pd.Series[int], pd.Series[int]]:
+    """Agregação vetorizada do resumo de produção.
+
+    Retorna (conjuntos, produtos): quantos pedidos ("Número pedido") têm cada conjunto de produtos
+    (nomes ordenados, unidos por " + ") e o total por produto individual, ambos na ordem de primeira
+    ocorrência percorrendo os pedidos em ordem crescente.
+    """
+    produto = df["Produto"]
+    produto = produto[[isinstance(p, str) for p in produto]].str.strip()
+    itens = pd.DataFrame({"pedido": df.loc[produto.index, "Número pedido"], "produto": produto})
+    itens = itens[itens["produto"].ne("") & itens["pedido"].notna()]
+
+    # chave por pedido: conjunto ordenado de produtos (com repetições) → contagem de pedidos por chave
+    itens = itens.sort_values("produto", kind="stable")
+    chave_por_pedido = itens.groupby("pedido", sort=True)["produto"].agg(" + ".join)
+    conjuntos = chave_por_pedido.value_counts(sort=False)
+
+    # total por produto: cada conjunto contribui com suas unidades x nº de pedidos
+    partes = pd.DataFrame({"produto": conjuntos.index.str.split(" + ", regex=False), "qtd": conjuntos.to_numpy()})
+    partes = partes.explode("produto")
+    produtos = partes.groupby("produto", sort=False)["qtd"].sum()
+    return conjuntos, produtos
+
+
+@rastreado("pdf_producao")
 def gerar_pdf_producao_logistica(
     df: pd.DataFrame,  # tabela de dados
     data_envio: date | datetime | str,  # aceita date/datetime/str
     bimestre: int,  # 1..6
     ano: int,  # ex.: 2025
     caminho_planilha: str | PathLike[str],  # caminho/Path
-) -> None:
-    # 🔁 Agrupa os produtos por Número pedido (pedido final)
-    agrupado: dict[str, int] = {}
-
-    # mypy-friendly: descompacta o groupby
-    for _chave, grupo_df in df.groupby("Número pedido"):
-        # grupo_df: pd.DataFrame
-        produtos = grupo_df["Produto"].dropna().tolist()
-        produtos = [p.strip() for p in produtos if isinstance(p, str) and p.strip()]
-        if not produtos:
-            continue
-        chave = " + ".join(sorted(produtos))
-        agrupado.setdefault(chave, 0)
-        agrupado[chave] += 1
+    *,
+    abrir: bool = True,
+) -> Future[str]:
+    """Agrega o resumo de produção e renderiza o PDF em segundo plano (pool de processos).
 
-    # 📊 Contagem total por produto individual
-    produtos_totais: Counter[str] = Counter()
-    for conjunto, qtd in agrupado.items():
-        for produto in conjunto.split(" + "):
-            produtos_totais[produto] += qtd
+    Retorna o Future do caminho do PDF; com `abrir`, o arquivo é aberto no sistema quando termina.
+    """
+    # 🔁 Conjuntos de produtos por Número pedido (pedido final) e totais por produto individual
+    agrupado, produtos_totais = contar_conjuntos_produtos(df)
 
     # 🔎 Normaliza data_envio para algo com .strftime (sempre datetime aware no TZ_APP)
     if isinstance(data_envio, str):
@@ -9793,59 +10093,89 @@ def gerar_pdf_producao_logistica(
     pasta_destino = os.path.dirname(os.fspath(caminho_planilha))
     caminho_pdf = os.path.join(pasta_destino, nome_arquivo)
 
-    # 🖨️ Criação do PDF
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, "Editora Logos - Logística", ln=True, align="C")
-    pdf.set_font("Arial", "", 12)
-    pdf.cell(
-        0,
-        10,
+    # 🎁 Produtos extras por cupom
+    contagem_extras = df.loc[
+        centavos_serie(df["Valor Total"], unidade="centavos").eq(0).fillna(False), "Produto"
+    ].value_counts()
+
+    # 🖨️ Renderização fora do processo da interface
+    futuro = renderizar_em_segundo_plano(
+        renderizar_resumo_producao,
+        caminho_pdf,
         f"Resumo de Produção - {data_envio_dt.strftime('%d/%m/%Y')} - {bimestre}/{ano}",
-        ln=True,
-        align="C",
+        [(str(k), int(v)) for k, v in produtos_totais.items()],
+        [(str(k), int(v)) for k, v in agrupado.items()],
+        [(str(k), int(v)) for k, v in contagem_extras.items()],
     )
-    pdf.ln(10)
-
-    # 📦 Total por produto individual
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(0, 10, "Total por Produto Individual:", ln=True)
-    pdf.set_font("Arial", "", 11)
-    for produto, qtd in produtos_totais.items():
-        pdf.cell(0, 8, f"{qtd} x {produto}", ln=True)
-
-    # 📦 Total por conjunto de produtos (pedido)
-    pdf.ln(6)
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(0, 10, "Total por Conjunto de Produtos (Pedido):", ln=True)
-    pdf.set_font("Arial", "", 11)
-    for conjunto, qtd in agrupado.items():
-        pdf.cell(0, 8, f"{qtd} x {conjunto}", ln=True)
 
-    # 🎁 Produtos extras por cupom
-    produtos_extras = df[df["Valor Total"] == "0,00"]
-    if not produtos_extras.empty:
-        pdf.ln(10)
-        pdf.set_font("Arial", "B", 12)
-        pdf.cell(0, 10, "Produtos Extras por Cupom (R$ 0,00):", ln=True)
-        pdf.set_font("Arial", "", 11)
+    # 💾 Abre quando terminar (roda na thread de callback do pool: a falha chega à UI pelo sinal)
+    def _abrir(f: Future[str]) -> None:
+        try:
+            abrir_no_sistema(f.result())
+        except Exception as e:
+            logger.error("pdf_producao_falhou", extra={"caminho": caminho_pdf, "erro": str(e)})
+            comunicador_global.mostrar_mensagem.emit(
+                "erro", "PDF de produção", f"Não foi possível gerar o PDF de produção:\n{caminho_pdf}\n\n{e}"
+            )
+
+    if abrir:
+        futuro.add_done_callback(_abrir)
+    return futuro
+
 
-        contagem_extras = produtos_extras["Produto"].value_counts()
-        for nome_produto, qtd in contagem_extras.items():
-            pdf.cell(0, 8, f"{qtd} x {nome_produto}", ln=True)
+def escrever_xlsx_streaming(df: pd.DataFrame, output_path: str | PathLike[str], sheet_name: str = "Sheet1") -> None:
+    """Grava o DataFrame em .xlsx linha a linha, com memória constante.
 
-    # 💾 Salva e abre
-    pdf.output(caminho_pdf)
-    abrir_no_sistema(caminho_pdf)
+    Usa o modo `constant_memory` do XlsxWriter (cada linha vai direto para o arquivo temporário da aba);
+    sem XlsxWriter instalado, cai para o modo `write_only` do openpyxl. O layout é o mesmo do
+    `to_excel(index=False)`: cabeçalho na 1ª linha e nulos como células vazias.
+    """
+    cabecalho = [str(c) for c in df.columns]
+    valores = df.astype(object).where(df.notna(), None)
+    linhas = valores.itertuples(index=False, name=None)
+
+    try:
+        import xlsxwriter
+    except ImportError:
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(sheet_name)
+        ws.append(cabecalho)
+        for linha in linhas:
+            ws.append(list(linha))
+        wb.save(os.fspath(output_path))
+        return
 
+    with xlsxwriter.Workbook(os.fspath(output_path), {"constant_memory": True}) as wb_x:
+        ws_x = wb_x.add_worksheet(sheet_name)
+        ws_x.write_row(0, 0, cabecalho)
+        for i, linha in enumerate(linhas, start=1):
+            ws_x.write_row(i, 0, linha)
+
+
+@rastreado("exportacao")
+def salvar_planilha_bling(
+    df: pd.DataFrame,
+    output_path: str,
+    *,
+    numero_inicial: int | None = None,
+    abrir_pdf: bool = True,
+    estado: MutableMapping[str, Any] | None = None,
+) -> None:
+    """Numera os pedidos por lote, gera o PDF de produção e grava a planilha no layout do Bling.
 
-def salvar_planilha_bling(df: pd.DataFrame, output_path: str) -> None:
+    Sem `numero_inicial`, o número do primeiro pedido é perguntado ao usuário. Lê ultimo_log e grava o
+    Future do PDF (estado["pdf_producao"]) e o frame exportado em `estado` — por padrão, o estado da GUI.
+    """
+    if estado is None:
+        estado = cast(MutableMapping[str, Any], globals()["estado"])
     if df is None or df.empty:
         comunicador_global.mostrar_mensagem.emit("erro", "Erro", "Nenhuma planilha foi carregada.")
         return
 
-    df_final = df.copy()
+    # cópia rasa basta: só atribuímos colunas inteiras / geramos frames novos (merge/sort), nunca in-place
+    df_final = df.copy(deep=False)
 
     # Garante colunas usadas adiante
     if "Transportadora" not in df_final.columns:
@@ -9877,12 +10207,13 @@ def salvar_planilha_bling(df: pd.DataFrame, output_path: str) -> None:
 
     # Numeração por lote (se houver)
     if "ID Lote" in df_final.columns:
-        parent = QApplication.activeWindow() or QWidget()
-        numero_inicial, ok = QInputDialog.getInt(
-            parent, "Número Inicial", "Informe o número inicial do pedido:", value=8000, min=1
-        )
-        if not ok:
-            return
+        if numero_inicial is None:
+            parent = QApplication.activeWindow() or QWidget()
+            numero_inicial, ok = QInputDialog.getInt(
+                parent, "Número Inicial", "Informe o número inicial do pedido:", value=8000, min=1
+            )
+            if not ok:
+                return
 
         df_final["Número pedido"] = ""
         lotes_ordenados = (
@@ -9897,11 +10228,8 @@ def salvar_planilha_bling(df: pd.DataFrame, output_path: str) -> None:
     else:
         df_final["Número pedido"] = ""
 
-    # Converte valores e calcula Total Pedido
-    # Aceita tanto entradas com vírgula quanto floats; evita quebrar se já for número
-    if df_final["Valor Total"].dtype != "float64" and df_final["Valor Total"].dtype != "int64":
-        df_final["Valor Total"] = df_final["Valor Total"].astype(str).str.replace(",", ".", regex=False)
-    df_final["Valor Total"] = pd.to_numeric(df_final["Valor Total"], errors="coerce")
+    # Calcula Total Pedido em centavos (colunas monetárias já são Int64; normaliza por segurança)
+    normalizar_colunas_monetarias(df_final, unidade="centavos")
 
     # Máscara para pedidos válidos (nem NaN nem "")
     tem_pedido_valido = df_final["Número pedido"].notna() & df_final["Número pedido"].astype(str).str.strip().ne("")
@@ -9921,7 +10249,7 @@ def salvar_planilha_bling(df: pd.DataFrame, output_path: str) -> None:
 
         df_final = pd.merge(df_final, total_por_pedido, on="Número pedido", how="left")
     else:
-        df_final["Total Pedido"] = pd.NA
+        df_final["Total Pedido"] = pd.Series(pd.NA, index=df_final.index, dtype="Int64")
 
     # Aviso sobre frete ausente (não bloqueia exportação)
     faltando_frete = df_final[
@@ -9937,28 +10265,19 @@ def salvar_planilha_bling(df: pd.DataFrame, output_path: str) -> None:
             f"{len(faltando_frete)} item(ns) estão sem frete cotado. Eles serão exportados mesmo assim.",
         )
 
-    # >>> A PARTIR DAQUI, FORMATAÇÃO APENAS PARA EXIBIÇÃO/EXPORTAÇÃO <<<
-    # Mantém números como floats; se quiser saída com vírgula para o Excel apenas visualmente,
-    # use formatos no Excel ou formate aqui em string (mas isso vira texto no arquivo).
-    # Abaixo mantém como string com vírgula (se você realmente precisar assim):
-    df_final["Valor Total"] = df_final["Valor Total"].map(
-        lambda x: f"{x:.2f}".replace(".", ",") if pd.notnull(x) else ""
-    )
-    df_final["Total Pedido"] = df_final["Total Pedido"].map(
-        lambda x: f"{x:.2f}".replace(".", ",") if pd.notnull(x) else ""
-    )
-
-    # PDF (usa periodo/ano de ultimo_log; se não houver, fallback)
+    # PDF (usa periodo/ano de ultimo_log; se não houver, fallback) — só lê df_final, sem cópia
     try:
-        df_para_pdf = df_final.copy()
+        df_para_pdf = df_final
         data_envio_str = df_para_pdf["Data"].dropna().iloc[0]
         data_envio = datetime.strptime(data_envio_str, "%d/%m/%Y").replace(tzinfo=TZ_APP)
 
-        raw_info = estado.get("ultimo_log") if isinstance(estado, dict) else None
+        raw_info = estado.get("ultimo_log")
         info = cast(dict[str, Any], raw_info or {})
         periodo = info.get("periodo", info.get("bimestre", 1))
         ano_pdf = info.get("ano", data_envio.year)
-        gerar_pdf_producao_logistica(df_para_pdf, data_envio, periodo, ano_pdf, output_path)
+        estado["pdf_producao"] = gerar_pdf_producao_logistica(
+            df_para_pdf, data_envio, periodo, ano_pdf, output_path, abrir=abrir_pdf
+        )
     except Exception as e:
         print(f"[⚠️] Erro ao gerar PDF: {e}")
 
@@ -9971,18 +10290,27 @@ def salvar_planilha_bling(df: pd.DataFrame, output_path: str) -> None:
         df_final = df_final[colunas]
 
     # Padroniza frete
-    df_final[["Transportadora", "Serviço"]] = df_final.apply(
-        lambda row: pd.Series(padronizar_transportadora_servico(row)), axis=1
-    )
+    df_final["Transportadora"], df_final["Serviço"] = padronizar_transportadora_servico_df(df_final)
 
+    # cópia profunda: df_final começou raso e ainda pode dividir buffers com o frame de quem chamou
     estado["df_planilha_exportada"] = df_final.copy()
 
     # Remove colunas internas antes de exportar
     colunas_remover = ["Conjunto Produtos", "ID Lote", "indisponivel"]
     df_para_exportar = df_final.drop(columns=colunas_remover, errors="ignore")
 
+    # Único ponto de formatação monetária: centavos → "1234,56" (texto aceito pelo Bling)
+    for col in COLUNAS_MONETARIAS:
+        if col in df_para_exportar.columns:
+            df_para_exportar[col] = formatar_centavos_serie(df_para_exportar[col])
+
     try:
-        df_para_exportar.to_excel(output_path, index=False)
+        t0 = time.perf_counter()
+        escrever_xlsx_streaming(df_para_exportar, output_path)
+        logger.info(
+            "planilha_bling_exportada",
+            extra={"linhas": len(df_para_exportar), "elapsed_ms": int((time.perf_counter() - t0) * 1000)},
+        )
         comunicador_global.mostrar_mensagem.emit("info", "Sucesso", f"Planilha exportada para:\n{output_path}")
     except Exception as e:
         comunicador_global.mostrar_mensagem.emit("erro", "Erro ao salvar", f"{e}")
@@ -10448,20 +10776,6 @@ def abrir_editor_produtos(box_nome_input: QComboBox | None = None) -> None:
 # Montar PDF de auxílio com XMLs
 
 
-def obter_nfes_zip(caminho_zip: str, pasta_destino: str = "/tmp/xmls_extraidos") -> list[str]:
-    """Extrai arquivos .xml de um ZIP para a pasta destino e retorna os caminhos extraídos."""
-    # Limpa a pasta antes de extrair
-    if os.path.exists(pasta_destino):
-        shutil.rmtree(pasta_destino)
-    os.makedirs(pasta_destino)
-
-    with zipfile.ZipFile(caminho_zip, "r") as zip_ref:
-        nomes_extraidos: list[str] = [
-            zip_ref.extract(nome, path=pasta_destino) for nome in zip_ref.namelist() if nome.endswith(".xml")
-        ]
-    return nomes_extraidos
-
-
 def ler_dados_nfes(
     caminho_xml: str,
 ) -> tuple[str | None, str | None, str | None, list[str]]:
@@ -10469,96 +10783,32 @@ def ler_dados_nfes(
 
     Retorna: (nNF, xNome, transportadora, produtos)
     """
-    try:
-        tree = ET.parse(caminho_xml)
-        root = tree.getroot()
-        ns = {"nfe": "http://www.portalfiscal.inf.br/nfe"}
-        infNFe = root.find(".//nfe:infNFe", ns)
-
-        nNF: str | None = infNFe.findtext("nfe:ide/nfe:nNF", namespaces=ns) if infNFe else None
-        xNome: str | None = infNFe.findtext("nfe:dest/nfe:xNome", namespaces=ns) if infNFe else None
-        xNomeTransportadora: str | None = (
-            infNFe.findtext("nfe:transp/nfe:transporta/nfe:xNome", namespaces=ns) if infNFe else None
-        ) or "Sem Transportadora"
-
-        produtos: list[str] = []
-        if infNFe is not None:
-            for det in infNFe.findall("nfe:det", ns):
-                xProd = det.findtext("nfe:prod/nfe:xProd", namespaces=ns)
-                if xProd:
-                    produtos.append(xProd.strip())
-
-        return nNF, xNome, xNomeTransportadora, produtos
-
-    except Exception as e:
-        print(f"Erro ao processar {caminho_xml}: {e}")
-        return None, None, None, []
+    return ler_dados_nfe(caminho_xml, origem=caminho_xml)
 
 
 def organizar_nfes_por_transportadora(
     lista_xml: Sequence[str],
 ) -> dict[str, dict[str, dict[str, Any]]]:
     """{ transportadora: { nNF: {"xNome": str, "produtos": list[str]} } }"""
-    agrupado: dict[str, dict[str, dict[str, Any]]] = defaultdict(
-        lambda: defaultdict(lambda: {"xNome": "", "produtos": []})
-    )
-
-    for caminho in lista_xml:
-        nNF, xNome, transportadora, produtos = ler_dados_nfes(caminho)  # nNF/transportadora podem ser None
-        # garanta chaves válidas:
-        if not nNF or not transportadora:
-            continue
-
-        nome_dest = xNome or ""  # xNome pode ser None -> converte para str
-        produtos = produtos or []  # segurança (já é list[str], mas evita None acidental)
-
-        agrupado[transportadora][nNF]["xNome"] = nome_dest
-        agrupado[transportadora][nNF]["produtos"].extend(produtos)
-
-    return agrupado
+    return agrupar_por_transportadora(ler_dados_nfes(caminho) for caminho in lista_xml)
 
 
+@rastreado("pdf_nfes", itens=len)
 def salvar_pdfs_nfes_producao(
     dados_por_transportadora: Mapping[str, Mapping[str, dict[str, Any]]],
     pasta_destino: str = "/tmp/pdfs_por_transportadora",
 ) -> list[str]:
+    """Um PDF por transportadora, renderizados em paralelo (um documento por processo)."""
     os.makedirs(pasta_destino, exist_ok=True)
-    caminhos: list[str] = []
+    tarefas: list[tuple[str, list[tuple[str, dict[str, Any]]]]] = []
 
     for transportadora, notas in dados_por_transportadora.items():
         # Sanitizar nome para nome de arquivo
         nome_arquivo = f"{transportadora.replace(' ', '_').replace('/', '-')}.pdf"
         caminho_pdf = os.path.join(pasta_destino, nome_arquivo)
+        tarefas.append((caminho_pdf, sorted(notas.items())))
 
-        c = canvas.Canvas(caminho_pdf, pagesize=A4)
-        _largura, altura = A4
-        margem_sup = 10 * mm
-        margem_inf = 10 * mm
-        y = altura - margem_sup
-
-        for nNF, dados in sorted(notas.items()):
-            if y < margem_inf + 25 * mm:
-                c.showPage()
-                y = altura - margem_sup
-
-            c.setFont("Helvetica-Bold", 10)
-            c.drawString(15 * mm, y, f"NF {nNF} - Destinatário: {dados['xNome']}")
-            y -= 5 * mm
-
-            c.setFont("Helvetica", 9)
-            for produto in dados["produtos"]:
-                if y < margem_inf + 10 * mm:
-                    c.showPage()
-                    y = altura - margem_sup
-                c.drawString(20 * mm, y, f"- 1x {produto}")
-                y -= 4 * mm
-
-            y -= 5 * mm  # espaço entre NF-es
-
-        c.save()
-        caminhos.append(caminho_pdf)
-
-    return caminhos
+    return renderizar_em_paralelo(renderizar_pdf_notas, tarefas)
 
 
 def gerar_pdfs_nfes_producao(estado: MutableMapping[str, Any]) -> None:
@@ -10571,10 +10821,8 @@ def gerar_pdfs_nfes_producao(estado: MutableMapping[str, Any]) -> None:
         if not caminho_zip:
             return
 
-        # Se suas funções já têm tipos melhores, troque Sequence/Mapping por eles
-        lista_xmls: Sequence[str] = cast(Sequence[str], obter_nfes_zip(caminho_zip))
-
-        dados_agrupados: Mapping[str, Any] = cast(Mapping[str, Any], organizar_nfes_por_transportadora(lista_xmls))
+        # lê os XMLs direto do ZIP (sem extrair para disco), em paralelo para lotes grandes
+        dados_agrupados: Mapping[str, Any] = organizar_nfes_zip(caminho_zip)
         # Se você pretende mutar depois em outro lugar, materializa como dict
         estado["dados_agrupados_nfe"] = dict(dados_agrupados)
 
@@ -10912,6 +11160,10 @@ def criar_grupo_controle(estado: MutableMapping[str, Any]) -> QGroupBox:
     btn_zip.clicked.connect(lambda: gerar_pdfs_nfes_producao(estado))
     linha_export.addWidget(btn_zip)
 
+    btn_exportar_log = QPushButton("📤 Exportar log de envios")
+    btn_exportar_log.clicked.connect(exportar_log_envios)
+    linha_export.addWidget(btn_exportar_log)
+
     btn_resetar_planilha = QPushButton("🗑️ Limpar Planilha")
     btn_resetar_planilha.clicked.connect(resetar_planilha)
     linha_export.addWidget(btn_resetar_planilha)
@@ -10922,6 +11174,16 @@ def criar_grupo_controle(estado: MutableMapping[str, Any]) -> QGroupBox:
     return group
 
 
+def exportar_metricas_http() -> None:
+    caminhos = gravar_metricas_http()
+    if caminhos:
+        comunicador_global.mostrar_mensagem.emit(
+            "info", "Métricas HTTP", "Gravadas em:\n" + "\n".join(map(str, caminhos))
+        )
+    else:
+        comunicador_global.mostrar_mensagem.emit("erro", "Métricas HTTP", "Não foi possível gravar as métricas.")
+
+
 def abrir_interface(
     estado: MutableMapping[str, Any],
     skus_info: MutableMapping[str, MutableMapping[str, Any]],
@@ -10990,10 +11252,388 @@ def abrir_interface(
     layout_principal.addWidget(criar_grupo_fretes(estado, transportadoras_var))
     layout_principal.addWidget(criar_grupo_controle(estado))
 
+    # Ctrl+Shift+M: grava as métricas HTTP da sessão (JSON + Prometheus) na pasta de logs, sob demanda
+    atalho_metricas = QShortcut(QKeySequence("Ctrl+Shift+M"), janela)
+    atalho_metricas.activated.connect(exportar_metricas_http)
+
     janela.show()
     app.exec_()
 
 
+# Execução sem interface (--mode cli)
+
+
+def _conectar_direto(sinal: pyqtBoundSignal, slot: Callable[..., Any]) -> None:
+    """connect com Qt.DirectConnection: o slot roda na thread que emitiu (não há loop de eventos para enfileirar)."""
+    cast(Any, sinal).connect(slot, Qt.DirectConnection)  # o stub do PyQt não tipa o 2º argumento
+
+
+@contextmanager
+def _stdout_reservado() -> Iterator[TextIO]:
+    """Reserva o stdout do processo para o relatório: console de log e print() vão para o stderr."""
+    real = cast(TextIO, sys.__stdout__ or sys.stdout)
+    consoles = [
+        h
+        for h in handlers_de_saida()
+        if type(h) is logging.StreamHandler and h.stream is real  # FileHandler/Rotating ficam como estão
+    ]
+    for h in consoles:
+        h.setStream(sys.__stderr__ or sys.stderr)
+    try:
+        # com LOG_CAPTURE_STDOUT ativo o print() já vai para o logger; senão desvia para o stderr
+        with redirect_stdout(sys.stderr) if sys.stdout is real else nullcontext():
+            yield real
+    finally:
+        descarregar_logs()  # o que ficou na fila sai no stderr, não depois do relatório
+        for h in consoles:
+            h.setStream(real)
+
+
+class PipelineHeadless:
+    """Coleta Guru/Shopify → planilha → lotes → fretes → exportação Bling, sem loop de eventos Qt.
+
+    As tarefas por pedido (os mesmos QRunnables da GUI) rodam nas faixas de um ExecutorGerenciado
+    próprio da execução (limite total = max_workers), com os sinais ligados por
+    Qt.DirectConnection; Guru e Shopify são coletados em paralelo. Ao final, imprime no
+    stdout (e grava em output_dir) o relatório JSON da execução.
+    """
+
+    def __init__(self, cfg: PipelineConfig, skus_info: Mapping[str, Any]) -> None:
+        self.cfg = cfg
+        self.skus_info = skus_info
+        self.saida = Path(cfg.output_dir)
+        self.carimbo = local_now().strftime("%Y%m%d_%H%M%S")
+        self.etapas: list[dict[str, Any]] = []
+        self.contagens: dict[str, int] = {}
+        self.mensagens: list[dict[str, str]] = []
+        self.artefatos: list[str] = []
+        self._lock = threading.Lock()
+        self._cancelador = threading.Event()
+        self._executor: ExecutorGerenciado | None = None
+        # estado da execução (no lugar do `estado` global da GUI): planilha, ultimo_log, PDF, fretes da Shopify
+        self.estado: dict[str, Any] = {
+            "skus_info": skus_info,
+            "cancelador_global": self._cancelador,
+            "etapas_finalizadas": {},
+            "dados_temp": {},
+        }
+
+    # ---- registro ----
+    @contextmanager
+    def etapa(self, nome: str) -> Iterator[None]:
+        """Cronometra a etapa e registra status/erro no relatório (a exceção continua subindo).
+
+        A etapa também é um span do rastreamento: as etapas rastreadas chamadas dentro dela (e as
+        chamadas HTTP) aparecem aninhadas no relatório da execução gravado na pasta de logs.
+        """
+        registro: dict[str, Any] = {"nome": nome, "status": "ok"}
+        t0 = time.perf_counter()
+        logger.info("pipeline_etapa_inicio", extra={"etapa": nome})
+        try:
+            with span(nome):
+                yield
+        except BaseException as e:
+            registro["status"] = "erro"
+            registro["erro"] = f"{type(e).__name__}: {e}"
+            logger.exception("pipeline_etapa_erro", extra={"etapa": nome})
+            raise
+        finally:
+            registro["duracao_s"] = round(time.perf_counter() - t0, 3)
+            with self._lock:
+                self.etapas.append(registro)
+            logger.info("pipeline_etapa_fim", extra=registro)
+
+    def _contar(self, chave: str, valor: int) -> None:
+        with self._lock:
+            self.contagens[chave] = self.contagens.get(chave, 0) + int(valor)
+
+    def _progresso(self, texto: str, atual: int, total: int) -> None:
+        logger.debug("pipeline_progresso", extra={"texto": texto, "atual": atual, "total": total})
+
+    def _prazo_esgotado(self) -> None:
+        self._registrar_mensagem("erro", "Pipeline", f"Prazo de {self.cfg.prazo_s:g}s esgotado; execução cancelada.")
+        self._cancelador.set()
+
+    def _registrar_mensagem(self, tipo: str, titulo: str, texto: str) -> None:
+        """Substitui o QMessageBox: avisos/erros viram log e entram no relatório."""
+        with self._lock:
+            self.mensagens.append({"tipo": tipo, "titulo": titulo, "texto": texto})
+        nivel = {"erro": logging.ERROR, "info": logging.INFO}.get(tipo, logging.WARNING)
+        logger.log(nivel, "pipeline_mensagem", extra={"tipo": tipo, "titulo": titulo, "texto": texto})
+
+    def _novo_estado(self) -> dict[str, Any]:
+        """Estado isolado por fonte (os fluxos da GUI guardam resultados parciais no dicionário).
+
+        Só o dados_temp é o da execução: fretes/descontos da Shopify são lidos depois por `aplicar_lotes`.
+        """
+        return {
+            "skus_info": self.skus_info,
+            "cancelador_global": self._cancelador,
+            "etapas_finalizadas": {},
+            "dados_temp": self.estado["dados_temp"],
+        }
+
+    # ---- Guru ----
+    @perfilado("pipeline_guru", memoria=True)
+    def coletar_guru(self, cfg: GuruEtapa) -> pd.DataFrame:
+        est = self._novo_estado()
+        with self.etapa(f"guru_{cfg.modo}"):
+            if cfg.modo == "assinaturas":
+                if cfg.box_nome and produto_indisponivel(cfg.box_nome):
+                    raise UserError(f"Box indisponível no SKUs: {cfg.box_nome}", code="BAD_INPUT")
+                dados = montar_dados_busca_assinaturas(
+                    cfg.ano, cfg.mes, cfg.periodicidade, cfg.modo_periodo, cfg.box_nome, ler_regras_assinaturas(est)
+                )
+                est["subscriptions_idx"] = build_subscriptions_index(fetch_all_subscriptions(), self.skus_info)
+                # período/ano do PDF de produção (salvar_planilha_bling lê do estado da execução)
+                self.estado["ultimo_log"] = {"ano": dados["ano"], "mes": dados["mes"], "periodo": dados["periodo"]}
+                transacoes, _, dados_final = gerenciar_coleta_vendas_assinaturas(
+                    dados, atualizar=self._progresso, cancelador=self._cancelador, estado=est
+                )
+            else:
+                assert cfg.data_ini is not None and cfg.data_fim is not None
+                produtos_ids = ids_guru_dos_produtos(self.skus_info, cfg.produtos)
+                if not produtos_ids:
+                    raise UserError("Nenhum produto com IDs da Guru encontrado no SKUs.", code="BAD_INPUT")
+                dados = {
+                    "modo": "produtos",
+                    "inicio": cfg.data_ini.isoformat(),
+                    "fim": cfg.data_fim.isoformat(),
+                    "produtos_ids": produtos_ids,
+                    "box_nome": cfg.box_nome,
+                    "transportadoras_permitidas": list(self.cfg.fretes.transportadoras) if self.cfg.fretes else [],
+                }
+                transacoes, _, dados_final = coletar_vendas_produtos(
+                    dados, atualizar=self._progresso, cancelador=self._cancelador, estado=est
+                )
+            self._contar("guru_transacoes", len(transacoes))
+            self._contar("guru_transacoes_com_erro", len(est.get("transacoes_com_erro") or []))
+
+            montar_planilha_vendas_guru(
+                transacoes=transacoes,
+                dados=dict(dados_final),
+                atualizar_etapa=self._progresso,
+                skus_info=self.skus_info,
+                cancelador=self._cancelador,
+                estado=est,
+            )
+            df = cast(pd.DataFrame, est.get("df_planilha_parcial", pd.DataFrame()))
+            self._contar("guru_linhas", len(df))
+        return df
+
+    # ---- Shopify ----
+    def _buscar_pedidos_shopify(self, cfg: ShopifyEtapa, est: MutableMapping[str, Any]) -> list[dict[str, Any]]:
+        pedidos: list[dict[str, Any]] = []
+        erros: list[str] = []
+        runnable = ColetarPedidosShopify(cfg.data_inicio.strftime("%d/%m/%Y"), est, cfg.fulfillment_status)
+        _conectar_direto(runnable.sinais.resultado, pedidos.extend)
+        _conectar_direto(runnable.sinais.erro, erros.append)
+        runnable.run()
+        if erros:
+            raise ExternalError(erros[0], code="SHOPIFY_ERROR")
+        return pedidos
+
+    @perfilado("pipeline_shopify", memoria=True)
+    def coletar_shopify(self, cfg: ShopifyEtapa) -> pd.DataFrame:
+        est = self._novo_estado()
+        with self.etapa("shopify_pedidos"):
+            pedidos = self._buscar_pedidos_shopify(cfg, est)
+            self._contar("shopify_pedidos", len(pedidos))
+
+        with self.etapa("shopify_planilha"):
+            df = construir_df_temp_shopify(pedidos, cfg.produto, self.skus_info, est)
+            self._contar("shopify_linhas", len(df))
+        if df.empty:
+            return df
+
+        with self.etapa("shopify_enriquecimento"):
+            assert self._executor is not None
+            enriquecimento = EnriquecimentoPedidos(est, df)
+            enriquecimento.iniciar(self._executor)
+            enriquecimento.aguardar()
+            for chave, pendentes in enriquecimento.pendentes.items():
+                self._contar(f"shopify_{chave}", pendentes.total)
+            enriquecimento.consolidar()
+
+        # quando cada etapa esvaziou, contado a partir do início do enriquecimento
+        with self._lock:
+            self.etapas.extend(
+                {"nome": f"shopify_{chave}", "status": "ok", "duracao_s": duracao}
+                for chave, duracao in enriquecimento.duracoes.items()
+            )
+
+        return cast(pd.DataFrame, est.get("df_planilha_parcial", df))
+
+    # ---- lotes, fretes e exportação ----
+    def cotar_fretes(self, df: pd.DataFrame) -> pd.DataFrame:
+        with self.etapa("lotes"):
+            df = aplicar_lotes(df, self.estado)
+            self._contar("lotes", int(df["ID Lote"].replace("", pd.NA).nunique()))
+
+        if self.cfg.fretes is None:
+            return df
+
+        with self.etapa("fretes"):
+            assert self._executor is not None
+            transportadoras = list(self.cfg.fretes.transportadoras)
+            futuros = [
+                self._executor.submeter("fretebarato", partial(cotar_fretes, lote, linhas, transportadoras))
+                for lote, linhas in agrupar_linhas_por_lote(df)
+            ]
+            cotados = 0
+            for f in futuros:
+                resultado = f.result()
+                if not resultado:
+                    continue
+                lote_id, nome_transportadora, nome_servico, _valor = resultado
+                mascara = df["ID Lote"] == lote_id
+                df.loc[mascara, "Transportadora"] = nome_transportadora
+                df.loc[mascara, "Serviço"] = nome_servico
+                cotados += 1
+            self._contar("fretes_cotados", cotados)
+            self._contar("fretes_sem_cotacao", len(futuros) - cotados)
+        return df
+
+    def exportar(self, df: pd.DataFrame) -> None:
+        with self.etapa("exportacao_bling"):
+            caminho = self.saida / f"bling_{self.carimbo}.xlsx"
+            self.estado.pop("pdf_producao", None)
+            salvar_planilha_bling(
+                df, str(caminho), numero_inicial=self.cfg.numero_inicial, abrir_pdf=False, estado=self.estado
+            )
+            if not caminho.exists():
+                raise RuntimeError(f"planilha do Bling não foi gravada: {caminho}")
+            self.artefatos.append(str(caminho))
+            self._contar("linhas_exportadas", len(cast(pd.DataFrame, self.estado.get("df_planilha_exportada", df))))
+
+            futuro_pdf = cast(Future[str] | None, self.estado.pop("pdf_producao", None))
+            if futuro_pdf is not None:
+                with span("pdf_producao"):
+                    self.artefatos.append(futuro_pdf.result(timeout=300))
+
+    # ---- orquestração ----
+    @perfilado("pipeline", memoria=True)
+    def _executar_etapas(self) -> None:
+        partes: list[pd.DataFrame] = []
+        assert self._executor is not None
+        futuros: list[Future[pd.DataFrame]] = []
+        if self.cfg.guru is not None:
+            futuros.append(self._executor.submeter("tarefas", partial(self.coletar_guru, self.cfg.guru)))
+        if self.cfg.shopify is not None:
+            futuros.append(self._executor.submeter("tarefas", partial(self.coletar_shopify, self.cfg.shopify)))
+        for f in futuros:
+            try:
+                partes.append(f.result())
+            except Exception:
+                continue  # já registrado na etapa; a outra fonte segue
+
+        partes = [p for p in partes if isinstance(p, pd.DataFrame) and not p.empty]
+        if not partes:
+            self._registrar_mensagem("aviso", "Pipeline", "Nenhuma linha coletada; nada a exportar.")
+            return
+
+        df = normalizar_colunas_monetarias(pd.concat(partes, ignore_index=True), unidade="centavos")
+        self._contar("linhas_planilha", len(df))
+        self.estado["df_planilha_parcial"] = df
+
+        df = self.cotar_fretes(df)
+        self.estado["df_planilha_parcial"] = df
+        self.exportar(df)
+
+    def _relatorio(
+        self,
+        iniciado_em: str,
+        duracao_s: float,
+        chamadas_http: Counter[str],
+        chamadas_gpt: int,
+        rastreamento: Path | None,
+    ) -> dict:
+        falhas = [e["nome"] for e in self.etapas if e["status"] != "ok"]
+        exportou = any(a.endswith(".xlsx") for a in self.artefatos)
+        status = "ok" if exportou and not falhas else ("parcial" if exportou else "erro")
+        return {
+            "status": status,
+            "iniciado_em": iniciado_em,
+            "duracao_s": round(duracao_s, 3),
+            "config": self.cfg.model_dump(mode="json"),
+            "etapas": self.etapas,
+            "contagens": self.contagens,
+            "chamadas_api": {
+                "http_por_host": dict(chamadas_http),
+                "http_total": sum(chamadas_http.values()),
+                "http_por_rota": ativar_metricas_http().para_dict()["series"],
+                "openai": chamadas_gpt,
+                "retentativas": orcamento_retentativas.para_dict(),
+                "disjuntores": disjuntores.para_dict(),
+            },
+            "executor": self._executor.metricas() if self._executor is not None else {},
+            "artefatos": self.artefatos,
+            "mensagens": self.mensagens,
+            "rastreamento": str(rastreamento) if rastreamento else None,
+        }
+
+    def executar(self) -> int:
+        """Roda o pipeline, imprime o relatório JSON no stdout e retorna 0 (ok) ou 1."""
+        iniciado_em = local_now().isoformat()
+        t0 = time.perf_counter()
+        gpt_antes = gpt_limiter.chamadas
+        execucao = iniciar_execucao()
+        metricas = ativar_metricas_http()
+        metricas.limpar()
+        orcamento_retentativas.limpar()
+        disjuntores.limpar()
+
+        # produto_indisponivel consulta o catálogo no estado global (o resto fica em self.estado)
+        estado["skus_info"] = self.skus_info
+
+        # mensagens da GUI (QMessageBox) viram log + relatório, entregues na própria thread que emitiu
+        comunicador_global.mostrar_mensagem.disconnect(slot_mostrar_mensagem)
+        _conectar_direto(comunicador_global.mostrar_mensagem, self._registrar_mensagem)
+        disjuntores.ao_mudar(avisar_servico_indisponivel)
+        chamadas_http: Counter[str] = Counter()
+        stdout: TextIO = sys.stdout
+        # max_workers limita a saída da execução inteira; a coleta da Guru (executor_global) usa as mesmas faixas
+        executor = self._executor = ExecutorGerenciado(limite_total=self.cfg.max_workers)
+        ativar_executor(executor)
+        # o prazo vai junto com as tarefas (esperas e timeouts HTTP); no fim dele a execução é cancelada
+        prazo = Prazo(self.cfg.prazo_s, self._cancelador)
+        alarme = threading.Timer(self.cfg.prazo_s, self._prazo_esgotado) if self.cfg.prazo_s else None
+        try:
+            with contar_chamadas_http() as chamadas_http, _stdout_reservado() as stdout, no_prazo(prazo):
+                if alarme is not None:
+                    alarme.daemon = True
+                    alarme.start()
+                try:
+                    self._executar_etapas()
+                except KeyboardInterrupt:
+                    self._cancelador.set()
+                    executor.cancelar_pendentes()
+                    raise
+                except Exception:
+                    pass  # já registrado na etapa que falhou
+                finally:
+                    executor.encerrar(cancelar_pendentes=False)  # drena o que ficou na fila
+        finally:
+            if alarme is not None:
+                alarme.cancel()
+            ativar_executor(None)
+            disjuntores.deixar_de_ouvir(avisar_servico_indisponivel)
+            comunicador_global.mostrar_mensagem.disconnect(self._registrar_mensagem)
+            comunicador_global.mostrar_mensagem.connect(slot_mostrar_mensagem)
+
+        rastreamento = gravar_relatorio(execucao=execucao)
+        gravar_metricas_http()
+        gravar_perfis()
+        relatorio = self._relatorio(
+            iniciado_em, time.perf_counter() - t0, chamadas_http, gpt_limiter.chamadas - gpt_antes, rastreamento
+        )
+        texto = json.dumps(relatorio, ensure_ascii=False, indent=2, default=str)
+        caminho_relatorio = self.saida / f"relatorio_{self.carimbo}.json"
+        caminho_relatorio.write_text(texto, encoding="utf-8")
+        print(texto, file=stdout, flush=True)
+        return 0 if relatorio["status"] == "ok" else 1
+
+
 def run_gui() -> int:
     """
     Inicializa a interface gráfica garantindo logging e correlation_id.
@@ -11011,9 +11651,20 @@ def run_gui() -> int:
 
     # Gera um id único por execução (para rastreamento no log)
     set_correlation_id()
+    iniciar_execucao()
+    ativar_metricas_http()
+    disjuntores.ao_mudar(avisar_servico_indisponivel)  # host fora: aviso na hora, não depois dos timeouts
 
     logger.info("abrindo interface gráfica")
-    abrir_interface(estado, skus_info)
+    try:
+        abrir_interface(estado, skus_info)
+    finally:
+        disjuntores.deixar_de_ouvir(avisar_servico_indisponivel)
+        # tempo por etapa e latência por host/rota da sessão (todas as coletas/exportações feitas na janela)
+        gravar_relatorio()
+        gravar_metricas_http()
+        gravar_perfis()
+        ativar_executor(None)  # cancela a fila e loga as métricas por faixa
     return 0
 
 
@@ -11062,13 +11713,56 @@ def _load_payload_from_arg(value: str) -> dict[Any, Any]:
         raise UserError("JSON inválido em --config", code="BAD_JSON", data={"value": value}) from e
 
 
+# variáveis de ambiente cujos valores nunca vão para um cassete (viram {NOME})
+SEGREDOS_CASSETE = ("API_KEY_GURU", "SHOPIFY_TOKEN", "OPENAI_API_KEY", "FRETEBARATO_URL")
+
+
+def configurar_cassete_http(caminho: str | None, modo: str | None, escala: float | None) -> Cassete | None:
+    """Liga o cassete HTTP da execução (argumentos --cassete* ou LG_HTTP_CASSETE*).
+
+    `gravar` captura as respostas reais; `reproduzir` roda sem rede, com as latências gravadas
+    multiplicadas por `escala` (0 = sem espera).
+    """
+    caminho = caminho or os.getenv("LG_HTTP_CASSETE")
+    if not caminho:
+        return None
+    modo = (modo or os.getenv("LG_HTTP_CASSETE_MODO") or "reproduzir").strip().lower()
+    if modo not in ("gravar", "reproduzir"):
+        raise UserError(f"Modo de cassete inválido: {modo} (use gravar ou reproduzir)", code="USAGE")
+    if escala is None:
+        escala = float(os.getenv("LG_HTTP_CASSETE_ESCALA", "1") or 1)
+
+    segredos = {nome: str(getattr(settings, nome, "") or "") for nome in SEGREDOS_CASSETE}
+    cassete = Cassete(caminho, cast(Literal["gravar", "reproduzir"], modo), escala=escala, segredos=segredos)
+    ativar_cassete(cassete)
+    logging.getLogger("main").info(
+        "cassete_http_ativo", extra={"caminho": str(cassete.caminho), "modo": modo, "escala": cassete.escala}
+    )
+    return cassete
+
+
+def configurar_perfilamento(ligar: bool) -> Perfilador | None:
+    """Liga cProfile + tracemalloc nas threads de trabalho (argumento --perfil ou LG_PERFIL=1).
+
+    Os `.prof` (um da execução no Python 3.12+, um por thread antes) e o relatório com os tempos por
+    thread e as alocações vão para `perfil_<ts>` na pasta de logs ao fim da execução; `LG_PERFIL_TOP`
+    define quantas linhas de alocação entram no relatório.
+    """
+    if not (ligar or os.getenv("LG_PERFIL", "0") in ("1", "true", "True")):
+        return None
+    perfilador = Perfilador(top=int(os.getenv("LG_PERFIL_TOP", "25") or 25))
+    ativar_perfilamento(perfilador)
+    logging.getLogger("main").info("perfilamento_ativo", extra={"top": perfilador.top})
+    return perfilador
+
+
 @safe_cli
 def main(argv: list[str] | None = None) -> int:
     """
     Entry point com tratamento de erros padronizado pelo @safe_cli.
 
     - GUI (padrão): abre a interface
-    - CLI: recebe JSON inline ou arquivo .json com a configuração
+    - CLI: recebe JSON inline ou arquivo .json com a configuração do pipeline e roda sem interface
     """
 
     parser = argparse.ArgumentParser(
@@ -11090,8 +11784,31 @@ def main(argv: list[str] | None = None) -> int:
         action="store_true",
         help="Mostra detalhes de erro (equivalente a DEBUG=1).",
     )
+    parser.add_argument(
+        "--cassete",
+        help="Arquivo .jsonl.gz de cassete HTTP (gravar/reproduzir todas as chamadas). Env: LG_HTTP_CASSETE.",
+    )
+    parser.add_argument(
+        "--cassete-modo",
+        choices=["gravar", "reproduzir"],
+        help="gravar: captura respostas reais (sem segredos); reproduzir (padrão): roda sem rede.",
+    )
+    parser.add_argument(
+        "--cassete-escala",
+        type=float,
+        help="(reproduzir) Fator sobre as latências gravadas; 0 = sem espera. Padrão: 1.",
+    )
+    parser.add_argument(
+        "--perfil",
+        "--profile",
+        action="store_true",
+        help="Grava cProfile, tempos por thread e relatório de alocações na pasta de logs. Env: LG_PERFIL=1.",
+    )
 
     args = parser.parse_args(argv)
+    inicializar_ambiente()
+    configurar_cassete_http(args.cassete, args.cassete_modo, args.cassete_escala)
+    configurar_perfilamento(args.perfil)
 
     # apenas gera um correlation_id (logging já é configurado via sitecustomize)
     from common.logging_setup import set_correlation_id
@@ -11112,22 +11829,20 @@ def main(argv: list[str] | None = None) -> int:
             code="USAGE",
         )
 
+    from common.validation import ensure_output_dir, validate_pipeline_config
+
     payload = _load_payload_from_arg(args.config)
-    cfg = validate_config(payload)
-    ensure_paths(cfg)
+    cfg = validate_pipeline_config(payload)
+    ensure_output_dir(cfg.output_dir)
 
     # log básico confirmando config válida
     logger.info("config CLI validada", extra={"output_dir": cfg.output_dir})
 
-    # placeholder: executar orquestrador, se existir
-    # from app.runner import run_from_cfg
-    # return int(run_from_cfg(cfg) or 0)
-
-    # provisório: apenas confirmar
-    print(f"OK (CLI): output_dir={cfg.output_dir} (dry_run={cfg.dry_run})")
-    return 0
+    return PipelineHeadless(cfg, skus_info).executar()
 
 
 if __name__ == "__main__":
+    # executável congelado (PyInstaller): permite que os workers do pool de processos subam
+    multiprocessing.freeze_support()
     # importante: agora passamos SEMPRE pelo safe_cli
     raise SystemExit(main())
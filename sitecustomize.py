@@ -10,7 +10,7 @@ from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from typing import Literal, TextIO, cast
 
-from common.logging_setup import set_correlation_id, setup_logging
+from common.logging_setup import ativar_log_assincrono, set_correlation_id, setup_logging
 
 # tenta usar platformdirs; se não estiver instalado, cai para um fallback seguro
 try:  # pragma: no cover
@@ -109,6 +109,9 @@ except Exception:
     # Último fallback: se não conseguir abrir o arquivo, não falha o app — mantém só console
     pass
 
+# Console e arquivo passam a ser escritos por uma thread dedicada (LOG_ASYNC=0 desliga)
+ativar_log_assincrono()
+
 # 3) Correlation ID por execução
 set_correlation_id()
 
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import http.server
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from types import ModuleType
+from typing import Any
+
+import pytest
+
+from common.disjuntor import disjuntores
+
+HOST_LOCAL = "127.0.0.1"
+
+
+class Mensagens(list[tuple[str, str, str]]):
+    """Dublê de ``comunicador_global``: guarda (tipo, título, texto) em vez de abrir QMessageBox."""
+
+    @property
+    def mostrar_mensagem(self) -> Mensagens:
+        return self
+
+    def emit(self, tipo: str, titulo: str, texto: str) -> None:
+        self.append((tipo, titulo, texto))
+
+
+@pytest.fixture(scope="session")
+def main() -> ModuleType:
+    """O main.py importado sem janela (Qt offscreen)."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    import main as modulo
+
+    return modulo
+
+
+@pytest.fixture
+def mensagens(main: Any, monkeypatch: pytest.MonkeyPatch) -> Mensagens:
+    """Troca o ``comunicador_global`` do main por um que só registra as mensagens."""
+    registro = Mensagens()
+    monkeypatch.setattr(main, "comunicador_global", registro)
+    return registro
+
+
+@dataclass
+class ServidorHttp:
+    """Servidor HTTP local de um teste: `url` base (sem barra no fim) e os caminhos recebidos, em ordem."""
+
+    url: str
+    acessos: list[str] = field(default_factory=list)
+
+
+@pytest.fixture
+def servidor_http(request: pytest.FixtureRequest) -> Iterator[ServidorHttp]:
+    """ThreadingHTTPServer em 127.0.0.1 que responde todo GET do mesmo jeito.
+
+    Parametrize com ``indirect=True`` e um dict: ``status`` (int ou função caminho → int),
+    ``headers``, ``atraso_s`` (espera antes de responder) e ``disjuntor`` (ConfigDisjuntor do host).
+    O corpo é ``{"path": <caminho sem query>, "n": <nº do acesso>}``. No fim o disjuntor do host
+    volta ao padrão, tenha o teste configurado um ou não.
+    """
+    opcoes: dict[str, Any] = getattr(request, "param", None) or {}
+    status = opcoes.get("status", 200)
+    headers: dict[str, str] = opcoes.get("headers", {})
+    atraso_s: float = opcoes.get("atraso_s", 0.0)
+    lock = threading.Lock()
+    acessos: list[str] = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            with lock:
+                acessos.append(self.path)
+                n = len(acessos)
+            if atraso_s:
+                time.sleep(atraso_s)
+            corpo = json.dumps({"path": self.path.split("?")[0], "n": n}).encode()
+            self.send_response(status(self.path) if callable(status) else status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(corpo)))
+            for nome, valor in headers.items():
+                self.send_header(nome, valor)
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *_args: object) -> None:
+            pass
+
+    if "disjuntor" in opcoes:
+        disjuntores.configurar(HOST_LOCAL, opcoes["disjuntor"])
+    srv = http.server.ThreadingHTTPServer((HOST_LOCAL, 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        yield ServidorHttp(f"http://{HOST_LOCAL}:{srv.server_port}", acessos)
+    finally:
+        srv.shutdown()
+        srv.server_close()
+        disjuntores.configurar(HOST_LOCAL, disjuntores.cfg)
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from benchmarks.executar import BASELINE, CASOS, TAMANHO_TESTE, Medida, comparar, executar_casos
+
+# n pequeno oscila mais que o benchmark completo: aqui só pega regressões grosseiras (ex.: O(n²))
+TOLERANCIA_TESTE = 0.5
+
+
+@pytest.fixture(scope="module")
+def resultados() -> dict[str, dict[str, Medida]]:
+    return executar_casos([TAMANHO_TESTE], repeticoes=3)
+
+
+def test_todos_os_casos_rodam_sem_qt(resultados: dict[str, dict[str, Medida]]) -> None:
+    assert set(resultados) == {c.nome for c in CASOS}
+    for por_tamanho in resultados.values():
+        medida = por_tamanho[str(TAMANHO_TESTE)]
+        assert medida.itens > 0 and medida.itens_por_s > 0 and medida.vazao_relativa > 0
+
+
+def test_sem_regressao_em_relacao_ao_baseline(resultados: dict[str, dict[str, Medida]]) -> None:
+    baseline = json.loads(BASELINE.read_text(encoding="utf-8"))
+    assert all(str(TAMANHO_TESTE) in por_tamanho for por_tamanho in baseline["casos"].values())
+    assert comparar(resultados, baseline, tolerancia_vazao=TOLERANCIA_TESTE) == []
+
+
+def test_comparar_acusa_regressao_de_vazao_e_memoria() -> None:
+    baseline = {"casos": {"aplicar_lotes": {"1000": {"itens_por_s": 1_000.0, "vazao_relativa": 0.01, "pico_mb": 10.0}}}}
+    # vazão absoluta bem menor numa máquina lenta, mas a mesma razão com a calibração: passa
+    maquina_lenta = {"aplicar_lotes": {"1000": Medida(1000, 4.0, 250.0, 10.0, 0.0095)}}
+    fora = {"aplicar_lotes": {"1000": Medida(1000, 2.0, 5_000.0, 20.0, 0.005)}}
+    sem_baseline = {"aplicar_regras_assinaturas": {"1000": Medida(1000, 9.0, 1.0, 999.0, 0.001)}}
+    formato_antigo = {"casos": {"aplicar_lotes": {"1000": {"itens_por_s": 1e9, "pico_mb": 10.0}}}}
+
+    assert comparar(maquina_lenta, baseline) == []
+    vazao, memoria = comparar(fora, baseline)
+    assert "vazão" in vazao and "pico" in memoria
+    assert comparar(sem_baseline, baseline) == []
+    assert comparar(maquina_lenta, formato_antigo) == []
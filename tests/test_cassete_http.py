@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import gzip
+import json
+from collections.abc import Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+import requests
+
+from common.cassete_http import Cassete, ativar_cassete
+from common.errors import UserError
+
+if TYPE_CHECKING:
+    from tests.conftest import ServidorHttp
+
+SEGREDO = "tok-123-secreto"
+N_PAGINAS = 2
+
+
+@pytest.fixture(autouse=True)
+def _sem_cassete() -> Iterator[None]:
+    yield
+    ativar_cassete(None)
+
+
+def test_grava_sem_segredos_e_reproduz_sem_rede(servidor_http: ServidorHttp, tmp_path: Path) -> None:
+    base, recebidas = servidor_http.url, servidor_http.acessos
+    caminho = tmp_path / "guru.jsonl.gz"
+    segredos = {"API_KEY_GURU": SEGREDO}
+
+    ativar_cassete(Cassete(caminho, "gravar", segredos=segredos))
+    originais = [
+        requests.get(f"{base}/pedidos/{SEGREDO}?page={i}&api_key={SEGREDO}", timeout=5).json()
+        for i in range(1, N_PAGINAS + 1)
+    ]
+    ativar_cassete(None)  # fecha o arquivo
+    assert len(recebidas) == N_PAGINAS
+
+    bruto = gzip.decompress(caminho.read_bytes()).decode("utf-8")
+    assert SEGREDO not in bruto
+    primeira = json.loads(bruto.splitlines()[0])
+    assert primeira["url"].endswith("/pedidos/{API_KEY_GURU}?api_key=%2A%2A%2A&page=1")
+
+    esperas: list[float] = []
+    ativar_cassete(Cassete(caminho, "reproduzir", escala=0.5, segredos=segredos, dormir=esperas.append))
+    reproduzidas = [
+        requests.get(f"{base}/pedidos/{SEGREDO}?api_key={SEGREDO}&page={i}", timeout=5).json()
+        for i in range(1, N_PAGINAS + 1)
+    ]
+    # o corpo gravado também passou pela limpeza de segredos
+    assert reproduzidas == [{**o, "path": "/pedidos/{API_KEY_GURU}"} for o in originais]
+    assert len(recebidas) == N_PAGINAS  # nada saiu para a rede
+    assert len(esperas) == N_PAGINAS and all(e >= 0 for e in esperas)
+
+    with pytest.raises(requests.ConnectionError):
+        requests.get(f"{base}/nao-gravado", timeout=5)
+
+
+def test_reproduzir_sem_arquivo_e_erro_de_uso(tmp_path: Path) -> None:
+    with pytest.raises(UserError):
+        Cassete(tmp_path / "nao-existe.jsonl.gz", "reproduzir")
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import re
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any
+
+import pytest
+
+SKUS: dict[str, dict[str, Any]] = {
+    "Livro A": {"sku": "LIV-A", "tipo": "produto"},
+    "Livro B": {"sku": "LIV-B", "tipo": "produto"},
+    "Marcador": {"sku": "BR-1", "tipo": "brinde"},
+    "Kit Trio": {"sku": "KIT-3", "tipo": "combo", "composto_de": "LIV-A, LIV-B x 2; BR-1"},
+    "Kit Divisor": {
+        "sku": "KIT-D",
+        "tipo": "combo",
+        "composto_de": ["LIV-A", {"sku": "LIV-B", "qtd": 2}],
+        "divisor": "4",
+    },
+    "Kit Brindes": {"sku": "KIT-BR", "tipo": "combo", "composto_de": "BR-1*2"},
+    "Kit Caixa": {"sku": "KIT-CX", "tipo": "combo", "composto_de": "liv-a, Liv-B x2, br-1"},
+}
+Q = Decimal("0.01")
+
+
+def _split_antigo(nome_combo: str, total_reais: str, skus: dict[str, dict[str, Any]]) -> list[tuple[str, int, int]]:
+    """O rateio linha a linha de `desmembrar_combo_planilha` antes da TabelaCombos → [(produto, unit, total)]."""
+
+    def info_por_sku(sku: str) -> tuple[str, dict[str, Any]]:
+        for nome, info in skus.items():
+            if str(info.get("sku", "")).strip() == sku:
+                return nome, info
+        return sku, {}
+
+    def centavos(d: Decimal) -> int:
+        return int((d * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+    componentes = []
+    for parte in re.split(r"[;,]", skus[nome_combo]["composto_de"]):
+        m = re.match(r"^\s*([A-Za-z0-9._\-]+)\s*(?:[xX\*]\s*(\d+))?\s*$", parte)
+        assert m
+        componentes.append((m.group(1), int(m.group(2) or 1)))
+    cobrados = [(s, q) for s, q in componentes if info_por_sku(s)[1].get("tipo") != "brinde"]
+    brindes = [(s, q) for s, q in componentes if info_por_sku(s)[1].get("tipo") == "brinde"]
+    total = Decimal(total_reais)
+    unidades = sum(q for _, q in cobrados)
+    if total <= 0 or unidades == 0:
+        return [(info_por_sku(s)[0], 0, 0) for s, _ in componentes]
+
+    bruto = total / Decimal(unidades)
+    unit = bruto.quantize(Q, rounding=ROUND_HALF_UP)
+    saida, soma = [], Decimal("0.00")
+    for i, (sku, qtd) in enumerate(cobrados):
+        if i < len(cobrados) - 1:
+            item = (bruto * qtd).quantize(Q, rounding=ROUND_HALF_UP)
+            soma += item
+        else:
+            item = (total - soma).quantize(Q, rounding=ROUND_HALF_UP)
+        saida.append((info_por_sku(sku)[0], centavos(unit), centavos(item)))
+    return saida + [(info_por_sku(s)[0], 0, 0) for s, _ in brindes]
+
+
+def test_parse_composto_de_e_divisao_arredondada(main: Any) -> None:
+    assert main.parse_composto_de("A, B x 2; C*3, ???, ") == [("A", 1), ("B", 2), ("C", 3)]
+    assert main.parse_composto_de([{"SKU": "A", "qtd": "x"}, {"sku": "B", "quantity": 0}, "C X 4", 7]) == [
+        ("A", 1),
+        ("B", 1),
+        ("C", 4),
+    ]
+    assert main.parse_composto_de(None) == []
+    assert [main._div_arredondada(a, 4) for a in (0, 1, 2, 3, 5, 6)] == [0, 0, 1, 1, 1, 2]
+    assert main._div_arredondada(1000, 3) == 333  # noqa: PLR2004
+
+
+@pytest.mark.parametrize("total", ["100.00", "10.00", "0.01", "99.99", "0"])
+def test_ratear_igual_ao_split_antigo(main: Any, total: str) -> None:
+    tabela = main.TabelaCombos(SKUS)
+    novo = tabela.ratear(tabela.por_nome["Kit Trio"], main.para_centavos(total))
+    esperado = _split_antigo("Kit Trio", total, SKUS)
+    assert [(c["nome"], unit, item) for c, unit, item in novo] == esperado
+    if total != "0":  # o último cobrado fecha o total, com resto
+        assert sum(item for _c, _u, item in novo) == main.para_centavos(total)
+
+
+def test_ratear_divisor_explicito_e_so_brindes(main: Any) -> None:
+    tabela = main.TabelaCombos(SKUS)
+    kit = tabela.por_nome["Kit Divisor"]
+    assert kit["divisor"] == 4 and kit["unidades_cobradas"] == 3  # noqa: PLR2004
+    # 10,01 / 4 = 2,5025 → 2,50; o total não é fechado
+    assert [(c["sku"], u, t) for c, u, t in tabela.ratear(kit, 1001)] == [("LIV-A", 250, 250), ("LIV-B", 250, 500)]
+    assert [(u, t) for _c, u, t in tabela.ratear(tabela.por_nome["Kit Brindes"], 5000)] == [(0, 0)]
+    assert tabela.por_sku["KIT-3"] is tabela.por_nome["Kit Trio"]
+
+
+def test_sku_em_caixa_mista_resolve_como_o_cadastrado(main: Any) -> None:
+    # a busca por SKU do split antigo era exata: "br-1" não achava o brinde e era cobrado. A tabela
+    # compara em maiúsculas (como a expansão da Shopify já fazia), então o combo rateia igual ao
+    # mesmo combo escrito com os SKUs do cadastro.
+    tabela = main.TabelaCombos(SKUS)
+    novo = tabela.ratear(tabela.por_nome["Kit Caixa"], 1000)
+    assert [(c["nome"], u, t) for c, u, t in novo] == _split_antigo("Kit Trio", "10.00", SKUS)
+    assert [c["sku"] for c, _u, _t in novo] == ["liv-a", "Liv-B", "br-1"]  # grafia do composto_de
+    assert [n for n, _u, _t in _split_antigo("Kit Caixa", "10.00", SKUS)] == ["liv-a", "Liv-B", "br-1"]
+
+
+def test_desmembrar_combo_planilha_usa_o_rateio(main: Any) -> None:
+    linhas = main.desmembrar_combo_planilha(
+        {"produto_principal": "Kit Trio", "valor_total": "10,00"},
+        {"transaction_id": "tx-1", "Produto": "Kit Trio"},
+        SKUS,
+    )
+    assert [(r["Produto"], r["SKU"], r["Valor Unitário"], r["Valor Total"]) for r in linhas] == [
+        ("Livro A", "LIV-A", 333, 333),
+        ("Livro B", "LIV-B", 333, 667),
+        ("Marcador", "BR-1", 0, 0),
+    ]
+    assert all(r["is_combo"] and r["Combo"] == "Kit Trio" and r["transaction_id"] == "tx-1" for r in linhas)
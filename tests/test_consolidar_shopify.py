@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import threading
+from typing import Any
+
+import pandas as pd
+
+COLUNAS = [
+    "CPF/CNPJ Comprador",
+    *(f"{campo} {sufixo}" for sufixo in ("Comprador", "Entrega") for campo in ("Bairro", "Cidade", "UF")),
+    *(f"{campo} {sufixo}" for sufixo in ("Comprador", "Entrega") for campo in ("Endereço", "Número", "Complemento")),
+    "Precisa Contato",
+]
+
+
+def _df() -> pd.DataFrame:
+    tids = ["1001", "1001", " 1002 ", "1002", "1003", "1004", "1005", "1005"]
+    df = pd.DataFrame({"transaction_id": tids, **{c: [""] * len(tids) for c in COLUNAS}})
+    df["SKU"], df["Produto"] = "LIV-A", "Livro A"
+    df.loc[df["transaction_id"].str.strip() == "1002", ["Bairro Comprador", "Bairro Entrega", "Cidade Comprador"]] = [
+        " ",
+        "Antigo",
+        "Velha",
+    ]
+    return df
+
+
+def _endereco(base: str) -> dict[str, str]:
+    return {"endereco_base": base, "numero": "10", "complemento": "ap 1", "precisa_contato": "NÃO"}
+
+
+def _estado(df: pd.DataFrame) -> dict[str, Any]:
+    return {
+        "cancelador_global": threading.Event(),
+        "etapas_finalizadas": {"cpf": True, "bairro": True, "endereco": True},
+        "skus_info": {},
+        "df_temp": df,
+        "dados_temp": {
+            "cpfs": {"1001": "111", "gid://shopify/Order/1003": "333"},
+            # 1002: a consulta do CEP falhou; 1003: veio sem UF
+            "bairros": {"1001": "Centro", "1002": "", "1003": "Vila"},
+            "localidades": {"1001": ("Recife", "PE"), "1002": ("", ""), "1003": ("Olinda", "")},
+        },
+        "enderecos_normalizados": {
+            "1001": _endereco("Rua A"),
+            "1002": _endereco("Rua B"),
+            "gid://shopify/Order/1005": _endereco("Rua E"),
+        },
+    }
+
+
+def _preencher_antigo(main: Any, df: pd.DataFrame, estado: dict[str, Any]) -> None:
+    """O que BuscarBairroRunnable gravava por pedido + os laços `df.loc` de consolidar_planilha_shopify (b04657a^)."""
+    dados = estado["dados_temp"]
+    for pid, (cidade, uf) in dados["localidades"].items():
+        bairro = dados["bairros"][pid]
+        idx = df["transaction_id"].astype(str).str.strip() == pid
+        if bairro:
+            df.loc[idx, "Bairro Comprador"] = bairro
+            df.loc[idx, "Bairro Entrega"] = bairro
+        if cidade:
+            df.loc[idx, "Cidade Comprador"] = cidade
+            df.loc[idx, "Cidade Entrega"] = cidade
+        if uf:
+            df.loc[idx, "UF Comprador"] = uf
+            df.loc[idx, "UF Entrega"] = uf
+
+    for pedido_id, cpf in dados["cpfs"].items():
+        idx = df["transaction_id"].astype(str).str.strip() == main.normalizar_order_id(pedido_id)
+        df.loc[idx, "CPF/CNPJ Comprador"] = cpf
+    for pedido_id, bairro in dados["bairros"].items():
+        idx = df["transaction_id"].astype(str).str.strip() == main.normalizar_order_id(pedido_id)
+        df.loc[idx, "Bairro Comprador"] = bairro
+    for pedido_id, endereco in estado["enderecos_normalizados"].items():
+        pid = main.normalizar_order_id(pedido_id)
+        idx = df["transaction_id"].astype(str).str.strip() == pid
+        df.loc[idx, "Endereço Comprador"] = endereco.get("endereco_base", "")
+        df.loc[idx, "Número Comprador"] = endereco.get("numero", "")
+        df.loc[idx, "Complemento Comprador"] = endereco.get("complemento", "")
+        df.loc[idx, "Precisa Contato"] = endereco.get("precisa_contato", "")
+        df.loc[idx, "Endereço Entrega"] = endereco.get("endereco_base", "")
+        df.loc[idx, "Número Entrega"] = endereco.get("numero", "")
+        df.loc[idx, "Complemento Entrega"] = endereco.get("complemento", "")
+        df.loc[idx, "Bairro Entrega"] = dados["bairros"].get(pid, "")
+
+
+def test_consolidar_igual_ao_preenchimento_por_pedido(main: Any) -> None:
+    antigo = _df()
+    _preencher_antigo(main, antigo, _estado(antigo))
+
+    estado = _estado(_df())
+    main.consolidar_planilha_shopify(estado, None)
+    novo = estado["df_planilha_parcial"]
+
+    pd.testing.assert_frame_equal(novo[COLUNAS], antigo[COLUNAS])
+    # falha do CEP: Bairro Comprador fica "" (sobrescrito), o resto do 1002 sai do endereço normalizado
+    linha_1002 = novo.loc[2]
+    assert (linha_1002["Bairro Comprador"], linha_1002["Bairro Entrega"], linha_1002["Cidade Comprador"]) == (
+        "",
+        "",
+        "Velha",
+    )
+    assert (novo.loc[5, COLUNAS] == "").all()  # 1004 não foi consultado
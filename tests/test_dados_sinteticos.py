@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import json
+from collections import Counter
+from pathlib import Path
+
+from common.dados_sinteticos import GeradorSintetico, PerfilSintetico, carregar_catalogo, main
+
+N = 2_000
+
+
+def test_mesma_semente_gera_os_mesmos_registros() -> None:
+    a, b = GeradorSintetico(7), GeradorSintetico(7)
+    assert list(a.transacoes_guru(200)) == list(b.transacoes_guru(200))
+    assert list(a.pedidos_shopify(50)) == list(b.pedidos_shopify(50))
+    assert next(GeradorSintetico(8).transacoes_guru(1)) != next(a.transacoes_guru(1))
+
+
+def test_transacoes_guru_usam_o_catalogo_real() -> None:
+    skus, regras = carregar_catalogo()
+    cupons = {str(r["cupom"]["nome"]) for r in regras if r.get("applies_to") == "cupom"}
+    perfil = PerfilSintetico(mix_planos={"anual": 1.0}, taxa_cupom=1.0)
+    gerador = GeradorSintetico(3, perfil)
+    transacoes = list(gerador.transacoes_guru(N))
+
+    assert len(transacoes) == N
+    ids_planos = set(gerador.dados_guru()["ids_planos_todos"])
+    principais = [t for t in transacoes if not t["is_order_bump"]]
+    bumps = [t for t in transacoes if t["is_order_bump"]]
+    assert principais and bumps
+    assert all(t["product"]["internal_id"] in ids_planos for t in principais)
+    assert all(t["product"]["internal_id"] in skus[t["product"]["name"]]["guru_ids"] for t in transacoes)
+    assert {t["tipo_assinatura"] for t in transacoes} == {"anuais"}
+    assert {t["payment"]["coupon"]["coupon_code"] for t in principais} <= cupons
+    # renovações: algumas assinaturas aparecem em mais de uma transação principal
+    por_assinatura = Counter(t["subscription"]["id"] for t in principais)
+    assert max(por_assinatura.values()) > 1
+
+
+def test_pedidos_shopify_parciais_e_enderecos() -> None:
+    perfil = PerfilSintetico(taxa_parcial=0.5)
+    pedidos = list(GeradorSintetico(5, perfil).pedidos_shopify(N))
+
+    parciais = [p for p in pedidos if p["displayFulfillmentStatus"] == "PARTIALLY_FULFILLED"]
+    assert parciais
+    for p in parciais:
+        (fo,) = p["fulfillmentOrders"]["edges"]
+        restantes = {
+            e["node"]["lineItem"]["id"]: e["node"]["remainingQuantity"] for e in fo["node"]["lineItems"]["edges"]
+        }
+        quantidades = {e["node"]["id"]: e["node"]["quantity"] for e in p["lineItems"]["edges"]}
+        assert sum(restantes.values()) < sum(quantidades.values())
+    assert any(p["shippingAddress"] is None for p in pedidos)  # só endereço de cobrança
+    assert any(p["billingAddress"]["zip"].isdigit() for p in pedidos)  # CEP sem máscara
+
+
+def test_cli_grava_jsonl(tmp_path: Path) -> None:
+    assert main(["--guru", "30", "--modo", "produtos", "--shopify", "10", "--saida", str(tmp_path)]) == 0
+    linhas = (tmp_path / "guru_produtos.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(linhas) == 30 and "subscription" not in json.loads(linhas[0])  # noqa: PLR2004
+    assert len((tmp_path / "shopify.jsonl").read_text(encoding="utf-8").splitlines()) == 10  # noqa: PLR2004
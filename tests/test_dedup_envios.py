@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pandas as pd
+
+ANO, MES = 2025, 3  # bimestre 2
+
+
+def _mascara_antiga(df: pd.DataFrame, ass: pd.DataFrame, prod: pd.DataFrame, combos: pd.DataFrame) -> pd.Series:
+    """O `deve_remover` linha a linha de antes da vetorização, com a mesma montagem das chaves."""
+    bimestre = 1 + (MES - 1) // 2
+    ass = ass.copy()
+    ass["periodo"] = pd.to_numeric(ass["periodo"], errors="coerce").fillna(-1).astype(int)
+    ass["ano"] = pd.to_numeric(ass["ano"], errors="coerce").fillna(-1).astype(int)
+    assinaturas = {
+        (str(r["subscription_id"]).strip(), int(r["ano"]), str(r["periodicidade"]).lower().strip(), int(r["periodo"]))
+        for _, r in ass.iterrows()
+        if str(r["subscription_id"]).strip() != ""
+    }
+    produtos = {str(v).strip() for v in prod["transaction_id"].astype(str)}
+    chaves_combo: set[str] = set()
+    for raw in combos["chave_dedup"].astype(str):
+        if raw.strip():
+            chaves_combo |= {raw.strip(), raw.strip().replace("+", "")}
+    for _, r in combos.iterrows():
+        tx, sk = str(r["transaction_id"]).strip(), str(r["sku"]).strip().upper()
+        if tx and sk:
+            chaves_combo |= {f"{tx}{sk}", f"{tx}+{sk}"}
+
+    def deve_remover(row: pd.Series) -> bool:
+        id_sub, id_trans, sku = row["subscription_id"], row["transaction_id"], row["sku"]
+        if row["is_combo"]:
+            if id_trans and sku:
+                return f"{id_trans}{sku}" in chaves_combo or f"{id_trans}+{sku}" in chaves_combo
+            return False
+        if id_sub:
+            per = row["periodicidade"]
+            if per == "mensal":
+                per_num = MES
+            elif per == "bimestral":
+                per_num = bimestre
+            else:
+                return False
+            if (id_sub, ANO, per, per_num) in assinaturas:
+                return True
+        if id_trans:
+            return id_trans in produtos
+        return False
+
+    return df.apply(deve_remover, axis=1).astype(bool)
+
+
+def test_mascara_vetorizada_igual_ao_deve_remover_antigo(main: Any) -> None:
+    assinaturas = pd.DataFrame(
+        {
+            "subscription_id": ["sub-m", "sub-b", " sub-x ", "", "nan"],
+            "ano": ["2025", 2025, 2025, 2025, 2025],
+            "periodicidade": ["Mensal", "bimestral", "mensal", "mensal", "mensal"],
+            "periodo": [3, 2.0, 4, 3, 3],
+        }
+    )
+    produtos = pd.DataFrame({"transaction_id": ["tx-prod", " tx-sub ", "nan", ""]})
+    combos = pd.DataFrame(
+        {
+            "chave_dedup": ["tx-c1+KIT", "", "tx-c2KIT2", ""],
+            "transaction_id": ["", "", "", "tx-c3"],
+            "sku": ["", "", "", "kit3"],
+        }
+    )
+    # já normalizado como em `remover_pedidos_enviados`; "nan" é o que sobra de um NaN depois do astype(str)
+    linhas = [
+        # (transaction_id, subscription_id, sku, periodicidade, is_combo)
+        ("tx-prod", "", "P1", "", False),
+        ("tx-novo", "", "P1", "", False),
+        ("", "", "P1", "", False),  # ids em branco
+        ("nan", "", "P1", "", False),
+        ("", "nan", "P1", "mensal", False),
+        ("", "sub-m", "A1", "mensal", False),  # só assinatura
+        ("", "sub-b", "A1", "bimestral", False),
+        ("", "sub-x", "A1", "mensal", False),  # período diferente
+        ("", "sub-m", "A1", "anual", False),
+        ("tx-sub", "sub-m", "A1", "trimestral", False),  # periodicidade inválida segura o produto
+        ("tx-sub", "sub-novo", "A1", "mensal", False),  # cai no produto
+        ("tx-prod", "", "", "", False),  # só transação
+        ("tx-c1", "", "KIT", "", True),
+        ("tx-c2", "", "KIT2", "", True),
+        ("tx-c3", "", "KIT3", "", True),
+        ("tx-c1", "", "OUTRO", "", True),
+        ("tx-prod", "", "", "", True),  # combo sem SKU nunca remove
+        ("", "sub-m", "KIT", "mensal", True),  # combo não olha assinaturas
+        ("nan", "nan", "NAN", "", True),
+    ]
+    df = pd.DataFrame(linhas, columns=["transaction_id", "subscription_id", "sku", "periodicidade", "is_combo"])
+
+    nova = main.mascara_pedidos_enviados(df, assinaturas, produtos, combos, ano=ANO, mes=MES)
+    antiga = _mascara_antiga(df, assinaturas, produtos, combos)
+
+    assert nova.tolist() == antiga.tolist()
+    assert nova.index.equals(df.index)
+    assert df.index[nova].tolist() == [0, 3, 4, 5, 6, 10, 11, 12, 13, 14]
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import math
+from typing import Any
+
+import pandas as pd
+import pytest
+
+# (valor de origem em reais, centavos, texto exportado)
+CASOS = [
+    (59.9, 5990, "59,90"),
+    ("59,90", 5990, "59,90"),
+    ("R$ 1.234,56", 123456, "1234,56"),
+    (math.nan, None, ""),
+]
+
+
+def test_unidade_dos_numeros_e_explicita(main: Any) -> None:
+    assert main.centavos_celula(5990, unidade="centavos") == main.centavos_celula(59.9, unidade="reais")
+    assert main.centavos_celula("59,90", unidade="centavos") == main.centavos_celula("59,90", unidade="reais")
+    assert main.centavos_celula(0.005, unidade="reais") == 1  # ROUND_HALF_UP
+    assert main.centavos_celula(pd.NA, unidade="centavos") is None
+    with pytest.raises(ValueError, match="unidade"):
+        main.centavos_celula(1, unidade="dolares")
+
+    reais = pd.Series([59.9, 10.0, math.nan])
+    assert main.centavos_serie(reais, unidade="reais").tolist() == [5990, 1000, pd.NA]
+    assert main.centavos_serie(reais, unidade="centavos").tolist() == [60, 10, pd.NA]
+
+
+def test_ida_e_volta_reais_centavos_texto(main: Any) -> None:
+    origem = [valor for valor, _, _ in CASOS]
+    centavos = [c for _, c, _ in CASOS]
+    texto = [t for _, _, t in CASOS]
+
+    # produtores: reais de fora → centavos; o frame do pipeline passa pela normalização sem mudar
+    df = pd.DataFrame({"Valor Total": [main.para_centavos(v) for v in origem]})
+    main.normalizar_colunas_monetarias(df, unidade="centavos")
+    assert df["Valor Total"].dtype == "Int64"
+    assert [None if pd.isna(c) else c for c in df["Valor Total"]] == centavos
+
+    exportado = main.formatar_centavos_serie(df["Valor Total"])
+    assert exportado.tolist() == texto
+
+    # edição na tabela: o texto exibido volta a centavos
+    editado = main.normalizar_colunas_monetarias(pd.DataFrame({"Valor Total": exportado}), unidade="centavos")
+    assert editado["Valor Total"].equals(df["Valor Total"])
+
+    # importação de fora com os mesmos valores em reais
+    importado = main.normalizar_colunas_monetarias(pd.DataFrame({"Valor Total": origem}), unidade="reais")
+    assert importado["Valor Total"].equals(df["Valor Total"])
+
+
+def test_exportacao_bling_formata_so_na_saida(
+    main: Any, mensagens: list[tuple[str, str, str]], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    gravados: list[pd.DataFrame] = []
+    monkeypatch.setattr(main, "escrever_xlsx_streaming", lambda df, _caminho: gravados.append(df))
+    monkeypatch.setattr(main, "gerar_pdf_producao_logistica", lambda *_a, **_k: None)
+    monkeypatch.setattr(main, "estado", {"ultimo_log": {}})
+
+    df = pd.DataFrame(
+        {
+            "ID Lote": ["L1", "L1", "L2", "L3"],
+            "Produto": ["A", "B", "C", "D"],
+            "Nome Comprador": ["Ana", "Ana", "Bia", "Caio"],
+            "Transportadora": ["PAC"] * 4,
+            "Serviço": ["PAC"] * 4,
+            "Data": ["01/03/2025"] * 4,
+            "Valor Unitário": [main.para_centavos(v) for v, _, _ in CASOS],
+            "Valor Total": [main.para_centavos(v) for v, _, _ in CASOS],
+        }
+    )
+    main.salvar_planilha_bling(df, "saida.xlsx", numero_inicial=1, abrir_pdf=False)
+
+    (saida,) = gravados
+    por_produto = saida.set_index("Produto")
+    assert por_produto["Valor Total"].tolist() == [t for _, _, t in CASOS]
+    assert por_produto["Total Pedido"].tolist() == ["119,80", "119,80", "1234,56", "0,00"]
+    # o frame guardado segue em centavos
+    assert main.estado["df_planilha_exportada"]["Valor Total"].dtype == "Int64"
+    assert mensagens[-1][1] == "Sucesso"
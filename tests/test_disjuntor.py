@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Any
+
+import pytest
+import requests
+
+from common.dados_sinteticos import GeradorSintetico, carregar_catalogo
+from common.disjuntor import (
+    ABERTO,
+    FECHADO,
+    MEIO_ABERTO,
+    CircuitoAberto,
+    ConfigDisjuntor,
+    Disjuntor,
+    disjuntores,
+)
+from common.http_client import _instalar_observacao
+
+if TYPE_CHECKING:
+    from tests.conftest import ServidorHttp
+
+ABERTO_S = 0.05
+CHAMADAS = 3
+
+
+def test_abre_pela_taxa_de_falhas_e_fecha_pela_sonda() -> None:
+    mudancas: list[tuple[str, str]] = []
+    d = Disjuntor(
+        "api.example",
+        ConfigDisjuntor(janela=4, minimo_chamadas=4, aberto_s=ABERTO_S),
+        lambda _host, anterior, novo: mudancas.append((anterior, novo)),
+    )
+    for falhou in (False, True, False, True):
+        d.registrar(d.permitir(), falhou, 0.01)
+    assert d.estado == ABERTO
+    with pytest.raises(CircuitoAberto) as erro:
+        d.permitir()
+    assert erro.value.code == "CIRCUITO_ABERTO" and erro.value.retryable
+
+    time.sleep(ABERTO_S * 2)
+    assert d.permitir() is True  # a sonda passa...
+    with pytest.raises(CircuitoAberto):
+        d.permitir()  # ...e só ela
+    d.registrar(True, False, 0.01)
+    assert mudancas == [(FECHADO, ABERTO), (ABERTO, MEIO_ABERTO), (MEIO_ABERTO, FECHADO)]
+    assert d.para_dict()["recusadas"] == 2  # noqa: PLR2004
+
+
+def test_lentidao_tambem_abre_e_cancelamento_nao_conta() -> None:
+    d = Disjuntor("api.example", ConfigDisjuntor(janela=2, minimo_chamadas=2, lenta_s=0.5, taxa_lentas=1.0))
+    d.registrar(d.permitir(), None, 99)  # cancelada: sem veredito
+    d.registrar(d.permitir(), False, 0.6)
+    assert d.estado == FECHADO
+    d.registrar(d.permitir(), False, 0.7)
+    assert d.estado == ABERTO
+
+
+@pytest.mark.parametrize(
+    "servidor_http",
+    [{"status": 503, "disjuntor": ConfigDisjuntor(janela=CHAMADAS, minimo_chamadas=CHAMADAS)}],
+    indirect=True,
+)
+def test_host_fora_falha_na_hora_sem_sair_para_a_rede(servidor_http: ServidorHttp) -> None:
+    url = f"{servidor_http.url}/"
+    _instalar_observacao()
+    with requests.Session() as sessao:
+        for _ in range(CHAMADAS):
+            assert sessao.get(url, timeout=5).status_code == 503  # noqa: PLR2004
+        assert disjuntores.indisponiveis() == ["127.0.0.1"]
+        with pytest.raises(CircuitoAberto):
+            sessao.get(url, timeout=5)
+    assert len(servidor_http.acessos) == CHAMADAS
+
+
+def test_guru_com_circuito_aberto_vira_erro_da_coleta(main: Any, monkeypatch: pytest.MonkeyPatch) -> None:
+    chamadas: list[str] = []
+
+    def coletar_vendas(product_id: str, *_args: Any, **_kwargs: Any) -> list[dict[str, Any]]:
+        chamadas.append(product_id)
+        raise main.TransientGuruError("Falha inicial") from CircuitoAberto(main.HOST_GURU, 30)
+
+    monkeypatch.setattr(main, "coletar_vendas", coletar_vendas)
+    monkeypatch.setattr(main, "aguardar_retentativa", lambda *_a, **_k: pytest.fail("circuito aberto não retenta"))
+    skus, _regras = carregar_catalogo()
+    fim = datetime(2025, 6, 30, 23, 59, tzinfo=UTC)
+    dados = {
+        **GeradorSintetico(1).dados_guru(),
+        "periodicidade": "bimestral",
+        "modo_periodo": "PERÍODO",
+        "ordered_at_ini_periodo": datetime(2025, 5, 1, tzinfo=UTC),
+        "ordered_at_end_periodo": fim,
+    }
+    estado: dict[str, Any] = {"skus_info": skus}
+
+    transacoes, _, _ = main.gerenciar_coleta_vendas_assinaturas(dados, cancelador=threading.Event(), estado=estado)
+
+    assert transacoes == [] and chamadas
+    assert len(estado["transacoes_com_erro"]) == len(chamadas)  # uma vez por tarefa, sem retentar
+    assert all("digitalmanager.guru indisponível" in erro for erro in estado["transacoes_com_erro"])
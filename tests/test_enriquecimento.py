@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from common.executor import ExecutorGerenciado, Faixa
+
+PEDIDOS = 24
+
+
+class _Sinal:
+    def connect(self, *_args: Any) -> None:
+        pass
+
+
+class _Eventos:
+    def __init__(self) -> None:
+        self.lista: list[tuple[str, str]] = []
+        self._lock = threading.Lock()
+        self.liberar = threading.Event()  # as tarefas falsas só rodam depois que ele abre
+        self.liberar.set()
+
+    def __call__(self, evento: str, pid: str) -> None:
+        self.liberar.wait()
+        with self._lock:
+            self.lista.append((evento, pid))
+
+    def posicao(self, evento: str, pid: str) -> int:
+        return self.lista.index((evento, pid))
+
+
+@pytest.fixture
+def eventos(main: Any, monkeypatch: pytest.MonkeyPatch) -> _Eventos:
+    """Troca os runnables de CPF/CEP/endereço por falsos que só registram a ordem e liberam o pendente."""
+    ev = _Eventos()
+
+    class Cpf:
+        def __init__(self, pid: str, estado: dict[str, Any]) -> None:
+            self.pid, self.estado, self.signals = pid, estado, type("S", (), {"resultado": _Sinal()})()
+
+        def run(self) -> None:
+            ev("cpf", self.pid)
+            self.estado["cpf_pendentes"].discard(self.pid)
+
+    class Cep:
+        def __init__(self, pid: str, _cep: str, _callback: Any, estado: dict[str, Any]) -> None:
+            self.pid, self.estado = pid, estado
+
+        def run(self) -> None:
+            ev("cep_inicio", self.pid)
+            time.sleep(0.005)  # o endereço do pedido, se não esperasse, passaria na frente
+            ev("cep_fim", self.pid)
+            self.estado["bairro_pendentes"].discard(self.pid)
+
+    class Endereco:
+        def __init__(self, pid: str, *args: Any) -> None:
+            self.pid, self.estado = pid, args[-1]
+
+        def run(self) -> None:
+            ev("endereco", self.pid)
+            self.estado["endereco_pendentes"].discard(self.pid)
+
+    monkeypatch.setattr(main, "ObterCpfShopifyRunnable", Cpf)
+    monkeypatch.setattr(main, "BuscarBairroRunnable", Cep)
+    monkeypatch.setattr(main, "NormalizarEndereco", Endereco)
+    return ev
+
+
+@pytest.fixture
+def executor() -> Iterator[ExecutorGerenciado]:
+    ex = ExecutorGerenciado()
+    yield ex
+    ex.encerrar(timeout=5)
+
+
+def _df() -> pd.DataFrame:
+    # pares já têm CPF; múltiplos de 3 já têm bairro (endereço sai sem esperar CEP)
+    return pd.DataFrame(
+        {
+            "transaction_id": [f"tx-{i}" for i in range(PEDIDOS)],
+            "CPF/CNPJ Comprador": ["123" if i % 2 == 0 else "" for i in range(PEDIDOS)],
+            "Bairro Comprador": ["Centro" if i % 3 == 0 else "" for i in range(PEDIDOS)],
+            "CEP Comprador": ["01001-000"] * PEDIDOS,
+            "Endereço Entrega": [f"Rua {i}" for i in range(PEDIDOS)],
+            "Complemento Entrega": [""] * PEDIDOS,
+        }
+    )
+
+
+def test_endereco_espera_o_cep_do_proprio_pedido(main: Any, eventos: _Eventos, executor: ExecutorGerenciado) -> None:
+    enriq = main.EnriquecimentoPedidos({"cancelador_global": threading.Event()}, _df())
+    enriq.iniciar(executor)
+    assert enriq.aguardar(10)
+
+    pids = [main.normalizar_order_id(f"tx-{i}") for i in range(PEDIDOS)]
+    assert {p for e, p in eventos.lista if e == "cpf"} == set(pids[1::2])
+    assert {p for e, p in eventos.lista if e == "endereco"} == set(pids)
+    for i, pid in enumerate(pids):
+        if i % 3:
+            assert eventos.posicao("cep_fim", pid) < eventos.posicao("endereco", pid)
+        else:
+            assert ("cep_inicio", pid) not in eventos.lista
+
+
+@pytest.mark.usefixtures("eventos")
+def test_pedidos_esvazia_por_ultimo(main: Any, executor: ExecutorGerenciado) -> None:
+    estado: dict[str, Any] = {"cancelador_global": threading.Event()}
+    enriq = main.EnriquecimentoPedidos(estado, _df())
+    ordem: list[str] = []
+    etapas_no_fim: list[dict[str, bool]] = []
+    for chave, pendentes in enriq.pendentes.items():
+        pendentes.ao_esvaziar(lambda chave=chave: ordem.append(chave))
+
+    def pedidos_vazio() -> None:
+        ordem.append("pedidos")
+        etapas_no_fim.append(dict(estado["etapas_finalizadas"]))
+
+    enriq.pedidos.ao_esvaziar(pedidos_vazio)
+
+    enriq.iniciar(executor)
+    assert enriq.aguardar(10)
+
+    assert sorted(ordem[:-1]) == ["bairro", "cpf", "endereco"] and ordem[-1] == "pedidos"
+    assert etapas_no_fim == [{"cpf": True, "bairro": True, "endereco": True}]
+    assert all(estado[f"finalizou_{chave}"] for chave in enriq.pendentes)
+    assert set(enriq.duracoes) == {"cpf", "bairro", "endereco"}
+
+
+def test_iniciar_nao_espera_pelas_faixas_cheias(main: Any, eventos: _Eventos) -> None:
+    # fila de 1 tarefa por faixa: enviar pedido a pedido da thread de quem chama travaria aqui
+    faixas = {nome: Faixa(1, fila_max=1) for nome in ("shopify", "cep", "openai")}
+    executor = ExecutorGerenciado({**faixas, "tarefas": Faixa(1)})
+    eventos.liberar.clear()
+    try:
+        enriq = main.EnriquecimentoPedidos({"cancelador_global": threading.Event()}, _df())
+        t0 = time.monotonic()
+        enriq.iniciar(executor)
+        assert time.monotonic() - t0 < 1
+        assert not enriq.aguardar(0.05)
+
+        eventos.liberar.set()
+        assert enriq.aguardar(10)
+        assert {p for e, p in eventos.lista if e == "endereco"} == {f"tx-{i}" for i in range(PEDIDOS)}
+    finally:
+        eventos.liberar.set()
+        executor.encerrar(timeout=5)
+
+
+@pytest.mark.usefixtures("eventos")
+def test_falha_ao_enviar_libera_os_pedidos(main: Any, caplog: pytest.LogCaptureFixture) -> None:
+    # sem a faixa "openai": o envio do endereço falha no primeiro pedido
+    executor = ExecutorGerenciado({"tarefas": Faixa(1), "shopify": Faixa(2), "cep": Faixa(2)})
+    estado: dict[str, Any] = {"cancelador_global": threading.Event()}
+    try:
+        enriq = main.EnriquecimentoPedidos(estado, _df())
+        enriq.iniciar(executor)
+        assert enriq.aguardar(10)
+    finally:
+        executor.encerrar(timeout=5)
+    assert "enriquecimento_disparo_erro" in caplog.text
+    assert all(p.concluido for p in enriq.pendentes.values())
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from common.envios_store import EnviosLogStore, abrir_envios_log
+
+ANO, MES = 2025, 3  # bimestre 2
+
+
+def test_insert_or_ignore_mantem_o_primeiro_registro(tmp_path: Path) -> None:
+    store = EnviosLogStore(tmp_path / "envios.sqlite3")
+    primeiro = {"transaction_id": " tx-1 ", "registro_em": "2025-01-01", "id_lote": "L1"}
+    inseridos = store.registrar("produtos", [primeiro, {"transaction_id": "tx-2"}, {"transaction_id": "nan"}])
+    assert inseridos == 2  # noqa: PLR2004 — "nan" não tem chave
+    assert store.registrar("produtos", [{"transaction_id": "tx-1", "registro_em": "2025-02-02"}]) == 0
+    assert store.registros("produtos")[0] == {"transaction_id": "tx-1", "registro_em": "2025-01-01", "id_lote": "L1"}
+
+    # combos sem chave_dedup usam transaction_id+sku; assinaturas deduplicam pela chave composta
+    assert store.registrar("combos", [{"transaction_id": "tx-1", "sku": "K1"}, {"chave_dedup": "tx-1+K1"}]) == 1
+    assinatura = {"subscription_id": "s1", "ano": "2025", "periodicidade": "Mensal", "periodo": 3.0}
+    assert store.registrar("assinaturas", [assinatura, {**assinatura, "periodo": 4}]) == 2  # noqa: PLR2004
+    assert store.registrar("assinaturas", [{**assinatura, "periodicidade": "mensal"}]) == 0
+
+
+def test_migracao_do_xlsx_roda_uma_vez(tmp_path: Path) -> None:
+    xlsx = tmp_path / "envios_log.xlsx"
+    store = EnviosLogStore(tmp_path / "envios_log.sqlite3")
+    assert store.migrar_de_xlsx(xlsx) == {}  # sem .xlsx: só marca como migrado
+
+    xlsx.write_bytes(b"nao e um xlsx")  # um .xlsx exportado depois nunca é relido
+    assert store.migrar_de_xlsx(xlsx) == {}
+    assert EnviosLogStore(store.caminho_db).migrar_de_xlsx(xlsx) == {}
+    assert store.contagem("produtos") == 0
+
+
+def test_migracao_importa_as_abas_sem_duplicar(tmp_path: Path) -> None:
+    pytest.importorskip("openpyxl")
+    xlsx = tmp_path / "envios_log.xlsx"
+    with pd.ExcelWriter(xlsx, engine="openpyxl") as writer:
+        pd.DataFrame({"Transaction_ID": ["a", "b", "a"]}).to_excel(writer, sheet_name="produtos", index=False)
+        pd.DataFrame({"chave_dedup": ["a+K"]}).to_excel(writer, sheet_name="combos", index=False)
+
+    store = EnviosLogStore(tmp_path / "envios_log.sqlite3")
+    assert store.migrar_de_xlsx(xlsx) == {"produtos": 2, "combos": 1}
+    assert store.migrar_de_xlsx(xlsx) == {}
+    assert store.contagem("produtos") == 2  # noqa: PLR2004
+
+
+def test_verificar_duplicidade_no_log_conta_so_os_novos(main: Any, tmp_path: Path) -> None:
+    xlsx = tmp_path / "envios_log.xlsx"
+    novos = pd.DataFrame({"transaction_id": ["t1", "t2"], "registro_em": ["x", "x"]})
+    assert main.verificar_duplicidade_no_log(xlsx, novos, "produtos") == 2  # noqa: PLR2004
+    assert (
+        main.verificar_duplicidade_no_log(xlsx, [{"transaction_id": "t2"}, {"transaction_id": "t3"}], "produtos") == 1
+    )
+    assert abrir_envios_log(xlsx).contagem("produtos") == 3  # noqa: PLR2004
+    with pytest.raises(ValueError, match="Aba desconhecida"):
+        main.verificar_duplicidade_no_log(xlsx, [], "outra")
+
+
+class _Dialogo:
+    @staticmethod
+    def getInt(*_args: Any, **_kwargs: Any) -> tuple[int, bool]:
+        return {"Ano do envio:": ANO, "Mês (1 a 12):": MES}[_args[2]], True
+
+
+class _Aplicacao:
+    @staticmethod
+    def activeWindow() -> object:
+        return object()
+
+
+def test_remover_pedidos_enviados_le_o_store(
+    main: Any, mensagens: list[tuple[str, str, str]], tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    store = EnviosLogStore(tmp_path / "envios_log.sqlite3")
+    store.registrar("produtos", [{"transaction_id": "tx-prod"}])
+    store.registrar("combos", [{"transaction_id": "tx-combo", "sku": "KIT"}])
+    store.registrar(
+        "assinaturas", [{"subscription_id": "sub-1", "ano": ANO, "periodicidade": "bimestral", "periodo": 2}]
+    )
+    monkeypatch.setattr(main, "abrir_envios_log", lambda _caminho: store)
+    monkeypatch.setattr(main, "QInputDialog", _Dialogo)
+    monkeypatch.setattr(main, "QApplication", _Aplicacao)
+
+    planilha = pd.DataFrame(
+        {
+            "Transaction_ID": ["tx-prod", "tx-novo", "tx-combo", "tx-combo", "", ""],
+            "SKU": ["P1", "P1", "kit", "OUTRO", "A1", "A1"],
+            "is_combo": ["", "", "true", "1", "", ""],
+            "subscription_id": ["", "", "", "", "sub-1", "sub-2"],
+            "periodicidade": ["", "", "", "", "Bimestral", "bimestral"],
+        }
+    )
+    monkeypatch.setitem(main.estado, "df_planilha_parcial", planilha)
+    main.remover_pedidos_enviados()
+
+    restante = main.estado["df_planilha_parcial"]
+    assert restante.index.tolist() == [1, 3, 5]
+    assert list(restante.columns) == list(planilha.columns)  # schema original preservado
+    assert mensagens[-1][2].startswith("3 linha(s) removida(s)")
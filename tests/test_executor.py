@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterator
+from contextvars import ContextVar
+
+import pytest
+
+from common.errors import ExternalError
+from common.executor import PRIORIDADE_INTERATIVA, ExecutorGerenciado, Faixa
+
+LIMITE = 3
+N = 12
+
+_marca: ContextVar[str] = ContextVar("marca", default="-")
+
+
+def _ocupar(executor: ExecutorGerenciado, faixa: str) -> threading.Event:
+    """Prende a única thread da faixa até o Event devolvido ser liberado."""
+    ocupada, liberar = threading.Event(), threading.Event()
+
+    def bloquear() -> None:
+        ocupada.set()
+        liberar.wait(5)
+
+    executor.submeter(faixa, bloquear)
+    assert ocupada.wait(5)
+    return liberar
+
+
+@pytest.fixture
+def executor() -> Iterator[ExecutorGerenciado]:
+    ex = ExecutorGerenciado({"api": Faixa(LIMITE, fila_max=N), "unica": Faixa(1, fila_max=2)}, limite_total=10)
+    yield ex
+    ex.encerrar(timeout=5)
+
+
+def test_respeita_o_limite_da_faixa_e_leva_o_contexto(executor: ExecutorGerenciado) -> None:
+    lock = threading.Lock()
+    ativas, pico = 0, 0
+    liberar = threading.Event()
+
+    def tarefa() -> str:
+        nonlocal ativas, pico
+        with lock:
+            ativas += 1
+            pico = max(pico, ativas)
+        liberar.wait(5)
+        with lock:
+            ativas -= 1
+        return _marca.get()
+
+    _marca.set("pedido-1")
+    futuros = [executor.submeter("api", tarefa) for _ in range(N)]
+    assert executor.aguardar_ocioso(["api"], timeout=0.05) is False
+    liberar.set()
+    assert {f.result(timeout=5) for f in futuros} == {"pedido-1"}
+    assert executor.aguardar_ocioso(timeout=5)
+
+    assert pico == LIMITE
+    metricas = executor.metricas()["api"]
+    assert metricas["concluidas"] == N and metricas["threads"] == LIMITE
+    assert metricas["pico_fila"] >= N - LIMITE and set(metricas["espera_ms"]) == {"p50", "p90", "p99"}
+
+
+def test_interativo_passa_na_frente_e_fila_cheia_recusa(executor: ExecutorGerenciado) -> None:
+    ordem: list[str] = []
+    liberar = _ocupar(executor, "unica")
+    lote = executor.submeter("unica", lambda: ordem.append("lote"))
+    interativo = executor.submeter("unica", lambda: ordem.append("ui"), prioridade=PRIORIDADE_INTERATIVA)
+    with pytest.raises(ExternalError) as erro:
+        executor.submeter("unica", lambda: None, espera_max=0.01)
+    assert erro.value.code == "EXECUTOR_SATURADO"
+
+    liberar.set()
+    lote.result(timeout=5)
+    interativo.result(timeout=5)
+    assert ordem == ["ui", "lote"]
+    assert executor.metricas()["unica"]["rejeitadas"] == 1
+
+
+def test_encerrar_cancela_a_fila(executor: ExecutorGerenciado) -> None:
+    liberar = _ocupar(executor, "unica")
+    pendente = executor.submeter("unica", lambda: None)
+
+    threading.Timer(0.05, liberar.set).start()
+    executor.encerrar(timeout=5)
+    assert pendente.cancelled()
+    with pytest.raises(RuntimeError):
+        executor.submeter("unica", lambda: None)
+    with pytest.raises(ValueError, match="faixa desconhecida"):
+        executor.submeter("nenhuma", lambda: None)
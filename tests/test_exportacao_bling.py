@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import math
+import re
+import sys
+import zipfile
+from pathlib import Path
+from typing import Any
+from xml.etree import ElementTree
+
+import pandas as pd
+import pytest
+
+NS = {"x": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+ABA = "Pedidos"
+
+
+def _ler_xlsx(caminho: Path) -> tuple[str, list[list[Any]]]:
+    """Lê a 1ª aba direto do XML (sem openpyxl): (nome da aba, linhas com None nas células vazias)."""
+    with zipfile.ZipFile(caminho) as z:
+        nome = ElementTree.fromstring(z.read("xl/workbook.xml")).find("x:sheets/x:sheet", NS)
+        compartilhadas = []
+        if "xl/sharedStrings.xml" in z.namelist():
+            raiz = ElementTree.fromstring(z.read("xl/sharedStrings.xml"))
+            compartilhadas = ["".join(t.text or "" for t in si.iter(f"{{{NS['x']}}}t")) for si in raiz]
+        aba = ElementTree.fromstring(z.read("xl/worksheets/sheet1.xml"))
+
+    linhas: list[list[Any]] = []
+    for row in aba.iterfind("x:sheetData/x:row", NS):
+        linha: list[Any] = []
+        for c in row.iterfind("x:c", NS):
+            letras = re.match(r"[A-Z]+", c.get("r", ""))
+            coluna = 0
+            for letra in letras.group() if letras else "":
+                coluna = coluna * 26 + ord(letra) - ord("A") + 1
+            linha.extend([None] * (coluna - 1 - len(linha)))
+            tipo, v = c.get("t"), c.findtext("x:v", namespaces=NS)
+            if tipo == "inlineStr":
+                linha.append("".join(t.text or "" for t in c.iter(f"{{{NS['x']}}}t")))
+            elif tipo == "s":
+                linha.append(compartilhadas[int(v or 0)])
+            elif tipo == "str":
+                linha.append(v)
+            else:
+                linha.append(float(v) if v is not None else None)
+        linhas.append(linha)
+    return (nome.get("name", "") if nome is not None else ""), linhas
+
+
+def _df_exportacao() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Número pedido": [8000, 8000, 8001],
+            "Produto": ["Livro A", "Livro B", None],
+            "Valor Total": ["59,90", "", "1234,56"],
+            "Peso": [0.5, math.nan, 1.25],
+        }
+    )
+
+
+def _esperado(df: pd.DataFrame) -> list[list[Any]]:
+    linhas: list[list[Any]] = [list(df.columns)]
+    for registro in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+        # números voltam como float; "" vira célula vazia, como no to_excel
+        linha = [float(v) if isinstance(v, int | float) else (v or None) for v in registro]
+        while linha and linha[-1] is None:  # células vazias no fim da linha não vão para o arquivo
+            linha.pop()
+        linhas.append(linha)
+    return linhas
+
+
+def test_escrever_xlsx_streaming_xlsxwriter(main: Any, tmp_path: Path) -> None:
+    pytest.importorskip("xlsxwriter")
+    df = _df_exportacao()
+    caminho = tmp_path / "saida.xlsx"
+
+    main.escrever_xlsx_streaming(df, caminho, sheet_name=ABA)
+
+    assert _ler_xlsx(caminho) == (ABA, _esperado(df))
+
+
+def test_escrever_xlsx_streaming_sem_xlsxwriter_usa_openpyxl(
+    main: Any, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    pytest.importorskip("openpyxl")
+    monkeypatch.setitem(sys.modules, "xlsxwriter", None)  # `import xlsxwriter` passa a levantar ImportError
+    df = _df_exportacao()
+    caminho = tmp_path / "saida.xlsx"
+
+    main.escrever_xlsx_streaming(df, caminho, sheet_name=ABA)
+
+    assert _ler_xlsx(caminho) == (ABA, _esperado(df))
+
+
+def test_padronizar_transportadora_vetorizado_igual_ao_por_linha(main: Any) -> None:
+    df = pd.DataFrame(
+        {
+            "Transportadora": [" jet ", "Correios", "CORREIOS", "Loggi", "Azul Cargo", "Outra", "", math.nan, "latam"],
+            "Serviço": ["x", "PAC", "SEDEX", "", "y", "Expressa", "", "z", math.nan],
+        }
+    )
+    # o caminho antigo de salvar_planilha_bling (6cc5205^): apply linha a linha
+    antigo = df.apply(lambda row: pd.Series(main.padronizar_transportadora_servico(row)), axis=1)
+
+    transportadora, servico = main.padronizar_transportadora_servico_df(df)
+
+    assert transportadora.tolist() == antigo[0].tolist()
+    assert servico.tolist() == antigo[1].tolist()
+    assert transportadora.index.equals(df.index) and servico.index.equals(df.index)
+
+    sem_servico = df[["Transportadora"]]
+    antigo_sem_servico = [main.padronizar_transportadora_servico(row)[1] for _, row in sem_servico.iterrows()]
+    assert main.padronizar_transportadora_servico_df(sem_servico)[1].tolist() == antigo_sem_servico
+
+
+def test_formatar_centavos_serie_igual_ao_por_celula(main: Any) -> None:
+    centavos = pd.Series([0, 5, 99, 100, 5990, -5, -123456, None, 10**12], dtype="Int64", index=range(10, 19))
+
+    texto = main.formatar_centavos_serie(centavos)
+
+    assert texto.tolist() == [main.formatar_centavos(c) for c in centavos]
+    assert texto.index.equals(centavos.index)
+    assert texto.tolist()[:3] == ["0,00", "0,05", "0,99"] and texto.iloc[6] == "-1234,56"
+
+
+@pytest.mark.usefixtures("mensagens")
+def test_frame_exportado_nao_compartilha_dados_com_a_entrada(main: Any, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(main, "escrever_xlsx_streaming", lambda *_a, **_k: None)
+    monkeypatch.setattr(main, "gerar_pdf_producao_logistica", lambda *_a, **_k: None)
+    estado: dict[str, Any] = {"ultimo_log": {}}
+    df = pd.DataFrame(
+        {
+            "ID Lote": ["L1", "L2"],
+            "Produto": ["A", "B"],
+            "Transportadora": ["PAC", "PAC"],
+            "Serviço": ["PAC", "PAC"],
+            "Data": ["01/03/2025"] * 2,
+            "Valor Total": pd.array([100, 200], dtype="Int64"),
+        }
+    )
+    main.salvar_planilha_bling(df, "saida.xlsx", numero_inicial=1, abrir_pdf=False, estado=estado)
+    exportado = estado["df_planilha_exportada"].copy()
+
+    df.loc[:, "Produto"] = ["X", "Y"]
+    df["Valor Total"] += 1
+
+    pd.testing.assert_frame_equal(estado["df_planilha_exportada"], exportado)
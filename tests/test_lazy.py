@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+import pytest
+
+from common.lazy import atributo_tardio, base_tardia
+
+MODULO = "_modulo_tardio_teste"
+INSTANCIAS = 2
+
+
+@pytest.fixture
+def modulo(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[str]:
+    """Um módulo ainda não importado, com uma classe `Base` que conta as inicializações."""
+    (tmp_path / f"{MODULO}.py").write_text(
+        "class Base:\n"
+        "    iniciadas = 0\n"
+        "    def __init__(self, valor):\n"
+        "        Base.iniciadas += 1\n"
+        "        self.valor = valor\n",
+        encoding="utf-8",
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield MODULO
+    sys.modules.pop(MODULO, None)
+
+
+def _importado() -> ModuleType | None:
+    return sys.modules.get(MODULO)
+
+
+def test_classe_tardia_chama_e_responde_ao_isinstance(modulo: str) -> None:
+    Base: Any = atributo_tardio(modulo, "Base")
+    assert _importado() is None
+
+    obj = Base(1)
+    assert _importado() is not None and obj.valor == 1
+    assert isinstance(obj, Base) and not isinstance(1, Base)
+
+    def subclasse() -> type:
+        class Filha(Base):
+            pass
+
+        return Filha
+
+    assert issubclass(subclasse(), _importado().Base)  # type: ignore[union-attr]
+
+
+def test_base_tardia_so_importa_na_primeira_instancia(modulo: str) -> None:
+    class Janela(base_tardia(modulo, "Base")):  # type: ignore[misc]
+        def __init__(self, valor: int) -> None:
+            super().__init__(valor * 10)
+            self.dobro = valor * 2
+
+    assert _importado() is None
+
+    a, b = Janela(1), Janela(2)
+    real = _importado().Base  # type: ignore[union-attr]
+    assert type(a) is type(b) and type(a).__name__ == "Janela"
+    assert isinstance(a, Janela) and isinstance(a, real)
+    assert (a.valor, a.dobro, b.valor) == (10, 2, 20)
+    assert real.iniciadas == INSTANCIAS  # __init__ uma vez por instância
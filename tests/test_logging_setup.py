@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import io
+import logging
+import queue
+import sys
+from collections.abc import Iterator
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from common import logging_setup
+from common.logging_setup import (
+    ContextFilter,
+    _Fila,
+    _FilaHandler,
+    ativar_log_assincrono,
+    correlation_id_ctx,
+    desativar_log_assincrono,
+    descarregar_logs,
+    handlers_de_saida,
+    log_limitado,
+)
+
+MENSAGENS = 300
+LOTE = 7
+
+
+@contextmanager
+def _raiz_isolada(monkeypatch: pytest.MonkeyPatch) -> Iterator[tuple[logging.Handler, io.StringIO]]:
+    """Root só com um StreamHandler em memória (com ContextFilter); devolve o root como estava."""
+    monkeypatch.delenv("LOG_ASYNC", raising=False)
+    estava_ativo = _Fila.listener is not None
+    desativar_log_assincrono()
+    root = logging.getLogger()
+    antes, nivel = list(root.handlers), root.level
+    for h in antes:
+        root.removeHandler(h)
+
+    saida = io.StringIO()
+    handler = logging.StreamHandler(saida)
+    handler.setFormatter(logging.Formatter("%(message)s cid=%(correlation_id)s"))
+    handler.addFilter(ContextFilter(service="teste", version="0"))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    try:
+        yield handler, saida
+    finally:
+        desativar_log_assincrono()
+        for h in list(root.handlers):
+            root.removeHandler(h)
+        for h in antes:
+            root.addHandler(h)
+        root.setLevel(nivel)
+        if estava_ativo:
+            ativar_log_assincrono()
+
+
+def test_context_filter_vai_para_a_fila_e_volta(monkeypatch: pytest.MonkeyPatch) -> None:
+    root = logging.getLogger()
+    with _raiz_isolada(monkeypatch) as (handler, saida):
+        (filtro,) = handler.filters
+        listener = ativar_log_assincrono()
+        assert listener is not None and ativar_log_assincrono() is listener  # idempotente
+        (fila,) = root.handlers
+        assert isinstance(fila, _FilaHandler) and fila.filters == [filtro] and handler.filters == []
+        assert handlers_de_saida() == [handler]
+
+        # o filtro roda na thread de origem: o correlation_id é o de quem logou
+        token = correlation_id_ctx.set("cid-origem")
+        try:
+            logging.getLogger("teste").info("na fila")
+        finally:
+            correlation_id_ctx.reset(token)
+        assert descarregar_logs()
+        assert saida.getvalue() == "na fila cid=cid-origem\n"
+
+        desativar_log_assincrono()
+        assert root.handlers == [handler] and handler.filters == [filtro]
+        assert handlers_de_saida() == [handler]
+
+
+def test_prepare_preserva_extra_e_exc_info() -> None:
+    try:
+        raise ValueError("quebrou")
+    except ValueError:
+        exc_info = sys.exc_info()
+    original = logging.getLogger("teste").makeRecord(
+        "teste", logging.ERROR, __file__, 1, "pedido %s", ("42",), exc_info, extra={"order_id": "42"}
+    )
+
+    preparado = _FilaHandler(queue.SimpleQueue()).prepare(original)
+
+    assert preparado is not original and (original.msg, original.args) == ("pedido %s", ("42",))
+    assert (preparado.msg, preparado.args, preparado.getMessage()) == ("pedido 42", None, "pedido 42")
+    assert preparado.order_id == "42"  # type: ignore[attr-defined]
+    assert preparado.exc_info is exc_info  # o formatter ainda monta o traceback
+    assert "ValueError: quebrou" in logging.Formatter().format(preparado)
+
+
+def test_descarregar_logs_espera_a_fila_sem_trocar_a_thread(monkeypatch: pytest.MonkeyPatch) -> None:
+    with _raiz_isolada(monkeypatch) as (_handler, saida):
+        assert descarregar_logs()  # síncrono: nada a esperar
+        listener = ativar_log_assincrono()
+        assert listener is not None
+        thread = listener._thread
+        assert thread is not None
+
+        log = logging.getLogger("teste")
+        for i in range(MENSAGENS):
+            log.info("linha %d", i)
+        assert descarregar_logs(timeout=5)
+
+        linhas = saida.getvalue().splitlines()
+        assert len(linhas) == MENSAGENS and linhas[-1].startswith(f"linha {MENSAGENS - 1} ")
+        assert listener._thread is thread and thread.is_alive()
+
+
+def test_log_limitado_informa_suprimidos(caplog: pytest.LogCaptureFixture, monkeypatch: pytest.MonkeyPatch) -> None:
+    agora = [1000.0]
+    monkeypatch.setattr(logging_setup, "time", SimpleNamespace(monotonic=lambda: agora[0]))
+    log = logging.getLogger("teste.limitado")
+    caplog.set_level(logging.INFO, logger=log.name)
+
+    def ponto_quente() -> bool:
+        return log_limitado(log, logging.WARNING, "quente", intervalo=1.0, extra={"lote": LOTE})
+
+    registrados = [ponto_quente() for _ in range(5)]
+    agora[0] += 1.5
+    registrados.append(ponto_quente())
+    registrados.append(log_limitado(log, logging.DEBUG, "desligado"))  # nível desligado: sai cedo
+
+    assert registrados == [True, False, False, False, False, True, False]
+    primeiro, segundo = caplog.records
+    assert primeiro.lote == LOTE and not hasattr(primeiro, "suprimidos")  # type: ignore[attr-defined]
+    assert (segundo.lote, segundo.suprimidos) == (LOTE, 4)  # type: ignore[attr-defined]
+    assert segundo.funcName == "ponto_quente"  # stacklevel aponta para quem chamou
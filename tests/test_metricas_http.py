@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import logging
+import random
+from typing import TYPE_CHECKING
+
+import pytest
+
+from common.errors import ExternalError
+from common.http_client import ChamadaHttp, http_get
+from common.metricas_http import Histograma, RegistroMetricasHttp, ativar_metricas_http, rota_modelo
+
+if TYPE_CHECKING:
+    from tests.conftest import ServidorHttp
+
+
+def test_histograma_percentis_dentro_da_precisao() -> None:
+    rnd = random.Random(7)
+    amostras = sorted(int(rnd.lognormvariate(11, 1)) for _ in range(20_000))  # ~60 ms, cauda longa
+    h = Histograma()
+    for v in amostras:
+        h.registrar(v)
+
+    for q in (0.5, 0.9, 0.99):
+        exato = amostras[round(q * len(amostras)) - 1]
+        assert abs(h.percentil(q) - exato) <= exato / Histograma.SUB
+    assert (h.minimo, h.maximo, h.n) == (amostras[0], amostras[-1], len(amostras))
+
+
+def test_rota_modelo_troca_identificadores() -> None:
+    assert rota_modelo("https://viacep.com.br/ws/01001000/json/") == "/ws/{id}/json/"
+    assert rota_modelo("https://loja.myshopify.com/admin/api/2025-07/graphql.json") == "/admin/api/{id}/graphql.json"
+    assert rota_modelo("https://digitalmanager.guru/api/v2/transactions?page=3") == "/api/v2/transactions"
+
+
+def test_registro_agrega_por_rota_e_exporta_prometheus() -> None:
+    registro = RegistroMetricasHttp()
+    for pedido, status, retries in ((1, 200, 0), (2, 200, 1), (3, 429, 2), (4, None, 0)):
+        url = f"https://api.example/orders/{pedido}"
+        registro.registrar(ChamadaHttp("GET", url, "api.example", status, 0.05 * pedido, 10, 1_000, retries))
+
+    (serie,) = registro.para_dict()["series"]
+    assert serie["rota"] == "/orders/{id}"
+    assert serie["status"] == {"2xx": 2, "4xx": 1, "erro": 1}
+    assert (serie["requisicoes"], serie["retries"], serie["bytes_recebidos"]) == (4, 3, 4_000)
+    assert serie["latencia_ms"]["min"] <= serie["latencia_ms"]["p50"] <= serie["latencia_ms"]["p99"]
+
+    texto = registro.para_prometheus()
+    rotulos = 'host="api.example",method="GET",route="/orders/{id}"'
+    assert f'lg_http_requests_total{{{rotulos},status_class="4xx"}} 1' in texto
+    assert f"lg_http_retries_total{{{rotulos}}} 3" in texto
+    assert f"lg_http_request_duration_seconds_count{{{rotulos}}} 4" in texto
+
+
+@pytest.mark.parametrize(
+    "servidor_http", [{"status": lambda caminho: 404 if caminho.startswith("/nada") else 200}], indirect=True
+)
+def test_chamadas_reais_alimentam_o_registro_global(
+    servidor_http: ServidorHttp, caplog: pytest.LogCaptureFixture
+) -> None:
+    caplog.set_level(logging.DEBUG, logger="common.http_client")
+    registro = ativar_metricas_http()
+    registro.limpar()
+    recebidos = sum(len(http_get(f"{servidor_http.url}/itens/{i}").content) for i in range(3))
+    with pytest.raises(ExternalError):
+        http_get(f"{servidor_http.url}/nada/1")
+
+    itens, nada = registro.para_dict()["series"]
+    assert (itens["host"], itens["rota"], itens["status"]) == ("127.0.0.1", "/itens/{id}", {"2xx": 3})
+    assert itens["bytes_recebidos"] == recebidos
+    assert nada["status"] == {"4xx": 1} and nada["retries"] == 0
+    # as métricas ficam no registro: nenhuma linha de log por chamada
+    assert [r for r in caplog.records if r.name == "common.http_client"] == []
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from common import nfe_zip
+from common.nfe_zip import ler_dados_nfe, ler_nfes_zip, organizar_nfes_zip
+
+NOTAS = 9
+
+
+def _nfe(nnf: int, transportadora: str | None = "Rápido", trailer: str = "") -> bytes:
+    transp = f"<transp><transporta><xNome>{transportadora}</xNome></transporta></transp>" if transportadora else ""
+    return (
+        '<nfeProc xmlns="http://www.portalfiscal.inf.br/nfe"><NFe><infNFe Id="NFe1">'
+        f"<ide><nNF>{nnf}</nNF></ide><dest><xNome>Cliente {nnf}</xNome></dest>"
+        f"<det><prod><xProd> Livro {nnf} </xProd></prod><imposto><ICMS><vICMS>1</vICMS></ICMS></imposto></det>"
+        f"<det><prod><xProd>Marcador</xProd></prod></det>{transp}"
+        f"</infNFe><Signature>{trailer}</Signature></NFe></nfeProc>"
+    ).encode()
+
+
+def test_para_no_fim_do_infnfe() -> None:
+    # assinatura/protocolo corrompidos depois do infNFe não são lidos
+    assert ler_dados_nfe(_nfe(7, trailer="<quebrado"), origem="a.xml") == (
+        "7",
+        "Cliente 7",
+        "Rápido",
+        ["Livro 7", "Marcador"],
+    )
+    assert ler_dados_nfe(_nfe(8, transportadora=None))[2] == "Sem Transportadora"
+    assert ler_dados_nfe(b"<nfeProc><NFe") == (None, None, None, [])
+    assert ler_dados_nfe(b"<outro/>") == (None, None, None, [])
+
+
+@pytest.fixture
+def zip_nfes(tmp_path: Path) -> Path:
+    caminho = tmp_path / "nfes.zip"
+    with zipfile.ZipFile(caminho, "w") as zf:
+        for n in range(NOTAS, 0, -1):  # ordem do ZIP ≠ ordem numérica
+            zf.writestr(f"nfe_{n}.xml", _nfe(n, "Lenta" if n % 3 == 0 else "Rápido"))
+        zf.writestr("leia-me.txt", "ignorado")
+        zf.writestr("quebrada.xml", b"<nfeProc")
+    return caminho
+
+
+def test_ordem_do_zip_entre_lotes(zip_nfes: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    serial = ler_nfes_zip(zip_nfes, max_workers=1)
+    assert [d[0] for d in serial] == [str(n) for n in range(NOTAS, 0, -1)] + [None]
+
+    monkeypatch.setattr(nfe_zip, "_MIN_XMLS_PARALELO", 0)
+    assert ler_nfes_zip(zip_nfes, max_workers=2, tamanho_lote=2) == serial
+
+    agrupado = organizar_nfes_zip(zip_nfes, max_workers=2, tamanho_lote=4)
+    assert list(agrupado) == ["Lenta", "Rápido"]
+    assert list(agrupado["Lenta"]) == ["9", "6", "3"]
+    assert agrupado["Rápido"]["1"] == {"xNome": "Cliente 1", "produtos": ["Livro 1", "Marcador"]}
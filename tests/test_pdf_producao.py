@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from concurrent.futures import Future
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pytest
+
+
+def test_contar_conjuntos_produtos_ordem_e_contagens(main: Any) -> None:
+    df = pd.DataFrame(
+        {
+            "Número pedido": [8002, 8002, 8001, 8001, 8003, 8003, 8004, 8005, None],
+            "Produto": [" Livro B", "Livro A", "Livro A", "Livro B", "Livro A", "Livro A", "Marcador", "", "Livro C"],
+        }
+    )
+    conjuntos, produtos = main.contar_conjuntos_produtos(df)
+
+    # pedidos em ordem crescente; produtos do conjunto ordenados (com repetição); vazios/sem pedido fora
+    assert conjuntos.to_dict() == {"Livro A + Livro B": 2, "Livro A + Livro A": 1, "Marcador": 1}
+    assert list(conjuntos.index) == ["Livro A + Livro B", "Livro A + Livro A", "Marcador"]
+    assert list(produtos.items()) == [("Livro A", 4), ("Livro B", 2), ("Marcador", 1)]
+
+
+def _renderizar_na_hora(renderizar: Any, *args: Any) -> Future[str]:
+    futuro: Future[str] = Future()
+    futuro.set_result(renderizar(*args))
+    return futuro
+
+
+def _df_pedidos() -> pd.DataFrame:
+    return pd.DataFrame({"Número pedido": [1, 1], "Produto": ["Livro A", "Brinde"], "Valor Total": [1000, 0]})
+
+
+def test_gerar_pdf_producao_logistica_em_tmp_path(main: Any, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    pytest.importorskip("fpdf")
+    monkeypatch.setattr(main, "renderizar_em_segundo_plano", _renderizar_na_hora)
+    futuro = main.gerar_pdf_producao_logistica(
+        _df_pedidos(), date(2025, 3, 5), 2, 2025, tmp_path / "x.xlsx", abrir=False
+    )
+    assert futuro.result() == str(tmp_path / "05032025_logos_resumo_logistica_2_2025.pdf")
+    assert Path(futuro.result()).read_bytes().startswith(b"%PDF")
+
+
+def test_falha_do_pdf_chega_a_interface(
+    main: Any, mensagens: list[tuple[str, str, str]], tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    falhou: Future[str] = Future()
+    falhou.set_exception(OSError("disco cheio"))
+    monkeypatch.setattr(main, "renderizar_em_segundo_plano", lambda *_a: falhou)
+
+    main.gerar_pdf_producao_logistica(_df_pedidos(), date(2025, 3, 5), 2, 2025, tmp_path / "x.xlsx", abrir=True)
+
+    ((tipo, titulo, texto),) = mensagens
+    assert (tipo, titulo) == ("erro", "PDF de produção") and "disco cheio" in texto
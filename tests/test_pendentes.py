@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from common.pendentes import PendentesEtapa
+
+PEDIDOS = 200
+
+
+def test_dispara_uma_vez_com_descartes_concorrentes() -> None:
+    pendentes = PendentesEtapa(f"p{i}" for i in range(PEDIDOS))
+    disparos: list[str] = []
+    pendentes.ao_esvaziar(lambda: disparos.append(threading.current_thread().name))
+    assert not pendentes.aguardar(0.01)
+
+    def descartar(inicio: int) -> None:
+        for i in range(inicio, PEDIDOS, 4):
+            pendentes.discard(f"p{i}")
+            pendentes.discard(f"p{i}")  # repetido: sem efeito
+
+    threads = [threading.Thread(target=descartar, args=(i,), name=f"t{i}") for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert pendentes.aguardar(1) and pendentes.concluido
+    assert len(disparos) == 1 and disparos[0].startswith("t")  # na thread que removeu o último
+    assert (len(pendentes), pendentes.total) == (0, PEDIDOS)
+
+
+def test_conjunto_vazio_dispara_na_hora() -> None:
+    pendentes = PendentesEtapa()
+    disparos: list[int] = []
+    pendentes.ao_esvaziar(lambda: disparos.append(1))
+    assert disparos == [1] and pendentes.concluido and pendentes.aguardar(0)
+
+
+def test_add_depois_de_esvaziar_nao_rearma(caplog: pytest.LogCaptureFixture) -> None:
+    pendentes = PendentesEtapa(["a"])
+    disparos: list[str] = []
+
+    def quebra() -> None:
+        raise RuntimeError("callback com defeito")
+
+    pendentes.ao_esvaziar(quebra)
+    pendentes.ao_esvaziar(lambda: disparos.append("primeiro"))
+    pendentes.discard("a")
+    assert disparos == ["primeiro"]  # o erro de um callback não impede os outros
+    assert "pendentes_callback_erro" in caplog.text
+
+    pendentes.add("b")
+    assert "b" in pendentes and pendentes.total == 2  # noqa: PLR2004
+    assert pendentes.concluido  # o latch não volta a fechar
+    pendentes.discard("b")
+    assert disparos == ["primeiro"]
+    pendentes.ao_esvaziar(lambda: disparos.append("tardio"))  # registrado depois: chamado já
+    assert disparos == ["primeiro", "tardio"]
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import pstats
+import threading
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import pytest
+
+from common.perfilamento import PERFIL_DO_PROCESSO, Perfilador, ativar_perfilamento, gravar_perfis, perfilado
+
+THREADS = 2
+
+
+@perfilado("interno")
+def _interno(n: int) -> list[str]:
+    return [str(i) * 10 for i in range(n)]
+
+
+@perfilado("trabalho", memoria=True)
+def _trabalho(n: int) -> int:
+    return len(_interno(n))
+
+
+_juntas = threading.Barrier(THREADS, timeout=5)
+
+
+@perfilado("sobreposta")
+def _sobreposta(n: int) -> int:
+    _juntas.wait()  # as duas chamadas ficam ativas ao mesmo tempo
+    resultado = len(_interno(n))
+    _juntas.wait()
+    return resultado
+
+
+def _rodar_em_threads(alvo: Callable[[int], int], n: int) -> list[int]:
+    resultados: list[int] = []
+    threads = [
+        threading.Thread(target=lambda: resultados.append(alvo(n)), name=f"coleta-{i}") for i in range(THREADS)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return resultados
+
+
+@pytest.fixture(autouse=True)
+def _sem_perfil() -> Iterator[None]:
+    yield
+    ativar_perfilamento(None)
+
+
+def test_desligado_nao_grava_nada(tmp_path: Path) -> None:
+    assert _trabalho(10) == 10  # noqa: PLR2004
+    assert gravar_perfis(tmp_path) == []
+
+
+def test_grava_prof_por_thread_e_relatorio_de_alocacoes(tmp_path: Path) -> None:
+    ativar_perfilamento(Perfilador(top=5))
+    _rodar_em_threads(_trabalho, 5_000)
+
+    caminhos = gravar_perfis(tmp_path)
+    perfis = sorted(c.name for c in caminhos if c.suffix == ".prof")
+    # por thread, a chamada aninhada entra no perfil de fora
+    assert perfis == (
+        ["execucao.prof"] if PERFIL_DO_PROCESSO else ["trabalho__coleta-0.prof", "trabalho__coleta-1.prof"]
+    )
+    stats = pstats.Stats(str(caminhos[0]))
+    assert any(func[2] == "_interno" for func in stats.stats)  # type: ignore[attr-defined]
+
+    relatorio = next(c for c in caminhos if c.name == "alocacoes.txt").read_text(encoding="utf-8")
+    assert "## trabalho @ coleta-0" in relatorio and "trabalho @ coleta-1: 1 em " in relatorio
+    assert "interno @" not in relatorio  # aninhada: só a medida de fora
+    assert "test_perfilamento.py" in relatorio  # as linhas de _interno aparecem no diff
+
+
+def test_chamadas_sobrepostas_em_threads(tmp_path: Path) -> None:
+    ativar_perfilamento(Perfilador())
+    assert _rodar_em_threads(_sobreposta, 1_000) == [1_000] * THREADS
+
+    caminhos = gravar_perfis(tmp_path)
+    for caminho in (c for c in caminhos if c.suffix == ".prof"):
+        stats = pstats.Stats(str(caminho))
+        assert any(func[2] == "_interno" for func in stats.stats)  # type: ignore[attr-defined]
+    relatorio = caminhos[-1].read_text(encoding="utf-8")
+    for i in range(THREADS):
+        assert f"sobreposta @ coleta-{i}: 1 em " in relatorio
+    assert "ainda em execução" not in relatorio
+
+    # um segundo perfilador substitui o primeiro sem brigar pelo cProfile do processo
+    ativar_perfilamento(Perfilador())
+    assert _rodar_em_threads(_sobreposta, 10) == [10] * THREADS
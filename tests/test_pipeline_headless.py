@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import io
+import json
+import logging
+import sys
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from common import pdf_producao
+from common.dados_sinteticos import GeradorSintetico, carregar_catalogo
+from common.errors import UserError
+from common.metricas_http import gravar_metricas_http
+from common.perfilamento import gravar_perfis
+from common.rastreamento import gravar_relatorio
+from common.validation import ensure_output_dir, validate_pipeline_config
+
+TRANSACOES = 40
+
+
+@pytest.mark.parametrize(
+    ("payload", "campo"),
+    [
+        ({}, "output_dir"),
+        ({"output_dir": "saida"}, "informe ao menos uma fonte"),
+        ({"output_dir": "saida", "guru": {"modo": "produtos"}}, "exige data_ini e data_fim"),
+        (
+            {"output_dir": "saida", "guru": {"modo": "produtos", "data_ini": "2025-02-01", "data_fim": "2025-01-01"}},
+            "posterior",
+        ),
+        ({"output_dir": "saida", "shopify": {"data_inicio": "2025-01-01"}, "max_workers": 0}, "max_workers"),
+        ({"output_dir": "saida", "guru": {"mes": 13}}, "mes"),
+    ],
+)
+def test_config_invalida_vira_user_error(payload: dict[str, Any], campo: str) -> None:
+    with pytest.raises(UserError) as erro:
+        validate_pipeline_config(payload)
+    assert erro.value.code == "BAD_INPUT"
+    assert campo in json.dumps(erro.value.data["errors"], default=str, ensure_ascii=False)
+
+
+def test_config_padrao() -> None:
+    cfg = validate_pipeline_config({"output_dir": "saida", "shopify": {"data_inicio": "2025-01-01"}})
+    assert cfg.guru is None and cfg.fretes is not None and cfg.fretes.transportadoras
+    assert (cfg.numero_inicial, cfg.max_workers, cfg.prazo_s) == (8000, 8, None)
+
+
+def test_ensure_output_dir(tmp_path: Path) -> None:
+    assert ensure_output_dir(str(tmp_path / "a" / "b")).is_dir()
+    (tmp_path / "arquivo").write_text("x")
+    with pytest.raises(UserError) as erro:
+        ensure_output_dir(str(tmp_path / "arquivo" / "sub"))
+    assert erro.value.code == "OUTPUT_DIR_ERROR"
+
+
+def test_stdout_reservado_para_o_relatorio(main: Any, monkeypatch: pytest.MonkeyPatch) -> None:
+    saida, erro = io.StringIO(), io.StringIO()
+    console = logging.StreamHandler(saida)
+    monkeypatch.setattr(sys, "__stdout__", saida)
+    monkeypatch.setattr(sys, "stdout", saida)
+    monkeypatch.setattr(sys, "__stderr__", erro)
+    monkeypatch.setattr(sys, "stderr", erro)
+    monkeypatch.setattr(main, "handlers_de_saida", lambda: [console])
+
+    with main._stdout_reservado() as real:
+        print("progresso")
+        console.emit(logging.makeLogRecord({"msg": "log"}))
+        print("relatorio", file=real)
+    assert console.stream is saida and sys.stdout is saida
+    assert saida.getvalue() == "relatorio\n"
+    assert erro.getvalue() == "progresso\nlog\n"
+
+
+@pytest.fixture
+def pipeline_offline(main: Any, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Any:
+    """PipelineHeadless da Guru (modo produtos) com a coleta trocada por transações sintéticas."""
+    pytest.importorskip("fpdf")
+    skus, _regras = carregar_catalogo()
+    gerador = GeradorSintetico(11)
+    transacoes = list(gerador.transacoes_guru(TRANSACOES, modo="produtos"))
+
+    def coletar(dados: dict[str, Any], **_kwargs: Any) -> tuple[list[dict[str, Any]], dict[str, Any], dict[str, Any]]:
+        return transacoes, {}, {**dados, **gerador.dados_guru("produtos")}
+
+    monkeypatch.setattr(main, "coletar_vendas_produtos", coletar)
+    monkeypatch.setattr(pdf_producao, "_max_workers_padrao", lambda: 1)  # PDF no próprio processo
+    logs = tmp_path / "logs"
+    monkeypatch.setattr(main, "gravar_relatorio", partial(gravar_relatorio, logs))
+    monkeypatch.setattr(main, "gravar_metricas_http", partial(gravar_metricas_http, logs))
+    monkeypatch.setattr(main, "gravar_perfis", partial(gravar_perfis, logs))
+    monkeypatch.setitem(main.estado, "skus_info", main.estado.get("skus_info"))
+
+    cfg = validate_pipeline_config(
+        {
+            "output_dir": str(tmp_path / "saida"),
+            "guru": {"modo": "produtos", "data_ini": "2025-05-01", "data_fim": "2025-06-30"},
+            "fretes": None,
+            "numero_inicial": 100,
+            "max_workers": 2,
+        }
+    )
+    ensure_output_dir(cfg.output_dir)
+    return main.PipelineHeadless(cfg, skus)
+
+
+def test_execucao_offline_e_formato_do_relatorio(
+    main: Any, pipeline_offline: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    global_antes = {k: main.estado.get(k) for k in ("df_planilha_parcial", "df_planilha_exportada", "ultimo_log")}
+    stdout = io.StringIO()
+    monkeypatch.setattr(sys, "__stdout__", stdout)
+    monkeypatch.setattr(sys, "stdout", stdout)
+
+    assert pipeline_offline.executar() == 0
+
+    (caminho,) = Path(pipeline_offline.cfg.output_dir).glob("relatorio_*.json")
+    relatorio = json.loads(caminho.read_text(encoding="utf-8"))
+    assert json.loads(stdout.getvalue()) == relatorio  # no stdout, só o relatório
+    assert relatorio["status"] == "ok"
+    assert set(relatorio) >= {"iniciado_em", "duracao_s", "config", "etapas", "contagens", "chamadas_api", "artefatos"}
+    assert [e["nome"] for e in relatorio["etapas"]] == ["guru_produtos", "lotes", "exportacao_bling"]
+    assert all(e["status"] == "ok" for e in relatorio["etapas"])
+    assert relatorio["contagens"]["guru_transacoes"] == TRANSACOES
+    assert 0 < relatorio["contagens"]["linhas_exportadas"] <= relatorio["contagens"]["linhas_planilha"]
+    assert relatorio["chamadas_api"]["http_total"] == 0
+    assert [Path(a).suffix for a in relatorio["artefatos"]] == [".xlsx", ".pdf"]
+
+    # o que a execução produziu fica no estado dela; o `estado` da GUI não é tocado
+    assert all(main.estado.get(k) is antes for k, antes in global_antes.items())
+    assert len(pipeline_offline.estado["df_planilha_exportada"]) == relatorio["contagens"]["linhas_exportadas"]
+    assert "pdf_producao" not in pipeline_offline.estado
+
+
+def test_cada_execucao_tem_o_proprio_estado(main: Any, pipeline_offline: Any) -> None:
+    outra = main.PipelineHeadless(pipeline_offline.cfg, pipeline_offline.skus_info)
+    assert outra.estado is not pipeline_offline.estado
+    assert outra.estado["cancelador_global"] is not pipeline_offline.estado["cancelador_global"]
+    por_fonte = pipeline_offline._novo_estado()
+    assert por_fonte["dados_temp"] is pipeline_offline.estado["dados_temp"]
+    assert "df_planilha_parcial" not in por_fonte
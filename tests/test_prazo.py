@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING
+
+import pytest
+import requests
+
+from common.prazo import ExecucaoInterrompida, Prazo, esperar, no_prazo
+
+if TYPE_CHECKING:
+    from tests.conftest import ServidorHttp
+
+# generoso para CI lento; as esperas pedidas são de vários segundos
+RAPIDO_S = 1.0
+
+
+def test_cancelar_acorda_a_espera_na_hora() -> None:
+    cancelador = threading.Event()
+    threading.Timer(0.05, cancelador.set).start()
+    t0 = time.monotonic()
+    assert esperar(10, cancelador) is False
+    assert time.monotonic() - t0 < RAPIDO_S
+    assert esperar(0.01) is True  # sem prazo nem cancelador: dorme e segue
+
+
+def test_prazo_encurta_esperas_e_timeouts() -> None:
+    prazo = Prazo(0.2)
+    assert prazo.limitar_timeout((5, 30)) == pytest.approx((0.2, 0.2), abs=0.05)
+    with no_prazo(prazo):
+        t0 = time.monotonic()
+        assert esperar(10) is False  # acorda no fim do prazo
+        assert time.monotonic() - t0 < RAPIDO_S
+    with pytest.raises(ExecucaoInterrompida) as erro:
+        prazo.verificar("teste")
+    assert erro.value.code == "PRAZO_ESGOTADO" and not erro.value.retryable
+
+
+@pytest.mark.parametrize("servidor_http", [{"atraso_s": 3}], indirect=True)
+def test_nenhuma_requisicao_sobrevive_ao_prazo(servidor_http: ServidorHttp) -> None:
+    servidor_lento = f"{servidor_http.url}/"
+    with no_prazo(Prazo(0.3)):
+        t0 = time.monotonic()
+        with pytest.raises(requests.Timeout):
+            requests.get(servidor_lento, timeout=(5, 30))
+        assert time.monotonic() - t0 < RAPIDO_S
+
+    cancelado = Prazo()
+    cancelado.cancelador.set()
+    with no_prazo(cancelado), pytest.raises(ExecucaoInterrompida):
+        requests.get(servidor_lento, timeout=5)  # nem sai para a rede
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from common.progresso import ProgressoCoalescido
+
+
+class RelogioFalso:
+    def __init__(self) -> None:
+        self.agora = 0.0
+
+    def __call__(self) -> float:
+        return self.agora
+
+
+def test_entrega_so_a_mais_recente_dentro_do_intervalo() -> None:
+    relogio = RelogioFalso()
+    entregues: list[tuple[str, int, int]] = []
+    progresso = ProgressoCoalescido(lambda *p: entregues.append(p), hz=20, relogio=relogio)
+
+    progresso.registrar("a", 1, 3)
+    assert progresso.descarregar()  # a primeira sai na hora
+    progresso.registrar("b", 2, 3)
+    progresso.registrar("c", 3, 3)
+    assert not progresso.descarregar()  # ainda dentro dos 50 ms
+    relogio.agora = 0.05
+    assert progresso.descarregar()
+    assert not progresso.descarregar()  # nada novo
+
+    assert entregues == [("a", 1, 3), ("c", 3, 3)]
+    assert progresso.entregues == len(entregues)
+
+
+def test_10k_tarefas_em_threads_sao_coalescidas() -> None:
+    n = 10_000
+    entregues: list[tuple[str, int, int]] = []
+    progresso = ProgressoCoalescido(lambda *p: entregues.append(p), hz=20)
+    fim = threading.Event()
+
+    def consumidor() -> None:
+        while not fim.wait(0.005):
+            progresso.descarregar()
+        progresso.descarregar(forcar=True)
+
+    thread_ui = threading.Thread(target=consumidor)
+    thread_ui.start()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: progresso.registrar("tarefa", i, n), range(1, n + 1)))
+    # a última registrada pode não ser a de maior índice (threads), mas precisa ser entregue
+    ultimo = progresso._ultimo
+    fim.set()
+    thread_ui.join()
+
+    assert ultimo is not None and entregues[-1] == ultimo[1]
+    assert len(entregues) < n // 100
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import importlib
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from common import rastreamento
+from common.http_client import ChamadaHttp
+from common.lazy import ao_importar
+from common.rastreamento import contar, gravar_relatorio, iniciar_execucao, propagar, rastreado, span
+
+N_LOTES = 10
+CHAMADA = ChamadaHttp("POST", "https://frete.example/cotar", "frete.example", 200, 0.1, 100, 2_000, 0)
+
+
+def test_spans_aninhados_agregam_por_nome_e_contam_http_nas_threads(tmp_path: Path) -> None:
+    execucao = iniciar_execucao("cid-teste-1234")
+
+    @rastreado("fretes", itens=lambda _r: 1)
+    def cotar(lote: int) -> int:
+        rastreamento._registrar_http(CHAMADA)  # o que o observador do HTTPAdapter faz
+        return lote
+
+    with span("pipeline"):
+        with span("fretes"):  # a função rastreada de mesmo nome não cria outro nível
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                assert sorted(pool.map(propagar(cotar), range(N_LOTES))) == list(range(N_LOTES))
+        with span("lotes"):
+            contar("itens", 3)
+    cotar(99)  # fora de qualquer etapa: vira um nó "fretes" direto na execução
+
+    relatorio = execucao.relatorio()
+    assert relatorio["correlation_id"] == "cid-teste-1234"
+    assert relatorio["http"]["chamadas"] == N_LOTES + 1
+
+    pipeline, fretes_solto = relatorio["etapas"]
+    assert pipeline["nome"] == "pipeline" and fretes_solto["execucoes"] == 1
+    fretes, lotes = pipeline["filhos"]
+    assert fretes["execucoes"] == 1 and fretes["contagens"] == {"itens": N_LOTES}
+    assert fretes["http"] == {
+        "chamadas": N_LOTES,
+        "por_host": {"frete.example": N_LOTES},
+        "bytes_enviados": 100 * N_LOTES,
+        "bytes_recebidos": 2_000 * N_LOTES,
+    }
+    assert pipeline["http"]["chamadas"] == N_LOTES
+    assert lotes["contagens"] == {"itens": 3} and lotes["http"]["chamadas"] == 0
+
+    caminho = gravar_relatorio(tmp_path)
+    assert caminho is not None and caminho.parent == tmp_path
+    assert json.loads(caminho.read_text(encoding="utf-8"))["etapas"][0]["nome"] == "pipeline"
+
+
+def test_erro_na_etapa_e_contado_e_propagado() -> None:
+    execucao = iniciar_execucao("cid-erro")
+    with pytest.raises(ValueError), span("guru_coleta"):
+        raise ValueError("falhou")
+    (etapa,) = execucao.relatorio()["etapas"]
+    assert etapa["erros"] == 1 and etapa["execucoes"] == 1
+
+
+def test_ao_importar_espera_o_primeiro_import(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (tmp_path / "modulo_gancho_teste.py").write_text("VALOR = 42\n", encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    vistos: list[int] = []
+
+    ao_importar("modulo_gancho_teste", lambda m: vistos.append(m.VALOR))
+    assert vistos == [] and "modulo_gancho_teste" not in sys.modules
+
+    importlib.import_module("modulo_gancho_teste")
+
+    ao_importar("modulo_gancho_teste", lambda m: vistos.append(m.VALOR + 1))  # já carregado: chama na hora
+    assert vistos == [42, 43]
+    monkeypatch.delitem(sys.modules, "modulo_gancho_teste")
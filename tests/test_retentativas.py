@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import threading
+import time
+from email.utils import formatdate
+from typing import TYPE_CHECKING, Any
+
+import pytest
+
+from common.errors import ExternalError
+from common.http_client import _build_session, http_get
+from common.prazo import ExecucaoInterrompida
+from common.retentativas import (
+    BACKOFF_BASE_S,
+    OrcamentoRetentativas,
+    espera_backoff,
+    ler_retry_after,
+    orcamento_retentativas,
+)
+
+if TYPE_CHECKING:
+    from tests.conftest import ServidorHttp
+
+RESERVA = 2.0
+RETRY_AFTER_S = 5.0
+
+
+def test_orcamento_rende_uma_ficha_a_cada_dez_requisicoes() -> None:
+    orcamento = OrcamentoRetentativas(razao=0.1, reserva=RESERVA)
+    assert orcamento.gastar("h") and orcamento.gastar("h")
+    assert not orcamento.gastar("h")  # reserva gasta: negada
+
+    for _ in range(10):
+        orcamento.registrar("h")
+    assert orcamento.gastar("h") and not orcamento.gastar("h")
+    assert orcamento.para_dict()["h"] == {"requisicoes": 10, "retentativas": 3, "negadas": 2, "saldo": 0.0}
+
+
+def test_backoff_com_jitter_respeita_retry_after() -> None:
+    assert ler_retry_after(" 5 ") == RETRY_AFTER_S
+    assert ler_retry_after(None) is None and ler_retry_after("amanhã") is None
+    assert ler_retry_after(formatdate(time.time() + 30, usegmt=True)) == pytest.approx(30, abs=2)
+    assert all(0 <= espera_backoff(3) <= BACKOFF_BASE_S * 8 for _ in range(100))
+    assert all(
+        RETRY_AFTER_S <= espera_backoff(0, retry_after=RETRY_AFTER_S) <= RETRY_AFTER_S + BACKOFF_BASE_S
+        for _ in range(100)
+    )
+
+
+@pytest.mark.parametrize("servidor_http", [{"status": 503, "headers": {"Retry-After": "0"}}], indirect=True)
+def test_retries_do_urllib3_param_no_orcamento(servidor_http: ServidorHttp, monkeypatch: pytest.MonkeyPatch) -> None:
+    url, acessos = servidor_http.url, servidor_http.acessos
+    monkeypatch.setattr(orcamento_retentativas, "reserva", RESERVA)
+    orcamento_retentativas.limpar()
+    sessao = _build_session()
+    try:
+        for _ in range(2):
+            with pytest.raises(ExternalError) as erro:
+                http_get(url, session=sessao)
+            assert erro.value.retryable
+    finally:
+        conta = orcamento_retentativas.para_dict()["127.0.0.1"]
+        orcamento_retentativas.limpar()
+
+    # 1ª chamada: original + 2 retentativas (a reserva); 2ª: só a original — sem Retry(total=5) inteiro
+    assert len(acessos) == 4  # noqa: PLR2004
+    assert conta["requisicoes"] == 2 and conta["retentativas"] == 2 and conta["negadas"] == 2  # noqa: PLR2004
+
+
+@pytest.fixture
+def guru_sempre_falha(main: Any, monkeypatch: pytest.MonkeyPatch) -> list[int]:
+    chamadas: list[int] = []
+
+    def coletar_vendas(*_args: Any, **_kwargs: Any) -> list[dict[str, Any]]:
+        chamadas.append(1)
+        raise main.TransientGuruError("HTTP 503")
+
+    monkeypatch.setattr(main, "coletar_vendas", coletar_vendas)
+    return chamadas
+
+
+def test_retry_da_guru_negado_ou_esgotado_sobe_o_erro(
+    main: Any, guru_sempre_falha: list[int], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    assert main.HOST_GURU == "digitalmanager.guru"
+
+    monkeypatch.setattr(main, "aguardar_retentativa", lambda *_a, **_k: False)
+    with pytest.raises(main.TransientGuruError):
+        main.coletar_vendas_com_retry("p1", "2025-01-01", "2025-01-31")
+    assert len(guru_sempre_falha) == 1  # negada: não tenta de novo
+
+    monkeypatch.setattr(main, "aguardar_retentativa", lambda *_a, **_k: True)
+    with pytest.raises(main.TransientGuruError):
+        main.coletar_vendas_com_retry("p1", "2025-01-01", "2025-01-31", tentativas=3)
+    assert len(guru_sempre_falha) == 1 + 3
+
+
+def test_retry_da_guru_cancelado_vira_execucao_interrompida(
+    main: Any, guru_sempre_falha: list[int], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cancelador = threading.Event()
+
+    def cancelar(*_args: Any, **_kwargs: Any) -> bool:
+        cancelador.set()
+        return False
+
+    monkeypatch.setattr(main, "aguardar_retentativa", cancelar)
+    with pytest.raises(ExecucaoInterrompida) as erro:
+        main.coletar_vendas_com_retry("p1", "2025-01-01", "2025-01-31", cancelador=cancelador)
+    assert isinstance(erro.value.__cause__, main.TransientGuruError) and not erro.value.retryable
+    assert len(guru_sempre_falha) == 1
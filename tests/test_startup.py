@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Dependências que só podem ser importadas no primeiro uso do subsistema (GUI/Guru/Shopify/PDF/LLM)
+PESADOS = (
+    "pandas",
+    "openai",
+    "reportlab",
+    "fpdf",
+    "brazilcep",
+    "dateutil",
+    "pydantic_settings",
+    "requests",
+    "PyQt5.QtGui",
+    "PyQt5.QtWidgets",
+)
+
+# Entrada da CLI até a validação da config (config sem fonte: sai com BAD_INPUT antes de qualquer coleta).
+# Como script, o main.py é compilado a cada execução — o tempo inclui isso e a subida do interpretador.
+CLI = ("main.py", "--mode", "cli", "--config", json.dumps({"output_dir": "saida"}))
+CODIGO_BAD_INPUT = 2
+
+# Orçamento (ms) do tempo de parede da entrada da CLI; ~0,4 s numa máquina de desenvolvimento, com folga
+# para CI lenta. LG_STARTUP_BUDGET_MS troca o valor (ex.: para apertar a checagem numa máquina conhecida).
+ORCAMENTO_PADRAO_MS = 1500
+ORCAMENTO_MS = int(os.getenv("LG_STARTUP_BUDGET_MS") or ORCAMENTO_PADRAO_MS)
+REPETICOES = 3
+
+_LINHA_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def _rodar(*args: str) -> subprocess.CompletedProcess[str]:
+    env = {**os.environ, "QT_QPA_PLATFORM": "offscreen", "LOG_CAPTURE_STDOUT": "0"}
+    return subprocess.run(
+        [sys.executable, *args], cwd=RAIZ, env=env, capture_output=True, text=True, timeout=120, check=False
+    )
+
+
+def importtime(*args: str) -> tuple[dict[str, int], subprocess.CompletedProcess[str]]:
+    """Roda `python -X importtime <args>` e retorna {módulo: tempo acumulado em µs}."""
+    proc = _rodar("-X", "importtime", *args)
+    tempos: dict[str, int] = {}
+    for linha in proc.stderr.splitlines():
+        m = _LINHA_RE.match(linha)
+        if m:
+            tempos[m.group(4)] = int(m.group(2))
+    return tempos, proc
+
+
+def relatorio(tempos: dict[str, int], n: int = 15) -> str:
+    """Os `n` imports mais caros (tempo acumulado), no formato do -X importtime."""
+    mais_caros = sorted(tempos.items(), key=lambda kv: kv[1], reverse=True)[:n]
+    return "\n".join(f"{us / 1000:9.1f} ms  {nome}" for nome, us in mais_caros)
+
+
+def _carregados(tempos: dict[str, int]) -> list[str]:
+    return [p for p in PESADOS if any(nome == p or nome.startswith(p + ".") for nome in tempos)]
+
+
+def test_import_main_nao_carrega_dependencias_pesadas() -> None:
+    tempos, proc = importtime("-c", "import main")
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    assert _carregados(tempos) == [], relatorio(tempos)
+
+
+def tempo_cli_ms() -> float:
+    """Melhor de REPETICOES execuções da entrada da CLI, em ms de tempo de parede."""
+    melhor = float("inf")
+    for _ in range(REPETICOES):
+        t0 = time.perf_counter()
+        proc = _rodar(*CLI)
+        melhor = min(melhor, (time.perf_counter() - t0) * 1000)
+        assert proc.returncode == CODIGO_BAD_INPUT, proc.stderr[-2000:]
+    return melhor
+
+
+def test_cli_nao_carrega_dependencias_pesadas() -> None:
+    tempos, proc = importtime(*CLI)
+    assert proc.returncode == CODIGO_BAD_INPUT, proc.stderr[-2000:]
+    assert "BAD_INPUT" in proc.stdout + proc.stderr
+    assert "PyQt5.QtCore" in tempos  # sinais e QRunnables do pipeline continuam no QtCore
+    assert _carregados(tempos) == [], relatorio(tempos)
+
+
+def test_cli_dentro_do_orcamento() -> None:
+    decorrido_ms = tempo_cli_ms()
+    assert decorrido_ms <= ORCAMENTO_MS, f"{decorrido_ms:.0f} ms > {ORCAMENTO_MS} ms\n" + relatorio(importtime(*CLI)[0])
+
+
+def test_help_nao_carrega_dependencias_pesadas() -> None:
+    tempos, proc = importtime("main.py", "--help")
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    assert "--mode" in proc.stdout
+    assert _carregados(tempos) == [], relatorio(tempos)
+
+
+if __name__ == "__main__":
+    print(f"--mode cli: {tempo_cli_ms():.0f} ms (orçamento {ORCAMENTO_MS} ms)")
+    print(relatorio(importtime(*CLI)[0]))
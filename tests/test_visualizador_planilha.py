@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import pandas as pd
+import pytest
+
+if TYPE_CHECKING:
+    from tests.conftest import Mensagens
+
+LINHAS = 4
+
+
+@pytest.fixture(scope="module")
+def app_qt(main: Any) -> Any:
+    return main.QApplication.instance() or main.QApplication([])
+
+
+def _df(main: Any) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Produto": ["Livro A", "Caneca", "Livro B", "Box"],
+            "Data": ["01/03/2025", "15/02/2025", "", "01/03/2025"],
+            # como texto, "59,90" > "1234,56" > "10,00" > "5,00"; pelo valor a ordem é outra
+            "Valor Total": [main.para_centavos(v) for v in (59.9, 1234.56, 5.0, 10.0)],
+        }
+    )
+
+
+def _coluna(modelo: Any, nome: str) -> list[Any]:
+    j = list(modelo.df.columns).index(nome)
+    return [modelo.data(modelo.index(i, j)) for i in range(modelo.rowCount())]
+
+
+def test_modelo_le_e_edita_o_dataframe(main: Any) -> None:
+    Qt, QModelIndex = main.Qt, main.QModelIndex
+    modelo = main.DataFrameTableModel(_df(main))
+    alterados: list[tuple[int, int]] = []
+    modelo.dataChanged.connect(lambda a, b, *_: alterados.append((a.row(), b.column())))
+
+    assert (modelo.rowCount(), modelo.columnCount()) == (LINHAS, 3)
+    assert modelo.rowCount(modelo.index(0, 0)) == 0  # tabela: sem filhos
+    assert _coluna(modelo, "Valor Total") == ["59,90", "1234,56", "5,00", "10,00"]
+    assert modelo.data(modelo.index(1, 1), Qt.UserRole) == datetime(2025, 2, 15, tzinfo=main.TZ_APP)
+    assert modelo.data(modelo.index(2, 1), Qt.UserRole) is None  # data vazia
+    assert modelo.data(modelo.index(0, 0), Qt.UserRole) is None  # não é coluna de data
+    assert modelo.data(QModelIndex()) is None
+    assert modelo.headerData(2, Qt.Horizontal) == "Valor Total" and modelo.headerData(0, Qt.Vertical) == "1"
+
+    assert modelo.flags(QModelIndex()) == Qt.NoItemFlags
+    assert modelo.flags(modelo.index(0, 0)) & Qt.ItemIsEditable
+
+    assert not modelo.setData(modelo.index(1, 0), "Xícara", Qt.DisplayRole)
+    assert modelo.setData(modelo.index(1, 0), "Xícara")
+    assert modelo.df.iat[1, 0] == "Xícara" and modelo.data(modelo.index(1, 0)) == "Xícara"
+    assert alterados == [(1, 0)]
+    # a coluna de busca acompanha a edição
+    assert modelo.mascara_busca("xícara") == [False, True, False, False]
+    assert modelo.mascara_busca("caneca") == [False] * LINHAS
+    assert modelo.mascara_busca("") == [True] * LINHAS
+
+
+@pytest.mark.usefixtures("app_qt")
+def test_proxy_filtra_e_ordena_pelo_modelo(main: Any) -> None:
+    Qt = main.Qt
+    modelo = main.DataFrameTableModel(_df(main))
+    proxy = main._FiltroBuscaProxy()
+    proxy.setSourceModel(modelo)
+
+    proxy.definir_termo("livro")
+    assert [proxy.data(proxy.index(i, 0)) for i in range(proxy.rowCount())] == ["Livro A", "Livro B"]
+
+    # ordena pelo valor em centavos (não pelo texto) e reaplica o filtro sobre a nova ordem
+    proxy.sort(2, Qt.DescendingOrder)
+    assert _coluna(modelo, "Valor Total") == ["1234,56", "59,90", "10,00", "5,00"]
+    assert [proxy.data(proxy.index(i, 0)) for i in range(proxy.rowCount())] == ["Livro A", "Livro B"]
+
+    proxy.definir_termo("")
+    proxy.sort(0, Qt.AscendingOrder)
+    assert [proxy.data(proxy.index(i, 0)) for i in range(proxy.rowCount())] == ["Box", "Caneca", "Livro A", "Livro B"]
+    assert proxy.mapToSource(proxy.index(3, 0)).row() == LINHAS - 1
+
+
+def test_remover_linhas_atualiza_os_caches(main: Any) -> None:
+    modelo = main.DataFrameTableModel(_df(main))
+
+    modelo.remover_linhas([0, 2])
+
+    assert modelo.rowCount() == LINHAS - 2
+    assert _coluna(modelo, "Produto") == ["Caneca", "Box"]
+    assert modelo.mascara_busca("livro") == [False, False]
+    assert modelo.setData(modelo.index(1, 0), "Box 2") and modelo.df["Produto"].tolist() == ["Caneca", "Box 2"]
+
+
+@pytest.mark.usefixtures("app_qt")
+def test_salvar_edicoes_devolve_o_dataframe_editado(main: Any, mensagens: Mensagens, tmp_path: Path) -> None:
+    estado: dict[str, Any] = {}
+    caminho_log = tmp_path / "log.json"
+    dialogo = main.VisualizadorPlanilha(_df(main), estado, caminho_log)
+    modelo, proxy = dialogo.modelo, dialogo.proxy
+
+    proxy.sort(2, main.Qt.AscendingOrder)  # 5,00 / 10,00 / 59,90 / 1234,56
+    dialogo.campo_busca.setText("LIVRO ")  # busca ignora caixa e espaços nas pontas
+    assert [proxy.data(proxy.index(i, 0)) for i in range(proxy.rowCount())] == ["Livro B", "Livro A"]
+    assert proxy.setData(proxy.index(1, 2), "60,00")  # Livro A (59,90), visto pelo filtro
+    modelo.remover_linhas([1])  # Box (10,00)
+
+    dialogo.salvar_edicoes()
+
+    salvo = estado["df_planilha_parcial"]
+    assert salvo["Produto"].tolist() == ["Livro B", "Livro A", "Caneca"]
+    assert salvo["Valor Total"].dtype == "Int64" and salvo["Valor Total"].tolist() == [500, 6000, 123456]
+    assert salvo["Cupom"].tolist() == [""] * 3 and salvo.index.tolist() == [0, 1, 2]
+    assert dialogo.df.equals(salvo)
+
+    registros = json.loads(caminho_log.read_text(encoding="utf-8"))
+    assert [r["Valor Total"] for r in registros] == ["5,00", "60,00", "1234,56"]
+    assert mensagens[-1] == ("info", "Sucesso", "Alterações salvas no log.")